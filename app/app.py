@@ -1,8 +1,26 @@
-import os
-import requests
-from flask import Flask, request, jsonify, render_template
-from app.engine.football import analyze_football_match, SUPPORTED_MARKETS
-from app.engine.audit import export_picks, import_picks, store_pick, MEMORY_PICKS
+import os, time
+from contextlib import contextmanager, suppress
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.exceptions import ClientDisconnected
+from app.engine.football import analyze_football_match, analyze_football_batch, match_probabilities, simulate_slate, SUPPORTED_MARKETS, PayloadError
+from app.engine.audit import export_picks, import_picks, import_picks_ndjson, store_pick, picks_count
+from app.engine.ndjson import read_chunks, gzip_chunks, maybe_gunzip, split_lines
+from app.engine.store import FILTER_FIELDS
+from app.engine.adapters.http_pool import get_session, fan_out
+from app.engine.adapters import live_football as api
+from app.engine.adapters.cache import cache_key
+from app.engine.adapters.singleflight import FLIGHTS
+from app.engine.adapters import prefetch, replay
+from app.engine.adapters.sources import TEAM_INDEX, resolve_teams
+from app.engine.metrics import REGISTRY, span, record_upstream
+from app.engine.grid_cache import GRID_CACHE
+from app.engine import ratings
+from app.engine.odds import parse_odds, parse_fixture_odds
+from app.engine.consensus import DEVIG_METHOD
+from app.engine.slate import Slate
+from app.engine import fastjson
+from app.engine.stream import HUB as STREAM_HUB, STREAM_ODDS_S, STREAM_FIXTURES_S
 
 # --- ENV ---
 APISPORTS_KEY  = os.getenv("APISPORTS_KEY") or os.getenv("APISPORTS")
@@ -11,9 +29,30 @@ STRICT_TEAM_MATCH = os.getenv("STRICT_TEAM_MATCH", "0").lower() in ("1","true","
 BOOKMAKER_ID   = int(os.getenv("BOOKMAKER_ID", "8"))     # Bet365 id in API-FOOTBALL
 BOOKMAKER_NAME = os.getenv("BOOKMAKER_NAME", "Bet365")
 BRAND          = os.getenv("BRAND_NAME", "Betrun")
+ODDS_CONCURRENCY = int(os.getenv("ODDS_CONCURRENCY", "8"))       # in-flight /odds calls per request
+ODDS_DEADLINE_S  = float(os.getenv("ODDS_DEADLINE_S", "20"))     # overall budget for the odds stage
+ODDS_TIMEOUT_S   = float(os.getenv("ODDS_TIMEOUT_S", "10"))      # per /odds call
+# every bookmaker's prices: best 1X2 and de-vigged consensus per fixture (off = BOOKMAKER_ID's only)
+ODDS_CONSENSUS   = os.getenv("ODDS_CONSENSUS", "1").lower() in ("1","true","yes")
+ODDS_BOOKMAKER   = None if ODDS_CONSENSUS else BOOKMAKER_ID          # /odds bookmaker filter
 
 app = Flask(__name__, static_folder="static", template_folder="templates")
 
+class _JSONProvider(DefaultJSONProvider):
+    """jsonify through fastjson (orjson when installed); indented debug output stays on the stdlib."""
+    def response(self, *args, **kwargs):
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        if args and kwargs:
+            raise TypeError("app.json.response() takes either args or kwargs, not both")
+        obj = (args[0] if len(args) == 1 else list(args)) if args else (kwargs or None)
+        return self._app.response_class(fastjson.dumps(obj, default=self.default) + b"\n", mimetype=self.mimetype)
+
+app.json = _JSONProvider(app)
+
+class UpstreamError(RuntimeError):
+    """The fixtures call behind /api/matches failed; the routes answer it with a 502."""
+
 def _api_headers():
     if not APISPORTS_KEY:
         raise RuntimeError("Missing APISPORTS_KEY env var")
@@ -36,132 +75,343 @@ def env_status():
         "BOOKMAKER_ID": BOOKMAKER_ID,
         "BOOKMAKER_NAME": BOOKMAKER_NAME,
         "BRAND": BRAND,
+        "ODDS_CONCURRENCY": ODDS_CONCURRENCY,
+        "ODDS_DEADLINE_S": ODDS_DEADLINE_S,
+        "ODDS_CONSENSUS": ODDS_CONSENSUS and DEVIG_METHOD,
+        "JSON_ENCODER": fastjson.ENCODER,
+        "API_CORPUS": replay.API_CORPUS and f"{replay.API_CORPUS_MODE}:{replay.API_CORPUS}",
     }
     return jsonify(present)
 
+def _adapter_counters():
+    out = {}
+    if api.CACHE is not None:
+        for event in ("hits", "stale_hits", "misses", "refreshes", "errors", "disk_hits"):
+            out[("betrun_cache_events_total", (("event", event),))] = api.CACHE.counters[event]
+    for outcome in ("executed", "deduplicated", "errors"):
+        out[("betrun_singleflight_total", (("outcome", outcome),))] = FLIGHTS.counters[outcome]
+    for kind in ("grid", "market"):
+        for result in ("hits", "misses"):
+            out[("betrun_grid_cache_total", (("kind", kind), ("result", result)))] = GRID_CACHE.counters[f"{kind}_{result}"]
+    return out
+
+REGISTRY.collectors.append(_adapter_counters)
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus exposition, aggregated over every live worker that shares METRICS_DIR."""
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+@app.before_request
+def _start_prefetch():
+    prefetch.start()   # per worker, idempotent; one worker per host wins the scheduler lock
+
+@app.get("/prefetch_status")
+def prefetch_status():
+    """Per-league freshness of prefetched fixtures/odds, next refresh times and the call budget."""
+    return jsonify(prefetch.status())
+
+@app.get("/cache_status")
+def cache_status():
+    stats = api.CACHE.stats() if api.CACHE is not None else {"enabled": False}
+    stats["singleflight"] = FLIGHTS.stats()
+    stats["engine_grid"] = GRID_CACHE.stats()
+    return jsonify(stats)
+
 # -------- fixtures + odds (Bet365) --------
-@app.get("/api/matches")
-def api_matches():
+def _upstream_json(path, params, timeout):
+    """GET {APISPORTS_BASE}/{path}; concurrent identical calls from other threads share one request."""
+    def fetch():
+        t0, r, err = time.perf_counter(), None, None
+        try:
+            r = get_session().get(f"{APISPORTS_BASE}/{path}", headers=_api_headers(), params=params, timeout=timeout)
+            r.raise_for_status()
+            return r.json()
+        except Exception as e:
+            err = e
+            raise
+        finally:
+            record_upstream(path, time.perf_counter() - t0, r, err)
+    return FLIGHTS.do(cache_key(path, params), fetch)
+
+def _odds_params(**params):
+    return {**params, "bookmaker": ODDS_BOOKMAKER} if ODDS_BOOKMAKER else params
+
+def _fixture_book(fid):
+    data = _upstream_json("odds", _odds_params(fixture=fid), ODDS_TIMEOUT_S)
+    return parse_fixture_odds(data.get("response", []))
+
+def _fixture_slate(fixtures_raw):
+    """Columnar slate (odds not yet attached) of a fixtures response."""
+    # finished results update team ratings in the background (each fixture once)
+    ratings.submit_results(fixtures_raw)
+    TEAM_INDEX.add_fixtures(fixtures_raw)
+    return Slate(fixtures_raw)
+
+def _bulk_books(entries, fixture_ids):
+    with span("matches.odds_parse"):
+        books = parse_odds(entries)
+        return [books.get(fid) for fid in fixture_ids]
+
+def _slate_books(entries, fixture_ids):
+    """Books of a bulk odds pull, or None to fall back to per-fixture calls (the pull failed: entries is None)."""
+    if entries is None:
+        return None
+    try:
+        return _bulk_books(entries, fixture_ids)
+    except Exception:
+        return None
+
+def _attach_odds(slate, books):
+    """Configured bookmaker's prices, with best price and consensus over all bookmakers."""
+    with span("matches.odds_attach"):
+        return slate.attach(books, BOOKMAKER_ID, BOOKMAKER_NAME, DEVIG_METHOD if ODDS_CONSENSUS else None)
+
+def _require_key():
+    if not APISPORTS_KEY:
+        raise UpstreamError("fixtures: Missing APISPORTS_KEY env var")
+
+@contextmanager
+def _upstream_stage(stage):
+    """Any failure inside is re-raised as UpstreamError("<stage>: ...") (a 502 for /api/matches)."""
+    try:
+        yield
+    except Exception as e:
+        raise UpstreamError(f"{stage}: {e}") from e
+
+def _match_slate(league_id, season, date, fixtures_ttl=None, odds_ttl=None):
     """
-    GET /api/matches?league_id=39&season=2025&date=YYYY-MM-DD
-    Returns fixtures WITH Bet365 1X2 odds when available.
+    /api/matches slate for a query. The ttls force an upstream refresh that stays cached that
+    long (the live stream polls through them); fixtures errors raise UpstreamError, odds errors
+    leave odds=None. asgi.match_slate is the same steps with the upstream calls awaited.
     """
+    # 1) fixtures
+    _require_key()
+    with _upstream_stage("fixtures"), span("matches.fixtures"):
+        fixtures_raw = api.fixtures(league_id, season, date, refresh_ttl=fixtures_ttl)   # cached; warmed by the prefetcher
+    slate = _fixture_slate(fixtures_raw)
+    fixture_ids = slate.ids()
+
+    # Early return if no fixtures
+    if not fixture_ids:
+        return slate
+
+    # 2) odds (1X2 plus every other market the engine prices), for every bookmaker unless
+    # ODDS_CONSENSUS is off: one paged bulk pull for the league/date, parsed in one pass and joined
+    # by fixture id. Bet365's prices fill odds/market_odds; all bookmakers' 1X2 the best price and consensus.
+    # If the bulk endpoint fails, fall back to per-fixture calls fanned out over pooled connections;
+    # fixtures whose odds miss the deadline keep odds=None instead of holding up the response.
+    entries = None
+    with suppress(Exception), span("matches.odds_fetch"):
+        entries = api.odds_bulk(league_id, season, date, bookmaker=ODDS_BOOKMAKER, refresh_ttl=odds_ttl)
+    books = _slate_books(entries, fixture_ids)
+    if books is None:
+        with span("matches.odds_fanout"):
+            books = fan_out(_fixture_book, fixture_ids, ODDS_CONCURRENCY, ODDS_DEADLINE_S)
+    return _attach_odds(slate, books)
+
+def _matches_query():
     league_id = request.args.get("league_id", type=int)
     season    = request.args.get("season", type=int)
     date      = request.args.get("date")  # optional
+    return league_id, season, date
 
+@app.get("/api/matches")
+def api_matches():
+    """
+    GET /api/matches?league_id=39&season=2025&date=YYYY-MM-DD
+    Returns fixtures WITH Bet365 1X2 odds (and the other priced markets) when available, plus
+    the best 1X2 price over all bookmakers and their de-vigged consensus.
+    """
+    league_id, season, date = _matches_query()
     if not (league_id and season) and not date:
         return jsonify({"error": "Provide league_id & season OR a specific date (YYYY-MM-DD)"}), 400
+    try:
+        slate = _match_slate(league_id, season, date)
+    except UpstreamError as e:
+        return jsonify({"error": str(e)}), 502
+    return jsonify({"count": len(slate), "items": slate.items()})
 
-    # 1) fixtures
-    params = {}
-    if league_id: params["league"] = league_id
-    if season:    params["season"] = season
-    if date:      params["date"]   = date
+def _model_probs(items):
+    """Model 1/X/2 probabilities for /api/matches items (fitted ratings where the league has them)."""
+    payloads = [{k: it.get(k) for k in ("league_id", "season", "home_id", "away_id", "home", "away")} for it in items]
+    return match_probabilities(payloads)[1]
 
+@app.get("/api/matches/stream")
+def api_matches_stream():
+    """
+    GET /api/matches/stream?league_id=39&season=2025&date=YYYY-MM-DD   (text/event-stream)
+    A snapshot of the /api/matches items (each with its value-mode edges), then deltas as odds
+    move or statuses change. All viewers of a query share one upstream poller per worker.
+    """
+    league_id, season, date = _matches_query()
+    if not (league_id and season) and not date:
+        return jsonify({"error": "Provide league_id & season OR a specific date (YYYY-MM-DD)"}), 400
+    fetch = lambda refresh: _match_slate(league_id, season, date, fixtures_ttl=STREAM_FIXTURES_S if refresh else None,
+                                         odds_ttl=STREAM_ODDS_S).items()
     try:
-        r = requests.get(f"{APISPORTS_BASE}/fixtures", headers=_api_headers(), params=params, timeout=25)
-        r.raise_for_status()
-        fixtures_raw = r.json().get("response", [])
-    except Exception as e:
-        return jsonify({"error": f"fixtures: {e}"}), 502
+        feed, sub = STREAM_HUB.subscribe((league_id, season, date), fetch, _model_probs)
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 503
+    return Response(feed.stream(sub), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
-    items = []
-    fixture_ids = []
-    for fx in fixtures_raw:
-        league = fx.get("league", {})
-        h = fx.get("teams", {}).get("home", {}) or {}
-        a = fx.get("teams", {}).get("away", {}) or {}
-        fid = fx.get("fixture", {}).get("id")
-        fixture_ids.append(fid)
-        items.append({
-            "fixture_id": fid,
-            "utc": fx.get("fixture", {}).get("date"),
-            "status": fx.get("fixture", {}).get("status", {}).get("short"),
-            "league_id": league.get("id"),
-            "league": league.get("name"),
-            "season": league.get("season"),
-            "home_id": h.get("id"),
-            "home": h.get("name"),
-            "away_id": a.get("id"),
-            "away": a.get("name"),
-            "odds": None,
-            "bookmaker": None
-        })
+@app.get("/stream_status")
+def stream_status():
+    """Live queries streamed by this worker: viewers, polls and events sent."""
+    return jsonify(STREAM_HUB.status())
 
-    # Early return if no fixtures
-    if not fixture_ids:
-        return jsonify({"count": 0, "items": []})
-
-    # 2) fetch odds per fixture (1X2 market) for Bet365
-    # API-FOOTBALL returns odds per fixture; call in batches to stay safe (here: one-by-one simple loop)
-    for it in items:
-        fid = it["fixture_id"]
-        try:
-            r = requests.get(
-                f"{APISPORTS_BASE}/odds",
-                headers=_api_headers(),
-                params={"fixture": fid, "bookmaker": BOOKMAKER_ID},
-                timeout=25
-            )
-            r.raise_for_status()
-            resp = r.json().get("response", [])
-        except Exception:
-            resp = []
-
-        # parse 1X2 if present
-        odds_map = None
-        if resp:
-            # resp structure: list of {bookmakers:[{name, bets:[{name, values:[{value,odd}]}]}]} per response item
-            for entry in resp:
-                for bm in entry.get("bookmakers", []):
-                    if str(bm.get("id")) == str(BOOKMAKER_ID) or bm.get("name") == BOOKMAKER_NAME:
-                        for bet in bm.get("bets", []):
-                            if bet.get("name", "").lower() in ("match winner", "1x2", "1x2 ft", "ft 1x2"):
-                                # values: [{"value":"Home","odd":"1.95"}, {"value":"Draw","odd":"3.40"}, {"value":"Away","odd":"3.45"}]
-                                mm = {}
-                                for v in bet.get("values", []):
-                                    val = (v.get("value") or "").lower()
-                                    try:
-                                        price = float(v.get("odd"))
-                                    except Exception:
-                                        continue
-                                    if val.startswith("home"): mm["1"] = price
-                                    elif val.startswith("draw"): mm["X"] = price
-                                    elif val.startswith("away"): mm["2"] = price
-                                if mm:
-                                    odds_map = mm
-                                    break
-                    if odds_map: break
-                if odds_map: break
-
-        if odds_map:
-            it["odds"] = odds_map
-            it["bookmaker"] = BOOKMAKER_NAME
-
-    return jsonify({"count": len(items), "items": items})
+@app.post("/api/teams/resolve")
+def api_teams_resolve():
+    """
+    POST {"names": ["Man City", "Arsenal", ...], "league_id": 39}
+    Resolves every name against the local team index; only misses go to API-Football.
+    """
+    body = request.get_json(force=True, silent=True) or {}
+    names = body.get("names")
+    if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+        return jsonify({"error": "Body must be {\"names\": [str, ...]}"}), 400
+    league_id = body.get("league_id") or None
+    if league_id is not None:
+        if isinstance(league_id, bool) or not isinstance(league_id, (int, str)) or not str(league_id).strip().isdigit():
+            return jsonify({"error": f"league_id must be an integer, got {league_id!r}"}), 400
+        league_id = int(league_id)
+    items = []
+    for name, m in zip(names, resolve_teams(names, league_id)):
+        team = (m.team or {}).get("team") or {}
+        items.append({"name": name, "team_id": team.get("id"), "team": team.get("name"), "how": m.how,
+                      "score": round(m.score, 1), "candidates": [list(c) for c in m.candidates]})
+    return jsonify({"count": len(items), "items": items, "index_size": len(TEAM_INDEX)})
 
 # -------- analyzers --------
 @app.post("/analyze/football")
 def analyze_football():
     payload = request.get_json(force=True, silent=True) or {}
     try:
-        result = analyze_football_match(payload)
+        with span("analyze.total"):
+            result = analyze_football_match(payload)
+    except PayloadError as e:
+        return jsonify({"status": "ERROR", "reason": str(e)}), 400
     except Exception as e:
         return jsonify({"status": "ERROR", "reason": str(e)}), 500
     store_pick(result)
     return jsonify(result)
 
+@app.post("/analyze/football/batch")
+def analyze_football_batch_view():
+    """
+    POST /analyze/football/batch  {"items": [<analyze/football payload>, ...]}
+    Evaluates the whole slate in one engine pass; items come back in request order.
+    """
+    data = request.get_json(force=True, silent=True) or {}
+    payloads = data.get("items", []) if isinstance(data, dict) else data
+    if not isinstance(payloads, list) or not all(isinstance(p, dict) for p in payloads):
+        return jsonify({"status": "ERROR", "reason": "items must be a list of match payloads"}), 400
+    try:
+        with span("analyze_batch.total"):
+            results = analyze_football_batch(payloads)
+    except PayloadError as e:
+        return jsonify({"status": "ERROR", "reason": str(e)}), 400
+    except Exception as e:
+        return jsonify({"status": "ERROR", "reason": str(e)}), 500
+    for result in results:
+        store_pick(result)
+    return jsonify({"count": len(results), "items": results})
+
+@app.post("/simulate/bankroll")
+def simulate_bankroll():
+    """
+    POST /simulate/bankroll  {"items": [<analyze/football payload> + optional "selection", "price"],
+                              "paths": 10000, "rounds": 100, "kelly": [0.25, 0.5, 1], "max_exposure": 1,
+                              "ruin": 0.5, "seed": 7}
+    Monte Carlo of the slate: flat-stake P&L distribution, and per Kelly multiplier the terminal
+    bankroll, log growth, max drawdown and risk of ruin over `rounds` repeats.
+    """
+    data = request.get_json(force=True, silent=True) or {}
+    items = data.get("items") if isinstance(data, dict) else None
+    if not isinstance(items, list) or not all(isinstance(p, dict) for p in items):
+        return jsonify({"status": "ERROR", "reason": "items must be a list of match payloads"}), 400
+    try:
+        opts = {k: int(data[k]) for k in ("paths", "rounds") if data.get(k) is not None}
+        opts.update({k: float(data[k]) for k in ("max_exposure", "ruin") if data.get(k) is not None})
+        if data.get("kelly") is not None: opts["kelly"] = [float(m) for m in data["kelly"]]
+        if data.get("seed") is not None: opts["seed"] = int(data["seed"])
+        with span("simulate.total"):
+            result = simulate_slate(items, **opts)
+    except (TypeError, ValueError) as e:
+        return jsonify({"status": "ERROR", "reason": str(e)}), 400
+    return jsonify(result)
+
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))
+
+def _pick_filters():
+    keys = FILTER_FIELDS + ("date_from", "date_to")
+    return {k: request.args[k] for k in keys if request.args.get(k)}
+
+def _export_page(default_limit=None):
+    """(limit, cursor) query args of the export routes; ValueError for anything but positive integers."""
+    def arg(name):
+        raw = request.args.get(name)
+        if raw is None or raw == "": return None
+        try: val = int(raw)
+        except ValueError: raise ValueError(f"{name} must be an integer") from None
+        if val < 1 and name == "limit": raise ValueError("limit must be at least 1")
+        if val < 0: raise ValueError(f"{name} must not be negative")
+        return val
+    limit, cursor = arg("limit"), arg("cursor")
+    return (default_limit if limit is None else limit), cursor
+
 @app.get("/export")
 def export_json():
-    return jsonify(export_picks())
+    """
+    GET /export?league=EPL&status=FINAL_PICK&selection=1&date_from=YYYY-MM-DD&date_to=...&limit=500&cursor=<next_cursor>
+    Paginated by insertion order; follow next_cursor until it is null.
+    """
+    try: limit, cursor = _export_page(EXPORT_PAGE_SIZE)
+    except ValueError as e:
+        return jsonify({"status": "ERROR", "reason": str(e)}), 400
+    return jsonify(export_picks(_pick_filters(), limit=min(limit, EXPORT_PAGE_SIZE), cursor=cursor))
 
 @app.post("/import")
 def import_json():
     data = request.get_json(force=True, silent=True) or {}
     items = data.get("items", [])
     import_picks(items)
-    return jsonify({"status": "ok", "count": len(MEMORY_PICKS)})
+    return jsonify({"status": "ok", "count": picks_count()})
+
+@app.get("/export/stream")
+def export_stream():
+    """
+    GET /export/stream?<same filters as /export>&cursor=<id>&gzip=1
+    Every matching pick as NDJSON, streamed with constant memory; gzip=1 sends a .ndjson.gz file.
+    """
+    try: limit, cursor = _export_page()
+    except ValueError as e:
+        return jsonify({"status": "ERROR", "reason": str(e)}), 400
+    lines = export_picks(_pick_filters(), limit=limit, cursor=cursor, stream=True)
+    if request.args.get("gzip", "0").lower() in ("1","true","yes"):
+        return Response(stream_with_context(gzip_chunks(lines)), mimetype="application/gzip",
+                        headers={"Content-Disposition": "attachment; filename=betrun_picks.ndjson.gz"})
+    return Response(stream_with_context(lines), mimetype="application/x-ndjson")
+
+def _upload_chunks():
+    """Request body chunks; a dropped upload ends them with OSError like any other failed read."""
+    try: yield from read_chunks(request.stream)
+    except ClientDisconnected as e: raise OSError("upload interrupted") from e
+
+@app.post("/import/stream")
+def import_stream():
+    """
+    POST /import/stream?cursor=0&replace=0  body: NDJSON picks, plain or gzip (detected).
+    Appends in committed chunks; on a bad line or dropped upload the reply is status=partial
+    with the cursor to resume from (re-send the same body with ?cursor=<cursor>).
+    """
+    cursor = request.args.get("cursor", 0, type=int) or 0
+    replace = request.args.get("replace", "0").lower() in ("1","true","yes")
+    lines = split_lines(maybe_gunzip(_upload_chunks()))
+    result = import_picks_ndjson(lines, cursor=cursor, replace=replace)
+    result["count"] = picks_count()
+    return jsonify(result), (200 if result["status"] == "ok" else 422)
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=8000, debug=True)
@@ -0,0 +1,108 @@
+# app/asgi.py
+"""
+ASGI entry point, alongside the WSGI app.app:app:
+
+    uvicorn app.asgi:app --workers 2
+    gunicorn -w 2 -k uvicorn.workers.UvicornWorker app.asgi:app
+
+GET /api/matches runs on the event loop: the fixtures call, the bulk odds pages and the
+per-fixture fallback are awaited on live_football_async's shared connection pool, so a worker
+is not limited to one in-flight request per thread. Items, odds parsing and the response are
+built by the same helpers as the Flask route; the blocking ones (slate building with its
+ratings and team-index updates, odds parsing) run in the default executor, off the loop.
+Every other route is the Flask app itself, served from a thread pool of ASGI_WSGI_THREADS
+threads (a2wsgi).
+"""
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from contextlib import suppress
+from urllib.parse import parse_qs
+import asyncio, os
+from a2wsgi import WSGIMiddleware
+
+from app import app as web
+from app.engine.adapters import live_football_async as aio
+from app.engine.adapters import prefetch
+from app.engine.metrics import REGISTRY, span
+from app.engine.odds import OddsBook
+from app.engine.slate import Slate
+from app.engine import fastjson
+
+ASGI_WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", "16"))   # threads for the Flask routes per worker
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+wsgi = WSGIMiddleware(web.app, workers=ASGI_WSGI_THREADS)
+
+REGISTRY.collectors.append(lambda: {("betrun_async_singleflight_total", (("outcome", o),)): aio.FLIGHTS.counters[o]
+                                    for o in ("executed", "deduplicated", "errors")})
+
+async def _fixture_book(fid: int) -> Optional[OddsBook]:
+    params = web._odds_params(fixture=fid)
+    data = await aio.FLIGHTS.do(web.cache_key("odds", params), lambda: aio.get_json(
+        f"{web.APISPORTS_BASE}/odds", "odds", params, web._api_headers(), web.ODDS_TIMEOUT_S))
+    return web.parse_fixture_odds(data.get("response", []))
+
+async def match_slate(league_id: Optional[int], season: Optional[int], date: Optional[str]) -> Slate:
+    """app._match_slate with the upstream calls awaited."""
+    web._require_key()
+    with web._upstream_stage("fixtures"), span("matches.fixtures"):
+        fixtures_raw = await aio.fixtures(league_id, season, date)
+    slate = await asyncio.to_thread(web._fixture_slate, fixtures_raw)
+    fixture_ids = slate.ids()
+    if not fixture_ids:
+        return slate
+    entries = None
+    with suppress(Exception), span("matches.odds_fetch"):
+        entries = await aio.odds_bulk(league_id, season, date, bookmaker=web.ODDS_BOOKMAKER)
+    books = await asyncio.to_thread(web._slate_books, entries, fixture_ids)
+    if books is None:
+        with span("matches.odds_fanout"):
+            books = await aio.fan_out(_fixture_book, fixture_ids, web.ODDS_CONCURRENCY, web.ODDS_DEADLINE_S)
+    return await asyncio.to_thread(web._attach_odds, slate, books)
+
+def _query(scope: Scope) -> Tuple[Optional[int], Optional[int], Optional[str]]:
+    q = {k: v[0] for k, v in parse_qs(scope.get("query_string", b"").decode("latin-1")).items()}
+    def as_int(name: str) -> Optional[int]:
+        try: return int(q[name])
+        except (KeyError, ValueError): return None
+    return as_int("league_id"), as_int("season"), q.get("date")
+
+async def _json(send: Send, status: int, obj: Any) -> None:
+    body = fastjson.dumps(obj)
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+async def api_matches(scope: Scope, receive: Receive, send: Send) -> None:
+    league_id, season, date = _query(scope)
+    if not (league_id and season) and not date:
+        return await _json(send, 400, {"error": "Provide league_id & season OR a specific date (YYYY-MM-DD)"})
+    try:
+        slate = await match_slate(league_id, season, date)
+    except web.UpstreamError as e:
+        return await _json(send, 502, {"error": str(e)})
+    await _json(send, 200, {"count": len(slate), "items": slate.items()})
+
+async def _lifespan(receive: Receive, send: Send) -> None:
+    while True:
+        msg = await receive()
+        if msg["type"] == "lifespan.startup":
+            prefetch.start()
+            await send({"type": "lifespan.startup.complete"})
+        elif msg["type"] == "lifespan.shutdown":
+            await aio.aclose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+# path -> native handler; everything else goes to Flask
+ROUTES = {"/api/matches": api_matches}
+
+async def app(scope: Scope, receive: Receive, send: Send) -> None:
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    handler = ROUTES.get(scope.get("path", "")) if scope["type"] == "http" and scope.get("method") == "GET" else None
+    if handler is not None:
+        return await handler(scope, receive, send)
+    await wsgi(scope, receive, send)
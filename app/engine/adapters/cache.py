@@ -0,0 +1,307 @@
+# app/engine/adapters/cache.py
+"""
+Response cache for upstream API calls.
+
+Entries are keyed on path + sorted params and held in a bounded in-process LRU. An
+optional sqlite file (API_CACHE_DB) sits behind it so every gunicorn worker on the host
+shares fetched responses. Freshness is per endpoint: within `ttl` an entry is served as
+is; within `ttl + stale` it is served stale while one background refresh runs; after
+that the caller fetches synchronously. An entry written with its own ttl (the prefetcher
+does this, see prefetch.py) keeps that ttl, and at most as long again stale, until it is
+next replaced. A fixtures response with a match in play or kicking off within
+API_CACHE_LIVE_LEAD_S gets API_CACHE_LIVE_TTL at most, so live statuses stay current.
+
+Bodies carrying API-Football "errors" (quota, bad parameters; still HTTP 200) are never
+stored. The memory tier keeps encoded JSON, so every hit is the caller's own copy.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import asyncio, json, os, sqlite3, threading, time
+from .. import fastjson
+
+API_CACHE             = os.getenv("API_CACHE", "1").lower() in ("1","true","yes")
+API_CACHE_MAX_ENTRIES = int(os.getenv("API_CACHE_MAX_ENTRIES", "2048"))
+API_CACHE_DB          = os.getenv("API_CACHE_DB", "")   # e.g. /tmp/betrun_cache.sqlite; empty = memory only
+API_CACHE_LIVE_TTL    = float(os.getenv("API_CACHE_LIVE_TTL", "60"))        # fixtures with a match live or about to start; 0 = off
+API_CACHE_LIVE_LEAD_S = float(os.getenv("API_CACHE_LIVE_LEAD_S", "7200"))   # "about to start": kickoff within this
+LIVE_STATUSES = ("1H", "HT", "2H", "ET", "BT", "P", "SUSP", "INT", "LIVE")
+
+# endpoint -> (ttl seconds, stale-while-revalidate seconds); longest matching path prefix wins
+DEFAULT_POLICIES: Dict[str, Tuple[float, float]] = {
+    "teams":              (3*86400, 86400),
+    "fixtures":           (600,     1800),
+    "fixtures/headtohead":(86400,   86400),
+    "injuries":           (6*3600,  6*3600),
+    "odds":               (30,      60),
+}
+
+def _parse_policies(spec: str) -> Dict[str, Tuple[float, float]]:
+    """API_CACHE_TTLS="odds=15:30,teams=86400" -> {endpoint: (ttl, stale)}; stale defaults to ttl."""
+    out: Dict[str, Tuple[float, float]] = {}
+    for part in (spec or "").split(","):
+        if "=" not in part: continue
+        name, val = part.split("=", 1)
+        ttl, _, stale = val.partition(":")
+        try: out[name.strip().strip("/")] = (float(ttl), float(stale or ttl))
+        except ValueError: continue
+    return out
+
+def cache_key(path: str, params: Optional[Dict[str, Any]]) -> str:
+    items = sorted((str(k), str(v)) for k, v in (params or {}).items())
+    return path.strip("/") + "?" + "&".join(f"{k}={v}" for k, v in items)
+
+def cacheable(value: Any) -> bool:
+    """False for an API-Football body reporting errors; replay.Corpus.put records by the same rule."""
+    return not (isinstance(value, dict) and value.get("errors"))
+
+def live_fixtures(value: Any, now: float, lead_s: float = API_CACHE_LIVE_LEAD_S) -> bool:
+    """True when a /fixtures body has a match in play, or not started and due within lead_s."""
+    for fx in (value.get("response") if isinstance(value, dict) else None) or []:
+        if not isinstance(fx, dict): continue
+        f = fx.get("fixture") or {}
+        status = (f.get("status") or {}).get("short")
+        if status in LIVE_STATUSES: return True
+        ts = f.get("timestamp")
+        if status in ("NS", "TBD") and isinstance(ts, (int, float)) and ts <= now + lead_s: return True
+    return False
+
+# (stored_at, value, ttl override or None)
+Entry = Tuple[float, Any, Optional[float]]
+
+class MemoryBackend:
+    """Bounded LRU of encoded responses; get and items decode, so callers never share an object."""
+    def __init__(self, max_entries: int):
+        self.max_entries = max(1, max_entries)
+        self._data: "OrderedDict[str, Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None: return None
+            self._data.move_to_end(key)
+        return hit[0], fastjson.loads(hit[1]), hit[2]
+
+    def set(self, key: str, stored_at: float, value: Any, ttl: Optional[float] = None) -> None:
+        blob = fastjson.dumps(value)
+        with self._lock:
+            self._data[key] = (stored_at, blob, ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def items(self, prefix: str) -> List[Tuple[str, Any]]:
+        with self._lock:
+            found = [(k, v[1]) for k, v in self._data.items() if k.startswith(prefix)]
+        return [(k, fastjson.loads(blob)) for k, blob in found]
+
+class SqliteBackend:
+    """Shared on-disk tier; one connection per thread, WAL so workers read while one writes."""
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self._local = threading.local()
+        self._writes = 0
+        con = self._con()
+        con.execute("CREATE TABLE IF NOT EXISTS api_cache (key TEXT PRIMARY KEY, stored_at REAL, value TEXT)")
+        con.execute("CREATE INDEX IF NOT EXISTS api_cache_stored_at ON api_cache(stored_at)")
+        try: con.execute("ALTER TABLE api_cache ADD COLUMN ttl REAL")   # files from before per-entry ttls
+        except sqlite3.OperationalError: pass
+        con.commit()
+
+    def _con(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.path, timeout=5)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+        return con
+
+    def get(self, key: str) -> Optional[Entry]:
+        row = self._con().execute("SELECT stored_at, value, ttl FROM api_cache WHERE key=?", (key,)).fetchone()
+        return (row[0], json.loads(row[1]), row[2]) if row else None
+
+    def items(self, prefix: str) -> List[Tuple[str, Any]]:
+        rows = self._con().execute("SELECT key, value FROM api_cache WHERE key >= ? AND key < ?",
+                                   (prefix, prefix + "\uffff")).fetchall()
+        return [(k, json.loads(v)) for k, v in rows]
+
+    def set(self, key: str, stored_at: float, value: Any, ttl: Optional[float] = None) -> None:
+        con = self._con()
+        con.execute("INSERT OR REPLACE INTO api_cache (key, stored_at, value, ttl) VALUES (?,?,?,?)",
+                    (key, stored_at, json.dumps(value, separators=(",", ":")), ttl))
+        self._writes += 1
+        if self._writes % 256 == 0:  # prune oldest rows now and then rather than on every write
+            con.execute("DELETE FROM api_cache WHERE key IN (SELECT key FROM api_cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,))
+        con.commit()
+
+class ResponseCache:
+    def __init__(self, policies: Optional[Dict[str, Tuple[float, float]]] = None,
+                 max_entries: int = API_CACHE_MAX_ENTRIES, db_path: str = API_CACHE_DB,
+                 refresh: Optional[Callable[[Callable[[], None]], Any]] = None):
+        self.policies = dict(DEFAULT_POLICIES, **(policies or {}))
+        self.memory = MemoryBackend(max_entries)
+        self.disk = SqliteBackend(db_path, max_entries * 8) if db_path else None
+        self._refresh = refresh or (lambda job: threading.Thread(target=job, daemon=True).start())
+        self._refreshing: set = set()
+        self._tasks: set = set()   # running async revalidations (held so they are not collected mid-flight)
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "errors": 0, "disk_hits": 0}
+
+    def policy(self, path: str) -> Tuple[float, float]:
+        path = path.strip("/")
+        best = ""
+        for name in self.policies:
+            if (path == name or path.startswith(name + "/")) and len(name) > len(best):
+                best = name
+        return self.policies.get(best, (0.0, 0.0))
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def _lookup(self, key: str) -> Optional[Entry]:
+        hit = self.memory.get(key)
+        if hit is None and self.disk is not None:
+            try: hit = self.disk.get(key)
+            except sqlite3.Error: hit = None
+            if hit is not None:
+                self._count("disk_hits")
+                self.memory.set(key, *hit)
+        return hit
+
+    async def _lookup_async(self, key: str) -> Optional[Entry]:
+        """_lookup with the sqlite read in a thread, so the event loop never waits on the disk."""
+        hit = self.memory.get(key)
+        if hit is None and self.disk is not None:
+            hit = await asyncio.to_thread(self._lookup, key)
+        return hit
+
+    async def put_async(self, path: str, params: Optional[Dict[str, Any]], value: Any,
+                        ttl: Optional[float] = None) -> None:
+        """put from a coroutine: the sqlite write runs in a thread."""
+        if self.disk is None: self.put(path, params, value, ttl=ttl)
+        else: await asyncio.to_thread(self.put, path, params, value, ttl=ttl)
+
+    def put(self, path: str, params: Optional[Dict[str, Any]], value: Any, stored_at: Optional[float] = None,
+            ttl: Optional[float] = None) -> None:
+        """Store a response unless it reports API errors; `ttl` overrides the endpoint policy's ttl for this entry."""
+        if not cacheable(value): return
+        key = cache_key(path, params)
+        stored_at = time.time() if stored_at is None else stored_at
+        if API_CACHE_LIVE_TTL > 0 and path.strip("/") == "fixtures" and live_fixtures(value, stored_at):
+            ttl = API_CACHE_LIVE_TTL if ttl is None else min(ttl, API_CACHE_LIVE_TTL)
+        self.memory.set(key, stored_at, value, ttl)
+        if self.disk is not None:
+            try: self.disk.set(key, stored_at, value, ttl)
+            except sqlite3.Error: self._count("errors")
+
+    def peek(self, path: str, params: Optional[Dict[str, Any]]) -> Optional[Tuple[float, Any]]:
+        """(stored_at, value) if cached at any age, without touching counters."""
+        hit = self._lookup(cache_key(path, params))
+        return hit[:2] if hit is not None else None
+
+    def responses(self, path: str) -> List[Tuple[Dict[str, str], Any]]:
+        """(params, response) for every cached call to an endpoint, at any age, memory and disk."""
+        prefix = path.strip("/") + "?"
+        found = dict(self.memory.items(prefix))
+        if self.disk is not None:
+            try:
+                for k, v in self.disk.items(prefix): found.setdefault(k, v)
+            except sqlite3.Error:
+                self._count("errors")
+        return [(dict(kv.split("=", 1) for kv in k[len(prefix):].split("&") if "=" in kv), v) for k, v in found.items()]
+
+    def get_or_fetch(self, path: str, params: Optional[Dict[str, Any]], fetch: Callable[[], Any]) -> Any:
+        ttl, stale = self.policy(path)
+        key = cache_key(path, params)
+        hit = self._lookup(key) if ttl > 0 else None
+        if hit is not None and hit[2]:
+            ttl, stale = hit[2], min(stale, hit[2])
+        if ttl <= 0:
+            return fetch()
+        if hit is not None:
+            age = time.time() - hit[0]
+            if age < ttl:
+                self._count("hits")
+                return hit[1]
+            if age < ttl + stale:
+                self._count("stale_hits")
+                self._revalidate(key, path, params, fetch)
+                return hit[1]
+        self._count("misses")
+        value = fetch()
+        self.put(path, params, value)
+        return value
+
+    async def get_or_fetch_async(self, path: str, params: Optional[Dict[str, Any]],
+                                 fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        get_or_fetch for coroutines (the ASGI mode); stale entries are refreshed by a task on the
+        same loop. The disk tier is read and written from a thread.
+        """
+        ttl, stale = self.policy(path)
+        key = cache_key(path, params)
+        hit = await self._lookup_async(key) if ttl > 0 else None
+        if hit is not None and hit[2]:
+            ttl, stale = hit[2], min(stale, hit[2])
+        if ttl <= 0:
+            return await fetch()
+        if hit is not None:
+            age = time.time() - hit[0]
+            if age < ttl:
+                self._count("hits")
+                return hit[1]
+            if age < ttl + stale:
+                self._count("stale_hits")
+                with self._lock:
+                    fresh = key not in self._refreshing
+                    self._refreshing.add(key)
+                if fresh:
+                    task = asyncio.get_running_loop().create_task(self._revalidate_async(key, path, params, fetch))
+                    self._tasks.add(task); task.add_done_callback(self._tasks.discard)
+                return hit[1]
+        self._count("misses")
+        value = await fetch()
+        await self.put_async(path, params, value)
+        return value
+
+    async def _revalidate_async(self, key: str, path: str, params: Optional[Dict[str, Any]],
+                                fetch: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            await self.put_async(path, params, await fetch())
+            self._count("refreshes")
+        except Exception:
+            self._count("errors")
+        finally:
+            with self._lock: self._refreshing.discard(key)
+
+    def _revalidate(self, key: str, path: str, params: Optional[Dict[str, Any]], fetch: Callable[[], Any]) -> None:
+        with self._lock:
+            if key in self._refreshing: return
+            self._refreshing.add(key)
+        def job():
+            try:
+                self.put(path, params, fetch())
+                self._count("refreshes")
+            except Exception:
+                self._count("errors")
+            finally:
+                with self._lock: self._refreshing.discard(key)
+        self._refresh(job)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            c = dict(self.counters)
+        lookups = c["hits"] + c["stale_hits"] + c["misses"]
+        c["hit_rate"] = round((c["hits"] + c["stale_hits"]) / lookups, 4) if lookups else None
+        c["entries"] = len(self.memory)
+        c["disk"] = self.disk.path if self.disk is not None else None
+        return c
+
+CACHE: Optional[ResponseCache] = ResponseCache(_parse_policies(os.getenv("API_CACHE_TTLS", ""))) if API_CACHE else None
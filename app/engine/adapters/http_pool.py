@@ -0,0 +1,74 @@
+# app/engine/adapters/http_pool.py
+from typing import Any, Callable, Iterable, List, Optional
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import os, time, threading
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import replay
+
+HTTP_POOL_SIZE    = int(os.getenv("HTTP_POOL_SIZE", "16"))     # keep-alive connections per host
+HTTP_POOL_WORKERS = int(os.getenv("HTTP_POOL_WORKERS", "16"))  # threads shared by all requests of a worker
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_executor: Optional[ThreadPoolExecutor] = None
+
+def get_session() -> requests.Session:
+    """Process-wide Session so upstream calls reuse pooled keep-alive connections."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                replay.mount(s, adapter)   # API_CORPUS set: APISPORTS_BASE is served from / recorded to a corpus
+                _session = s
+    return _session
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=HTTP_POOL_WORKERS, thread_name_prefix="upstream")
+    return _executor
+
+def fan_out(fn: Callable[[Any], Any], items: Iterable[Any], concurrency: int, deadline_s: float) -> List[Any]:
+    """
+    Run fn over items on the shared pool with at most `concurrency` in flight for this call.
+    Returns results in item order; items that fail or are not done by the deadline give None.
+    Work still running at the deadline is abandoned, not awaited; work still queued behind
+    other requests on the shared pool is cancelled so it never starts.
+    """
+    items = list(items)
+    results: List[Any] = [None] * len(items)
+    if not items: return results
+    ex = _get_executor()
+    end = time.monotonic() + deadline_s
+    todo = iter(range(len(items)))
+    running = {}
+
+    def submit_next() -> bool:
+        k = next(todo, None)
+        if k is None: return False
+        running[ex.submit(fn, items[k])] = k
+        return True
+
+    for _ in range(max(1, concurrency)):
+        if not submit_next(): break
+    while running:
+        remaining = end - time.monotonic()
+        if remaining <= 0: break
+        done, _ = wait(running, timeout=remaining, return_when=FIRST_COMPLETED)
+        for fut in done:
+            k = running.pop(fut)
+            try: results[k] = fut.result()
+            except Exception: results[k] = None
+            submit_next()
+    for fut, k in running.items():
+        if fut.done() and not fut.cancelled() and fut.exception() is None: results[k] = fut.result()
+        else: fut.cancel()
+    return results
@@ -1,19 +1,85 @@
 # app/engine/adapters/live_football.py
 from typing import Any, Dict, List, Optional
-import os, requests
+import os, time
+from ..metrics import record_upstream
+from .http_pool import get_session, fan_out
+from .cache import CACHE, cache_key
+from .singleflight import FLIGHTS
 
 BASE = os.getenv("APISPORTS_BASE", "https://v3.football.api-sports.io")
-API_KEY = os.getenv("APISPORTS_KEY", "")
+API_KEY = os.getenv("APISPORTS_KEY") or os.getenv("APISPORTS", "")
+ODDS_PAGE_CONCURRENCY = int(os.getenv("ODDS_PAGE_CONCURRENCY", "4"))
+ODDS_PAGE_DEADLINE_S  = float(os.getenv("ODDS_PAGE_DEADLINE_S", "20"))
 
 HEADERS = {
     "x-apisports-key": API_KEY or "",
 }
 
-def _get(path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+def _fetch(path: str, params: Dict[str, Any]) -> Dict[str, Any]:
     url = f"{BASE.rstrip('/')}/{path.lstrip('/')}"
-    r = requests.get(url, headers=HEADERS, params=params, timeout=20)
-    r.raise_for_status()
-    return r.json()
+    t0, r, err = time.perf_counter(), None, None
+    try:
+        r = get_session().get(url, headers=HEADERS, params=params, timeout=20)
+        r.raise_for_status()
+        return r.json()
+    except Exception as e:
+        err = e
+        raise
+    finally:
+        record_upstream(path, time.perf_counter() - t0, r, err)
+
+def _get(path: str, params: Dict[str, Any], refresh_ttl: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Cached upstream GET; see cache.py for the per-endpoint freshness policies.
+    Cache misses go through FLIGHTS so identical concurrent calls share one upstream request.
+    With refresh_ttl the call always goes upstream and the cached entry stays fresh for that long
+    (how the prefetcher warms entries for user requests).
+    """
+    fetch = lambda: FLIGHTS.do(cache_key(path, params), lambda: _fetch(path, params))
+    if CACHE is None:
+        return fetch()
+    if refresh_ttl is not None:
+        value = fetch()
+        CACHE.put(path, params, value, ttl=refresh_ttl)
+        return value
+    return CACHE.get_or_fetch(path, params, fetch)
+
+# ---------- Requests and pages (shared with live_football_async) ----------
+def response(data: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The "response" array of an API-Football body ([] for a missing or failed one)."""
+    return (data or {}).get("response", []) or []
+
+def fixtures_params(league_id: Optional[int]=None, season: Optional[int]=None,
+                    date: Optional[str]=None) -> Dict[str, Any]:
+    params: Dict[str, Any] = {}
+    if league_id: params["league"] = league_id
+    if season:    params["season"] = season
+    if date:      params["date"] = date
+    return params
+
+def odds_bulk_params(league_id: Optional[int]=None, season: Optional[int]=None, date: Optional[str]=None,
+                     bookmaker: Optional[int]=None) -> Dict[str, Any]:
+    """Params of page 1 of a bulk odds pull; ValueError without league & season or a date."""
+    params: Dict[str, Any] = {}
+    if league_id and season: params.update(league=league_id, season=season)
+    if date: params["date"] = date  # YYYY-MM-DD
+    if bookmaker: params["bookmaker"] = bookmaker
+    if not params.get("league") and not date:
+        raise ValueError("odds_bulk needs league_id & season or a date")
+    return params
+
+def more_pages(first: Dict[str, Any], max_pages: Optional[int]=None) -> range:
+    """Page numbers after page 1 that paging.total says exist, at most `max_pages` pages in all."""
+    total = int(((first or {}).get("paging") or {}).get("total") or 1)
+    if max_pages is not None: total = min(total, max_pages)
+    return range(2, total+1)
+
+def merge_pages(first: Dict[str, Any], pages: List[Optional[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Entries of page 1, then of each later page; failed pages (None) are dropped."""
+    out = list(response(first))
+    for data in pages:
+        out.extend(response(data))
+    return out
 
 # ---------- Teams ----------
 def search_team(name: str) -> Optional[Dict[str, Any]]:
@@ -23,11 +89,13 @@ def search_team(name: str) -> Optional[Dict[str, Any]]:
     return arr[0] if arr else None
 
 # ---------- Fixtures ----------
+def fixtures(league_id: Optional[int]=None, season: Optional[int]=None, date: Optional[str]=None,
+             refresh_ttl: Optional[float]=None) -> List[Dict[str, Any]]:
+    """Fixtures for a league and/or season and/or date (YYYY-MM-DD), as /api/matches queries them."""
+    return response(_get("fixtures", fixtures_params(league_id, season, date), refresh_ttl))
+
 def fixtures_by_league_season(league_id: int, season: int, date: Optional[str]=None) -> List[Dict[str, Any]]:
-    params = {"league": league_id, "season": season}
-    if date: params["date"] = date  # YYYY-MM-DD
-    data = _get("fixtures", params)
-    return (data or {}).get("response", []) or []
+    return fixtures(league_id, season, date)
 
 def recent_fixtures(team_id: int, season: int, last: int = 6) -> List[Dict[str, Any]]:
     data = _get("fixtures", {"team": team_id, "season": season, "last": last})
@@ -50,3 +118,27 @@ def odds_by_fixture(fixture_id: int) -> List[Dict[str, Any]]:
     """
     data = _get("odds", {"fixture": fixture_id})
     return (data or {}).get("response", []) or []
+
+def odds_bulk(league_id: Optional[int]=None, season: Optional[int]=None, date: Optional[str]=None,
+              bookmaker: Optional[int]=None, refresh_ttl: Optional[float]=None,
+              max_pages: Optional[int]=None) -> List[Dict[str, Any]]:
+    """
+    All odds entries for a league/season and/or a date in paged bulk calls (O(pages), not O(fixtures)).
+    Page 1 gives paging.total; the remaining pages are fetched concurrently. A page that fails or
+    misses the deadline is dropped, so the result can be partial; a failing first page raises.
+    `max_pages` stops after that many pages (the prefetcher's call allowance).
+    """
+    params = odds_bulk_params(league_id, season, date, bookmaker)
+    first = _get("odds", params, refresh_ttl) or {}
+    pages = fan_out(lambda page: _get("odds", {**params, "page": page}, refresh_ttl),
+                    more_pages(first, max_pages), ODDS_PAGE_CONCURRENCY, ODDS_PAGE_DEADLINE_S)
+    return merge_pages(first, pages)
+
+def index_by_fixture(entries: List[Dict[str, Any]]) -> Dict[int, List[Dict[str, Any]]]:
+    """Group raw odds entries by fixture id, in the per-fixture shape odds_by_fixture returns."""
+    idx: Dict[int, List[Dict[str, Any]]] = {}
+    for e in entries or []:
+        fid = (e.get("fixture") or {}).get("id")
+        if fid is not None:
+            idx.setdefault(fid, []).append(e)
+    return idx
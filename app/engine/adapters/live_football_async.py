@@ -0,0 +1,106 @@
+# app/engine/adapters/live_football_async.py
+"""
+Coroutine twin of live_football for the ASGI mode (app/asgi.py).
+
+Same endpoints, params, response cache and freshness policies as live_football (BASE, HEADERS
+and CACHE are read from it, so entries are shared with the sync routes). Upstream calls go
+through one httpx.AsyncClient per worker, a keep-alive pool of HTTP_ASYNC_POOL_SIZE
+connections, and identical concurrent calls share one request (AsyncSingleFlight). Waiting on
+API-Football never holds a thread, so a worker serves as many concurrent /api/matches
+requests as upstream allows instead of one per gthread thread.
+
+API_CORPUS is not applied on this path: run `python -m app.engine.adapters.replay serve`
+and point APISPORTS_BASE at it instead.
+"""
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+import asyncio, os, time
+import httpx
+
+from . import live_football as sync_api
+from .cache import cache_key
+from .singleflight import AsyncSingleFlight
+from ..metrics import record_upstream
+
+HTTP_ASYNC_POOL_SIZE = int(os.getenv("HTTP_ASYNC_POOL_SIZE", "100"))   # connections per worker, all hosts
+
+FLIGHTS = AsyncSingleFlight()
+_client: Optional[httpx.AsyncClient] = None
+
+def get_client() -> httpx.AsyncClient:
+    """The worker's AsyncClient, created on first use inside the running loop."""
+    global _client
+    if _client is None or _client.is_closed:
+        limits = httpx.Limits(max_connections=HTTP_ASYNC_POOL_SIZE, max_keepalive_connections=HTTP_ASYNC_POOL_SIZE)
+        _client = httpx.AsyncClient(limits=limits, timeout=20)
+    return _client
+
+async def aclose() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def get_json(url: str, path: str, params: Dict[str, Any], headers: Dict[str, str],
+                   timeout: float = 20) -> Dict[str, Any]:
+    """One upstream GET, recorded in the upstream metrics under `path`."""
+    t0, r, err = time.perf_counter(), None, None
+    try:
+        r = await get_client().get(url, headers=headers, params=params, timeout=timeout)
+        r.raise_for_status()
+        return r.json()
+    except Exception as e:
+        err = e
+        raise
+    finally:
+        record_upstream(path, time.perf_counter() - t0, r, err)
+
+async def _fetch(path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    return await get_json(f"{sync_api.BASE.rstrip('/')}/{path.lstrip('/')}", path, params, sync_api.HEADERS)
+
+async def _get(path: str, params: Dict[str, Any], refresh_ttl: Optional[float] = None) -> Dict[str, Any]:
+    """live_football._get on the event loop."""
+    fetch = lambda: FLIGHTS.do(cache_key(path, params), lambda: _fetch(path, params))
+    cache = sync_api.CACHE
+    if cache is None:
+        return await fetch()
+    if refresh_ttl is not None:
+        value = await fetch()
+        await cache.put_async(path, params, value, ttl=refresh_ttl)
+        return value
+    return await cache.get_or_fetch_async(path, params, fetch)
+
+async def fan_out(fn: Callable[[Any], Awaitable[Any]], items: Iterable[Any], concurrency: int,
+                  deadline_s: float) -> List[Any]:
+    """http_pool.fan_out for coroutines: results in item order, None for failures and anything past the deadline."""
+    items = list(items)
+    results: List[Any] = [None] * len(items)
+    if not items: return results
+    gate = asyncio.Semaphore(max(1, concurrency))
+    async def one(k: int) -> None:
+        async with gate:
+            try: results[k] = await fn(items[k])
+            except Exception: results[k] = None
+    tasks = [asyncio.ensure_future(one(k)) for k in range(len(items))]
+    _, pending = await asyncio.wait(tasks, timeout=deadline_s)
+    for t in pending: t.cancel()
+    return results
+
+# ---------- Fixtures ----------
+async def fixtures(league_id: Optional[int]=None, season: Optional[int]=None, date: Optional[str]=None,
+                   refresh_ttl: Optional[float]=None) -> List[Dict[str, Any]]:
+    return sync_api.response(await _get("fixtures", sync_api.fixtures_params(league_id, season, date), refresh_ttl))
+
+# ---------- Odds ----------
+async def odds_by_fixture(fixture_id: int) -> List[Dict[str, Any]]:
+    return sync_api.response(await _get("odds", {"fixture": fixture_id}))
+
+async def odds_bulk(league_id: Optional[int]=None, season: Optional[int]=None, date: Optional[str]=None,
+                    bookmaker: Optional[int]=None, refresh_ttl: Optional[float]=None,
+                    max_pages: Optional[int]=None) -> List[Dict[str, Any]]:
+    """live_football.odds_bulk: page 1, then the remaining pages concurrently; failed pages are dropped."""
+    params = sync_api.odds_bulk_params(league_id, season, date, bookmaker)
+    first = await _get("odds", params, refresh_ttl) or {}
+    pages = await fan_out(lambda page: _get("odds", {**params, "page": page}, refresh_ttl),
+                          sync_api.more_pages(first, max_pages), sync_api.ODDS_PAGE_CONCURRENCY,
+                          sync_api.ODDS_PAGE_DEADLINE_S)
+    return sync_api.merge_pages(first, pages)
@@ -0,0 +1,280 @@
+# app/engine/adapters/prefetch.py
+"""
+Background prefetch of fixtures and odds for configured leagues.
+
+One worker per host runs the scheduler (whichever holds PREFETCH_LOCK); it refreshes the
+same cache entries /api/matches and sources.fixtures_with_odds read, pinning each one fresh
+until the next scheduled refresh. Cadence follows the league's next kickoff (CADENCE) and
+every upstream call is paid from a token bucket of PREFETCH_BUDGET_PER_DAY calls; a refresh
+never makes more calls than the bucket holds (odds paging stops where it runs out). Share
+the cache between workers with API_CACHE_DB, otherwise only the scheduler's worker is warmed.
+
+    PREFETCH_LEAGUES="39:2025,140:2025"     # league:season pairs; empty disables prefetch
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+import json, os, tempfile, threading, time
+
+from . import live_football as api
+from ..metrics import REGISTRY
+
+try:
+    import fcntl
+except ImportError:  # no leader election on Windows; prefetch stays off there
+    fcntl = None
+
+PREFETCH_LEAGUES        = os.getenv("PREFETCH_LEAGUES", "")
+PREFETCH_BUDGET_PER_DAY = float(os.getenv("PREFETCH_BUDGET_PER_DAY", "1500"))
+PREFETCH_RESERVE        = float(os.getenv("PREFETCH_RESERVE", "500"))   # pause when the daily quota left drops below
+PREFETCH_DAYS           = int(os.getenv("PREFETCH_DAYS", "0"))          # also warm per-date queries for N days from today
+# /api/matches pulls every bookmaker unless ODDS_CONSENSUS is off, then it filters to BOOKMAKER_ID
+_MATCHES_ALL            = os.getenv("ODDS_CONSENSUS", "1").lower() in ("1", "true", "yes")
+PREFETCH_BOOKMAKERS     = os.getenv("PREFETCH_BOOKMAKERS", "all" if _MATCHES_ALL else os.getenv("BOOKMAKER_ID", "8") + ",all")
+PREFETCH_TICK_S         = float(os.getenv("PREFETCH_TICK_S", "30"))
+PREFETCH_SCALE          = float(os.getenv("PREFETCH_SCALE", "1"))       # multiplies every interval below
+PREFETCH_LOCK   = os.path.join(tempfile.gettempdir(), "betrun_prefetch.lock")
+PREFETCH_STATE  = os.path.join(tempfile.gettempdir(), "betrun_prefetch.json")
+
+# seconds until next kickoff -> (fixtures every, odds every); first matching row wins
+CADENCE: Tuple[Tuple[float, float, float], ...] = (
+    (3*86400, 6*3600, 12*3600),
+    (86400,   3*3600,  3*3600),
+    (6*3600,  3600,    3600),
+    (3600,    1800,    900),
+    (0,       900,     300),
+)
+IDLE_CADENCE = (12*3600, 0)   # no upcoming kickoff: fixtures only
+PIN_SLACK = 1.5               # entries stay fresh this many intervals, so a late run is not a miss
+
+def parse_leagues(spec: str) -> List[Tuple[int, int]]:
+    out = []
+    for part in (spec or "").split(","):
+        league, _, season = part.strip().partition(":")
+        try: out.append((int(league), int(season)))
+        except ValueError: continue
+    return out
+
+def parse_bookmakers(spec: str) -> List[Optional[int]]:
+    """"8,all" -> [8, None]; None is the unfiltered query sources.fixtures_with_odds makes."""
+    out: List[Optional[int]] = []
+    for part in (spec or "").split(","):
+        part = part.strip().lower()
+        if part == "all": out.append(None)
+        elif part.isdigit(): out.append(int(part))
+    return out
+
+def odds_params(query: Dict[str, Any], bookmaker: Optional[int]) -> Dict[str, Any]:
+    """Cache params of page 1 of odds_bulk for a fixture query."""
+    return api.odds_bulk_params(query["league_id"], query["season"], query.get("date"), bookmaker)
+
+def cadence(seconds_to_kickoff: Optional[float]) -> Tuple[float, float]:
+    if seconds_to_kickoff is None:
+        return IDLE_CADENCE[0]*PREFETCH_SCALE, IDLE_CADENCE[1]
+    for above, fixtures_s, odds_s in CADENCE:
+        if seconds_to_kickoff > above:
+            return fixtures_s*PREFETCH_SCALE, odds_s*PREFETCH_SCALE
+    return CADENCE[-1][1]*PREFETCH_SCALE, CADENCE[-1][2]*PREFETCH_SCALE
+
+def next_kickoff(fixtures: List[Dict[str, Any]], now: float) -> Optional[float]:
+    ts = [(fx.get("fixture") or {}).get("timestamp") for fx in fixtures or []]
+    ahead = [t for t in ts if isinstance(t, (int, float)) and t > now]
+    return min(ahead) if ahead else None
+
+class Budget:
+    """Token bucket: per_day calls, refilled continuously, bursts up to an hour's worth."""
+    def __init__(self, per_day: float):
+        self.rate = per_day / 86400.0
+        self.capacity = max(per_day / 24.0, 1.0)
+        self.tokens = self.capacity
+        self.spent = 0
+        self._t = time.monotonic()
+
+    def available(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._t)*self.rate)
+        self._t = now
+        return self.tokens
+
+    def spend(self, calls: int) -> None:
+        self.available()
+        self.tokens -= calls; self.spent += calls
+
+class LeagueJob:
+    def __init__(self, league_id: int, season: int):
+        self.league_id, self.season = league_id, season
+        self.kickoff: Optional[float] = None
+        self.last = {"fixtures": 0.0, "odds": 0.0}
+        self.due = {"fixtures": 0.0, "odds": 0.0}
+        self.calls = 0
+        self.error: Optional[str] = None
+
+    def fixture_queries(self, now: float) -> List[Dict[str, Any]]:
+        out = [{"league_id": self.league_id, "season": self.season}]
+        day = datetime.fromtimestamp(now, timezone.utc).date()
+        for d in range(PREFETCH_DAYS):
+            out.append({"league_id": self.league_id, "season": self.season, "date": (day + timedelta(days=d)).isoformat()})
+        return out
+
+class Prefetcher:
+    def __init__(self, leagues: List[Tuple[int, int]], budget_per_day: float = PREFETCH_BUDGET_PER_DAY,
+                 bookmakers: Optional[List[Optional[int]]] = None):
+        self.jobs = [LeagueJob(l, s) for l, s in leagues]
+        self.budget = Budget(budget_per_day)
+        self.bookmakers = parse_bookmakers(PREFETCH_BOOKMAKERS) if bookmakers is None else bookmakers
+        self.paused: Optional[str] = None
+
+    def _quota_left(self) -> Optional[float]:
+        hit = REGISTRY.gauges.get(("betrun_api_quota_remaining", (("window", "day"),)))
+        return hit[0] if hit else None
+
+    def _odds_pages(self, params: Dict[str, Any]) -> int:
+        hit = api.CACHE.peek("odds", params) if api.CACHE is not None else None
+        return int(((hit[1] if hit else {}).get("paging") or {}).get("total") or 1)
+
+    def run_job(self, job: LeagueJob, kind: str, now: float, allowance: float = float("inf")) -> int:
+        """
+        Refresh one league's fixtures or odds with at most `allowance` upstream calls; returns the
+        calls made. A run the allowance cuts short pauses the scheduler on "budget" and stays due.
+        """
+        fixtures_s, odds_s = cadence(job.kickoff - now if job.kickoff else None)
+        calls = 0
+        if kind == "fixtures":
+            for q in job.fixture_queries(now):
+                if allowance - calls < 1: return self._out_of_budget(calls)
+                rows = api.fixtures(q["league_id"], q["season"], q.get("date"), refresh_ttl=fixtures_s*PIN_SLACK)
+                calls += 1
+                if "date" not in q:
+                    job.kickoff = next_kickoff(rows, now)
+            fixtures_s, odds_s = cadence(job.kickoff - now if job.kickoff else None)
+        else:
+            for q in job.fixture_queries(now):
+                for bm in self.bookmakers:
+                    left = int(allowance - calls)
+                    if left < 1: return self._out_of_budget(calls)
+                    api.odds_bulk(q["league_id"], q["season"], q.get("date"), bookmaker=bm,
+                                  refresh_ttl=odds_s*PIN_SLACK, max_pages=left)
+                    pages = self._odds_pages(odds_params(q, bm))
+                    calls += min(pages, left)
+                    if pages > left: return self._out_of_budget(calls)
+        job.last[kind] = now
+        job.due["fixtures"] = job.last["fixtures"] + fixtures_s
+        job.due["odds"] = job.last["odds"] + odds_s if odds_s else float("inf")
+        return calls
+
+    def _out_of_budget(self, calls: int) -> int:
+        self.paused = "budget"
+        return calls
+
+    def tick(self, now: Optional[float] = None) -> int:
+        """Run every due refresh the budget allows, nearest kickoff first; returns calls made."""
+        now = time.time() if now is None else now
+        left = self._quota_left()
+        if left is not None and left < PREFETCH_RESERVE:
+            self.paused = f"daily quota left {int(left)} < reserve {int(PREFETCH_RESERVE)}"
+            return 0
+        self.paused = None
+        due = [(job.kickoff or float("inf"), kind, k) for k, job in enumerate(self.jobs)
+               for kind in ("fixtures", "odds") if job.due[kind] <= now]
+        made = 0
+        for _, kind, k in sorted(due):
+            job = self.jobs[k]
+            if job.due[kind] > now: continue   # a fixtures run just pushed this back (e.g. no kickoff ahead)
+            if kind == "odds" and job.last["fixtures"] == 0: continue   # need a kickoff first
+            allowance = self.budget.available()
+            if allowance < 1:
+                self.paused = "budget"
+                break
+            try:
+                calls = self.run_job(job, kind, now, allowance)
+                job.error = None
+            except Exception as e:
+                calls, job.error = 1, f"{kind}: {e}"
+                job.due[kind] = now + 300*PREFETCH_SCALE   # back off, keep the rest of the schedule
+            job.calls += calls; made += calls
+            self.budget.spend(calls)
+            if self.paused: break
+        return made
+
+    def status(self, now: Optional[float] = None) -> Dict[str, Any]:
+        now = time.time() if now is None else now
+        leagues = []
+        for job in self.jobs:
+            entry: Dict[str, Any] = {"league_id": job.league_id, "season": job.season,
+                                     "next_kickoff": _iso(job.kickoff), "calls": job.calls, "error": job.error}
+            for kind in ("fixtures", "odds"):
+                entry[kind] = {
+                    "age_s": round(now - job.last[kind], 1) if job.last[kind] else None,
+                    "next_in_s": round(job.due[kind] - now, 1) if job.due[kind] != float("inf") else None,
+                }
+            leagues.append(entry)
+        return {
+            "pid": os.getpid(), "updated_at": _iso(now), "paused": self.paused,
+            "budget": {"per_day": round(self.budget.rate*86400), "tokens": round(self.budget.available(), 1),
+                       "spent": self.budget.spent},
+            "leagues": leagues,
+        }
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat() if ts else None
+
+# ---------- runner: one scheduler per host ----------
+_started_pid: Optional[int] = None
+_start_lock = threading.Lock()
+PREFETCHER: Optional[Prefetcher] = None
+
+def start() -> bool:
+    """Start the election loop in this process (idempotent, per pid); False when prefetch is off."""
+    global _started_pid
+    leagues = parse_leagues(PREFETCH_LEAGUES)
+    if not leagues or api.CACHE is None or fcntl is None: return False
+    with _start_lock:
+        if _started_pid == os.getpid(): return True
+        _started_pid = os.getpid()
+    threading.Thread(target=_run, args=(leagues,), name="prefetch", daemon=True).start()
+    return True
+
+def _run(leagues: List[Tuple[int, int]]) -> None:
+    global PREFETCHER
+    lock = open(PREFETCH_LOCK, "a")
+    while True:   # followers retry, so a new leader takes over when the old worker exits
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            break
+        except OSError:
+            time.sleep(PREFETCH_TICK_S)
+    PREFETCHER = Prefetcher(leagues)
+    while True:
+        try: PREFETCHER.tick()
+        except Exception: pass
+        _write_state(PREFETCHER.status())
+        time.sleep(PREFETCH_TICK_S)
+
+def _write_state(state: Dict[str, Any]) -> None:
+    tmp = f"{PREFETCH_STATE}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w") as f: json.dump(state, f)
+        os.replace(tmp, PREFETCH_STATE)
+    except OSError:
+        pass
+
+def status() -> Dict[str, Any]:
+    """Scheduler state from whichever worker runs it, plus the age of each league's cached entries here."""
+    leagues = parse_leagues(PREFETCH_LEAGUES)
+    if not leagues:
+        return {"enabled": False}
+    if PREFETCHER is not None:
+        state = PREFETCHER.status()
+    else:
+        try:
+            with open(PREFETCH_STATE) as f: state = json.load(f)
+        except (OSError, ValueError):
+            state = {"leagues": [], "note": "scheduler not running yet"}
+    now, bookmakers = time.time(), parse_bookmakers(PREFETCH_BOOKMAKERS) or [None]
+    for entry in state.get("leagues", []):
+        q = {"league_id": entry["league_id"], "season": entry["season"]}
+        for kind, params in (("fixtures", api.fixtures_params(q["league_id"], q["season"])),
+                             ("odds", odds_params(q, bookmakers[0]))):
+            hit = api.CACHE.peek(kind, params) if api.CACHE is not None else None
+            entry.setdefault(kind, {})["cached_age_s"] = round(now - hit[0], 1) if hit else None
+    state["enabled"] = True
+    return state
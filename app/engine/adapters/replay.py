@@ -0,0 +1,288 @@
+# app/engine/adapters/replay.py
+"""
+Record/replay of API-Football responses.
+
+A corpus is a directory of gzip JSON files, one per upstream call keyed like the response
+cache (path + sorted params, see cache.cache_key): status, rate-limit headers, upstream
+latency and the response body. Three modes:
+
+  record   every call goes upstream and 200 responses without API "errors" are saved
+  replay   calls are served from the corpus only; a call that was never recorded gets 404
+  hybrid   replay what is recorded, record the rest
+
+Replayed responses can be slowed and failed on purpose: a fixed latency (or each
+response's recorded one) plus uniform jitter, and an error rate answered with
+REPLAY_ERROR_STATUS. The draws for a call depend only on the seed, the call key and how
+many times that key was asked for, so a run replays the same faults whatever the thread
+interleaving.
+
+Two ways in, both switched by environment only:
+  * in process: API_CORPUS=<dir> mounts a transport adapter for APISPORTS_BASE on the
+    pooled session (http_pool.get_session), so live_football and /api/matches use it as is
+  * as a server: python -m app.engine.adapters.replay serve --corpus <dir> --port 8099,
+    then APISPORTS_BASE=http://127.0.0.1:8099 (one corpus for several gunicorn workers;
+    in record mode it proxies to --upstream with the caller's x-apisports-key)
+
+The files hold the API-Football envelope under "body", so the backtest reads a corpus
+directory directly.
+"""
+from typing import Any, Callable, Dict, Iterator, NamedTuple, Optional, Tuple
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qsl, urlsplit
+import argparse, gzip, hashlib, json, os, random, sys, threading, time
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from .cache import cache_key, cacheable
+
+APISPORTS_BASE      = os.getenv("APISPORTS_BASE", "https://v3.football.api-sports.io")
+API_CORPUS          = os.getenv("API_CORPUS", "")                # directory; empty = off
+API_CORPUS_MODE     = os.getenv("API_CORPUS_MODE", "replay")     # replay | record | hybrid
+REPLAY_LATENCY_MS   = os.getenv("REPLAY_LATENCY_MS", "0")        # per replayed call, or "recorded"
+REPLAY_JITTER_MS    = float(os.getenv("REPLAY_JITTER_MS", "0"))  # plus uniform [0, jitter)
+REPLAY_ERROR_RATE   = float(os.getenv("REPLAY_ERROR_RATE", "0"))
+REPLAY_ERROR_STATUS = int(os.getenv("REPLAY_ERROR_STATUS", "500"))
+REPLAY_SEED         = int(os.getenv("REPLAY_SEED", "0"))
+MODES = ("replay", "record", "hybrid")
+KEPT_HEADERS = ("content-type", "x-ratelimit-requests-limit", "x-ratelimit-requests-remaining",
+                "x-ratelimit-limit", "x-ratelimit-remaining")
+MEMO_SIZE = 4096
+
+class Recording(NamedTuple):
+    key: str
+    path: str
+    params: Dict[str, str]
+    status: int
+    headers: Dict[str, str]
+    body: Any
+    elapsed_ms: float
+    recorded_at: float
+
+# (status, headers, body bytes, upstream seconds) of a live call
+Upstream = Tuple[int, Dict[str, str], bytes, float]
+
+# ---------- corpus ----------
+class Corpus:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._memo: Dict[str, Optional[Tuple[Recording, bytes]]] = {}
+        self._lock = threading.Lock()
+
+    def file_for(self, key: str) -> str:
+        endpoint = key.split("?", 1)[0].replace("/", "_") or "root"
+        return os.path.join(self.directory, endpoint, hashlib.sha1(key.encode()).hexdigest()[:20] + ".json.gz")
+
+    def get(self, key: str) -> Optional[Tuple[Recording, bytes]]:
+        """Recording and its serialised body, memoised (misses too, until the next put)."""
+        if key in self._memo: return self._memo[key]
+        try:
+            with gzip.open(self.file_for(key), "rt", encoding="utf-8") as f: data = json.load(f)
+            rec = Recording(**data)
+            hit: Optional[Tuple[Recording, bytes]] = (rec, json.dumps(rec.body, separators=(",", ":")).encode())
+        except (OSError, ValueError, TypeError):
+            hit = None
+        with self._lock:
+            if len(self._memo) >= MEMO_SIZE: self._memo = {}
+            self._memo[key] = hit
+        return hit
+
+    def put(self, path: str, params: Dict[str, Any], status: int, headers: Dict[str, str], body: bytes,
+            elapsed_s: float) -> Optional[Recording]:
+        """Save a 200 response unless the API reported errors in it (quota, bad params)."""
+        try: data = json.loads(body)
+        except ValueError: return None
+        if status != 200 or not cacheable(data): return None
+        key = cache_key(path, params)
+        rec = Recording(key, path.strip("/"), {str(k): str(v) for k, v in params.items()}, status,
+                        {k: v for k, v in headers.items() if k.lower() in KEPT_HEADERS},
+                        data, round(elapsed_s * 1000, 1), time.time())
+        target = self.file_for(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f: json.dump(rec._asdict(), f, separators=(",", ":"))
+        os.replace(tmp, target)
+        with self._lock: self._memo.pop(key, None)
+        return rec
+
+    def __iter__(self) -> Iterator[Recording]:
+        for d, _, names in os.walk(self.directory):
+            for n in sorted(names):
+                if not n.endswith(".json.gz"): continue
+                try:
+                    with gzip.open(os.path.join(d, n), "rt", encoding="utf-8") as f: yield Recording(**json.load(f))
+                except (OSError, ValueError, TypeError):
+                    continue
+
+# ---------- responder shared by the adapter and the server ----------
+class Replayer:
+    def __init__(self, corpus: Corpus, mode: str = API_CORPUS_MODE, latency_ms: str = REPLAY_LATENCY_MS,
+                 jitter_ms: float = REPLAY_JITTER_MS, error_rate: float = REPLAY_ERROR_RATE,
+                 error_status: int = REPLAY_ERROR_STATUS, seed: int = REPLAY_SEED,
+                 sleep: Callable[[float], None] = time.sleep):
+        if mode not in MODES: raise ValueError(f"API_CORPUS_MODE must be one of {MODES}")
+        self.corpus, self.mode = corpus, mode
+        self.recorded_latency = str(latency_ms).strip().lower() == "recorded"
+        self.latency_ms = 0.0 if self.recorded_latency else float(latency_ms or 0)
+        self.jitter_ms, self.error_rate, self.error_status, self.seed = jitter_ms, error_rate, error_status, seed
+        self.sleep = sleep
+        self._calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "recorded": 0, "upstream": 0, "injected_errors": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock: self.counters[name] += 1
+
+    def faults(self, key: str, rec: Recording) -> Tuple[float, bool]:
+        """(delay seconds, fail?) for the n-th call of a key; deterministic per (seed, key, n)."""
+        with self._lock:
+            n = self._calls[key] = self._calls.get(key, 0) + 1
+        rng = random.Random(f"{self.seed}|{key}|{n}")
+        base = rec.elapsed_ms if self.recorded_latency else self.latency_ms
+        return (base + rng.random() * self.jitter_ms) / 1000.0, rng.random() < self.error_rate
+
+    def respond(self, path: str, params: Dict[str, Any],
+                upstream: Optional[Callable[[], Upstream]] = None) -> Tuple[int, Dict[str, str], bytes]:
+        key = cache_key(path, params)
+        hit = self.corpus.get(key) if self.mode != "record" else None
+        if hit is not None:
+            self._count("hits")
+            rec, body = hit
+            delay, fail = self.faults(key, rec)
+            if delay > 0: self.sleep(delay)
+            if fail:
+                self._count("injected_errors")
+                return self.error_status, {"content-type": "application/json"}, \
+                    json.dumps({"errors": {"replay": "injected error"}, "response": []}).encode()
+            return rec.status, dict(rec.headers), body
+        if self.mode == "replay" or upstream is None:
+            self._count("misses")
+            return 404, {"content-type": "application/json"}, \
+                json.dumps({"errors": {"replay": f"not recorded: {key}"}, "response": []}).encode()
+        self._count("upstream")
+        status, headers, body, elapsed = upstream()
+        if self.corpus.put(path, params, status, headers, body, elapsed) is not None:
+            self._count("recorded")
+        return status, headers, body
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"mode": self.mode, "corpus": self.corpus.directory, **self.counters}
+
+# ---------- in-process adapter ----------
+class ReplayAdapter(BaseAdapter):
+    """Transport adapter for APISPORTS_BASE; upstream calls (record/hybrid) go through `live`."""
+    def __init__(self, replayer: Replayer, live: BaseAdapter, base: str = APISPORTS_BASE):
+        super().__init__()
+        self.replayer, self.live = replayer, live
+        self.base_path = urlsplit(base).path.rstrip("/")
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        u = urlsplit(request.url)
+        path = u.path[len(self.base_path):] if u.path.startswith(self.base_path) else u.path
+        def upstream() -> Upstream:
+            t0 = time.perf_counter()
+            r = self.live.send(request, stream=False, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+            return r.status_code, dict(r.headers), r.content, time.perf_counter() - t0
+        status, headers, body = self.replayer.respond(path, dict(parse_qsl(u.query)), upstream)
+        r = requests.Response()
+        r.status_code, r.headers, r._content = status, CaseInsensitiveDict(headers), body
+        r.reason = "OK" if status == 200 else "Replay"
+        r.url, r.request, r.encoding = request.url, request, "utf-8"
+        return r
+
+    def close(self) -> None:
+        self.live.close()
+
+REPLAYER: Optional[Replayer] = None
+
+def mount(session: requests.Session, live: BaseAdapter) -> None:
+    """Route APISPORTS_BASE through the corpus when API_CORPUS is set (called by http_pool)."""
+    global REPLAYER
+    if not API_CORPUS: return
+    REPLAYER = REPLAYER or Replayer(Corpus(API_CORPUS))
+    session.mount(APISPORTS_BASE.rstrip("/") + "/", ReplayAdapter(REPLAYER, live))
+
+# ---------- stub server ----------
+class ReplayServer:
+    """HTTP front for a Replayer; in record/hybrid mode misses are proxied to `upstream`."""
+    def __init__(self, replayer: Replayer, upstream: str = "https://v3.football.api-sports.io",
+                 host: str = "127.0.0.1", port: int = 0):
+        self.replayer, self.upstream, self.host, self.port = replayer, upstream.rstrip("/"), host, port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._session = requests.Session()
+
+    def _proxy(self, path: str, params: Dict[str, str], key_header: Optional[str]) -> Upstream:
+        t0 = time.perf_counter()
+        r = self._session.get(self.upstream + path, params=params, timeout=20,
+                              headers={"x-apisports-key": key_header or "", "Accept": "application/json"})
+        return r.status_code, dict(r.headers), r.content, time.perf_counter() - t0
+
+    def start(self) -> str:
+        srv = self
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+            def log_message(self, *args): pass
+            def do_GET(self):
+                u = urlsplit(self.path)
+                params = dict(parse_qsl(u.query))
+                key = self.headers.get("x-apisports-key")
+                status, headers, body = srv.replayer.respond(u.path, params, lambda: srv._proxy(u.path, params, key))
+                self.send_response(status)
+                for k, v in headers.items():
+                    if k.lower() in KEPT_HEADERS: self.send_header(k, v)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://{self.host}:{self._server.server_address[1]}"
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown(); self._server.server_close()
+
+# ---------- CLI ----------
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m app.engine.adapters.replay")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("serve", help="serve a corpus (and record misses in record/hybrid mode)")
+    s.add_argument("--corpus", default=API_CORPUS or None, required=not API_CORPUS)
+    s.add_argument("--mode", choices=MODES, default=API_CORPUS_MODE)
+    s.add_argument("--upstream", default="https://v3.football.api-sports.io")
+    s.add_argument("--host", default="127.0.0.1")
+    s.add_argument("--port", type=int, default=8099)
+    s.add_argument("--latency-ms", default=REPLAY_LATENCY_MS, help='milliseconds, or "recorded"')
+    s.add_argument("--jitter-ms", type=float, default=REPLAY_JITTER_MS)
+    s.add_argument("--error-rate", type=float, default=REPLAY_ERROR_RATE)
+    s.add_argument("--error-status", type=int, default=REPLAY_ERROR_STATUS)
+    s.add_argument("--seed", type=int, default=REPLAY_SEED)
+    t = sub.add_parser("stats", help="recordings per endpoint")
+    t.add_argument("--corpus", default=API_CORPUS or None, required=not API_CORPUS)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "stats":
+        per: Dict[str, Tuple[int, float]] = {}
+        for rec in Corpus(args.corpus):
+            n, ms = per.get(rec.path, (0, 0.0))
+            per[rec.path] = (n + 1, ms + rec.elapsed_ms)
+        for path, (n, ms) in sorted(per.items()):
+            print(f"{path:<24} {n:>6} recordings  {ms/n:>7.1f} ms avg upstream")
+        return 0
+
+    replayer = Replayer(Corpus(args.corpus), args.mode, args.latency_ms, args.jitter_ms,
+                        args.error_rate, args.error_status, args.seed)
+    server = ReplayServer(replayer, args.upstream, args.host, args.port)
+    base = server.start()
+    print(f"{args.mode} {args.corpus} at {base}  (APISPORTS_BASE={base})", file=sys.stderr)
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+        print(json.dumps(replayer.stats()), file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+# app/engine/adapters/singleflight.py
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio, threading
+
+class _Call:
+    __slots__ = ("done", "value", "error", "waiters")
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller runs fn, later callers
+    block until it finishes and get the same result (or the same exception).
+    Nothing is remembered once the call completes; caching is the cache layer's job.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.counters = {"calls": 0, "executed": 0, "deduplicated": 0, "errors": 0}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            self.counters["calls"] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.counters["executed"] += 1
+            else:
+                call.waiters += 1
+                self.counters["deduplicated"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None: raise call.error
+            return call.value
+
+        try:
+            call.value = fn()
+            return call.value
+        except BaseException as e:
+            call.error = e
+            with self._lock: self.counters["errors"] += 1
+            raise
+        finally:
+            with self._lock: self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            c = dict(self.counters)
+            c["in_flight"] = len(self._calls)
+        return c
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for coroutines on one event loop: later callers await the first caller's
+    future. A leader that is cancelled (say by a fan-out deadline) fails its followers with
+    RuntimeError rather than cancelling their requests too.
+    """
+    def __init__(self):
+        self._calls: Dict[str, "asyncio.Future[Any]"] = {}
+        self.counters = {"calls": 0, "executed": 0, "deduplicated": 0, "errors": 0}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.counters["calls"] += 1
+        call = self._calls.get(key)
+        if call is not None:
+            self.counters["deduplicated"] += 1
+            try:
+                return await asyncio.shield(call)
+            except asyncio.CancelledError:
+                if call.cancelled(): raise RuntimeError(f"shared upstream call {key} was cancelled") from None
+                raise
+        call = self._calls[key] = asyncio.get_running_loop().create_future()
+        self.counters["executed"] += 1
+        try:
+            value = await fn()
+            call.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        except BaseException as e:
+            self.counters["errors"] += 1
+            call.set_exception(e)
+            call.exception()   # retrieved: no "never retrieved" warning when nobody else waited
+            raise
+        finally:
+            self._calls.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.counters, in_flight=len(self._calls))
+
+# one per process: gthread workers share it across request threads
+FLIGHTS = SingleFlight()
@@ -1,9 +1,17 @@
 # app/engine/adapters/sources.py
 from typing import Any, Dict, List, Optional, Tuple
 from types import SimpleNamespace
-import re, unicodedata
+import os, re, threading, unicodedata
 
 from . import live_football as api
+from .http_pool import fan_out
+from .team_index import Match, TeamIndex
+from ..odds import parse_fixture_odds, quote, split_1x2
+
+STRICT_TEAM_MATCH    = os.getenv("STRICT_TEAM_MATCH", "0").lower() in ("1","true","yes")
+ALLOW_FALLBACK_NAMES = os.getenv("ALLOW_FALLBACK_NAMES", "1").lower() in ("1","true","yes")
+TEAM_SEARCH_CONCURRENCY = int(os.getenv("TEAM_SEARCH_CONCURRENCY", "4"))   # network lookups for index misses
+TEAM_SEARCH_DEADLINE_S  = float(os.getenv("TEAM_SEARCH_DEADLINE_S", "20"))
 
 # ---------- name normalization ----------
 _STRIP_TOKENS = r'\b(fc|cf|sc|sk|fk|ac|afc|ud|cd|sv|if|s\.c\.|f\.c\.)\b'
@@ -32,30 +40,54 @@ def _apply_alias(s: str) -> str:
     n = _norm(s)
     return _ALIAS.get(n, s)
 
-# ---------- Robust team search ----------
-def search_team(name: str, country: Optional[str]=None, league_id: Optional[int]=None) -> Optional[Dict[str, Any]]:
-    if not name: return None
-    try:
-        m = api.search_team(name)
-        if m: return m
-    except Exception: pass
+# ---------- Team index ----------
+TEAM_INDEX = TeamIndex(_norm, _ALIAS, strict=STRICT_TEAM_MATCH, allow_aliases=ALLOW_FALLBACK_NAMES)
+_seeded = threading.Event()
 
-    alias = _apply_alias(name)
-    if alias and alias != name:
-        try:
-            m = api.search_team(alias)
-            if m: return m
-        except Exception: pass
+def _seed_index() -> None:
+    """Load teams from every cached /teams and /fixtures response, once per process."""
+    if _seeded.is_set() or api.CACHE is None: return
+    _seeded.set()
+    for params, data in api.CACHE.responses("teams"):
+        league = params.get("league")
+        TEAM_INDEX.add_many((data or {}).get("response"), int(league) if league and league.isdigit() else None)
+    for _, data in api.CACHE.responses("fixtures"):
+        TEAM_INDEX.add_fixtures((data or {}).get("response"))
 
+# ---------- Robust team search ----------
+def _search_remote(name: str) -> Optional[Dict[str, Any]]:
+    """Up to three /teams?search= calls (raw, alias, normalised); a hit is added to the index."""
+    tries = [name]
+    alias = _apply_alias(name) if ALLOW_FALLBACK_NAMES else name
+    if alias and alias != name: tries.append(alias)
     norm = _norm(name)
-    if norm and norm != name and norm != _norm(alias):
+    if norm and norm != name and norm != _norm(alias): tries.append(norm)
+    for q in tries:
         try:
-            m = api.search_team(norm)
-            if m: return m
-        except Exception: pass
-
+            m = api.search_team(q)
+        except Exception:
+            continue
+        if m:
+            TEAM_INDEX.add(m)
+            return m
     return None
 
+def search_team(name: str, country: Optional[str]=None, league_id: Optional[int]=None) -> Optional[Dict[str, Any]]:
+    if not name: return None
+    _seed_index()
+    hit = TEAM_INDEX.lookup(name, league_id)
+    return hit.team if hit.team is not None else _search_remote(name)
+
+def resolve_teams(names: List[str], league_id: Optional[int]=None) -> List[Match]:
+    """Resolve a slate of names: one local pass, then concurrent network searches for the misses only."""
+    _seed_index()
+    out = TEAM_INDEX.lookup_many(names, league_id)
+    misses = [k for k, m in enumerate(out) if m.team is None and names[k]]
+    found = fan_out(_search_remote, [names[k] for k in misses], TEAM_SEARCH_CONCURRENCY, TEAM_SEARCH_DEADLINE_S)
+    for k, team in zip(misses, found):
+        if team is not None: out[k] = Match(team, "remote", 0.0, out[k].candidates)
+    return out
+
 def recent_fixtures(team_id: int, season: int, last: int=6) -> List[Dict[str, Any]]:
     try: return api.recent_fixtures(team_id, season, last=last) or []
     except Exception: return []
@@ -73,76 +105,48 @@ def fixtures_by_league_season(league_id: int, season: int, date: Optional[str]=N
     try: return api.fixtures_by_league_season(league_id, season, date=date) or []
     except Exception: return []
 
-def _extract_1x2_from_odds(raw: List[Dict[str, Any]]) -> Optional[Dict[str, float]]:
-    """
-    API-Football odds response shape:
-      response: [
-        {
-          "bookmakers": [
-            {
-              "name": "...",
-              "bets": [
-                 { "name": "Match Winner", "values": [ {"value":"Home", "odd":"2.10"}, ... ] },
-                 ...
-              ]
-            }, ...
-          ]
-        }
-      ]
-
-    We take the FIRST bookmaker that contains a 'Match Winner' (or '1X2') bet and map to {"1":..., "X":..., "2":...}
-    """
-    if not raw: return None
-    r0 = raw[0]  # first line for the fixture
-    for bm in r0.get("bookmakers", []) or []:
-        for bet in bm.get("bets", []) or []:
-            name = (bet.get("name") or "").lower()
-            if "match winner" in name or "1x2" in name:
-                home = draw = away = None
-                for v in bet.get("values", []) or []:
-                    label = (v.get("value") or "").strip().lower()
-                    try:
-                        price = float(v.get("odd"))
-                    except Exception:
-                        price = None
-                    if price is None: continue
-                    if label in ("home","1","1 (home)"):
-                        home = price
-                    elif label in ("draw","x"):
-                        draw = price
-                    elif label in ("away","2","2 (away)"):
-                        away = price
-                if home and draw and away:
-                    return {"1": home, "X": draw, "2": away}
-    return None
+def _quote(raw: List[Dict[str, Any]]) -> Tuple[Optional[Dict[str, float]], Optional[Dict[str, float]]]:
+    """(1X2, other markets) from one fixture's /odds items: the first bookmaker with a full 1X2."""
+    return split_1x2(quote(parse_fixture_odds(raw), fallback=True)) if raw else (None, None)
 
 def odds_for_fixture(fixture_id: int) -> Optional[Dict[str, float]]:
-    try:
-        raw = api.odds_by_fixture(fixture_id)
-        return _extract_1x2_from_odds(raw)
-    except Exception:
-        return None
+    return _odds_for_fixture(fixture_id)[0]
+
+def _odds_for_fixture(fixture_id: int) -> Tuple[Optional[Dict[str, float]], Optional[Dict[str, float]]]:
+    try: return _quote(api.odds_by_fixture(fixture_id))
+    except Exception: return None, None
+
+def odds_index(league_id: int, season: int, date: Optional[str]=None) -> Optional[Dict[int, List[Dict[str, Any]]]]:
+    """Bulk odds for a league/date keyed by fixture id, or None if the bulk endpoint failed."""
+    try: return api.index_by_fixture(api.odds_bulk(league_id, season, date=date))
+    except Exception: return None
 
 def fixtures_with_odds(league_id: int, season: int, date: Optional[str]=None) -> List[Dict[str, Any]]:
     fxs = fixtures_by_league_season(league_id, season, date=date)
+    by_fixture = odds_index(league_id, season, date=date) if fxs else {}
     out = []
     for fx in fxs:
         fixture = fx.get("fixture", {})
         teams = fx.get("teams", {})
         fid = fixture.get("id")
-        odds = odds_for_fixture(fid) if fid else None
+        if by_fixture is None:   # bulk pull failed: per-fixture calls
+            odds, markets = _odds_for_fixture(fid) if fid else (None, None)
+        else:
+            odds, markets = _quote(by_fixture.get(fid, []))
         out.append({
             "fixture_id": fid,
             "utc": fixture.get("date"),
             "home": teams.get("home",{}).get("name"),
             "away": teams.get("away",{}).get("name"),
-            "odds": odds  # may be None if odds not posted yet
+            "odds": odds,  # may be None if odds not posted yet
+            "market_odds": markets,
         })
     return out
 
 # export
 sources = SimpleNamespace(
     search_team=search_team,
+    resolve_teams=resolve_teams,
     recent_fixtures=recent_fixtures,
     get_injuries=get_injuries,
     get_h2h=get_h2h,
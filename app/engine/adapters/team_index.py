@@ -0,0 +1,159 @@
+# app/engine/adapters/team_index.py
+"""
+Local team index for name -> API-Football team resolution.
+
+Filled from data already on hand: teams seen in fixtures responses and every cached /teams
+response. A lookup tries, in order: the normalised name, the alias table (when fallback
+names are allowed), then rapidfuzz top-k over all normalised names (unless strict
+matching is on), scoped to the league's teams when a league is given. A fuzzy hit must clear
+the threshold and beat the best other team by TEAM_MATCH_MARGIN; a name shorter than
+TEAM_MATCH_MIN_PARTIAL only scores as a whole-string match, not as a piece of a longer name
+("Real" is not Real Madrid). Results are memoised
+until the index changes, so exact, alias and repeat lookups take microseconds and none
+need the network; sources.search_team only goes upstream on a miss and feeds what it finds
+back into the index.
+"""
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+import os, threading
+import numpy as np
+from rapidfuzz import fuzz, process
+
+TEAM_MATCH_THRESHOLD = float(os.getenv("TEAM_MATCH_THRESHOLD", "88"))   # rapidfuzz score, 0-100
+TEAM_MATCH_TOP_K     = int(os.getenv("TEAM_MATCH_TOP_K", "3"))
+TEAM_MATCH_MARGIN    = float(os.getenv("TEAM_MATCH_MARGIN", "5"))       # best must beat the runner-up team by this
+TEAM_MATCH_MIN_PARTIAL = int(os.getenv("TEAM_MATCH_MIN_PARTIAL", "5"))  # shortest name matched inside a longer one
+MEMO_SIZE = 8192
+
+Team = Dict[str, Any]   # /teams response item: {"team": {"id", "name", ...}, "venue": {...}}
+
+class Match(NamedTuple):
+    team: Optional[Team]        # None on a miss
+    how: str = "miss"           # exact | alias | fuzzy | remote | ambiguous | miss
+    score: float = 0.0          # rapidfuzz score of the pick (100 for exact/alias)
+    candidates: Tuple[Tuple[str, float], ...] = ()   # top-k (normalised name, score) when fuzzy ran
+
+class TeamIndex:
+    def __init__(self, normalize: Callable[[str], str], aliases: Dict[str, str],
+                 strict: bool = False, allow_aliases: bool = True,
+                 threshold: float = TEAM_MATCH_THRESHOLD, top_k: int = TEAM_MATCH_TOP_K,
+                 margin: float = TEAM_MATCH_MARGIN, min_partial: int = TEAM_MATCH_MIN_PARTIAL):
+        self.normalize, self.strict, self.allow_aliases = normalize, strict, allow_aliases
+        self.threshold, self.top_k, self.margin, self.min_partial = threshold, top_k, margin, min_partial
+        self.aliases = {normalize(k): normalize(v) for k, v in aliases.items()}
+        self._lock = threading.Lock()
+        self._by_id: Dict[int, Team] = {}
+        self._by_norm: Dict[str, int] = {}
+        self._leagues: Dict[int, set] = {}                  # team id -> league ids it was seen in
+        # rebuilt lazily after adds: league (None = all) -> (normalised names, team ids); (norm, league) -> Match
+        self._choices: Dict[Optional[int], Tuple[List[str], List[int]]] = {}
+        self._memo: Dict[Tuple[str, Optional[int]], Match] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    # --- filling ---
+    def add(self, team: Team, league_id: Optional[int] = None) -> None:
+        t = (team or {}).get("team") or {}
+        if t.get("id") is None or not t.get("name"): return
+        tid = int(t["id"])
+        with self._lock:
+            known = self._by_id.get(tid)
+            n = self.normalize(t["name"])
+            new_league = league_id is not None and int(league_id) not in self._leagues.get(tid, ())
+            if known is not None and n in self._by_norm and not new_league and len(team) <= len(known):
+                return
+            if known is None or len(team) > len(known):   # keep the richer /teams shape
+                self._by_id[tid] = team
+            if n: self._by_norm.setdefault(n, tid)
+            if league_id is not None: self._leagues.setdefault(tid, set()).add(int(league_id))
+            self._choices, self._memo = {}, {}
+
+    def add_many(self, teams: Iterable[Team], league_id: Optional[int] = None) -> None:
+        for team in teams or []: self.add(team, league_id)
+
+    def add_fixtures(self, fixtures: Iterable[Dict[str, Any]]) -> None:
+        """Teams from /fixtures response items (id, name, logo), tagged with the fixture's league."""
+        for fx in fixtures or []:
+            league_id = (fx.get("league") or {}).get("id")
+            for side in ("home", "away"):
+                t = ((fx.get("teams") or {}).get(side)) or {}
+                if t.get("id") is not None: self.add({"team": t}, league_id)
+
+    # --- lookups ---
+    def _candidates(self, league_id: Optional[int]) -> Tuple[List[str], List[int]]:
+        """Fuzzy search space: the league's teams if any are known, else every team."""
+        hit = self._choices.get(league_id)
+        if hit is not None: return hit
+        with self._lock:
+            items = [(n, tid) for n, tid in self._by_norm.items()
+                     if league_id is None or int(league_id) in self._leagues.get(tid, ())]
+            if not items and league_id is not None:
+                items = list(self._by_norm.items())
+            choices = self._choices[league_id] = ([n for n, _ in items], [tid for _, tid in items])
+        return choices
+
+    def _remember(self, key: Tuple[str, Optional[int]], m: Match) -> Match:
+        if len(self._memo) >= MEMO_SIZE: self._memo = {}
+        self._memo[key] = m
+        return m
+
+    def _exact(self, norm: str) -> Optional[Match]:
+        tid = self._by_norm.get(norm)
+        if tid is not None: return Match(self._by_id[tid], "exact", 100.0)
+        if self.allow_aliases and norm in self.aliases:
+            tid = self._by_norm.get(self.aliases[norm])
+            if tid is not None: return Match(self._by_id[tid], "alias", 100.0)
+        return None
+
+    def _scores(self, queries: List[str], choices: List[str]) -> np.ndarray:
+        """
+        WRatio score matrix. Where the shorter string is under min_partial characters and WRatio
+        would score it as a substring of one 1.5x its length, the plain ratio is used instead.
+        """
+        s = process.cdist(queries, choices, scorer=fuzz.WRatio, dtype=np.float32, workers=-1)
+        lq = np.array([len(q) for q in queries])[:, None]
+        lc = np.array([len(c) for c in choices])[None, :]
+        short = np.minimum(lq, lc)
+        partial = (short < self.min_partial) & (np.maximum(lq, lc) >= 1.5 * short)
+        if partial.any():
+            s = np.where(partial, process.cdist(queries, choices, scorer=fuzz.ratio, dtype=np.float32, workers=-1), s)
+        return s
+
+    def _pick(self, scores: np.ndarray, choices: List[str], ids: List[int]) -> Match:
+        """One query's scores over the choices: the best team, if it clears threshold and margin."""
+        order = np.argsort(-scores, kind="stable")
+        cands = tuple((choices[j], round(float(scores[j]), 1)) for j in order[:self.top_k].tolist())
+        if not len(order): return Match(None, "miss")
+        k = int(order[0]); score = float(scores[k])
+        if self.strict or score < self.threshold:
+            return Match(None, "miss", score, cands)
+        rival = next((float(scores[j]) for j in order[1:].tolist() if ids[j] != ids[k]), 0.0)
+        if score - rival < self.margin:
+            return Match(None, "ambiguous", score, cands)
+        return Match(self._by_id[ids[k]], "fuzzy", score, cands)
+
+    def lookup(self, name: str, league_id: Optional[int] = None) -> Match:
+        norm = self.normalize(name or "")
+        if not norm: return Match(None, "miss")
+        hit = self._memo.get((norm, league_id)) or self._exact(norm)
+        if hit is not None: return hit
+        names, ids = self._candidates(league_id)
+        if not names: return Match(None, "miss")
+        m = self._pick(self._scores([norm], names)[0], names, ids)
+        return self._remember((norm, league_id), m)
+
+    def lookup_many(self, names: List[str], league_id: Optional[int] = None) -> List[Match]:
+        """Resolve a slate at once: exact/alias by dict, the rest in one rapidfuzz score matrix."""
+        out: List[Optional[Match]] = [None] * len(names)
+        fuzzy: List[int] = []
+        norms = [self.normalize(n or "") for n in names]
+        for k, norm in enumerate(norms):
+            hit = (self._memo.get((norm, league_id)) or self._exact(norm)) if norm else Match(None, "miss")
+            if hit is not None: out[k] = hit
+            else: fuzzy.append(k)
+        choices, ids = self._candidates(league_id)
+        if fuzzy and choices:
+            scores = self._scores([norms[k] for k in fuzzy], choices)
+            for row, k in enumerate(fuzzy):
+                out[k] = self._remember((norms[k], league_id), self._pick(scores[row], choices, ids))
+        return [m if m is not None else Match(None, "miss") for m in out]
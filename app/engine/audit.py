@@ -1,6 +1,19 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+from itertools import islice
+import json, os, threading, zlib
+from .store import PickStore, open_store
 
-MEMORY_PICKS: List[Dict[str, Any]] = []
+_store: Optional[PickStore] = None
+_store_lock = threading.Lock()
+IMPORT_CHUNK = int(os.getenv("IMPORT_CHUNK", "500"))
+
+def get_store() -> PickStore:
+    """The pick store, opened on first use: importing the engine creates no file and no writer thread."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None: _store = open_store()
+    return _store
 
 def parameter_integrity(payload: Dict[str, Any]) -> bool:
     keys = ["home","away","odds"]
@@ -15,14 +28,71 @@ def ev_simulation(prob: float, odds: float, stake: float = 1.0) -> float:
     return prob* (odds-1) - (1-prob)*1.0
 
 def store_pick(pick: Dict[str, Any]) -> None:
+    # queued; the store writes in batches off the request path
     try:
-        MEMORY_PICKS.append(pick)
+        get_store().add(pick)
     except Exception:
         pass
 
-def export_picks() -> Dict[str, Any]:
-    return {"items": MEMORY_PICKS}
+def export_picks(filters: Optional[Dict[str, Any]] = None, limit: Optional[int] = None,
+                 cursor: Optional[int] = None, stream: bool = False):
+    """
+    One page as {"items", "count", "next_cursor"}; with stream=True, a generator of NDJSON
+    lines (bytes) over every matching pick, read from the store page by page.
+    """
+    if stream:
+        rows = get_store().iter_raw(filters, cursor=cursor)
+        return (payload.encode() + b"\n" for _, payload in islice(rows, limit))
+    items, next_cursor = get_store().query(filters, limit=limit, cursor=cursor)
+    return {"items": items, "count": len(items), "next_cursor": next_cursor}
+
+def import_picks(items: Iterable[Dict[str, Any]], replace: bool = True, chunk_size: int = IMPORT_CHUNK) -> int:
+    """
+    Bulk-load picks; items may be any iterable and is consumed lazily, one executemany
+    per chunk. replace=True clears the stored history first. Returns the number stored.
+    """
+    it = iter(items or [])
+    n = get_store().replace_all(islice(it, chunk_size)) if replace else 0
+    while True:
+        chunk = list(islice(it, chunk_size))
+        if not chunk: return n
+        n += get_store().add_many(chunk)
+
+def import_picks_ndjson(lines: Iterable[bytes], cursor: int = 0, replace: bool = False,
+                        chunk_size: int = IMPORT_CHUNK) -> Dict[str, Any]:
+    """
+    Stream-import NDJSON picks. Lines up to `cursor` are skipped, so an interrupted import is
+    resumed by re-sending the same body with the returned cursor; each chunk is committed
+    before the cursor moves past it. replace only applies to a fresh import (cursor 0).
+    A bad line, a corrupt or truncated gzip body or a failed read ends the import as
+    status=partial; `lines` should raise OSError when the upload is cut off.
+    """
+    state = {"line": 0, "committed": cursor, "imported": 0}
+    if replace and not cursor:
+        import_picks([], replace=True)
+
+    def parsed() -> Iterator[Dict[str, Any]]:
+        for raw in lines:
+            state["line"] += 1
+            if state["line"] <= cursor: continue
+            raw = raw.strip()
+            if not raw: continue
+            pick = json.loads(raw)
+            if not isinstance(pick, dict): raise ValueError("expected a JSON object per line")
+            yield pick
+
+    it = parsed()
+    try:
+        while True:
+            chunk = list(islice(it, chunk_size))
+            if chunk:
+                state["imported"] += import_picks(chunk, replace=False, chunk_size=chunk_size)
+            state["committed"] = max(state["committed"], state["line"])
+            if not chunk: break
+    except (ValueError, OSError, EOFError, zlib.error) as e:
+        return {"status": "partial", "imported": state["imported"], "cursor": state["committed"],
+                "error": f"line {state['line']}: {e}"}
+    return {"status": "ok", "imported": state["imported"], "cursor": state["committed"]}
 
-def import_picks(items: List[Dict[str, Any]]) -> None:
-    MEMORY_PICKS.clear()
-    MEMORY_PICKS.extend(items or [])
+def picks_count(filters: Optional[Dict[str, Any]] = None) -> int:
+    return get_store().count(filters)
@@ -0,0 +1,319 @@
+# app/engine/backtest.py
+"""
+Historical backtest of the football engine.
+
+Replays finished fixtures with their pre-match 1X2 odds from a local cache of API-Football
+responses (directories of saved /fixtures and /odds JSON, .json or .json.gz, a replay
+corpus, and/or an API_CACHE_DB sqlite file) through analyze_slate, one league per shard on a
+process pool. Per league it writes BACKTEST_DIR/<league_id>.npz, one row per fixture
+(columnar: ids, kickoff, score, odds, model probabilities, pick, P&L), and reports hit
+rate, ROI, Brier score and log-loss, next to the market's own (de-vigged) Brier and
+log-loss as the baseline.
+
+Models:
+  walk-forward  ratings are built day by day from the league's earlier results only (the
+                online update plus the periodic refit the app uses), so no fixture is
+                priced with its own result
+  fitted        the current RATINGS_DIR files, as the app serves them (look-ahead!)
+  priors        league-average priors only
+
+Each shard file records a fingerprint of its inputs and options; re-runs skip shards
+whose fingerprint is unchanged (--force recomputes).
+
+    python -m app.engine.backtest run --cache data/api --cache $API_CACHE_DB --workers 4
+    python -m app.engine.backtest run --cache data/api --league 39 --season 2023 --season 2024
+    python -m app.engine.backtest report
+"""
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse, gzip, hashlib, json, os, sys, time
+import numpy as np
+
+from . import football as fb
+from . import ratings
+from . import simulation as sim
+from .metrics import REGISTRY
+from .odds import parse_fixture_odds, quote, split_1x2
+from .value_mode import OUTCOMES
+from .adapters.cache import SqliteBackend
+
+BACKTEST_DIR = os.getenv("BACKTEST_DIR", "backtest")
+BOOKMAKER_ID = int(os.getenv("BOOKMAKER_ID", "8"))
+MODELS = ("walk-forward", "fitted", "priors")
+DAY = 86400
+
+# int columns of a shard's input, one row per finished fixture
+COLS = ("fixture_id", "ts", "season", "home_id", "away_id", "home_goals", "away_goals")
+
+class Shard(NamedTuple):
+    league_id: int
+    rows: np.ndarray     # (M, len(COLS)) int64, kickoff order
+    odds: np.ndarray     # (M, 3) 1/X/2 decimal odds, 0 where none were cached
+
+class Options(NamedTuple):
+    model: str = "walk-forward"
+    warmup: int = 100          # walk-forward: league matches seen before fixtures are scored
+    k: float = ratings.ONLINE_K
+    xi: float = ratings.XI_PER_DAY
+    reconcile_every: int = ratings.RECONCILE_EVERY
+    goal_epsilon: float = fb.GOAL_EPSILON   # > 0: adaptive score-grid size (football._grid_sizes)
+
+# ---------- loading the local response cache ----------
+def _read_json(path: str) -> Any:
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        data = json.load(f)
+    return data["body"] if isinstance(data, dict) and "body" in data else data   # replay corpus recordings
+
+def iter_response_items(paths: List[str]) -> Iterator[Dict[str, Any]]:
+    """Every response item under the given directories, JSON files and cache databases."""
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(os.path.join(d, n) for d, _, names in os.walk(path) for n in names
+                           if n.endswith((".json", ".json.gz")))
+            for f in files:
+                data = _read_json(f)
+                yield from (data.get("response", []) if isinstance(data, dict) else data) or []
+        elif path.endswith((".json", ".json.gz")):
+            data = _read_json(path)
+            yield from (data.get("response", []) if isinstance(data, dict) else data) or []
+        else:   # API_CACHE_DB file
+            db = SqliteBackend(path, 1)
+            for prefix in ("fixtures?", "odds?"):
+                for _, data in db.items(prefix):
+                    yield from (data or {}).get("response", []) or []
+
+def _best_1x2(entries: List[Dict[str, Any]], bookmaker: int) -> Optional[Dict[str, float]]:
+    """1X2 from every cached odds entry of a fixture: the configured bookmaker, else the first with a full 1X2."""
+    book = parse_fixture_odds(entries) if entries else None
+    q = quote(book, bookmaker)
+    if q is None or "1" not in q: q = quote(book, fallback=True)
+    return split_1x2(q)[0]
+
+def load_shards(paths: List[str], leagues: Optional[List[int]] = None, seasons: Optional[List[int]] = None,
+                bookmaker: int = BOOKMAKER_ID) -> Dict[int, Shard]:
+    """Finished fixtures with regulation scores (and odds where cached), grouped by league."""
+    fixtures: Dict[int, Dict[str, Any]] = {}
+    odds: Dict[int, List[Dict[str, Any]]] = {}
+    for item in iter_response_items(paths):
+        fid = (item.get("fixture") or {}).get("id")
+        if fid is None: continue
+        if "bookmakers" in item: odds.setdefault(int(fid), []).append(item)
+        elif "teams" in item: fixtures[int(fid)] = item
+    by_league: Dict[int, List[Tuple[List[int], List[float]]]] = {}
+    for fid, fx in fixtures.items():
+        league = fx.get("league") or {}
+        if league.get("id") is None: continue
+        league_id, season = int(league["id"]), int(league.get("season") or 0)
+        if leagues and league_id not in leagues: continue
+        if seasons and season not in seasons: continue
+        m = ratings.matches_from_fixtures([fx])
+        if not len(m.ts): continue
+        o = _best_1x2(odds.get(fid, []), bookmaker) or {}
+        row = [fid, int(m.ts[0]), season, int(m.home_id[0]), int(m.away_id[0]), int(m.home_goals[0]), int(m.away_goals[0])]
+        by_league.setdefault(league_id, []).append((row, [float(o.get(k) or 0.0) for k in OUTCOMES]))
+    shards = {}
+    for league_id, items in by_league.items():
+        rows = np.array([r for r, _ in items], dtype=np.int64).reshape(-1, len(COLS))
+        order = np.lexsort((rows[:, 0], rows[:, 1]))
+        shards[league_id] = Shard(league_id, rows[order], np.array([o for _, o in items], dtype=float).reshape(-1, 3)[order])
+    return shards
+
+def fingerprint(shard: Shard, opts: Options) -> str:
+    """Hash of a shard's inputs, the options and the model settings read from the environment."""
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(shard.rows).tobytes())
+    h.update(np.ascontiguousarray(shard.odds).tobytes())
+    h.update(json.dumps([opts, fb.LEAGUE_AVG, fb.MAX_GOALS, ratings.PRIOR_GOALS]).encode())
+    if opts.model == "fitted":
+        try: h.update(str(os.stat(ratings.ratings_path(shard.league_id)).st_mtime).encode())
+        except OSError: pass
+    return h.hexdigest()
+
+# ---------- one shard ----------
+def _payload(league_id: int, row: np.ndarray, odds: np.ndarray, goal_epsilon: float = 0.0) -> Dict[str, Any]:
+    fid, _, _, h, a = row[:5].tolist()
+    return {"home": str(h), "away": str(a), "league": str(league_id),
+            "league_id": league_id, "home_id": h, "away_id": a, "goal_epsilon": goal_epsilon,
+            "odds": {k: o for k, o in zip(OUTCOMES, odds.tolist()) if o > 0}}
+
+def _walk_forward(shard: Shard, opts: Options) -> Iterator[Tuple[np.ndarray, Optional[fb.Lookup]]]:
+    """(row indices of one kickoff day, lookup from ratings built on earlier days only)."""
+    r = ratings.seed_ratings(shard.league_id, ratings.Matches.from_log(np.zeros((0, 6), dtype=np.int64)))
+    seen, applied = 0, set()
+    days = shard.rows[:, 1] // DAY
+    for day in np.unique(days).tolist():
+        rows = np.flatnonzero(days == day)
+        idx = r.index()
+        lookup = (lambda league, h, a, r=r, idx=idx: ratings.expected_goals(r, idx, h, a))
+        yield rows[seen + np.arange(len(rows)) >= opts.warmup], lookup
+        block = shard.rows[rows]
+        log = np.column_stack([block[:, 3:7], block[:, 1], block[:, 0]])   # ratings' match-log layout
+        r, n = ratings.update_ratings(r, ratings.Matches.from_log(log), k=opts.k, seen=applied)
+        seen += n
+        if r.online_updates >= opts.reconcile_every:
+            r = ratings.reconcile(r, xi=opts.xi, now=int((day + 1) * DAY))
+
+def _blocks(shard: Shard, opts: Options) -> Iterator[Tuple[np.ndarray, Optional[fb.Lookup]]]:
+    if opts.model == "walk-forward":
+        yield from _walk_forward(shard, opts)
+    else:
+        yield np.arange(len(shard.rows)), (None if opts.model == "fitted" else (lambda *ids: None))
+
+def run_shard(shard: Shard, opts: Options, out_dir: str, fp: str) -> Tuple[int, str, int]:
+    """Backtest one league and write its columnar file. Returns (league, path, fixtures scored)."""
+    t0 = time.perf_counter()
+    n = len(shard.rows)
+    prob, lam = np.zeros((n, 3)), np.zeros((n, 3))
+    scored, fitted, picked = np.zeros(n, bool), np.zeros(n, bool), np.zeros(n, bool)
+    selection = np.full(n, -1, dtype=np.int8)
+    for rows, lookup in _blocks(shard, opts):
+        rows = rows[(shard.odds[rows] > 0).all(axis=1)]   # 1X2 priced both ways
+        if not len(rows): continue
+        payloads = [_payload(shard.league_id, shard.rows[k], shard.odds[k], opts.goal_epsilon) for k in rows]
+        results, params, wm, basis = fb.analyze_slate(payloads, lookup=lookup)
+        prob[rows], lam[rows], scored[rows] = wm, params, True
+        fitted[rows] = [b != "priors" for b in basis]
+        for k, res in zip(rows.tolist(), results):
+            if res.get("status") == "FINAL_PICK":
+                picked[k] = True
+                selection[k] = OUTCOMES.index(res["value_mode_table"]["best_edge_sel"])
+    hg, ag = shard.rows[:, 5], shard.rows[:, 6]
+    result = np.where(hg > ag, 0, np.where(hg == ag, 1, 2)).astype(np.int8)
+    price = np.where(picked, shard.odds[np.arange(n), np.maximum(selection, 0)], 0.0)
+    won = picked & (selection == result)
+    pnl = np.where(picked, np.where(won, price - 1.0, -1.0), 0.0)
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{shard.league_id}.npz")
+    tmp = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez_compressed(tmp, **{c: shard.rows[:, j] for j, c in enumerate(COLS)},
+                        odds=shard.odds, prob=prob, lam=lam[:, :2], rho=lam[:, 2], result=result,
+                        scored=scored, fitted=fitted, picked=picked, selection=selection,
+                        price=price, won=won, pnl=pnl,
+                        fingerprint=np.array(fp), options=np.array(json.dumps(opts._asdict())),
+                        elapsed=np.array(time.perf_counter() - t0))
+    os.replace(tmp, path)
+    return shard.league_id, path, int(scored.sum())
+
+def _init_worker() -> None:
+    # the per-pick MC audit and metrics snapshots are for the web app, not for replays
+    sim.SIM_AUDIT_PATHS = 0
+    REGISTRY.directory = None
+
+def stored_fingerprint(path: str) -> Optional[str]:
+    try:
+        with np.load(path) as z: return str(z["fingerprint"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+def run(shards: Dict[int, Shard], opts: Options, out_dir: str = BACKTEST_DIR, workers: Optional[int] = None,
+        force: bool = False) -> Dict[str, List[int]]:
+    """Run every shard whose inputs changed since its file was written; {"ran": [...], "skipped": [...]}."""
+    todo, skipped = [], []
+    for league_id, shard in sorted(shards.items()):
+        fp = fingerprint(shard, opts)
+        if not force and stored_fingerprint(os.path.join(out_dir, f"{league_id}.npz")) == fp:
+            skipped.append(league_id)
+        else:
+            todo.append((shard, fp))
+    ran = []
+    if todo:
+        workers = min(workers or os.cpu_count() or 1, len(todo))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [pool.submit(run_shard, shard, opts, out_dir, fp) for shard, fp in todo]
+            for f in as_completed(futures):
+                league_id, _, n = f.result()
+                ran.append(league_id)
+                print(f"league {league_id}: {n} fixtures scored", file=sys.stderr)
+    return {"ran": sorted(ran), "skipped": skipped}
+
+# ---------- scoring ----------
+def load_results(out_dir: str = BACKTEST_DIR, leagues: Optional[List[int]] = None) -> Dict[int, Dict[str, np.ndarray]]:
+    out = {}
+    for name in sorted(os.listdir(out_dir)) if os.path.isdir(out_dir) else []:
+        stem = name[:-4] if name.endswith(".npz") else ""
+        if not stem.isdigit() or (leagues and int(stem) not in leagues): continue
+        with np.load(os.path.join(out_dir, name)) as z:
+            out[int(stem)] = {k: z[k] for k in z.files}
+    return out
+
+def score(cols: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """Hit rate and ROI of the picks (flat 1 unit); Brier and log-loss of the 1X2 probabilities."""
+    s = cols["scored"]
+    prob, odds, result = cols["prob"][s], cols["odds"][s], cols["result"][s].astype(int)
+    onehot = np.eye(3)[result]
+    market = 1.0 / odds
+    market /= market.sum(axis=1, keepdims=True)        # proportional de-vig
+    picks = cols["picked"] & s
+    staked = int(picks.sum())
+    def brier(p): return round(float(((p - onehot)**2).sum(axis=1).mean()), 4) if len(p) else None
+    def logloss(p): return round(float(-np.log(np.clip(p[np.arange(len(p)), result], 1e-12, 1)).mean()), 4) if len(p) else None
+    return {
+        "fixtures": int(s.sum()), "fitted_share": round(float(cols["fitted"][s].mean()), 3) if s.any() else None,
+        "picks": staked,
+        "hit_rate": round(float(cols["won"][picks].mean()), 4) if staked else None,
+        "profit": round(float(cols["pnl"][picks].sum()), 2),
+        "roi": round(float(cols["pnl"][picks].sum() / staked), 4) if staked else None,
+        "avg_price": round(float(cols["price"][picks].mean()), 3) if staked else None,
+        "brier": brier(prob), "log_loss": logloss(prob),
+        "market_brier": brier(market), "market_log_loss": logloss(market),
+    }
+
+def report(results: Dict[int, Dict[str, np.ndarray]]) -> Dict[str, Any]:
+    per_league = {str(league): score(cols) for league, cols in results.items()}
+    keys = ("odds", "prob", "result", "scored", "fitted", "picked", "won", "pnl", "price")
+    total = score({k: np.concatenate([c[k] for c in results.values()]) for k in keys}) if results else {}
+    return {"leagues": per_league, "total": total}
+
+def format_report(rep: Dict[str, Any]) -> str:
+    head = f"{'league':>8} {'fixtures':>8} {'picks':>6} {'hit%':>6} {'ROI%':>7} {'brier':>7} {'mkt':>7} {'logloss':>8} {'mkt':>7}"
+    def line(name, s):
+        pct = lambda v: f"{v*100:.1f}" if v is not None else "-"
+        num = lambda v: f"{v:.4f}" if v is not None else "-"
+        return (f"{name:>8} {s['fixtures']:>8} {s['picks']:>6} {pct(s['hit_rate']):>6} {pct(s['roi']):>7} "
+                f"{num(s['brier']):>7} {num(s['market_brier']):>7} {num(s['log_loss']):>8} {num(s['market_log_loss']):>7}")
+    rows = [head] + [line(k, s) for k, s in rep["leagues"].items()]
+    if rep.get("total"): rows.append(line("total", rep["total"]))
+    return "\n".join(rows)
+
+# ---------- CLI ----------
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m app.engine.backtest")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("run", help="backtest every league in the cache, then report")
+    r.add_argument("--cache", action="append", required=True,
+                   help="directory or file of saved API-Football responses, or an API_CACHE_DB sqlite file (repeatable)")
+    r.add_argument("--league", type=int, action="append", default=[])
+    r.add_argument("--season", type=int, action="append", default=[])
+    r.add_argument("--model", choices=MODELS, default="walk-forward")
+    r.add_argument("--warmup", type=int, default=Options().warmup, help="walk-forward: matches per league before scoring")
+    r.add_argument("--bookmaker", type=int, default=BOOKMAKER_ID, help="preferred bookmaker for 1X2 odds")
+    r.add_argument("--goal-epsilon", type=float, default=Options().goal_epsilon,
+                   help="score-grid tail allowed per fixture; > 0 picks the smallest grid under it")
+    r.add_argument("--workers", type=int, default=None)
+    r.add_argument("--force", action="store_true", help="recompute shards whose inputs did not change")
+    for p in (r, sub.add_parser("report", help="score the shard files already written")):
+        p.add_argument("--out", default=BACKTEST_DIR)
+        p.add_argument("--json", help="also write the report here")
+    args = ap.parse_args(argv)
+
+    leagues = getattr(args, "league", None)
+    if args.cmd == "run":
+        t0 = time.perf_counter()
+        shards = load_shards(args.cache, args.league, args.season, args.bookmaker)
+        if not shards:
+            print("no finished fixtures in the cache", file=sys.stderr); return 1
+        done = run(shards, Options(model=args.model, warmup=args.warmup, goal_epsilon=args.goal_epsilon), args.out, args.workers, args.force)
+        print(f"{len(done['ran'])} league(s) run, {len(done['skipped'])} unchanged "
+              f"in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+        leagues = sorted(shards)
+    rep = report(load_results(args.out, leagues))
+    if not rep["leagues"]:
+        print(f"no backtest results in {args.out}", file=sys.stderr); return 1
+    print(format_report(rep))
+    if args.json:
+        with open(args.json, "w") as f: json.dump(rep, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+# app/engine/consensus.py
+"""
+Best price and margin-free market consensus for 1X2, over every bookmaker of a slate.
+
+slate_1x2 stacks the 1X2 columns of each fixture's OddsBook into one (fixtures, bookmakers, 3)
+array, NaN where a bookmaker has no full 1X2. Everything after that is array arithmetic over
+the whole slate: the best price per selection (and who offers it), each bookmaker's implied
+probabilities with the margin removed, and their mean across bookmakers as the consensus.
+
+De-vig methods (DEVIG_METHOD):
+  proportional  implied probabilities scaled to sum to 1
+  shin          Shin's insider-trading model; takes more margin off longshots than favourites
+  power         p_i = q_i ** k with k chosen so the p_i sum to 1; also favours favourites
+Shin and power are solved by Newton's method on every row at once, until all rows converge.
+"""
+from typing import Dict, Optional, Sequence
+import os
+import numpy as np
+
+from .odds import RESULT, OddsBook
+
+DEVIG_METHOD = os.getenv("DEVIG_METHOD", "shin")   # proportional | shin | power
+METHODS = ("proportional", "shin", "power")
+_ITERATIONS = 50     # Newton steps at most
+_TOL = 1e-12
+
+def slate_1x2(books: Sequence[Optional[OddsBook]]) -> np.ndarray:
+    """(fixtures, bookmakers, 3) 1/X/2 prices, NaN-padded; a bookmaker missing any of the three counts as not quoting."""
+    width = max([len(b.bookmaker_ids) for b in books if b is not None] + [1])
+    out = np.full((len(books), width, 3), np.nan)
+    for f, b in enumerate(books):
+        if b is None: continue
+        cols = [b.column(s) for s in RESULT]
+        if None in cols: continue
+        out[f, :len(b.bookmaker_ids)] = b.prices[:, cols]
+    out[np.isnan(out).any(axis=2)] = np.nan
+    return out
+
+def best_prices(prices: np.ndarray) -> Dict[str, np.ndarray]:
+    """Highest price per fixture and selection ("price", 0 where nobody quotes) and its bookmaker row ("row", -1)."""
+    filled = np.where(np.isnan(prices), -np.inf, prices)
+    row = np.argmax(filled, axis=1)
+    best = np.take_along_axis(filled, row[:, None, :], axis=1)[:, 0, :]
+    quoted = np.isfinite(best)
+    return {"price": np.where(quoted, best, 0.0), "row": np.where(quoted, row, -1)}
+
+def _proportional(q: np.ndarray) -> np.ndarray:
+    return q / q.sum(axis=-1, keepdims=True)
+
+def _shin(q: np.ndarray) -> np.ndarray:
+    # Newton on the insider share z: sum_i p_i(z) = 1, p_i = (sqrt(z^2 + 4(1-z) q_i^2/Q) - z) / (2(1-z))
+    a = 4 * q*q / q.sum(axis=-1, keepdims=True)
+    z = np.zeros(q.shape[:-1] + (1,))
+    for _ in range(_ITERATIONS):
+        r = np.sqrt(z*z + (1 - z) * a)
+        f = (r - z).sum(axis=-1, keepdims=True) - 2*(1 - z)        # 2(1-z) (sum p - 1)
+        df = ((2*z - a) / (2*r) - 1).sum(axis=-1, keepdims=True) + 2
+        step = z - np.clip(z - f / df, 0.0, 0.99)   # a book priced under 100% has no root in z >= 0: it stays at 0
+        z = z - step
+        if np.abs(step).max() < _TOL: break
+    p = (np.sqrt(z*z + (1 - z) * a) - z) / (2*(1 - z))
+    return p / p.sum(axis=-1, keepdims=True)   # absorbs what the iterations left
+
+def _power(q: np.ndarray) -> np.ndarray:
+    # Newton on f(k) = sum q_i^k - 1; f is convex and decreasing in k, so from k = 1 it converges monotonically
+    lq = np.log(q)
+    k = np.ones(q.shape[:-1] + (1,))
+    for _ in range(_ITERATIONS):
+        qk = np.exp(k * lq)
+        f = qk.sum(axis=-1, keepdims=True) - 1
+        if np.abs(f).max() < _TOL: break
+        k = k - f / (qk * lq).sum(axis=-1, keepdims=True)
+    p = np.exp(k * lq)
+    return p / p.sum(axis=-1, keepdims=True)
+
+_DEVIG = {"proportional": _proportional, "shin": _shin, "power": _power}
+
+def devig(prices: np.ndarray, method: str = DEVIG_METHOD) -> np.ndarray:
+    """Margin-free probabilities of (..., 3) prices; NaN rows stay NaN."""
+    if method not in _DEVIG:
+        raise ValueError(f"unknown de-vig method {method!r} (one of {', '.join(METHODS)})")
+    q = 1.0 / np.where(np.isnan(prices), 1.0, prices)
+    valid = ~np.isnan(prices).any(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        p = _DEVIG[method](np.where(valid[..., None], q, 1/3))
+    return np.where(valid[..., None], p, np.nan)
+
+def consensus(prices: np.ndarray, method: str = DEVIG_METHOD) -> Dict[str, np.ndarray]:
+    """
+    Per fixture: "prob" (3,) mean de-vigged probability over the bookmakers quoting it (NaN when
+    none do), "bookmakers" how many did, "margin" their mean overround.
+    """
+    valid = ~np.isnan(prices).any(axis=2)
+    n = valid.sum(axis=1)
+    fair = np.where(valid[..., None], devig(prices, method), 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        prob = fair.sum(axis=1) / n[:, None]
+        margin = np.where(valid, (1.0 / np.where(valid[..., None], prices, 1.0)).sum(axis=2) - 1, 0.0).sum(axis=1) / n
+    return {"prob": np.where(n[:, None] > 0, prob, np.nan), "bookmakers": n, "margin": np.where(n > 0, margin, np.nan)}
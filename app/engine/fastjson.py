@@ -0,0 +1,29 @@
+# app/engine/fastjson.py
+"""
+JSON for responses: orjson when it is installed, the stdlib otherwise.
+
+Both give the compact, key-sorted output Flask's jsonify produces. orjson also writes numpy
+arrays and scalars directly and leaves non-ASCII text unescaped (the body is UTF-8 either way);
+NaN and infinities come out as null instead of the stdlib's non-standard NaN/Infinity.
+"""
+from typing import Any, Callable, Optional
+import json
+
+try:
+    import orjson
+except ImportError:  # in requirements.txt; the stdlib keeps working without it
+    orjson = None
+
+ENCODER = "orjson" if orjson is not None else "json"
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def dumps(obj: Any, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """Compact, key-sorted JSON bytes; `default` converts anything the encoder does not know."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=default, option=_OPTIONS)
+    return json.dumps(obj, default=default, separators=(",", ":"), sort_keys=True).encode()
+
+def loads(data: bytes) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
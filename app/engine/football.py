@@ -1,10 +1,19 @@
-from typing import Dict, Any, List, Tuple
-import math, os
+from typing import Callable, Dict, Any, List, NamedTuple, Optional, Tuple
+import math, os, zlib
+from functools import lru_cache
 import numpy as np
-from .value_mode import compute_value_mode
+from . import markets as mk
+from .value_mode import OUTCOMES, compute_value_mode_batch, value_mode_row
+from .metrics import span
+from .grid_cache import GRID_CACHE, GridKey
+from . import ratings
+from . import simulation as sim
 from .audit import parameter_integrity, formula_integrity, ev_simulation
 
 LEAGUE_AVG = float(os.getenv("FOOTBALL_LEAGUE_AVG_GOALS","2.6"))
+MAX_GOALS = int(os.getenv("FOOTBALL_MAX_GOALS","10"))
+GOAL_EPSILON = float(os.getenv("FOOTBALL_GOAL_EPSILON","0"))   # > 0: per fixture, the smallest grid discarding less than this
+MAX_GOALS_CAP = int(os.getenv("FOOTBALL_MAX_GOALS_CAP","20"))  # largest grid the adaptive size may pick
 
 SUPPORTED_MARKETS = [
     "1X2","Double Chance","Draw No Bet",
@@ -15,23 +24,57 @@ SUPPORTED_MARKETS = [
 ]
 
 # ---------- core math ----------
-def poisson_prob_matrix(lmb_home: float, lmb_away: float, max_goals: int = 10, rho: float = 0.02):
-    P = np.zeros((max_goals+1, max_goals+1))
-    for i in range(max_goals+1):
-        for j in range(max_goals+1):
-            p_ind = (math.exp(-lmb_home) * (lmb_home**i) / math.factorial(i)) * \
-                    (math.exp(-lmb_away) * (lmb_away**j) / math.factorial(j))
-            adj = 1.0
-            if i <= 1 and j <= 1:
-                if i == 0 and j == 0: adj = 1 - (lmb_home*lmb_away*rho)
-                elif i == 0 and j == 1: adj = 1 + (lmb_home*rho)
-                elif i == 1 and j == 0: adj = 1 + (lmb_away*rho)
-                elif i == 1 and j == 1: adj = 1 - rho
-            P[i,j] = p_ind * adj
+@lru_cache(maxsize=32)
+def _goal_axis(max_goals: int) -> Tuple[np.ndarray, np.ndarray]:
+    k = np.arange(max_goals+1, dtype=float)
+    inv_fact = 1.0 / np.array([math.factorial(i) for i in range(max_goals+1)], dtype=float)
+    return k, inv_fact
+
+def poisson_pmf(lmb, max_goals: int = MAX_GOALS) -> np.ndarray:
+    """Poisson PMF for 0..max_goals along the last axis; lmb may be a scalar or an array."""
+    k, inv_fact = _goal_axis(max_goals)
+    lmb = np.asarray(lmb, dtype=float)[..., None]
+    return np.exp(-lmb) * np.power(lmb, k) * inv_fact
+
+def poisson_prob_matrix(lmb_home: float, lmb_away: float, max_goals: int = MAX_GOALS, rho: float = 0.02):
+    P = np.multiply.outer(poisson_pmf(lmb_home, max_goals), poisson_pmf(lmb_away, max_goals))
+    # Dixon-Coles low-score adjustment only touches the 2x2 corner
+    tau = np.array([[1 - lmb_home*lmb_away*rho, 1 + lmb_home*rho],
+                    [1 + lmb_away*rho,          1 - rho]])
+    n = min(2, max_goals+1)
+    P[:n, :n] *= tau[:n, :n]
     S = P.sum()
     if S>0: P /= S
     return P
 
+def poisson_prob_tensor(lmb_home, lmb_away, max_goals: int = MAX_GOALS, rho=0.02) -> np.ndarray:
+    """Stacked (N, G, G) version of poisson_prob_matrix for N (λ home, λ away, rho) triples."""
+    lh = np.asarray(lmb_home, dtype=float).reshape(-1)
+    la = np.asarray(lmb_away, dtype=float).reshape(-1)
+    rho = np.broadcast_to(np.asarray(rho, dtype=float), lh.shape)
+    P = poisson_pmf(lh, max_goals)[:, :, None] * poisson_pmf(la, max_goals)[:, None, :]
+    tau = np.stack([np.stack([1 - lh*la*rho, 1 + lh*rho], axis=-1),
+                    np.stack([1 + la*rho,    1 - rho],    axis=-1)], axis=1)
+    n = min(2, max_goals+1)
+    P[:, :n, :n] *= tau[:, :n, :n]
+    S = P.sum(axis=(1, 2), keepdims=True)
+    np.divide(P, S, out=P, where=S > 0)
+    return P
+
+def tail_mass(lmb_home, lmb_away, max_goals: int = MAX_GOALS) -> np.ndarray:
+    """
+    Probability of a score outside the 0..max_goals grid: the mass the grid's renormalisation
+    spreads over the rest. Dixon-Coles leaves the total unchanged, so it is exact either way.
+    """
+    return 1.0 - poisson_pmf(lmb_home, max_goals).sum(axis=-1) * poisson_pmf(lmb_away, max_goals).sum(axis=-1)
+
+def adaptive_max_goals(lmb_home, lmb_away, epsilon, cap: int = MAX_GOALS_CAP) -> np.ndarray:
+    """Smallest max_goals (1..cap) per fixture whose tail_mass is below epsilon; cap where none is."""
+    fh = np.cumsum(poisson_pmf(lmb_home, cap), axis=-1)
+    fa = np.cumsum(poisson_pmf(lmb_away, cap), axis=-1)
+    ok = 1.0 - fh*fa < np.asarray(epsilon, dtype=float)[..., None]
+    return np.maximum(np.where(ok.any(axis=-1), ok.argmax(axis=-1), cap), 1)
+
 def probs_from_matrix(P) -> Dict[str,float]:
     ph = float(np.tril(P, -1).sum())
     pd = float(np.trace(P))
@@ -39,50 +82,19 @@ def probs_from_matrix(P) -> Dict[str,float]:
     return {"1":ph,"X":pd,"2":pa}
 
 def over_under_probs(P, line: float) -> Tuple[float,float]:
-    total_over = 0.0; total_under = 0.0
-    g = P.shape[0]-1
-    for i in range(g+1):
-        for j in range(g+1):
-            if i+j > line: total_over += P[i,j]
-            else: total_under += P[i,j]
-    return total_over, total_under
+    g = P.shape[-1]-1
+    return mk.mass(P, mk.total_goals_mask(g, line, True)), mk.mass(P, mk.total_goals_mask(g, line, False))
 
 def btts_probs(P) -> Tuple[float,float]:
-    g = P.shape[0]-1
-    yes = 0.0; no = 0.0
-    for i in range(g+1):
-        for j in range(g+1):
-            if i>0 and j>0: yes += P[i,j]
-            else: no += P[i,j]
-    return yes, no
+    g = P.shape[-1]-1
+    return mk.mass(P, mk.btts_mask(g, True)), mk.mass(P, mk.btts_mask(g, False))
 
 def team_goals_over(P, team: str, line: float) -> float:
-    g = P.shape[0]-1; s=0.0
-    if team=="home":
-        for i in range(g+1):
-            for j in range(g+1):
-                if i > line: s += P[i,j]
-    else:
-        for i in range(g+1):
-            for j in range(g+1):
-                if j > line: s += P[i,j]
-    return s
+    return mk.mass(P, mk.team_goals_mask(P.shape[-1]-1, team, line))
 
 def winning_margin_probs(P) -> Dict[str,float]:
-    g = P.shape[0]-1
-    margins = {"+1":0.0,"+2":0.0,"+3+":0.0,"-1":0.0,"-2":0.0,"-3+":0.0}
-    for i in range(g+1):
-        for j in range(g+1):
-            d = i-j
-            if d>0:
-                if d==1: margins["+1"]+=P[i,j]
-                elif d==2: margins["+2"]+=P[i,j]
-                else: margins["+3+"]+=P[i,j]
-            elif d<0:
-                if d==-1: margins["-1"]+=P[i,j]
-                elif d==-2: margins["-2"]+=P[i,j]
-                else: margins["-3+"]+=P[i,j]
-    return margins
+    m = np.einsum("...ij,kij->...k", P, mk.margin_masks(P.shape[-1]-1))
+    return {k: m[..., n] for n, k in enumerate(mk.MARGIN_KEYS)}
 
 def correct_score_prob(P, i: int, j: int) -> float:
     g = P.shape[0]-1
@@ -90,37 +102,231 @@ def correct_score_prob(P, i: int, j: int) -> float:
     return 0.0
 
 # ---------- engine ----------
-def analyze_football_match(payload: Dict[str, Any]) -> Dict[str, Any]:
-    league = payload.get("league","")
-    season = payload.get("season", 2025)
-    home_name = payload.get("home","Home")
-    away_name = payload.get("away","Away")
-    odds = payload.get("odds", {})
-    ctx = payload.get("context", {})
-    markets = payload.get("markets", SUPPORTED_MARKETS)
-    ou_lines = payload.get("ou_lines", [1.5,2.5,3.5])
-    team_goal_lines = payload.get("team_goal_lines", {"home":[0.5,1.5], "away":[0.5,1.5]})
-    cs_groups = payload.get("cs_groups", [[1,0],[2,0],[2,1]])
-
-    # --- basic lambda from priors or light context (if you have live form, wire it here) ---
-    # Default neutral ~2.6 goals split slightly to away if "away strong" in context.
-    base_h = LEAGUE_AVG/2 * 0.95
-    base_a = LEAGUE_AVG/2 * 1.05
+class PayloadError(ValueError):
+    """A payload field the engine cannot use; the routes answer it with a 400."""
+
+Lookup = Callable[[Any, Any, Any], Optional[Tuple[float, float, float]]]   # (league, home, away) ids -> (λh, λa, rho)
+
+def _match_params(payload: Dict[str, Any], lookup: Optional[Lookup] = None) -> Tuple[float, float, float, str]:
+    """(λ home, λ away, rho, basis): fitted league ratings when the payload carries known ids, else priors."""
+    ctx = payload.get("context", {}) or {}
+    fitted = (lookup or ratings.lambdas)(payload.get("league_id"), payload.get("home_id"), payload.get("away_id"))
+    if fitted is not None:
+        base_h, base_a, rho = fitted
+        basis = "fitted ratings"
+    else:
+        # Default neutral ~2.6 goals split slightly to away if "away strong" in context.
+        base_h = LEAGUE_AVG/2 * 0.95
+        base_a = LEAGUE_AVG/2 * 1.05
+        rho = 0.05 if ctx.get("derby") else 0.02
+        basis = "priors"
     if ctx.get("derby"):     # slightly higher volatility
         base_h *= 1.03; base_a *= 1.03
     lam_h, lam_a = max(0.2, base_h), max(0.2, base_a)
-    rho = 0.05 if ctx.get("derby") else 0.02
+    return lam_h, lam_a, rho, basis
+
+def _price(odds: Dict[str, Any], k: str) -> float:
+    try: return float(odds.get(k) or 0.0)
+    except (TypeError, ValueError): return 0.0
+
+def _consensus_probs(p: Dict[str, Any]) -> List[float]:
+    """Payload "consensus" (an /api/matches item's) as 1/X/2 probabilities; NaN when absent."""
+    pct = (p.get("consensus") or {}).get("percent") or {}
+    try: return [float(pct[k]) / 100 for k in OUTCOMES]
+    except (KeyError, TypeError, ValueError): return [math.nan] * 3
+
+def _market_prices(odds: Dict[str, Any]) -> Dict[str, float]:
+    """Priced selections of a payload's odds other than 1/X/2 ("Over 2.5", "BTTS Yes", "CS 1-0", ...)."""
+    out = {}
+    for k in odds:
+        if k in OUTCOMES: continue
+        o = _price(odds, k)
+        if o > 1.0: out[k] = o
+    return out
+
+@lru_cache(maxsize=64)
+def _market_masks(g: int, selections: Tuple[str, ...]) -> Tuple[Tuple[str, ...], Optional[np.ndarray]]:
+    """(selections the grid can settle, their stacked masks); a slate's fixtures mostly share one set."""
+    sels, masks = [], []
+    for s in selections:
+        try: masks.append(mk.selection_mask(g, s))
+        except ValueError: continue
+        sels.append(s)
+    return tuple(sels), (np.stack(masks) if masks else None)
+
+def _market_value_mode(P: np.ndarray, prices: Dict[str, float], g: int) -> Optional[Dict[str, Any]]:
+    """
+    Value mode for the other priced markets of one fixture: implied vs model probability per
+    selection, in the shape of value_mode_table. Selections selection_mask does not know are left out.
+    """
+    sels, masks = _market_masks(g, tuple(prices))
+    if not sels: return None
+    price = np.array([prices[s] for s in sels])
+    true = mk.mass(P, masks)
+    implied = 1.0 / price
+    edge = true - implied
+    best = int(np.argmax(edge))
+    with np.errstate(divide="ignore"):
+        fair = np.round(1.0 / true, 3).tolist()
+    table = lambda v: dict(zip(sels, v.tolist()))
+    return {
+        "odds": table(price),
+        "implied_percent": table(np.round(implied*100, 2)),
+        "true_percent": table(np.round(true*100, 2)),
+        "fair_odds": {s: f if t > 0 else None for s, f, t in zip(sels, fair, true.tolist())},
+        "edge_percent_points": table(np.round(edge*100, 2)),
+        "efficient": bool(edge[best] < 0.03),
+        "best_edge_sel": sels[best],
+    }
+
+def _payload_spec(g: int, p: Dict[str, Any]) -> Tuple:
+    return mk.mask_spec(g, p.get("ou_lines", mk.DEFAULT_OU_LINES),
+                        p.get("team_goal_lines", mk.DEFAULT_TEAM_GOAL_LINES),
+                        p.get("cs_groups", mk.DEFAULT_CS_GROUPS))
+
+def _max_goals(p: Dict[str, Any]) -> Optional[int]:
+    """A payload's own "max_goals", checked: an integer in 1..MAX_GOALS_CAP (PayloadError otherwise)."""
+    m = p.get("max_goals")
+    if m is None: return None
+    try: ok = not isinstance(m, bool) and float(m) == int(m) and 1 <= int(m) <= MAX_GOALS_CAP
+    except (TypeError, ValueError, OverflowError): ok = False
+    if not ok:
+        raise PayloadError(f"max_goals must be an integer in 1..{MAX_GOALS_CAP}, got {m!r}")
+    return int(m)
+
+def _goal_epsilon(p: Dict[str, Any]) -> float:
+    """A payload's "goal_epsilon" (default FOOTBALL_GOAL_EPSILON), checked: a number in [0, 1) (PayloadError otherwise)."""
+    e = p.get("goal_epsilon", GOAL_EPSILON)
+    if e is None: return 0.0
+    try: ok = not isinstance(e, bool) and 0.0 <= float(e) < 1.0
+    except (TypeError, ValueError): ok = False
+    if not ok:
+        raise PayloadError(f"goal_epsilon must be a number in [0, 1), got {e!r}")
+    return float(e)
+
+def _lambda_quantum(p: Dict[str, Any], default: Optional[float] = None) -> Optional[float]:
+    """A payload's "lambda_quantum" (default `default`), checked: a finite number >= 0 (PayloadError otherwise)."""
+    q = p.get("lambda_quantum", default)
+    if q is None: return None
+    try: ok = not isinstance(q, bool) and math.isfinite(float(q)) and float(q) >= 0.0
+    except (TypeError, ValueError): ok = False
+    if not ok:
+        raise PayloadError(f"lambda_quantum must be a finite number >= 0, got {q!r}")
+    return float(q)
+
+def _grid_sizes(payloads: List[Dict[str, Any]], params: np.ndarray) -> np.ndarray:
+    """
+    max_goals per payload: its own "max_goals" when it sends one, else the adaptive size for
+    its "goal_epsilon" (default FOOTBALL_GOAL_EPSILON) when that is > 0, else MAX_GOALS.
+    """
+    fixed = [_max_goals(p) for p in payloads]
+    eps = np.array([_goal_epsilon(p) if m is None else 0.0 for p, m in zip(payloads, fixed)])
+    g = np.array([MAX_GOALS if m is None else m for m in fixed], dtype=int)
+    auto = np.flatnonzero(eps > 0)
+    if len(auto):
+        g[auto] = adaptive_max_goals(params[auto, 0], params[auto, 1], eps[auto])
+    return g
 
-    P = poisson_prob_matrix(lam_h, lam_a, max_goals=10, rho=rho)
+def _win_draw_loss(P: np.ndarray) -> np.ndarray:
+    return np.stack([np.tril(P, -1).sum(axis=(1, 2)),
+                     np.trace(P, axis1=1, axis2=2),
+                     np.triu(P, 1).sum(axis=(1, 2))], axis=1)
+
+def _score_grids(params: np.ndarray, g: int, quanta: List[Optional[float]]) -> Tuple[List[GridKey], List[np.ndarray], np.ndarray]:
+    """
+    (memo keys, grids, 1/X/2 probabilities) for fixtures sharing grid size g. Only parameter
+    tuples missing from GRID_CACHE are built, in one poisson_prob_tensor call.
+    """
+    keys = [GRID_CACHE.key(lh, la, rho, g, q) for (lh, la, rho), q in zip(params.tolist(), quanta)]
+    entries = {k: GRID_CACHE.grids.get(k) for k in dict.fromkeys(keys)}
+    miss = [k for k, e in entries.items() if e is None]
+    if miss:
+        arr = np.array([k[:3] for k in miss], dtype=float)
+        P = poisson_prob_tensor(arr[:,0], arr[:,1], max_goals=g, rho=arr[:,2])
+        for k, Pk, wk in zip(miss, P, _win_draw_loss(P)):
+            Pk = Pk.copy(); Pk.setflags(write=False)
+            entries[k] = (Pk, wk)
+            GRID_CACHE.grids.put(k, entries[k])
+    GRID_CACHE.record("grid", len(keys) - len(miss), len(miss))
+    return keys, [entries[k][0] for k in keys], np.array([entries[k][1] for k in keys]).reshape(-1, 3)
+
+def _grid_markets(P: np.ndarray, wm: np.ndarray, specs: List[Tuple]) -> List[Dict[str, Any]]:
+    """Market dicts for a stack of grids (all of one size); fixtures sharing a line set share one einsum."""
+    groups: Dict[Tuple, List[int]] = {}
+    for r, spec in enumerate(specs):
+        groups.setdefault(spec, []).append(r)
+
+    out: List[Dict[str, Any]] = [{} for _ in specs]
+    for spec, rows in groups.items():
+        ms = mk.mask_set(spec)
+        values = mk.evaluate(P[rows], ms).tolist()
+        for r, vals in zip(rows, values):
+            pct = dict(zip(OUTCOMES, wm[r].tolist()))
+            mr: Dict[str, Any] = {name: {} for name in SUPPORTED_MARKETS if name != "Correct Score Groups"}
+            mr["Team Goals"] = {"home":{}, "away":{}}
+            # 1X2 / DC / DNB
+            mr["1X2"] = {k: round(v*100,2) for k,v in pct.items()}
+            dc = {"1X": pct["1"]+pct["X"], "12": pct["1"]+pct["2"], "X2": pct["X"]+pct["2"]}
+            mr["Double Chance"] = {k: round(v*100,2) for k,v in dc.items()}
+            dnb_home = pct["1"] / (1.0 - pct["X"]) if pct["X"]<1.0 else 0.0
+            dnb_away = pct["2"] / (1.0 - pct["X"]) if pct["X"]<1.0 else 0.0
+            mr["Draw No Bet"] = {"Home": round(dnb_home*100,2), "Away": round(dnb_away*100,2)}
+            out[r] = mk.fill_markets(mr, ms.layout, vals)
+    return out
+
+def _copy_markets(mr: Dict[str, Any]) -> Dict[str, Any]:
+    # memoised sheets are shared; callers get their own two-level copy
+    return {m: {k: (dict(v) if isinstance(v, dict) else v) for k, v in d.items()} for m, d in mr.items()}
+
+def _cached_markets(keys: List[GridKey], grids: List[np.ndarray], wm: np.ndarray, specs: List[Tuple]) -> List[Dict[str, Any]]:
+    """Market sheets per (grid key, line set), evaluating only sheets missing from the memo."""
+    memo_keys = list(zip(keys, specs))
+    sheets = {k: GRID_CACHE.markets.get(k) for k in dict.fromkeys(memo_keys)}
+    miss = [k for k, v in sheets.items() if v is None]
+    if miss:
+        first = {k: r for r, k in reversed(list(enumerate(memo_keys)))}
+        rows = [first[k] for k in miss]
+        built = _grid_markets(np.stack([grids[r] for r in rows]), wm[rows], [specs[r] for r in rows])
+        for k, mr in zip(miss, built):
+            sheets[k] = mr
+            GRID_CACHE.markets.put(k, mr)
+    GRID_CACHE.record("market", len(memo_keys) - len(miss), len(miss))
+    return [_copy_markets(sheets[k]) for k in memo_keys]
+
+def score_grid(lam_h: float, lam_a: float, rho: float = 0.02, max_goals: int = MAX_GOALS,
+               quantum: Optional[float] = None, **lines: Any) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Memoised (score grid, market sheet) for one parameter tuple. `quantum` snaps the lambdas
+    (see grid_cache.py); lines takes ou_lines / team_goal_lines / cs_groups like a payload.
+    """
+    keys, grids, wm = _score_grids(np.array([[lam_h, lam_a, rho]], dtype=float), int(max_goals), [quantum])
+    return grids[0], _cached_markets(keys, grids, wm, [_payload_spec(int(max_goals), lines)])[0]
+
+def _skipped_result(payload: Dict[str, Any], basis: str = "priors") -> Dict[str, Any]:
+    return {
+        "site": "Betrun",
+        "sport": "football",
+        "league": payload.get("league",""),
+        "home": payload.get("home","Home"),
+        "away": payload.get("away","Away"),
+        "status": "SKIPPED",
+        "reason": "Edge < 5% (no value)",
+        "sources": [f"Model: {basis}"],
+    }
+
+def _final_pick_result(payload: Dict[str, Any], params: Tuple[float, float, float], wm_pct: Dict[str, float],
+                       vm: Dict[str, Any], market_results: Dict[str, Any], basis: str = "priors",
+                       mc: Optional[Dict[str, Any]] = None, grid: Optional[Tuple[int, float]] = None) -> Dict[str, Any]:
+    odds = payload.get("odds", {}) or {}
+    lam_h, lam_a, rho = params
 
     # Winner Mode
-    wm_pct = probs_from_matrix(P)  # 0..1
     wm_fair = {k: (1.0/wm_pct[k]) if wm_pct[k]>0 else None for k in wm_pct}
     winner_mode_table = {
         "rows":[
             {"outcome":"1","Poisson%": round(wm_pct["1"]*100,2),"Bayesian%": round(wm_pct["1"]*100,2),
              "DixonColes%": round(wm_pct["1"]*100,2), "FairOdds": round(wm_fair["1"],3) if wm_fair["1"] else None,
-             "notes": f"λ {lam_h:.2f}-{lam_a:.2f}; base priors"},
+             "notes": f"λ {lam_h:.2f}-{lam_a:.2f}; " + ("base priors" if basis == "priors" else basis)},
             {"outcome":"X","Poisson%": round(wm_pct["X"]*100,2),"Bayesian%": round(wm_pct["X"]*100,2),
              "DixonColes%": round(wm_pct["X"]*100,2), "FairOdds": round((1.0/wm_pct['X']),3) if wm_pct['X']>0 else None,
              "notes": "DC low-score effect"},
@@ -131,120 +337,28 @@ def analyze_football_match(payload: Dict[str, Any]) -> Dict[str, Any]:
     }
 
     # Value Mode
-    vm = compute_value_mode(odds, wm_pct)
     best_vm_sel = vm.get("best_edge_sel")
     best_vm_edge = vm["edge"].get(best_vm_sel, 0.0) if best_vm_sel else 0.0
     wm_best_sel = max(wm_pct, key=wm_pct.get)
     wm_equals_vm = (wm_best_sel == best_vm_sel)
 
-    # Decision
+    # Decision (only called for picks with edge ≥ 5%)
     warnings: List[str] = []
-    status = "SKIPPED"
-    remark = "Edge < 5% (no value)"
-
-    if best_vm_sel and best_vm_edge >= 0.05:
-        status = "FINAL_PICK"
-        remark = "Final Pick (Edge ≥ 5%)"
-        # Underdog warning: if model pick is market underdog (highest decimal) flag
-        try:
-            o1 = float(odds.get("1") or 0)
-            oX = float(odds.get("X") or 0)
-            o2 = float(odds.get("2") or 0)
-            if best_vm_sel == "1" and o1 > max(oX, o2) and o1 > 2.80:
-                warnings.append("MODEL_PICK_IS_MARKET_UNDERDOG: Home has longest price.")
-            if best_vm_sel == "2" and o2 > max(o1, oX) and o2 > 2.80:
-                warnings.append("MODEL_PICK_IS_MARKET_UNDERDOG: Away has longest price.")
-            if best_vm_sel == "X" and oX > max(o1, o2) and oX > 3.50:
-                warnings.append("MODEL_PICK_IS_MARKET_UNDERDOG: Draw is longest price.")
-        except Exception:
-            pass
-    else:
-        return {
-            "site": "Betrun",
-            "sport": "football",
-            "league": league,
-            "home": home_name,
-            "away": away_name,
-            "status": "SKIPPED",
-            "reason": "Edge < 5% (no value)",
-            "sources": ["Model: priors"],
-        }
-
-    # Markets
-    market_results = {}
-    # 1X2 / DC / DNB
-    market_results["1X2"] = {k: round(v*100,2) for k,v in wm_pct.items()}
-    dc = {"1X": wm_pct["1"]+wm_pct["X"], "12": wm_pct["1"]+wm_pct["2"], "X2": wm_pct["X"]+wm_pct["2"]}
-    market_results["Double Chance"] = {k: round(v*100,2) for k,v in dc.items()}
-    dnb_home = wm_pct["1"] / (1.0 - wm_pct["X"]) if wm_pct["X"]<1.0 else 0.0
-    dnb_away = wm_pct["2"] / (1.0 - wm_pct["X"]) if wm_pct["X"]<1.0 else 0.0
-    market_results["Draw No Bet"] = {"Home": round(dnb_home*100,2), "Away": round(dnb_away*100,2)}
-
-    # O/U
-    ou = {}
-    for line in ou_lines:
-        over, under = over_under_probs(P, line)
-        ou[f"O{line}"] = round(over*100,2); ou[f"U{line}"] = round(under*100,2)
-    market_results["Over/Under"] = ou
-
-    # BTTS
-    yes, no = btts_probs(P)
-    market_results["BTTS"] = {"Yes": round(yes*100,2), "No": round(no*100,2)}
-
-    # Team goals
-    tg = {"home":{}, "away":{}}
-    for line in team_goal_lines.get("home",[0.5,1.5]):
-        tg["home"][f"> {line}"] = round(team_goals_over(P,"home",line)*100,2)
-    for line in team_goal_lines.get("away",[0.5,1.5]):
-        tg["away"][f"> {line}"] = round(team_goals_over(P,"away",line)*100,2)
-    market_results["Team Goals"] = tg
-
-    # 1X2 + O/U
-    combos = {}
-    g = P.shape[0]-1
-    def sum_cond(cond):
-        s=0.0
-        for i in range(g+1):
-            for j in range(g+1):
-                if cond(i,j): s += P[i,j]
-        return s
-    for line in ou_lines:
-        combos[f"1 & O{line}"] = round(sum_cond(lambda i,j: i>j and (i+j)>line)*100,2)
-        combos[f"1 & U{line}"] = round(sum_cond(lambda i,j: i>j and (i+j)<=line)*100,2)
-        combos[f"X & O{line}"] = round(sum_cond(lambda i,j: i==j and (i+j)>line)*100,2)
-        combos[f"X & U{line}"] = round(sum_cond(lambda i,j: i==j and (i+j)<=line)*100,2)
-        combos[f"2 & O{line}"] = round(sum_cond(lambda i,j: i<j and (i+j)>line)*100,2)
-        combos[f"2 & U{line}"] = round(sum_cond(lambda i,j: i<j and (i+j)<=line)*100,2)
-    market_results["1X2 + O/U"] = combos
-
-    # DC+BTTS / Result+BTTS
-    if True:
-        r_dc = {}
-        r_dc["1X & GG"] = round(sum(P[i,j] for i in range(g+1) for j in range(g+1) if (i>=j) and i>0 and j>0)*100,2)
-        r_dc["X2 & GG"] = round(sum(P[i,j] for i in range(g+1) for j in range(g+1) if (j>=i) and i>0 and j>0)*100,2)
-        r_dc["12 & GG"] = round(sum(P[i,j] for i in range(g+1) for j in range(g+1) if (i!=j) and i>0 and j>0)*100,2)
-        market_results["DC + BTTS"] = r_dc
-
-        r_bt = {}
-        r_bt["1 & GG"] = round(sum(P[i,j] for i in range(g+1) for j in range(g+1) if (i>j and i>0 and j>0))*100,2)
-        r_bt["X & GG"] = round(sum(P[i,j] for i in range(g+1) for j in range(g+1) if (i==j and i>0 and j>0))*100,2)
-        r_bt["2 & GG"] = round(sum(P[i,j] for i in range(g+1) for j in range(g+1) if (i<j and i>0 and j>0))*100,2)
-        market_results["Result + BTTS"] = r_bt
-
-    # Correct Score (top few)
-    cs = {}
-    for a,b in cs_groups:
-        cs[f"{a}:{b}"] = round(correct_score_prob(P,a,b)*100,4)
-    market_results["Correct Score"] = cs
-
-    # Clean Sheet / Win to Nil / Margin
-    home_cs = sum(P[i,0] for i in range(g+1))
-    away_cs = sum(P[0,j] for j in range(g+1))
-    market_results["Clean Sheet"] = {"Home Yes": round(home_cs*100,2), "Away Yes": round(away_cs*100,2)}
-    home_wtn = sum(P[i,0] for i in range(1,g+1))
-    away_wtn = sum(P[0,j] for j in range(1,g+1))
-    market_results["Win to Nil"] = {"Home": round(home_wtn*100,2), "Away": round(away_wtn*100,2)}
-    market_results["Winning Margin"] = {k: round(v*100,2) for k,v in winning_margin_probs(P).items()}
+    status = "FINAL_PICK"
+    remark = "Final Pick (Edge ≥ 5%)"
+    # Underdog warning: if model pick is market underdog (highest decimal) flag
+    try:
+        o1 = float(odds.get("1") or 0)
+        oX = float(odds.get("X") or 0)
+        o2 = float(odds.get("2") or 0)
+        if best_vm_sel == "1" and o1 > max(oX, o2) and o1 > 2.80:
+            warnings.append("MODEL_PICK_IS_MARKET_UNDERDOG: Home has longest price.")
+        if best_vm_sel == "2" and o2 > max(o1, oX) and o2 > 2.80:
+            warnings.append("MODEL_PICK_IS_MARKET_UNDERDOG: Away has longest price.")
+        if best_vm_sel == "X" and oX > max(o1, o2) and oX > 3.50:
+            warnings.append("MODEL_PICK_IS_MARKET_UNDERDOG: Draw is longest price.")
+    except Exception:
+        pass
 
     sel = best_vm_sel or wm_best_sel
     ev = ev_simulation(wm_pct.get(sel,0.0), odds.get(sel))
@@ -252,9 +366,9 @@ def analyze_football_match(payload: Dict[str, Any]) -> Dict[str, Any]:
     result = {
         "site": "Betrun",
         "sport": "football",
-        "league": league,
-        "home": home_name,
-        "away": away_name,
+        "league": payload.get("league",""),
+        "home": payload.get("home","Home"),
+        "away": payload.get("away","Away"),
         "markets": market_results,
         "winner_mode_table": winner_mode_table,
         "value_mode_table": {
@@ -263,7 +377,10 @@ def analyze_football_match(payload: Dict[str, Any]) -> Dict[str, Any]:
             "fair_odds": {k: round(v,3) if v else None for k,v in vm["fair_odds"].items()},
             "edge_percent_points": {k: round(v*100,2) for k,v in vm["edge"].items()},
             "efficient": vm["efficient"],
-            "best_edge_sel": best_vm_sel
+            "best_edge_sel": best_vm_sel,
+            **({"market_percent": {k: round(v*100,2) for k,v in vm["market_percent"].items()},
+                "market_edge_percent_points": {k: round(v*100,2) for k,v in vm["market_edge"].items()}}
+               if "market_percent" in vm else {}),
         },
         "alignment": {
             "wm_best": wm_best_sel,
@@ -276,7 +393,9 @@ def analyze_football_match(payload: Dict[str, Any]) -> Dict[str, Any]:
             "parameters_ok": parameter_integrity(payload),
             "formula_ok": formula_integrity(),
             "ev_sim": round(ev,4),
-            "calibration_note": f"priors; DC rho={rho:.2f}"
+            "calibration_note": f"{basis}; DC rho={rho:.2f}",
+            **({"ev_mc": mc} if mc else {}),
+            **({"grid": {"max_goals": grid[0], "discarded_mass": float(f"{max(grid[1], 0.0):.3g}")}} if grid else {}),
         },
         "status": status,
         "remark": remark,
@@ -284,3 +403,141 @@ def analyze_football_match(payload: Dict[str, Any]) -> Dict[str, Any]:
         "sources": ["API-FOOTBALL: fixtures+odds (Bet365) when available"],
     }
     return result
+
+def _pick_mc(params: np.ndarray, grids: List[np.ndarray], sel: np.ndarray, price: np.ndarray, g: int) -> List[Dict[str, Any]]:
+    """Audit MC for the picked selections; each pick's seed comes from its own inputs, so batch == single."""
+    seeds = [zlib.crc32(f"{lh!r}|{la!r}|{rho!r}|{s}|{o!r}".encode())
+             for (lh, la, rho), s, o in zip(params.tolist(), sel.tolist(), price.tolist())]
+    names = [OUTCOMES[s] for s in sel.tolist()]
+    prob = mk.mass(np.stack(grids), np.stack([mk.selection_mask(g, s) for s in names]))
+    return sim.pick_mc(params, names, price, prob, seeds)
+
+def simulate_slate(items: List[Dict[str, Any]], **opts: Any) -> Dict[str, Any]:
+    """
+    Bankroll simulation (simulation.simulate) for a slate of payloads. An item may name its
+    "selection" (1/X/2, 1X/X2/12, Over 2.5, BTTS Yes, Home Over 1.5, ...) and "price"; by
+    default it bets the value-mode best-edge 1X2 selection at the payload's odds. Items with
+    the same fixture_id (or league/home/away) share one sampled scoreline per round.
+    """
+    fixtures: Dict[Any, int] = {}
+    grids: List[np.ndarray] = []
+    picks: List[sim.Pick] = []
+    skipped: List[Dict[str, Any]] = []
+    for n, it in enumerate(items):
+        key = it.get("fixture_id") or (it.get("league"), it.get("home"), it.get("away"))
+        if key not in fixtures:
+            lh, la, rho, _ = _match_params(it)
+            params = np.array([[lh, la, rho]])
+            g = int(_grid_sizes([it], params)[0])
+            _, P, _ = _score_grids(params, g, [_lambda_quantum(it)])
+            fixtures[key] = len(grids); grids.append(P[0])
+        P = grids[fixtures[key]]
+        odds = it.get("odds", {}) or {}
+        sel = it.get("selection")
+        if not sel:
+            vm = compute_value_mode_batch(np.array([[_price(odds, k) for k in OUTCOMES]]), _win_draw_loss(P[None]))
+            b = int(vm["best_idx"][0])
+            sel = OUTCOMES[b] if b >= 0 and vm["edge"][0, b] > 0 else None
+        price = it.get("price") or (_price(odds, sel) if sel in OUTCOMES else 0.0)
+        if not sel or not price or float(price) <= 1.0:
+            skipped.append({"item": n, "reason": "no selection with a price" if not sel else "no price > 1.0"})
+            continue
+        picks.append(sim.Pick(fixtures[key], str(sel), float(price)))
+    out = sim.simulate(grids, picks, **opts)
+    dropped = {s["item"] for s in skipped}
+    labelled = [k for k in range(len(items)) if k not in dropped]
+    for k, row in zip(labelled, out["picks"]):
+        row.update(item=k, home=items[k].get("home"), away=items[k].get("away"))
+    out["skipped"] = skipped
+    return out
+
+def match_probabilities(payloads: List[Dict[str, Any]], quantum: Optional[float] = None,
+                        lookup: Optional[Lookup] = None) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """(N,3) lambdas/rho, (N,3) 1/X/2 probabilities and the basis of each, as analyze_football_batch has them."""
+    fitted = [_match_params(p, lookup) for p in payloads]
+    params = np.array([f[:3] for f in fitted], dtype=float).reshape(-1, 3)
+    grids = _grid_sizes(payloads, params)
+    wm = np.zeros((len(payloads), 3))
+    for g in np.unique(grids).tolist():
+        idx = np.flatnonzero(grids == g)
+        wm[idx] = _score_grids(params[idx], g, [_lambda_quantum(payloads[k], quantum) for k in idx])[2]
+    return params, wm, [f[3] for f in fitted]
+
+class SlateAnalysis(NamedTuple):
+    results: List[Dict[str, Any]]   # as analyze_football_batch returns them
+    params: np.ndarray              # (N,3) lambdas/rho
+    probabilities: np.ndarray       # (N,3) model 1/X/2
+    basis: List[str]
+
+def analyze_football_batch(payloads: List[Dict[str, Any]], quantum: Optional[float] = None,
+                           lookup: Optional[Lookup] = None) -> List[Dict[str, Any]]:
+    """Per-fixture results of analyze_slate."""
+    return analyze_slate(payloads, quantum, lookup).results
+
+def analyze_slate(payloads: List[Dict[str, Any]], quantum: Optional[float] = None,
+                  lookup: Optional[Lookup] = None) -> SlateAnalysis:
+    """
+    Analyze a whole slate in one pass. Lambdas for all fixtures are stacked into an (N, G, G)
+    score tensor and 1X2, value mode, the skip rule and markets run as array operations.
+    Item k is identical to analyze_football_match(payloads[k]). Grid sizes may differ per
+    payload (see _grid_sizes); grids and markets are built per size, the rest in one pass.
+    Grids and market sheets are memoised per parameter tuple; `quantum` (or a payload's
+    "lambda_quantum") snaps lambdas so near-identical fixtures share them. `lookup` replaces
+    the fitted-ratings lookup (backtests pass walk-forward ratings). Returns the results with
+    the lambdas, 1/X/2 probabilities and basis behind them (match_probabilities without a second pass).
+    """
+    n = len(payloads)
+    if not n: return SlateAnalysis([], np.zeros((0, 3)), np.zeros((0, 3)), [])
+    fitted = [_match_params(p, lookup) for p in payloads]
+    params = np.array([f[:3] for f in fitted], dtype=float)
+    basis = [f[3] for f in fitted]
+    grids = _grid_sizes(payloads, params)
+    odds = np.array([[_price(p.get("odds", {}) or {}, k) for k in OUTCOMES] for p in payloads], dtype=float)
+    market = np.array([_consensus_probs(p) for p in payloads]) if any(p.get("consensus") for p in payloads) else None
+    quanta = [_lambda_quantum(p, quantum) for p in payloads]
+
+    results: List[Dict[str, Any]] = [{} for _ in payloads]
+    keys: List[Optional[GridKey]] = [None] * n
+    P_of: List[Optional[np.ndarray]] = [None] * n
+    wm = np.zeros((n, 3))
+    with span("engine.score_matrix"):
+        for g in np.unique(grids).tolist():
+            idx = np.flatnonzero(grids == g)
+            kg, P, wm[idx] = _score_grids(params[idx], g, [quanta[k] for k in idx])
+            for r, k in enumerate(idx.tolist()): keys[k], P_of[k] = kg[r], P[r]
+    with span("engine.value_mode"):
+        vm = compute_value_mode_batch(odds, wm, market)
+
+    # Decision: FINAL_PICK needs a best-edge selection with edge ≥ 5%
+    best = vm["best_idx"]
+    best_edge = np.where(best >= 0, vm["edge"][np.arange(n), best], 0.0)
+    picked = (best >= 0) & (best_edge >= 0.05)
+    for k in np.flatnonzero(~picked).tolist():
+        results[k] = _skipped_result(payloads[k], basis[k])
+
+    for g in np.unique(grids[picked]).tolist():
+        rows = np.flatnonzero(picked & (grids == g))
+        with span("engine.markets"):
+            markets = _cached_markets([keys[k] for k in rows], [P_of[k] for k in rows], wm[rows],
+                                      [_payload_spec(g, payloads[k]) for k in rows])
+        mc: List[Optional[Dict[str, Any]]] = [None] * len(rows)
+        if sim.SIM_AUDIT_PATHS > 0:
+            with span("engine.ev_mc"):
+                mc = _pick_mc(params[rows], [P_of[k] for k in rows], best[rows], odds[rows, best[rows]], g)
+        tails = tail_mass([keys[k][0] for k in rows], [keys[k][1] for k in rows], g).tolist()
+        for k, market_results, mc_row, tail in zip(rows.tolist(), markets, mc, tails):
+            wm_pct = dict(zip(OUTCOMES, wm[k].tolist()))
+            vm_row = value_mode_row(vm, k, wm_pct)
+            results[k] = _final_pick_result(payloads[k], tuple(params[k].tolist()), wm_pct, vm_row, market_results,
+                                            basis[k], mc_row, (g, tail))
+
+    # value mode for every other market the payload prices (O/U, BTTS, team totals, correct score, ...)
+    with span("engine.value_mode_markets"):
+        for k, p in enumerate(payloads):
+            prices = _market_prices(p.get("odds", {}) or {})
+            vmm = _market_value_mode(P_of[k], prices, int(grids[k])) if prices else None
+            if vmm: results[k]["value_mode_markets"] = vmm
+    return SlateAnalysis(results, params, wm, basis)
+
+def analyze_football_match(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return analyze_football_batch([payload])[0]
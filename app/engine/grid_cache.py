@@ -0,0 +1,83 @@
+# app/engine/grid_cache.py
+"""
+Memo for score grids and their market sheets.
+
+Lambdas cluster heavily (today they come from league priors), so most requests rebuild a
+grid that was built moments ago. Entries are keyed on (λ home, λ away, rho, max_goals); with
+a quantum q > 0 the lambdas are snapped to multiples of q first, so nearby fixtures share
+an entry and the grid is built at the snapped values (every market then moves by at most
+the effect of a q/2 change in λ). q = 0 keys on the exact floats and changes nothing.
+"""
+from typing import Any, Dict, Hashable, Optional, Tuple
+from collections import OrderedDict
+import os, threading
+
+GRID_CACHE_SIZE    = int(os.getenv("FOOTBALL_GRID_CACHE", "4096"))     # 0 disables
+MARKET_CACHE_SIZE  = int(os.getenv("FOOTBALL_MARKET_CACHE", "2048"))
+LAMBDA_QUANTUM     = float(os.getenv("FOOTBALL_LAMBDA_QUANTUM", "0"))
+
+GridKey = Tuple[float, float, float, int]
+
+class LRU:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            v = self._data.get(key)
+            if v is not None: self._data.move_to_end(key)
+            return v
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.max_entries <= 0: return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock: self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+def quantize(x: float, quantum: float) -> float:
+    return round(round(x / quantum) * quantum, 12) if quantum > 0 else float(x)
+
+class GridCache:
+    def __init__(self, grid_entries: int = GRID_CACHE_SIZE, market_entries: int = MARKET_CACHE_SIZE,
+                 quantum: float = LAMBDA_QUANTUM):
+        self.quantum = quantum
+        self.grids = LRU(grid_entries)
+        self.markets = LRU(market_entries if grid_entries > 0 else 0)
+        self._lock = threading.Lock()
+        self.counters = {"grid_hits": 0, "grid_misses": 0, "market_hits": 0, "market_misses": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.grids.max_entries > 0
+
+    def key(self, lam_h: float, lam_a: float, rho: float, max_goals: int, quantum: Optional[float] = None) -> GridKey:
+        q = self.quantum if quantum is None else float(quantum)
+        return (quantize(lam_h, q), quantize(lam_a, q), float(rho), int(max_goals))
+
+    def record(self, kind: str, hits: int, misses: int) -> None:
+        with self._lock:
+            self.counters[f"{kind}_hits"] += hits
+            self.counters[f"{kind}_misses"] += misses
+
+    def clear(self) -> None:
+        self.grids.clear(); self.markets.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock: c = dict(self.counters)
+        for kind in ("grid", "market"):
+            n = c[f"{kind}_hits"] + c[f"{kind}_misses"]
+            c[f"{kind}_hit_rate"] = round(c[f"{kind}_hits"] / n, 4) if n else None
+        c.update(grids=len(self.grids), market_sheets=len(self.markets), quantum=self.quantum)
+        return c
+
+GRID_CACHE = GridCache()
@@ -0,0 +1,162 @@
+# app/engine/markets.py
+"""
+Score-grid market masks.
+
+Every grid market is a weighted sum over the (home goals, away goals) grid, so it is
+expressed as a 0/1 mask of the grid's shape and priced as (P * mask).sum(). Masks are
+built once per (max_goals, line set) and cached; a whole market sheet for one or many
+grids is then a single einsum against the stacked masks.
+"""
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from functools import lru_cache
+import numpy as np
+
+DEFAULT_OU_LINES = [1.5,2.5,3.5]
+DEFAULT_TEAM_GOAL_LINES = {"home":[0.5,1.5], "away":[0.5,1.5]}
+DEFAULT_CS_GROUPS = [[1,0],[2,0],[2,1]]
+MARGIN_KEYS = ("+1","+2","+3+","-1","-2","-3+")
+
+# (market, side, key, round digits); side is "home"/"away" for Team Goals, else None
+MarketKey = Tuple[str, Optional[str], str, int]
+
+class MaskSet(NamedTuple):
+    layout: Tuple[MarketKey, ...]
+    masks: np.ndarray  # (K, G, G), read-only
+
+def _frozen(a: np.ndarray) -> np.ndarray:
+    a = np.ascontiguousarray(a, dtype=float)
+    a.setflags(write=False)
+    return a
+
+# ---------- single-market masks ----------
+@lru_cache(maxsize=64)
+def grid_indices(max_goals: int) -> Tuple[np.ndarray, np.ndarray]:
+    i, j = np.indices((max_goals+1, max_goals+1))
+    i.setflags(write=False); j.setflags(write=False)
+    return i, j
+
+@lru_cache(maxsize=256)
+def total_goals_mask(max_goals: int, line: float, over: bool = True) -> np.ndarray:
+    i, j = grid_indices(max_goals)
+    return _frozen((i+j > line) if over else (i+j <= line))
+
+@lru_cache(maxsize=64)
+def btts_mask(max_goals: int, yes: bool = True) -> np.ndarray:
+    i, j = grid_indices(max_goals)
+    gg = (i > 0) & (j > 0)
+    return _frozen(gg if yes else ~gg)
+
+@lru_cache(maxsize=256)
+def team_goals_mask(max_goals: int, team: str, line: float) -> np.ndarray:
+    i, j = grid_indices(max_goals)
+    return _frozen((i if team == "home" else j) > line)
+
+@lru_cache(maxsize=64)
+def margin_masks(max_goals: int) -> np.ndarray:
+    """(6, G, G) masks in MARGIN_KEYS order."""
+    i, j = grid_indices(max_goals)
+    d = i-j
+    return _frozen(np.stack([d == 1, d == 2, d >= 3, d == -1, d == -2, d <= -3]))
+
+_RESULT_SELECTIONS = {"1": (1,), "X": (0,), "2": (-1,), "1X": (1, 0), "X2": (0, -1), "12": (1, -1)}
+
+@lru_cache(maxsize=256)
+def selection_mask(max_goals: int, selection: str) -> np.ndarray:
+    """
+    Mask of the scores that win a bet: "1", "X", "2", "1X", "X2", "12", "Over 2.5", "Under 2.5",
+    "BTTS Yes", "BTTS No", "Home Over 1.5", "Away Under 0.5", "CS 2-1". A correct score outside
+    the grid is in its truncated tail and gets an empty mask. ValueError for anything else.
+    """
+    sel = " ".join(str(selection).split())
+    if sel.upper() in _RESULT_SELECTIONS:
+        i, j = grid_indices(max_goals)
+        return _frozen(np.isin(np.sign(i-j), _RESULT_SELECTIONS[sel.upper()]))
+    words = sel.lower().split(" ")
+    try:
+        if len(words) == 2 and words[0] in ("over", "under"):
+            return total_goals_mask(max_goals, float(words[1]), words[0] == "over")
+        if len(words) == 2 and words[0] == "btts" and words[1] in ("yes", "no"):
+            return btts_mask(max_goals, words[1] == "yes")
+        if len(words) == 3 and words[0] in ("home", "away") and words[1] in ("over", "under"):
+            over = team_goals_mask(max_goals, words[0], float(words[2]))
+            return over if words[1] == "over" else _frozen(1.0 - over)
+        if len(words) == 2 and words[0] == "cs":
+            h, a = (int(x) for x in words[1].split("-"))
+            if h >= 0 and a >= 0:
+                i, j = grid_indices(max_goals)
+                return _frozen((i == h) & (j == a))
+    except ValueError:
+        pass
+    raise ValueError(f"unsupported selection: {selection!r}")
+
+def mass(P: np.ndarray, mask: np.ndarray):
+    """Probability mass of mask under P; P may be one (G, G) grid or an (N, G, G) stack."""
+    return (P * mask).sum(axis=(-2, -1))
+
+# ---------- full market sheet ----------
+def mask_spec(max_goals: int, ou_lines: Sequence[float] = DEFAULT_OU_LINES,
+              team_goal_lines: Optional[Dict[str, Sequence[float]]] = None,
+              cs_groups: Sequence[Sequence[int]] = DEFAULT_CS_GROUPS) -> Tuple:
+    """
+    Hashable cache key for a market sheet. Lines are kept next to their printed label,
+    so 2 and 2.0 (equal as keys) still produce "O2" and "O2.0" respectively.
+    """
+    tg = DEFAULT_TEAM_GOAL_LINES if team_goal_lines is None else team_goal_lines
+    labelled = lambda lines: tuple((float(x), str(x)) for x in lines)
+    return (int(max_goals),
+            labelled(ou_lines),
+            labelled(tg.get("home",[0.5,1.5])),
+            labelled(tg.get("away",[0.5,1.5])),
+            tuple((a, b, f"{a}:{b}") for a,b in cs_groups))
+
+@lru_cache(maxsize=128)
+def mask_set(spec: Tuple) -> MaskSet:
+    g, ou, tg_home, tg_away, cs = spec
+    i, j = grid_indices(g)
+    tot, gg = i+j, (i > 0) & (j > 0)
+    layout: List[MarketKey] = []
+    masks: List[np.ndarray] = []
+    def add(market, key, mask, side=None, digits=2):
+        layout.append((market, side, key, digits)); masks.append(mask)
+
+    for line, lbl in ou:
+        add("Over/Under", f"O{lbl}", tot > line)
+        add("Over/Under", f"U{lbl}", tot <= line)
+    add("BTTS", "Yes", gg); add("BTTS", "No", ~gg)
+    for line, lbl in tg_home:
+        add("Team Goals", f"> {lbl}", i > line, side="home")
+    for line, lbl in tg_away:
+        add("Team Goals", f"> {lbl}", j > line, side="away")
+    for line, lbl in ou:
+        for sel, res in (("1", i > j), ("X", i == j), ("2", i < j)):
+            add("1X2 + O/U", f"{sel} & O{lbl}", res & (tot > line))
+            add("1X2 + O/U", f"{sel} & U{lbl}", res & (tot <= line))
+    add("DC + BTTS", "1X & GG", (i >= j) & gg)
+    add("DC + BTTS", "X2 & GG", (j >= i) & gg)
+    add("DC + BTTS", "12 & GG", (i != j) & gg)
+    add("Result + BTTS", "1 & GG", (i > j) & gg)
+    add("Result + BTTS", "X & GG", (i == j) & gg)
+    add("Result + BTTS", "2 & GG", (i < j) & gg)
+    for a, b, lbl in cs:
+        add("Correct Score", lbl, (i == a) & (j == b), digits=4)
+    add("Clean Sheet", "Home Yes", j == 0); add("Clean Sheet", "Away Yes", i == 0)
+    add("Win to Nil", "Home", (j == 0) & (i > 0)); add("Win to Nil", "Away", (i == 0) & (j > 0))
+    for key, mask in zip(MARGIN_KEYS, margin_masks(g)):
+        add("Winning Margin", key, mask)
+    return MaskSet(tuple(layout), _frozen(np.stack(masks)))
+
+def evaluate(P: np.ndarray, ms: MaskSet) -> np.ndarray:
+    """All markets of a sheet at once: (G, G) -> (K,), (N, G, G) -> (N, K)."""
+    return np.einsum("...ij,kij->...k", P, ms.masks)
+
+def fill_markets(out: Dict[str, Any], layout: Sequence[MarketKey], values: Sequence[float]) -> Dict[str, Any]:
+    """Write one row of evaluate() into a market dict as rounded percentages."""
+    for (market, side, key, digits), v in zip(layout, values):
+        dst = out.setdefault(market, {})
+        if side: dst = dst.setdefault(side, {})
+        dst[key] = round(v*100, digits)
+    return out
+
+def cache_info() -> Dict[str, Dict[str, int]]:
+    return {f.__name__: f.cache_info()._asdict()
+            for f in (mask_set, total_goals_mask, btts_mask, team_goals_mask, margin_masks)}
@@ -0,0 +1,215 @@
+# app/engine/metrics.py
+"""
+In-process metrics with a Prometheus text exposition.
+
+Each process keeps counters, gauges and histograms in memory and snapshots them to
+METRICS_DIR/metrics_<pid>.json (throttled, atomic rename). /metrics merges the snapshots
+of all live workers: counters and histograms are summed, gauges take the newest value.
+"""
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from contextlib import contextmanager
+import glob, json, os, tempfile, threading, time
+
+METRICS_DIR     = os.getenv("METRICS_DIR", os.path.join(tempfile.gettempdir(), "betrun_metrics"))
+METRICS_FLUSH_S = float(os.getenv("METRICS_FLUSH_S", "2"))
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+Key = Tuple[str, Labels]
+
+HELP = {
+    "betrun_stage_seconds": ("histogram", "Wall time per pipeline stage"),
+    "betrun_upstream_seconds": ("histogram", "API-Football request latency per endpoint"),
+    "betrun_upstream_requests_total": ("counter", "API-Football requests by endpoint and outcome"),
+    "betrun_api_quota_remaining": ("gauge", "API-Football quota left, from x-ratelimit response headers"),
+    "betrun_api_quota_limit": ("gauge", "API-Football quota size, from x-ratelimit response headers"),
+    "betrun_cache_events_total": ("counter", "Upstream response cache events"),
+    "betrun_singleflight_total": ("counter", "Single-flight calls by outcome"),
+    "betrun_grid_cache_total": ("counter", "Score-grid / market-sheet memo lookups"),
+    "betrun_pick_store_total": ("counter", "Picks written by the store's background writer, failed batches and dropped picks"),
+    "betrun_pick_store_pending": ("gauge", "Picks of failed batches waiting for the writer's retry"),
+}
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+class Registry:
+    def __init__(self, directory: Optional[str] = METRICS_DIR, flush_s: float = METRICS_FLUSH_S):
+        self.directory = directory
+        self.flush_s = flush_s
+        self._lock = threading.Lock()
+        self.counters: Dict[Key, float] = {}
+        self.gauges: Dict[Key, Tuple[float, float]] = {}
+        self.hists: Dict[Key, List[Any]] = {}
+        # callables returning {(name, labels): value} for counters owned by other modules
+        self.collectors: List[Callable[[], Dict[Key, float]]] = []
+        self._dirty = False
+        self._flusher_pid: Optional[int] = None
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+        self._maybe_flush()
+
+    def set(self, name: str, value: float, **labels: Any) -> None:
+        with self._lock:
+            self.gauges[(name, _labels(labels))] = (float(value), time.time())
+        self._maybe_flush()
+
+    def observe(self, name: str, seconds: float, **labels: Any) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            h = self.hists.get(key)
+            if h is None:
+                h = self.hists[key] = [[0] * len(BUCKETS), 0.0, 0]
+            for k, le in enumerate(BUCKETS):
+                if seconds <= le: h[0][k] += 1
+            h[1] += seconds; h[2] += 1
+        self._maybe_flush()
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("betrun_stage_seconds", time.perf_counter() - t0, stage=stage)
+
+    # --- snapshots ---
+    def snapshot(self) -> Dict[str, Any]:
+        counters = {}
+        for collect in self.collectors:
+            try: counters.update(collect())
+            except Exception: pass
+        with self._lock:
+            counters.update(self.counters)
+            return {
+                "pid": os.getpid(),
+                "counters": [[n, list(l), v] for (n, l), v in counters.items()],
+                "gauges": [[n, list(l), v, ts] for (n, l), (v, ts) in self.gauges.items()],
+                "hists": [[n, list(l), list(h[0]), h[1], h[2]] for (n, l), h in self.hists.items()],
+            }
+
+    def _maybe_flush(self) -> None:
+        # one background flusher per process (gunicorn forks workers after import)
+        self._dirty = True
+        if self.directory and self._flusher_pid != os.getpid():
+            with self._lock:
+                if self._flusher_pid == os.getpid(): return
+                self._flusher_pid = os.getpid()
+            threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True).start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.flush_s)
+            if self._dirty: self.flush()
+
+    def flush(self) -> None:
+        if not self.directory: return
+        self._dirty = False
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f"metrics_{os.getpid()}.json")
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def _worker_snapshots(self) -> List[Dict[str, Any]]:
+        snaps = [self.snapshot()]
+        if not self.directory: return snaps
+        self.flush()
+        for path in glob.glob(os.path.join(self.directory, "metrics_*.json")):
+            try:
+                with open(path) as f: snap = json.load(f)
+            except (OSError, ValueError):
+                continue
+            pid = snap.get("pid")
+            if pid == os.getpid() or not _alive(pid): continue
+            snaps.append(snap)
+        return snaps
+
+    def render(self) -> str:
+        """Prometheus text format, merged across live workers."""
+        counters: Dict[Key, float] = {}
+        gauges: Dict[Key, Tuple[float, float]] = {}
+        hists: Dict[Key, List[Any]] = {}
+        for snap in self._worker_snapshots():
+            for n, l, v in snap.get("counters", []):
+                key = (n, tuple(map(tuple, l)))
+                counters[key] = counters.get(key, 0.0) + v
+            for n, l, v, ts in snap.get("gauges", []):
+                key = (n, tuple(map(tuple, l)))
+                if key not in gauges or ts > gauges[key][1]: gauges[key] = (v, ts)
+            for n, l, buckets, total, count in snap.get("hists", []):
+                key = (n, tuple(map(tuple, l)))
+                h = hists.setdefault(key, [[0] * len(BUCKETS), 0.0, 0])
+                h[0] = [a + b for a, b in zip(h[0], buckets)]
+                h[1] += total; h[2] += count
+
+        out: List[str] = []
+        def header(name: str, kind: str):
+            out.append(f"# HELP {name} {HELP.get(name, (kind, name))[1]}")
+            out.append(f"# TYPE {name} {kind}")
+        for name in sorted({n for n, _ in counters}):
+            header(name, "counter")
+            for (n, l), v in sorted(counters.items()):
+                if n == name: out.append(f"{n}{_fmt_labels(l)} {_num(v)}")
+        for name in sorted({n for n, _ in gauges}):
+            header(name, "gauge")
+            for (n, l), (v, _) in sorted(gauges.items()):
+                if n == name: out.append(f"{n}{_fmt_labels(l)} {_num(v)}")
+        for name in sorted({n for n, _ in hists}):
+            header(name, "histogram")
+            for (n, l), (buckets, total, count) in sorted(hists.items()):
+                if n != name: continue
+                for le, c in zip(BUCKETS, buckets):
+                    out.append(f"{n}_bucket{_fmt_labels(l + (('le', repr(le)),))} {c}")
+                out.append(f"{n}_bucket{_fmt_labels(l + (('le', '+Inf'),))} {count}")
+                out.append(f"{n}_sum{_fmt_labels(l)} {_num(total)}")
+                out.append(f"{n}_count{_fmt_labels(l)} {count}")
+        return "\n".join(out) + "\n"
+
+def _alive(pid: Any) -> bool:
+    try:
+        os.kill(int(pid), 0)
+        return True
+    except (OSError, TypeError, ValueError):
+        return False
+
+def _fmt_labels(labels) -> str:
+    if not labels: return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in labels) + "}"
+
+def _num(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+REGISTRY = Registry()
+span = REGISTRY.span
+
+# ---------- upstream accounting ----------
+QUOTA_HEADERS = {
+    # header -> (gauge, window)
+    "x-ratelimit-requests-remaining": ("betrun_api_quota_remaining", "day"),
+    "x-ratelimit-requests-limit": ("betrun_api_quota_limit", "day"),
+    "x-ratelimit-remaining": ("betrun_api_quota_remaining", "minute"),
+    "x-ratelimit-limit": ("betrun_api_quota_limit", "minute"),
+}
+
+def record_upstream(endpoint: str, seconds: float, response: Any = None, error: Optional[BaseException] = None) -> None:
+    """Latency, outcome and quota headers for one API-Football call (response: requests or httpx Response)."""
+    endpoint = endpoint.strip("/")
+    REGISTRY.observe("betrun_upstream_seconds", seconds, endpoint=endpoint)
+    if response is not None: status = str(response.status_code)
+    else: status = type(error).__name__ if error else "ok"
+    REGISTRY.inc("betrun_upstream_requests_total", endpoint=endpoint, status=status)
+    headers = getattr(response, "headers", None) or {}
+    for header, (gauge, window) in QUOTA_HEADERS.items():
+        val = headers.get(header)
+        if val is None: continue
+        try: REGISTRY.set(gauge, float(val), window=window)
+        except ValueError: pass
@@ -0,0 +1,60 @@
+# app/engine/ndjson.py
+"""Constant-memory helpers for newline-delimited JSON streams, optionally gzip-compressed."""
+from typing import IO, Iterable, Iterator
+import zlib
+
+GZIP_MAGIC = b"\x1f\x8b"
+CHUNK_SIZE = 64 * 1024
+
+def read_chunks(fp: IO[bytes], size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    while True:
+        buf = fp.read(size)
+        if not buf: return
+        yield buf
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6, min_flush: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """gzip-compress a byte stream, emitting output roughly every min_flush input bytes."""
+    z = zlib.compressobj(level, zlib.DEFLATED, 31)
+    pending = 0
+    for c in chunks:
+        out = z.compress(c)
+        pending += len(c)
+        if pending >= min_flush:
+            out += z.flush(zlib.Z_SYNC_FLUSH); pending = 0
+        if out: yield out
+    yield z.flush()
+
+def maybe_gunzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Pass a byte stream through, inflating it when it starts with the gzip magic. Corrupt
+    data, and a stream that ends before the gzip trailer, raise ValueError.
+    """
+    it = iter(chunks)
+    first = b""
+    for first in it:
+        if first: break
+    if not first: return
+    if not first.startswith(GZIP_MAGIC):
+        yield first
+        yield from it
+        return
+    z = zlib.decompressobj(31)
+    try:
+        yield z.decompress(first)
+        for c in it:
+            out = z.decompress(c)
+            if out: yield out
+        tail = z.flush()
+    except zlib.error as e:
+        raise ValueError(f"corrupt gzip stream: {e}") from e
+    if tail: yield tail
+    if not z.eof: raise ValueError("gzip stream truncated")
+
+def split_lines(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Re-chunk a byte stream into lines (without the trailing newline)."""
+    rest = b""
+    for c in chunks:
+        rest += c
+        *lines, rest = rest.split(b"\n")
+        yield from lines
+    if rest: yield rest
@@ -0,0 +1,164 @@
+# app/engine/odds.py
+"""
+One parser for API-Football /odds payloads.
+
+parse_odds walks the response once and returns, per fixture, an OddsBook: the bookmakers
+that quote it, the selections they price (named as markets.selection_mask names them:
+"1", "X", "2", "1X", "Over 2.5", "BTTS Yes", "Home Under 1.5", "CS 2-1", ...) and a
+(bookmakers, selections) price array with NaN where a bookmaker has no price.
+
+Markets read: Match Winner, Double Chance, Goals Over/Under, Both Teams Score,
+Total - Home / Total - Away and Exact Score. Quarter and whole goal lines (2.25, 3) are
+skipped: they settle with half stakes or pushes, which a win mask cannot price.
+
+quote() turns a book into one bookmaker's {selection: price}: the configured bookmaker,
+else (when the caller allows it) the first bookmaker with a full 1X2. A 1X2 only counts
+when all three prices are there.
+"""
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+import math
+import numpy as np
+
+RESULT = ("1", "X", "2")
+
+# bet name (lower case) -> market kind
+BETS = {
+    "match winner": "1x2", "1x2": "1x2", "1x2 ft": "1x2", "ft 1x2": "1x2",
+    "double chance": "dc",
+    "goals over/under": "ou",
+    "both teams score": "btts",
+    "total - home": "home", "total - away": "away",
+    "exact score": "cs", "correct score": "cs",
+}
+_FIXED = {
+    "1x2": {"home": "1", "1": "1", "1 (home)": "1", "draw": "X", "x": "X", "away": "2", "2": "2", "2 (away)": "2"},
+    "dc": {"home/draw": "1X", "1x": "1X", "draw/away": "X2", "x2": "X2", "home/away": "12", "12": "12"},
+    "btts": {"yes": "BTTS Yes", "no": "BTTS No"},
+}
+_labels: Dict[Tuple[str, str], Optional[str]] = {}   # (kind, raw value) -> selection, memoised
+
+class OddsBook(NamedTuple):
+    fixture_id: Optional[int]
+    bookmaker_ids: Tuple[int, ...]
+    bookmaker_names: Tuple[str, ...]
+    selections: Tuple[str, ...]
+    prices: np.ndarray            # (bookmakers, selections) decimal odds, NaN = not quoted
+
+    def column(self, selection: str) -> Optional[int]:
+        try: return self.selections.index(selection)
+        except ValueError: return None
+
+def _half_line(x: str) -> Optional[str]:
+    try: line = float(x)
+    except ValueError: return None
+    return f"{line:g}" if math.isfinite(line) and (line * 2) % 2 == 1 else None
+
+def selection_for(kind: str, value: Any) -> Optional[str]:
+    """Engine selection name for one bet value, None when it is not one the engine can price."""
+    key = (kind, str(value))
+    if key in _labels: return _labels[key]
+    label = " ".join(str(value).lower().split())
+    sel: Optional[str] = None
+    if kind in _FIXED:
+        sel = _FIXED[kind].get(label)
+    elif kind in ("ou", "home", "away"):
+        side, _, line = label.partition(" ")
+        line = _half_line(line) if side in ("over", "under") else None
+        if line is not None:
+            sel = f"{side.capitalize()} {line}" if kind == "ou" else f"{kind.capitalize()} {side.capitalize()} {line}"
+    elif kind == "cs":
+        h, _, a = label.partition(":")
+        if h.isdigit() and a.isdigit(): sel = f"CS {int(h)}-{int(a)}"
+    if len(_labels) < 65536: _labels[key] = sel
+    return sel
+
+def _prices(raw: List[Any]) -> np.ndarray:
+    """Decimal odds as floats in one conversion; 0 for anything that is not a price above 1."""
+    try: p = np.asarray(raw, dtype=float)
+    except (TypeError, ValueError):
+        p = np.array([_one_price(v) for v in raw], dtype=float)
+    return np.where(np.isfinite(p) & (p > 1.0), p, 0.0)
+
+def _one_price(v: Any) -> float:
+    try: return float(v)
+    except (TypeError, ValueError): return 0.0
+
+def parse_odds(entries: Iterable[Dict[str, Any]]) -> Dict[Optional[int], OddsBook]:
+    """Odds response items (one or many fixtures) -> OddsBook per fixture id, in one pass."""
+    # per fixture: bookmaker key -> row, [(id, name)], selection -> column, and the cells as flat lists
+    acc: Dict[Optional[int], Tuple[Dict[Any, int], List[Tuple[Any, str]], Dict[str, int], List[int], List[int], List[Any]]] = {}
+    memo = {kind: {} for kind in set(BETS.values())}   # raw value -> selection, per market kind
+    for e in entries or []:
+        fid = (e.get("fixture") or {}).get("id")
+        hit = acc.get(fid)
+        if hit is None: hit = acc[fid] = ({}, [], {}, [], [], [])
+        rows, books, cols, rs, cs, raw = hit
+        for bm in e.get("bookmakers") or []:
+            key = bm.get("id", bm.get("name"))
+            r = rows.get(key)
+            if r is None:
+                r = rows[key] = len(books)
+                books.append((bm.get("id"), bm.get("name") or ""))
+            for bet in bm.get("bets") or []:
+                kind = BETS.get((bet.get("name") or "").strip().lower())
+                if kind is None: continue
+                labels = memo[kind]
+                for v in bet.get("values") or []:
+                    value = v.get("value")
+                    sel = labels.get(value, labels)
+                    if sel is labels: sel = labels[value] = selection_for(kind, value)
+                    if sel is None: continue
+                    c = cols.get(sel)
+                    if c is None: c = cols[sel] = len(cols)
+                    rs.append(r); cs.append(c); raw.append(v.get("odd"))
+    out: Dict[Optional[int], OddsBook] = {}
+    for fid, (rows, books, cols, rs, cs, raw) in acc.items():
+        prices = np.full((len(books), len(cols)), np.nan)
+        if raw:
+            p = _prices(raw)
+            ok = p > 0
+            prices[np.asarray(rs)[ok], np.asarray(cs)[ok]] = p[ok]
+        quoted = ~np.isnan(prices).all(axis=1)          # bookmakers with at least one usable price
+        ids = tuple(int(b) if b is not None else -1 for (b, _), q in zip(books, quoted) if q)
+        names = tuple(n for (_, n), q in zip(books, quoted) if q)
+        fid = int(fid) if fid is not None else None
+        out[fid] = OddsBook(fid, ids, names, tuple(cols), prices[quoted])
+    return out
+
+def parse_fixture_odds(entries: Iterable[Dict[str, Any]]) -> Optional[OddsBook]:
+    """The book of a per-fixture /odds response (all entries are the same fixture)."""
+    books = parse_odds(entries)
+    return next(iter(books.values()), None) if books else None
+
+def bookmaker_row(book: OddsBook, bookmaker: Any = None, name: Optional[str] = None) -> Optional[int]:
+    """Row of the bookmaker with id `bookmaker` or name `name`, None when the book has neither."""
+    for k, (bid, bname) in enumerate(zip(book.bookmaker_ids, book.bookmaker_names)):
+        if (bookmaker is not None and str(bid) == str(bookmaker)) or (name and bname == name):
+            return k
+    return None
+
+def quote(book: Optional[OddsBook], bookmaker: Any = None, name: Optional[str] = None,
+          fallback: bool = False) -> Optional[Dict[str, float]]:
+    """
+    {selection: price} of one bookmaker: the one matching `bookmaker` (id) or `name`, else with
+    `fallback` the first that has a full 1X2. 1X2 prices are dropped unless all three are there.
+    """
+    if book is None or not len(book.bookmaker_ids): return None
+    row = bookmaker_row(book, bookmaker, name)
+    if row is None and fallback:
+        cols = [book.column(s) for s in RESULT]
+        if None not in cols:
+            full = np.flatnonzero(~np.isnan(book.prices[:, cols]).any(axis=1))
+            row = int(full[0]) if len(full) else None
+    if row is None: return None
+    q = {s: float(p) for s, p in zip(book.selections, book.prices[row].tolist()) if not math.isnan(p)}
+    if not all(s in q for s in RESULT):
+        for s in RESULT: q.pop(s, None)
+    return q or None
+
+def split_1x2(q: Optional[Dict[str, float]]) -> Tuple[Optional[Dict[str, float]], Optional[Dict[str, float]]]:
+    """(1X2 prices or None, every other market's prices or None)."""
+    if not q: return None, None
+    res = {s: q[s] for s in RESULT if s in q}
+    rest = {s: p for s, p in q.items() if s not in RESULT}
+    return res or None, rest or None
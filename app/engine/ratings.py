@@ -0,0 +1,478 @@
+# app/engine/ratings.py
+"""
+Dixon-Coles team ratings.
+
+Fitted offline per league from finished fixtures and saved as one compact .npz per league
+(RATINGS_DIR/<league_id>.npz: team ids plus attack/defence arrays and the shared terms), next to
+an append-only log of the matches behind them (RATINGS_DIR/<league_id>.log, six int64 per match).
+At request time a fixture's lambdas are an O(1) lookup:
+
+    log λ_home = mu + home_adv + attack[home] - defence[away]
+    log λ_away = mu            + attack[away] - defence[home]
+
+Fitting maximises the time-weighted Poisson likelihood for all teams of a league at once
+(vectorised gradients, diagonal Newton steps), then picks rho by maximising the
+Dixon-Coles low-score term at those lambdas.
+
+Between fits the ratings move online: every newly finished fixture nudges the four
+strengths involved along the Poisson score (an Elo-style step, O(1) per match). The match
+log is appended in place and its fixture ids are kept in memory, so each update costs the
+new rows only and is applied once; after RATINGS_RECONCILE_EVERY online updates the league
+is refitted from that log to bound drift.
+
+    python -m app.engine.ratings fit --league 39 --season 2024 --season 2025
+    python -m app.engine.ratings fit --league 39 --from-json fixtures_2024.json --from-json fixtures_2025.json
+    python -m app.engine.ratings reconcile --league 39
+"""
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from datetime import datetime, timezone
+import argparse, json, math, os, queue, sys, threading, time
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # no cross-process locking on Windows; single-process dev servers only
+    fcntl = None
+
+RATINGS_DIR = os.getenv("RATINGS_DIR", "ratings")
+XI_PER_DAY  = float(os.getenv("RATINGS_XI", "0.0019"))   # time decay; ~1 year half-life
+ONLINE_K    = float(os.getenv("RATINGS_K", "0.02"))      # online step per goal of surprise
+RECONCILE_EVERY = int(os.getenv("RATINGS_RECONCILE_EVERY", "200"))
+HISTORY_DAYS    = int(os.getenv("RATINGS_HISTORY_DAYS", "1095"))   # match log kept for refits
+PRIOR_GOALS = float(os.getenv("FOOTBALL_LEAGUE_AVG_GOALS", "2.6"))  # seeds leagues never fitted
+RATINGS_ONLINE = os.getenv("RATINGS_ONLINE", "1").lower() in ("1", "true", "yes")
+RATINGS_SEED = os.getenv("RATINGS_SEED", "0").lower() in ("1", "true", "yes")  # online-rate leagues never fitted
+STAT_TTL = float(os.getenv("RATINGS_STAT_TTL", "5"))   # seconds between checks for rewritten files
+FINISHED = ("FT", "AET", "PEN")
+
+class Matches(NamedTuple):
+    home_id: np.ndarray    # int64 API-Football team ids
+    away_id: np.ndarray
+    home_goals: np.ndarray # int64
+    away_goals: np.ndarray
+    ts: np.ndarray         # int64 unix seconds of kickoff
+    fixture_id: np.ndarray # int64, 0 when unknown
+
+    def as_log(self) -> np.ndarray:
+        return np.stack(self, axis=1) if len(self.ts) else np.zeros((0, 6), dtype=np.int64)
+
+    @classmethod
+    def from_log(cls, log: np.ndarray) -> "Matches":
+        return cls(*(log[:, k] for k in range(6)))
+
+class Ratings(NamedTuple):
+    league_id: int
+    team_ids: np.ndarray   # (T,) int64
+    attack: np.ndarray     # (T,) float64
+    defence: np.ndarray    # (T,) float64
+    mu: float
+    home_adv: float
+    rho: float
+    n_matches: int
+    fitted_at: int         # unix seconds
+    log: np.ndarray = np.zeros((0, 6), dtype=np.int64)   # Matches.as_log() of everything seen
+    online_updates: int = 0                              # since the last full fit
+
+    def index(self) -> Dict[int, int]:
+        return {int(t): k for k, t in enumerate(self.team_ids.tolist())}
+
+# ---------- data ----------
+def _kickoff_ts(fx: Dict[str, Any]) -> int:
+    f = fx.get("fixture", {}) or {}
+    if f.get("timestamp"): return int(f["timestamp"])
+    try: return int(datetime.fromisoformat(str(f.get("date")).replace("Z", "+00:00")).timestamp())
+    except ValueError: return 0
+
+def matches_from_fixtures(fixtures: Iterable[Dict[str, Any]]) -> Matches:
+    """Finished fixtures from API-Football /fixtures payloads (regulation goals where available)."""
+    rows = []
+    for fx in fixtures or []:
+        f = fx.get("fixture", {}) or {}
+        if (f.get("status", {}) or {}).get("short") not in FINISHED: continue
+        teams = fx.get("teams", {}) or {}
+        ft = ((fx.get("score", {}) or {}).get("fulltime") or {})
+        goals = ft if ft.get("home") is not None else (fx.get("goals", {}) or {})
+        h, a = (teams.get("home") or {}).get("id"), (teams.get("away") or {}).get("id")
+        if h is None or a is None or goals.get("home") is None or goals.get("away") is None: continue
+        rows.append((int(h), int(a), int(goals["home"]), int(goals["away"]), _kickoff_ts(fx), int(f.get("id") or 0)))
+    return Matches.from_log(np.array(rows, dtype=np.int64).reshape(-1, 6))
+
+# ---------- fit ----------
+def fit_poisson(hi: np.ndarray, ai: np.ndarray, hg: np.ndarray, ag: np.ndarray, n_teams: int,
+                w: Optional[np.ndarray] = None, iters: int = 300, ridge: float = 1e-3, tol: float = 1e-9
+                ) -> Tuple[float, float, np.ndarray, np.ndarray]:
+    """
+    Weighted Poisson MLE of (mu, home_adv, attack, defence) over every team at once.
+    The likelihood is concave in these parameters, so damped diagonal Newton steps converge;
+    a small ridge keeps teams with few matches near zero and fixes the attack/defence offset.
+    """
+    w = np.ones(len(hg)) if w is None else np.asarray(w, dtype=float)
+    hg = hg.astype(float); ag = ag.astype(float)
+    mu = float(np.log(max((w*(hg+ag)).sum() / (2*w.sum()), 1e-6))); home = 0.0
+    att = np.zeros(n_teams); dfn = np.zeros(n_teams)
+    for _ in range(iters):
+        lh = np.exp(mu + home + att[hi] - dfn[ai])
+        la = np.exp(mu + att[ai] - dfn[hi])
+        rh, ra = w*(hg - lh), w*(ag - la)      # d ll / d log λ
+        ch, ca = w*lh, w*la                    # -d² ll / d log λ²
+        g_att = np.bincount(hi, rh, n_teams) + np.bincount(ai, ra, n_teams) - ridge*att
+        g_def = -np.bincount(ai, rh, n_teams) - np.bincount(hi, ra, n_teams) - ridge*dfn
+        h_tm = np.bincount(hi, ch, n_teams) + np.bincount(ai, ca, n_teams) + ridge
+        h_df = np.bincount(ai, ch, n_teams) + np.bincount(hi, ca, n_teams) + ridge
+        d_mu = (rh.sum() + ra.sum()) / (ch.sum() + ca.sum())
+        d_home = rh.sum() / ch.sum()
+        step_att, step_def = g_att / h_tm, g_def / h_df
+        # Jacobi-style steps on coupled parameters overshoot; half steps are stable here
+        mu += 0.5*d_mu; home += 0.5*d_home
+        att += 0.5*step_att; dfn += 0.5*step_def
+        # identifiability: mean attack 0 and mean defence 0, absorbed into mu
+        mu += att.mean() - dfn.mean(); att -= att.mean(); dfn -= dfn.mean()
+        if max(abs(d_mu), abs(d_home), np.abs(step_att).max(initial=0), np.abs(step_def).max(initial=0)) < tol:
+            break
+    return mu, home, att, dfn
+
+def fit_rho(hg: np.ndarray, ag: np.ndarray, lh: np.ndarray, la: np.ndarray, w: Optional[np.ndarray] = None,
+            grid: np.ndarray = np.linspace(-0.2, 0.2, 401)) -> float:
+    """rho maximising the weighted Dixon-Coles tau log-likelihood, evaluated for every grid value at once."""
+    w = np.ones(len(hg)) if w is None else w
+    low = (hg <= 1) & (ag <= 1)
+    if not low.any(): return 0.0
+    h, a, l1, l2, ww = hg[low], ag[low], lh[low], la[low], w[low]
+    r = grid[:, None]
+    tau = np.where((h == 0) & (a == 0), 1 - l1*l2*r,
+          np.where((h == 0) & (a == 1), 1 + l1*r,
+          np.where((h == 1) & (a == 0), 1 + l2*r, 1 - r)))
+    ll = np.where((tau > 0).all(axis=1), (ww*np.log(np.clip(tau, 1e-12, None))).sum(axis=1), -np.inf)
+    return float(grid[int(np.argmax(ll))])
+
+def fit_ratings(m: Matches, league_id: int, xi: float = XI_PER_DAY, now: Optional[int] = None) -> Ratings:
+    if len(m.home_id) == 0:
+        raise ValueError("no finished fixtures to fit")
+    team_ids, inv = np.unique(np.concatenate([m.home_id, m.away_id]), return_inverse=True)
+    hi, ai = inv[:len(m.home_id)], inv[len(m.home_id):]
+    now = int(now if now is not None else datetime.now(timezone.utc).timestamp())
+    days = np.clip((now - m.ts) / 86400.0, 0, None)
+    w = np.exp(-xi * days)
+    mu, home, att, dfn = fit_poisson(hi, ai, m.home_goals, m.away_goals, len(team_ids), w)
+    lh = np.exp(mu + home + att[hi] - dfn[ai]); la = np.exp(mu + att[ai] - dfn[hi])
+    rho = fit_rho(m.home_goals, m.away_goals, lh, la, w)
+    return Ratings(int(league_id), team_ids.astype(np.int64), att, dfn, float(mu), float(home), rho,
+                   int(len(m.home_id)), now, _prune(m.as_log(), now))
+
+def _prune(log: np.ndarray, now: int) -> np.ndarray:
+    return log[log[:, 4] >= now - HISTORY_DAYS*86400] if len(log) else log
+
+# ---------- online updates ----------
+def seed_ratings(league_id: int, m: Matches) -> Ratings:
+    """Neutral start for a league that was never fitted: every team at league average."""
+    n = len(m.ts)
+    hg, ag = float(m.home_goals.sum()), float(m.away_goals.sum())
+    k = 10.0   # pseudo-matches at PRIOR_GOALS, so one odd matchday does not set the scale
+    mu = math.log((hg + ag + k*PRIOR_GOALS) / (2*(n + k)))
+    home = math.log((hg + k*PRIOR_GOALS/2) / (ag + k*PRIOR_GOALS/2))
+    return Ratings(int(league_id), np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0), mu, home, 0.0, 0, 0)
+
+def update_ratings(r: Ratings, m: Matches, k: float = ONLINE_K, seen: Optional[set] = None) -> Tuple[Ratings, int]:
+    """
+    Apply matches whose fixture id is not in `seen` (default: r.log's), oldest first. Per match:
+        att[h] += k(hg - λh);  def[a] -= k(hg - λh);  att[a] += k(ag - λa);  def[h] -= k(ag - λa)
+    plus a step on home advantage. New teams enter at zero. The applied matches are appended
+    to r.log and their ids added to `seen`. Returns (ratings, matches applied).
+    """
+    if seen is None: seen = set(r.log[:, 5].tolist()) if len(r.log) else set()
+    keep = []
+    for i in np.argsort(m.ts, kind="stable").tolist():
+        fid = int(m.fixture_id[i])
+        if fid and fid in seen: continue
+        seen.add(fid); keep.append(i)
+    if not keep: return r, 0
+    new = Matches.from_log(m.as_log()[keep])
+    idx = r.index()
+    fresh = [t for t in dict.fromkeys(np.concatenate([new.home_id, new.away_id]).tolist()) if t not in idx]
+    team_ids = np.concatenate([r.team_ids, np.array(fresh, dtype=np.int64)])
+    att = np.concatenate([r.attack, np.zeros(len(fresh))])
+    dfn = np.concatenate([r.defence, np.zeros(len(fresh))])
+    idx.update((t, len(r.team_ids) + j) for j, t in enumerate(fresh))
+    home = r.home_adv
+    for h_id, a_id, hg, ag in zip(new.home_id.tolist(), new.away_id.tolist(),
+                                  new.home_goals.tolist(), new.away_goals.tolist()):
+        h, a = idx[h_id], idx[a_id]
+        rh = hg - math.exp(r.mu + home + att[h] - dfn[a])
+        ra = ag - math.exp(r.mu + att[a] - dfn[h])
+        att[h] += k*rh; dfn[a] -= k*rh
+        att[a] += k*ra; dfn[h] -= k*ra
+        home += k*rh / max(len(team_ids), 1)   # league-wide term: every match informs it
+    log = np.concatenate([r.log, new.as_log()])
+    return r._replace(team_ids=team_ids, attack=att, defence=dfn, home_adv=home,
+                      log=_prune(log, int(log[:, 4].max())), online_updates=r.online_updates + len(keep)), len(keep)
+
+def reconcile(r: Ratings, xi: float = XI_PER_DAY, now: Optional[int] = None) -> Ratings:
+    """Full refit from the stored match log: strengths, mu, home advantage and rho are all
+    re-estimated, the log is pruned to RATINGS_HISTORY_DAYS and online drift is reset."""
+    if not len(r.log): return r
+    return fit_ratings(Matches.from_log(r.log), r.league_id, xi=xi, now=now)
+
+# ---------- persistence ----------
+def ratings_path(league_id: int, directory: Optional[str] = None) -> str:
+    return os.path.join(directory or RATINGS_DIR, f"{int(league_id)}.npz")
+
+def log_path(path: str) -> str:
+    """Match log next to a ratings file."""
+    return os.path.splitext(path)[0] + ".log"
+
+def _save_params(r: Ratings, path: str) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez_compressed(tmp, team_ids=r.team_ids, attack=r.attack, defence=r.defence,
+                        scalars=np.array([r.mu, r.home_adv, r.rho]),
+                        meta=np.array([r.league_id, r.n_matches, r.fitted_at, r.online_updates], dtype=np.int64))
+    os.replace(tmp, path)
+
+def save_ratings(r: Ratings, path: Optional[str] = None) -> str:
+    """Write the parameters and replace the whole match log (fits and reconciles)."""
+    path = path or ratings_path(r.league_id)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{log_path(path)}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f: f.write(np.ascontiguousarray(r.log, dtype="<i8").tobytes())
+    os.replace(tmp, log_path(path))
+    _save_params(r, path)
+    return path
+
+def append_log(path: str, rows: np.ndarray) -> None:
+    """Append matches to a ratings file's log in place."""
+    with open(log_path(path), "ab") as f: f.write(np.ascontiguousarray(rows, dtype="<i8").tobytes())
+
+def read_log(path: str, offset: int = 0) -> Tuple[np.ndarray, int]:
+    """Log rows from byte `offset` on, and the offset after the last whole row."""
+    with open(log_path(path), "rb") as f:
+        f.seek(offset); buf = f.read()
+    n = len(buf) // 48 * 48   # a row being appended right now is read next time
+    return np.frombuffer(buf[:n], dtype="<i8").reshape(-1, 6).astype(np.int64), offset + n
+
+def load_ratings(path: str, with_log: bool = True) -> Ratings:
+    with np.load(path) as z:
+        mu, home, rho = z["scalars"].tolist()
+        league_id, n, fitted_at, online = (z["meta"].tolist() + [0])[:4]
+        if "log" in z.files: log = z["log"]   # written before the log moved to its own file
+        else:
+            log = np.zeros((0, 6), dtype=np.int64)
+            if with_log:
+                try: log = read_log(path)[0]
+                except FileNotFoundError: pass
+        return Ratings(league_id, z["team_ids"], z["attack"], z["defence"], mu, home, rho, n, fitted_at, log, online)
+
+# ---------- request-time lookup ----------
+_loaded: Dict[str, Tuple[float, float, Optional[Tuple[Ratings, Dict[int, int]]]]] = {}
+_logs: Dict[str, Tuple[float, Optional[int], int, Optional[set]]] = {}
+_lock = threading.RLock()
+
+def get_ratings(league_id: int) -> Optional[Tuple[Ratings, Dict[int, int]]]:
+    """
+    Ratings (without their log) and team index for a league, None if not fitted. The file
+    is stat'ed at most once per RATINGS_STAT_TTL and reloaded when it was rewritten.
+    """
+    path = ratings_path(league_id)
+    now = time.monotonic()
+    hit = _loaded.get(path)
+    if hit is not None and now - hit[0] < STAT_TTL: return hit[2]
+    try: mtime = os.stat(path).st_mtime
+    except OSError: mtime = None
+    got = hit[2] if hit is not None and hit[1] == mtime else None
+    if got is None and mtime is not None:
+        try:
+            r = load_ratings(path, with_log=False)
+            got = (r, r.index())
+        except (OSError, ValueError, KeyError): mtime = None
+    with _lock: _loaded[path] = (now, mtime, got)
+    return got
+
+def _seen(league_id: int, fresh: bool = False) -> Optional[set]:
+    """
+    Fixture ids in a league's match log, None if the league has no ratings. Kept in memory:
+    after the first full read only rows appended since (by any worker) are read, and the
+    log is stat'ed at most once per RATINGS_STAT_TTL unless `fresh`.
+    """
+    path = ratings_path(league_id)
+    now = time.monotonic()
+    with _lock:
+        hit = _logs.get(path)
+        if hit is not None and not fresh and now - hit[0] < STAT_TTL: return hit[3]
+        try: st = os.stat(log_path(path))
+        except OSError:
+            # not fitted, or a file from before the log moved out of the .npz
+            try: r = load_ratings(path) if os.path.exists(path) else None
+            except (OSError, ValueError, KeyError): r = None
+            seen = set(r.log[:, 5].tolist()) if r is not None else None
+            _logs[path] = (now, None, 0, seen)
+            return seen
+        if hit is None or hit[1] != st.st_ino or hit[3] is None or st.st_size < hit[2]:
+            seen, offset = set(), 0   # first look, or the log was rewritten by a fit
+        else:
+            seen, offset = hit[3], hit[2]
+        if st.st_size > offset:
+            rows, offset = read_log(path, offset)
+            seen.update(rows[:, 5].tolist())
+        _logs[path] = (now, st.st_ino, offset, seen)
+        return seen
+
+def lambdas(league_id: Any, home_id: Any, away_id: Any) -> Optional[Tuple[float, float, float]]:
+    """(λ home, λ away, rho) from fitted ratings, or None when the league or a team is unknown."""
+    try: got = get_ratings(int(league_id))
+    except (TypeError, ValueError): return None
+    if got is None: return None
+    return expected_goals(*got, home_id, away_id)
+
+def expected_goals(r: Ratings, idx: Dict[int, int], home_id: Any, away_id: Any) -> Optional[Tuple[float, float, float]]:
+    """(λ home, λ away, rho) for two teams of one Ratings, None if either is not rated."""
+    h, a = idx.get(_as_int(home_id)), idx.get(_as_int(away_id))
+    if h is None or a is None: return None
+    lh = float(np.exp(r.mu + r.home_adv + r.attack[h] - r.defence[a]))
+    la = float(np.exp(r.mu + r.attack[a] - r.defence[h]))
+    return lh, la, r.rho
+
+def _as_int(x: Any) -> Optional[int]:
+    try: return int(x)
+    except (TypeError, ValueError): return None
+
+# ---------- results feed ----------
+def new_results(fixtures: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Finished fixtures whose result is not in their league's ratings yet (in-memory check; at
+    most one stat per league and RATINGS_STAT_TTL). Leagues never fitted only count with RATINGS_SEED.
+    """
+    out = []
+    for fx in fixtures or []:
+        f = fx.get("fixture", {}) or {}
+        if (f.get("status", {}) or {}).get("short") not in FINISHED: continue
+        league_id = _as_int((fx.get("league", {}) or {}).get("id"))
+        if league_id is None: continue
+        seen = _seen(league_id)
+        if seen is None and not RATINGS_SEED: continue
+        if seen is None or _as_int(f.get("id")) not in seen:
+            out.append(fx)
+    return out
+
+def record_results(fixtures: Iterable[Dict[str, Any]]) -> Dict[int, int]:
+    """
+    Fold finished fixtures into each league's ratings file; returns {league_id: matches applied}.
+    Runs under a file lock so gunicorn workers never lose each other's updates. Only the
+    parameters are rewritten; new matches are appended to the log, which is read back in
+    full only when the league is reconciled. Leagues never fitted are seeded at league
+    average with RATINGS_SEED and skipped otherwise.
+    """
+    by_league: Dict[int, List[Dict[str, Any]]] = {}
+    for fx in fixtures or []:
+        league_id = _as_int((fx.get("league", {}) or {}).get("id"))
+        if league_id is not None: by_league.setdefault(league_id, []).append(fx)
+    applied = {}
+    for league_id, group in by_league.items():
+        m = matches_from_fixtures(group)
+        if not len(m.ts): continue
+        path = ratings_path(league_id)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".lock", "a") as lock:
+            if fcntl: fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                seen = _seen(league_id, fresh=True)
+                if seen is None and not RATINGS_SEED: continue
+                if seen is None: r, seen, full = seed_ratings(league_id, m), set(), True
+                else:
+                    r = load_ratings(path, with_log=False)
+                    full = len(r.log) > 0   # old single-file format: rewrite both files
+                r, n = update_ratings(r, m, seen=seen)   # adds the applied ids to the cached set
+                if n:
+                    if r.online_updates >= RECONCILE_EVERY:
+                        if not full: r = r._replace(log=np.concatenate([read_log(path)[0], r.log]))
+                        r, full = reconcile(r), True
+                    if full:
+                        save_ratings(r, path)
+                        with _lock: _logs.pop(path, None)
+                    else:
+                        append_log(path, r.log)
+                        _save_params(r, path)
+                applied[league_id] = n
+            except BaseException:
+                with _lock: _logs.pop(path, None)   # reread the log rather than trust the cache
+                raise
+            finally:
+                if fcntl: fcntl.flock(lock, fcntl.LOCK_UN)
+    return applied
+
+_feed: "queue.Queue[List[Dict[str, Any]]]" = queue.Queue()
+_feeder_pid: Optional[int] = None
+
+def _drain_feed() -> None:
+    while True:
+        fixtures = _feed.get()
+        try: record_results(fixtures)
+        except (OSError, ValueError): pass  # next sighting of these results retries them
+        finally: _feed.task_done()
+
+def submit_results(fixtures: Iterable[Dict[str, Any]]) -> int:
+    """Queue unseen finished fixtures for the background updater; returns how many were queued."""
+    global _feeder_pid
+    if not RATINGS_ONLINE: return 0
+    fresh = new_results(fixtures)
+    if not fresh: return 0
+    with _lock:
+        if _feeder_pid != os.getpid():   # one feeder per gunicorn worker
+            _feeder_pid = os.getpid()
+            threading.Thread(target=_drain_feed, name="ratings-feed", daemon=True).start()
+    _feed.put(fresh)
+    return len(fresh)
+
+# ---------- CLI ----------
+def _load_fixture_files(paths: List[str]) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for p in paths:
+        with open(p) as f: data = json.load(f)
+        out.extend(data.get("response", []) if isinstance(data, dict) else data)
+    return out
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m app.engine.ratings")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    f = sub.add_parser("fit", help="fit one league and write RATINGS_DIR/<league>.npz")
+    f.add_argument("--league", type=int, required=True)
+    f.add_argument("--season", type=int, action="append", default=[], help="fetch from API-Football (repeatable)")
+    f.add_argument("--from-json", action="append", default=[], help="saved /fixtures response file (repeatable)")
+    f.add_argument("--xi", type=float, default=XI_PER_DAY)
+    f.add_argument("--out")
+    s = sub.add_parser("show", help="print a fitted league's table")
+    s.add_argument("--league", type=int, required=True)
+    c = sub.add_parser("reconcile", help="refit a league from its stored match log")
+    c.add_argument("--league", type=int, required=True)
+    c.add_argument("--xi", type=float, default=XI_PER_DAY)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "reconcile":
+        try: r = load_ratings(ratings_path(args.league))
+        except OSError:
+            print(f"no ratings at {ratings_path(args.league)}", file=sys.stderr); return 1
+        r = reconcile(r, xi=args.xi)
+        path = save_ratings(r)
+        print(f"refitted {len(r.team_ids)} teams from {r.n_matches} logged matches (rho={r.rho:.3f}) -> {path}")
+        return 0
+
+    if args.cmd == "show":
+        got = get_ratings(args.league)
+        if got is None:
+            print(f"no ratings at {ratings_path(args.league)}", file=sys.stderr); return 1
+        r = got[0]
+        print(f"league {r.league_id}: {r.n_matches} matches fitted + {r.online_updates} online, "
+              f"mu={r.mu:.3f} home={r.home_adv:.3f} rho={r.rho:.3f}")
+        for k in np.argsort(-(r.attack + r.defence)):
+            print(f"{int(r.team_ids[k]):>8}  att {r.attack[k]:+.3f}  def {r.defence[k]:+.3f}")
+        return 0
+
+    fixtures = _load_fixture_files(args.from_json)
+    if args.season:
+        from .adapters import live_football as api
+        for season in args.season:
+            fixtures.extend(api.fixtures_by_league_season(args.league, season))
+    r = fit_ratings(matches_from_fixtures(fixtures), args.league, xi=args.xi)
+    path = save_ratings(r, args.out)
+    print(f"fitted {len(r.team_ids)} teams from {r.n_matches} matches (rho={r.rho:.3f}) -> {path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+# app/engine/simulation.py
+"""
+Monte Carlo EV and bankroll simulation over score grids.
+
+Each path draws one scoreline per fixture per round straight from the fixture's score grid
+(inverse CDF over the flattened grid), and every pick is settled against that scoreline
+through its selection mask. Picks on the same fixture therefore move together (1 and Over
+2.5, say) while different fixtures stay independent, as the model assumes. Paths are
+generated in chunks of SIM_CHUNK_PATHS, each from its own child of one seed, so memory
+is bounded and a (seed, chunk size) pair always reproduces the same numbers. Every Kelly
+multiplier is run on the same draws.
+"""
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+import os
+import numpy as np
+from . import markets as mk
+
+SIM_CHUNK_PATHS = int(os.getenv("SIM_CHUNK_PATHS", "20000"))
+SIM_MAX_DRAWS   = int(os.getenv("SIM_MAX_DRAWS", "200000000"))   # kelly multipliers * paths * rounds * fixtures per request
+SIM_MAX_ROUNDS  = int(os.getenv("SIM_MAX_ROUNDS", "10000"))      # rounds run one Python iteration each
+SIM_MAX_KELLY   = int(os.getenv("SIM_MAX_KELLY", "16"))          # Kelly multipliers per request
+SIM_AUDIT_PATHS = int(os.getenv("SIM_AUDIT_PATHS", "0"))          # per-pick MC in the audit block; 0 = off
+DEFAULT_KELLY = (0.25, 0.5, 1.0)
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+class Pick(NamedTuple):
+    fixture: int         # index into the grids passed to simulate()
+    selection: str
+    odds: float          # decimal price
+
+def kelly_fraction(prob: np.ndarray, odds: np.ndarray) -> np.ndarray:
+    """Full-Kelly stake as a bankroll fraction, 0 where the bet has no edge."""
+    b = np.asarray(odds, dtype=float) - 1.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        f = np.where(b > 0, (np.asarray(prob)*(b + 1) - 1) / b, 0.0)
+    return np.clip(f, 0.0, 1.0)
+
+def grid_cdfs(grids: Sequence[np.ndarray]) -> np.ndarray:
+    """(F, G*G) cumulative distributions, grids zero-padded to the largest size; rows end at exactly 1."""
+    g = max(P.shape[-1] for P in grids)
+    padded = np.zeros((len(grids), g, g))
+    for k, P in enumerate(grids):
+        padded[k, :P.shape[0], :P.shape[1]] = P
+    cdf = np.cumsum(padded.reshape(len(grids), -1), axis=1)
+    cdf /= cdf[:, -1:]
+    cdf[:, -1] = 1.0
+    return cdf
+
+def cells_from_uniform(cdf: np.ndarray, u: np.ndarray) -> np.ndarray:
+    """(F, n) uniforms -> flat grid-cell indices, all fixtures in one searchsorted."""
+    f, cells = cdf.shape
+    offsets = np.arange(f, dtype=float)[:, None]
+    flat = (cdf + offsets).ravel()   # row k lives in [k, k+1], so one sorted array serves every fixture
+    idx = np.searchsorted(flat, u + offsets, side="right")
+    return np.minimum(idx - np.arange(f)[:, None]*cells, cells - 1)
+
+def sample_cells(cdf: np.ndarray, n: int, rng: np.random.Generator) -> np.ndarray:
+    """(F, n) scorelines, one per fixture and path."""
+    return cells_from_uniform(cdf, rng.random((cdf.shape[0], n)))
+
+def cdf_mass(cdf_row: np.ndarray, mask: np.ndarray) -> float:
+    """Probability of a flat mask given one row of grid_cdfs."""
+    return float(np.diff(cdf_row, prepend=0.0)[mask].sum())
+
+def _summary(x: np.ndarray, digits: int = 4) -> Dict[str, Any]:
+    q = np.quantile(x, QUANTILES)
+    return {"mean": round(float(x.mean()), digits), "std": round(float(x.std()), digits),
+            **{f"p{int(p*100)}": round(float(v), digits) for p, v in zip(QUANTILES, q)}}
+
+def simulate(grids: Sequence[np.ndarray], picks: Sequence[Pick], paths: int = 10000, rounds: int = 100,
+             kelly: Sequence[float] = DEFAULT_KELLY, max_exposure: float = 1.0, ruin: float = 0.5,
+             seed: Optional[int] = None, chunk: int = SIM_CHUNK_PATHS) -> Dict[str, Any]:
+    """
+    Bet the slate `rounds` times on each of `paths` paths.
+      slate:  one round at 1 unit flat per pick: P&L distribution and P(loss)
+      kelly:  per multiplier m, stakes m * Kelly (scaled so they total at most max_exposure),
+              compounded over rounds: terminal bankroll, log growth per round, max drawdown,
+              and risk of ruin (bankroll ever below `ruin` of the start)
+    """
+    mult = np.asarray(kelly, dtype=float).reshape(-1)
+    if not picks: raise ValueError("no picks to simulate")
+    if paths < 1 or rounds < 1: raise ValueError("paths and rounds must be positive")
+    if rounds > SIM_MAX_ROUNDS: raise ValueError(f"rounds exceeds SIM_MAX_ROUNDS={SIM_MAX_ROUNDS}")
+    if not 1 <= len(mult) <= SIM_MAX_KELLY: raise ValueError(f"kelly needs 1..{SIM_MAX_KELLY} multipliers")
+    if not (mult > 0).all() or not np.isfinite(mult).all(): raise ValueError("kelly multipliers must be positive")
+    if not 0 < max_exposure <= 1: raise ValueError("max_exposure must be in (0, 1]")
+    if not 0 < ruin <= 1: raise ValueError("ruin must be in (0, 1]")
+    if len(mult) * paths * rounds * len(grids) > SIM_MAX_DRAWS:
+        raise ValueError(f"kelly*paths*rounds*fixtures exceeds SIM_MAX_DRAWS={SIM_MAX_DRAWS}")
+    cdf = grid_cdfs(grids)
+    g = int(round(np.sqrt(cdf.shape[1]))) - 1
+    masks = np.stack([np.asarray(mk.selection_mask(g, p.selection), dtype=bool).ravel() for p in picks])
+    fix = np.array([p.fixture for p in picks])
+    odds = np.array([p.odds for p in picks], dtype=float)
+    prob = np.array([cdf_mass(cdf[f], m) for f, m in zip(fix, masks)])
+    full_kelly = kelly_fraction(prob, odds)
+    stakes = mult[:, None] * full_kelly[None, :]                      # (K, picks)
+    total = stakes.sum(axis=1, keepdims=True)
+    stakes *= np.where(total > max_exposure, max_exposure / np.maximum(total, 1e-12), 1.0)
+    rows = np.arange(len(picks))[:, None]
+
+    slate_pnl, terminal, growth, drawdown, ruined, wins_seen = [], [], [], [], [], np.zeros(len(picks))
+    chunks = [min(chunk, paths - s) for s in range(0, paths, chunk)]
+    for n, child in zip(chunks, np.random.SeedSequence(seed).spawn(len(chunks))):
+        rng = np.random.default_rng(child)
+        bank = np.ones((len(mult), n)); peak = bank.copy()
+        dd = np.zeros_like(bank); hit = np.zeros(bank.shape, dtype=bool)
+        for r in range(rounds):
+            cells = sample_cells(cdf, n, rng)                          # (F, n)
+            won = masks[rows, cells[fix]]                               # (picks, n)
+            unit = np.where(won, odds[:, None] - 1.0, -1.0)           # per-unit return of each pick
+            if r == 0:
+                slate_pnl.append(unit.sum(axis=0)); wins_seen += won.sum(axis=1)
+            bank *= 1.0 + stakes @ unit
+            np.maximum(peak, bank, out=peak)
+            np.maximum(dd, 1.0 - bank/peak, out=dd)
+            hit |= bank < ruin
+        terminal.append(bank); drawdown.append(dd); ruined.append(hit)
+        growth.append(np.log(np.maximum(bank, 1e-300)) / rounds)
+    slate = np.concatenate(slate_pnl)
+    terminal, growth = np.concatenate(terminal, axis=1), np.concatenate(growth, axis=1)
+    drawdown, ruined = np.concatenate(drawdown, axis=1), np.concatenate(ruined, axis=1)
+
+    return {
+        "paths": paths, "rounds": rounds, "seed": seed, "chunk": chunk,
+        "picks": [{"fixture": int(p.fixture), "selection": p.selection, "odds": p.odds,
+                   "prob": round(float(prob[k]), 4), "hit_rate_sim": round(float(wins_seen[k] / paths), 4),
+                   "ev": round(float(prob[k]*odds[k] - 1), 4), "kelly": round(float(full_kelly[k]), 4)}
+                  for k, p in enumerate(picks)],
+        "slate": {**_summary(slate), "units_staked": len(picks), "p_loss": round(float((slate < 0).mean()), 4)},
+        "kelly": [{"multiplier": float(m), "stakes": [round(float(s), 4) for s in stakes[k]],
+                   "exposure": round(float(stakes[k].sum()), 4),
+                   "terminal_bankroll": _summary(terminal[k]),
+                   "log_growth_per_round": round(float(growth[k].mean()), 5),
+                   "max_drawdown": _summary(drawdown[k]),
+                   "risk_of_ruin": round(float(ruined[k].mean()), 4)}
+                  for k, m in enumerate(mult)],
+    }
+
+def pick_mc(params: np.ndarray, selections: Sequence[str], odds: np.ndarray, model_prob: np.ndarray,
+            seeds: Sequence[int], paths: int = SIM_AUDIT_PATHS) -> List[Dict[str, Any]]:
+    """
+    Per-pick MC check of the single-bet EV, independent of the score grid: home and away goals
+    are drawn from untruncated Poisson(λ) and weighted by the Dixon-Coles corner factor (whose
+    mean is 1), and each path is settled by the selection's own rule. The weighted win rate
+    then estimates the model probability without the grid's truncation, renormalisation or
+    masks, and `agrees` says whether the closed-form EV (`ev_model`, from `model_prob`) lies in
+    the 95% interval. Each row is seeded on its own, so a pick's numbers do not depend on the
+    rest of the batch.
+    """
+    out = []
+    for (lh, la, rho), sel, o, q, seed in zip(np.asarray(params).tolist(), selections,
+                                               np.asarray(odds, dtype=float).tolist(),
+                                               np.asarray(model_prob, dtype=float).tolist(), seeds):
+        rng = np.random.default_rng(seed)
+        h, a = rng.poisson(lh, paths), rng.poisson(la, paths)
+        tau = np.array([[1 - lh*la*rho, 1 + lh*rho], [1 + la*rho, 1 - rho]])
+        w = np.where((h < 2) & (a < 2), tau[np.minimum(h, 1), np.minimum(a, 1)], 1.0)
+        won = mk.selection_mask(int(max(h.max(), a.max(), 1)), sel)[h, a]
+        p = float((w * won).sum() / w.sum())
+        se = float(np.sqrt((w*w * (won - p)**2).sum()) / w.sum())
+        mean, half = p*o - 1.0, 1.96 * o * se
+        ev_model = q*o - 1.0
+        out.append({"paths": paths, "ev_mean": round(mean, 4), "ev_std": round(o*float(np.sqrt(p*(1 - p))), 4),
+                    "ev_ci95": [round(mean - half, 4), round(mean + half, 4)], "p_loss": round(1 - p, 4),
+                    "ev_model": round(ev_model, 4), "agrees": bool(abs(ev_model - mean) <= half)})
+    return out
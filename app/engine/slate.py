@@ -0,0 +1,147 @@
+# app/engine/slate.py
+"""
+Columnar form of an /api/matches slate: one fixtures response and its odds books.
+
+Ids and seasons are int64 arrays (-1 where upstream sent none), prices float arrays
+with NaN for "not quoted", and names and status strings are lists referencing the cached
+fixtures response rather than copies of it. The configured bookmaker's prices sit in one
+(fixtures, selections) array over the union of selections the slate quotes; best prices and the
+consensus are the arrays consensus.py works on. Nothing per fixture is built until items(),
+which the response (or the live stream) calls once at the very end.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import math
+import numpy as np
+
+from . import consensus as cs
+from .odds import RESULT, OddsBook, bookmaker_row
+
+def _ints(values: Sequence[Any]) -> np.ndarray:
+    out = np.empty(len(values), dtype=np.int64)
+    for k, v in enumerate(values):
+        try: out[k] = int(v)
+        except (TypeError, ValueError): out[k] = -1
+    return out
+
+def _opt(values: List[int]) -> List[Optional[int]]:
+    return [None if v == -1 else v for v in values]
+
+class Slate:
+    __slots__ = ("fixture_id", "utc", "status", "league_id", "league", "season",
+                 "home_id", "home", "away_id", "away",
+                 "bookmaker", "selections", "prices",
+                 "best_odds", "best_bookmaker", "bookmaker_names",
+                 "consensus", "n_bookmakers", "margin", "method")
+
+    def __init__(self, fixtures_raw: Sequence[Dict[str, Any]]):
+        fx = [f.get("fixture", {}) for f in fixtures_raw]
+        league = [f.get("league", {}) for f in fixtures_raw]
+        home = [f.get("teams", {}).get("home", {}) or {} for f in fixtures_raw]
+        away = [f.get("teams", {}).get("away", {}) or {} for f in fixtures_raw]
+        self.fixture_id = _ints([f.get("id") for f in fx])
+        self.utc: List[Optional[str]] = [f.get("date") for f in fx]
+        self.status: List[Optional[str]] = [f.get("status", {}).get("short") for f in fx]
+        self.league_id = _ints([lg.get("id") for lg in league])
+        self.league: List[Optional[str]] = [lg.get("name") for lg in league]
+        self.season = _ints([lg.get("season") for lg in league])
+        self.home_id = _ints([t.get("id") for t in home])
+        self.home: List[Optional[str]] = [t.get("name") for t in home]
+        self.away_id = _ints([t.get("id") for t in away])
+        self.away: List[Optional[str]] = [t.get("name") for t in away]
+        n = len(fixtures_raw)
+        self.bookmaker: Optional[str] = None
+        self.selections: Tuple[str, ...] = ()
+        self.prices = np.full((n, 0), np.nan)               # configured bookmaker, (fixtures, selections)
+        self.best_odds: Optional[np.ndarray] = None         # (fixtures, 3), 0 where nobody quotes
+        self.best_bookmaker: Optional[np.ndarray] = None    # (fixtures, 3) index into bookmaker_names
+        self.bookmaker_names: List[str] = []
+        self.consensus: Optional[np.ndarray] = None         # (fixtures, 3) margin-free probabilities
+        self.n_bookmakers: Optional[np.ndarray] = None
+        self.margin: Optional[np.ndarray] = None
+        self.method: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self.fixture_id)
+
+    def ids(self) -> List[Optional[int]]:
+        return _opt(self.fixture_id.tolist())
+
+    def attach(self, books: Sequence[Optional[OddsBook]], bookmaker: Any, name: Optional[str],
+               method: Optional[str] = None) -> "Slate":
+        """
+        Fill the price columns from each fixture's OddsBook (same order as the fixtures): the
+        bookmaker matching `bookmaker`/`name`, and with `method` the best price and the consensus
+        over all of them.
+        """
+        index: Dict[str, int] = {}
+        where: Dict[Tuple[str, ...], np.ndarray] = {}    # a book's selections -> union columns
+        cells = []
+        for f, book in enumerate(books):
+            row = bookmaker_row(book, bookmaker, name) if book is not None else None
+            if row is None: continue
+            cols = where.get(book.selections)
+            if cols is None:
+                cols = where[book.selections] = np.array([index.setdefault(s, len(index)) for s in book.selections], dtype=np.intp)
+            cells.append((f, cols, book.prices[row]))
+        self.selections = tuple(index)
+        self.prices = np.full((len(self), len(index)), np.nan)
+        for f, cols, p in cells: self.prices[f, cols] = p
+        self.bookmaker = name
+        if method:
+            prices = cs.slate_1x2(books)
+            best, cons = cs.best_prices(prices), cs.consensus(prices, method)
+            names: Dict[str, int] = {}
+            self.best_bookmaker = np.full((len(self), 3), -1, dtype=np.int32)
+            for f, (b, rows) in enumerate(zip(books, best["row"].tolist())):
+                if b is None or rows[0] < 0: continue
+                self.best_bookmaker[f] = [names.setdefault(b.bookmaker_names[k], len(names)) for k in rows]
+            self.bookmaker_names = list(names)
+            self.best_odds, self.method = best["price"], method
+            self.consensus, self.n_bookmakers, self.margin = cons["prob"], cons["bookmakers"], cons["margin"]
+        return self
+
+    def _result_prices(self) -> np.ndarray:
+        """(fixtures, 3) configured bookmaker's 1/X/2; rows missing any of the three are all NaN."""
+        out = np.full((len(self), 3), np.nan)
+        cols = [self.selections.index(s) if s in self.selections else None for s in RESULT]
+        if None not in cols:
+            out = self.prices[:, cols]
+            out[np.isnan(out).any(axis=1)] = np.nan
+        return out
+
+    def items(self) -> List[Dict[str, Any]]:
+        """The /api/matches items, built in one go from the columns."""
+        res = self._result_prices().tolist()
+        others = [k for k, s in enumerate(self.selections) if s not in RESULT]
+        other_sels = [self.selections[k] for k in others]
+        other_prices = self.prices[:, others].tolist()
+        out = []
+        for r, (fid, utc, status, lid, league, season, hid, home, aid, away) in enumerate(zip(
+                self.ids(), self.utc, self.status, _opt(self.league_id.tolist()), self.league,
+                _opt(self.season.tolist()), _opt(self.home_id.tolist()), self.home,
+                _opt(self.away_id.tolist()), self.away)):
+            odds = None if math.isnan(res[r][0]) else dict(zip(RESULT, res[r]))
+            markets = {s: p for s, p in zip(other_sels, other_prices[r]) if p == p}
+            out.append({"fixture_id": fid, "utc": utc, "status": status, "league_id": lid, "league": league,
+                        "season": season, "home_id": hid, "home": home, "away_id": aid, "away": away,
+                        "odds": odds, "market_odds": markets or None,
+                        "bookmaker": self.bookmaker if odds else None})
+        if self.method:
+            self._attach_consensus(out)
+        return out
+
+    def _attach_consensus(self, out: List[Dict[str, Any]]) -> None:
+        n = self.n_bookmakers.tolist()
+        best = self.best_odds.tolist()
+        book = self.best_bookmaker.tolist()
+        pct = np.round(self.consensus * 100, 2).tolist()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fair = np.round(1.0 / self.consensus, 3).tolist()
+        margin = np.round(self.margin * 100, 2).tolist()
+        names = self.bookmaker_names
+        for r, it in enumerate(out):
+            if not n[r]: continue
+            it["best_odds"] = dict(zip(RESULT, best[r]))
+            it["best_bookmakers"] = {s: names[b] for s, b in zip(RESULT, book[r])}
+            it["consensus"] = {"method": self.method, "bookmakers": n[r], "margin_percent": margin[r],
+                               "percent": dict(zip(RESULT, pct[r])), "fair_odds": dict(zip(RESULT, fair[r]))}
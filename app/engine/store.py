@@ -0,0 +1,259 @@
+# app/engine/store.py
+"""
+Pick storage.
+
+PickStore is the interface audit.py talks to. SqlitePickStore is the default: one file in
+WAL mode shared by every gunicorn worker, indexed on date, league, status and selection.
+Writes are queued and flushed in batches by a background thread, off the request path; a
+batch sqlite refuses (locked, disk full) is logged, counted in /metrics and kept for the next
+write instead of dropped. MemoryPickStore keeps the old in-process behaviour (PICK_STORE=memory).
+"""
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+import json, logging, os, queue, sqlite3, threading, time
+
+from .metrics import REGISTRY
+
+log = logging.getLogger(__name__)
+
+PICK_STORE        = os.getenv("PICK_STORE", "sqlite")          # sqlite | memory
+PICK_DB           = os.getenv("PICK_DB", "betrun_picks.sqlite")
+PICK_BATCH_SIZE   = int(os.getenv("PICK_BATCH_SIZE", "200"))
+PICK_FLUSH_S      = float(os.getenv("PICK_FLUSH_S", "0.2"))    # max wait to fill a batch
+FILTER_FIELDS     = ("date", "league", "status", "selection")
+_RETRY_S          = 1.0      # writer retries a failed batch this often while picks are pending
+_PENDING_MAX      = 10000    # failed picks kept for retry; the oldest beyond this are dropped
+
+def pick_row(pick: Dict[str, Any]) -> Dict[str, Any]:
+    """Indexed columns for a pick; date is the analysis day (UTC) unless the pick carries one."""
+    selection = (pick.get("alignment") or {}).get("vm_best") or (pick.get("value_mode_table") or {}).get("best_edge_sel")
+    date = pick.get("date") or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    return {
+        "date": str(date)[:10],
+        "league": pick.get("league"),
+        "status": pick.get("status"),
+        "selection": selection,
+        "home": pick.get("home"),
+        "away": pick.get("away"),
+    }
+
+def _matches(row: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+    for k, v in filters.items():
+        if k == "date_from":
+            if row["date"] < v: return False
+        elif k == "date_to":
+            if row["date"] > v: return False
+        elif row.get(k) != v:
+            return False
+    return True
+
+class PickStore(ABC):
+    @abstractmethod
+    def add(self, pick: Dict[str, Any]) -> None: ...
+    @abstractmethod
+    def add_many(self, picks: Iterable[Dict[str, Any]]) -> int: ...
+    @abstractmethod
+    def replace_all(self, picks: Iterable[Dict[str, Any]]) -> int: ...
+    @abstractmethod
+    def query(self, filters: Optional[Dict[str, Any]] = None, limit: Optional[int] = None,
+              cursor: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Picks matching filters in insertion order, after cursor; returns (items, next_cursor)."""
+    @abstractmethod
+    def iter_raw(self, filters: Optional[Dict[str, Any]] = None, cursor: Optional[int] = None,
+                 page_size: int = 500) -> Iterator[Tuple[int, str]]:
+        """(id, pick JSON text) for matching picks after cursor, fetched page by page."""
+    @abstractmethod
+    def count(self, filters: Optional[Dict[str, Any]] = None) -> int: ...
+    def flush(self) -> None: pass
+    def close(self) -> None: pass
+
+class MemoryPickStore(PickStore):
+    def __init__(self):
+        self._rows: List[Tuple[int, Dict[str, Any], Dict[str, Any]]] = []
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+    def add(self, pick: Dict[str, Any]) -> None:
+        self.add_many([pick])
+
+    def add_many(self, picks: Iterable[Dict[str, Any]]) -> int:
+        n = 0
+        with self._lock:
+            for p in picks:
+                self._rows.append((self._next_id, pick_row(p), p))
+                self._next_id += 1; n += 1
+        return n
+
+    def replace_all(self, picks: Iterable[Dict[str, Any]]) -> int:
+        with self._lock: self._rows.clear()
+        return self.add_many(picks)
+
+    def query(self, filters=None, limit=None, cursor=None):
+        filters = filters or {}
+        with self._lock: rows = list(self._rows)
+        out, last = [], None
+        for rid, row, pick in rows:
+            if cursor is not None and rid <= cursor: continue
+            if not _matches(row, filters): continue
+            if limit is not None and len(out) >= limit:
+                return out, last
+            out.append(pick); last = rid
+        return out, None
+
+    def iter_raw(self, filters=None, cursor=None, page_size=500):
+        filters = filters or {}
+        with self._lock: rows = list(self._rows)
+        for rid, row, pick in rows:
+            if cursor is not None and rid <= cursor: continue
+            if _matches(row, filters):
+                yield rid, json.dumps(pick, separators=(",", ":"), default=str)
+
+    def count(self, filters=None) -> int:
+        filters = filters or {}
+        with self._lock:
+            return sum(1 for _, row, _ in self._rows if _matches(row, filters))
+
+class SqlitePickStore(PickStore):
+    def __init__(self, path: str = PICK_DB, batch_size: int = PICK_BATCH_SIZE, flush_s: float = PICK_FLUSH_S):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_s = flush_s
+        self._local = threading.local()
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        con = self._con()
+        con.executescript("""
+            CREATE TABLE IF NOT EXISTS picks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                date TEXT, league TEXT, status TEXT, selection TEXT, home TEXT, away TEXT,
+                payload TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS picks_date ON picks(date);
+            CREATE INDEX IF NOT EXISTS picks_league ON picks(league);
+            CREATE INDEX IF NOT EXISTS picks_status ON picks(status);
+            CREATE INDEX IF NOT EXISTS picks_selection ON picks(selection);
+        """)
+        con.commit()
+        self._writer = threading.Thread(target=self._drain, name="pick-writer", daemon=True)
+        self._writer.start()
+
+    def _con(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.path, timeout=10)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+        return con
+
+    def _insert(self, con: sqlite3.Connection, picks: Iterable[Dict[str, Any]]) -> int:
+        def rows():
+            for p in picks:
+                r = pick_row(p)
+                yield (r["date"], r["league"], r["status"], r["selection"], r["home"], r["away"],
+                       json.dumps(p, separators=(",", ":"), default=str))
+        cur = con.executemany(
+            "INSERT INTO picks (date, league, status, selection, home, away, payload) VALUES (?,?,?,?,?,?,?)", rows())
+        return cur.rowcount
+
+    # --- background writer: batches queued picks into one transaction ---
+    def _drain(self) -> None:
+        con = self._con()
+        pending: List[Dict[str, Any]] = []   # picks of batches sqlite refused, written with the next one
+        while True:
+            try:
+                batch = [self._queue.get(timeout=_RETRY_S if pending else None)]
+            except queue.Empty:
+                batch = []
+            deadline = time.monotonic() + self.flush_s
+            try:
+                while batch and len(batch) < self.batch_size and batch[-1] is not None:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                pass
+            picks = pending + [p for p in batch if p is not None]
+            try:
+                if picks:
+                    with con: self._insert(con, picks)
+                    REGISTRY.inc("betrun_pick_store_total", len(picks), event="written")
+                pending = []
+            except sqlite3.Error as e:
+                # a failed batch must not kill the writer; analysis results were already returned
+                REGISTRY.inc("betrun_pick_store_total", event="failed_batches")
+                pending = picks[-_PENDING_MAX:]
+                if len(picks) > len(pending):
+                    REGISTRY.inc("betrun_pick_store_total", len(picks) - len(pending), event="dropped")
+                log.warning("pick store %s: %d pick(s) not written, retrying: %s", self.path, len(pending), e)
+            finally:
+                REGISTRY.set("betrun_pick_store_pending", len(pending))
+                for _ in batch: self._queue.task_done()
+            if None in batch:
+                if pending: log.error("pick store %s: closed with %d pick(s) unwritten", self.path, len(pending))
+                return
+
+    def add(self, pick: Dict[str, Any]) -> None:
+        self._queue.put(pick)
+
+    def add_many(self, picks: Iterable[Dict[str, Any]]) -> int:
+        con = self._con()
+        with con: return self._insert(con, picks)
+
+    def replace_all(self, picks: Iterable[Dict[str, Any]]) -> int:
+        self.flush()
+        con = self._con()
+        with con:
+            con.execute("DELETE FROM picks")
+            return self._insert(con, picks)
+
+    def flush(self) -> None:
+        """Block until queued picks are written or pending a retry (reads call this for read-your-writes)."""
+        self._queue.join()
+
+    def _where(self, filters: Dict[str, Any], cursor: Optional[int]) -> Tuple[str, List[Any]]:
+        clauses, args = [], []
+        for k, v in (filters or {}).items():
+            if k == "date_from": clauses.append("date >= ?")
+            elif k == "date_to": clauses.append("date <= ?")
+            elif k in FILTER_FIELDS: clauses.append(f"{k} = ?")
+            else: continue
+            args.append(v)
+        if cursor is not None:
+            clauses.append("id > ?"); args.append(cursor)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def query(self, filters=None, limit=None, cursor=None):
+        self.flush()
+        where, args = self._where(filters or {}, cursor)
+        sql = f"SELECT id, payload FROM picks{where} ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ?"; args.append(int(limit) + 1)
+        rows = self._con().execute(sql, args).fetchall()
+        more = limit is not None and len(rows) > limit
+        if more: rows = rows[:limit]
+        items = [json.loads(payload) for _, payload in rows]
+        return items, (rows[-1][0] if more else None)
+
+    def iter_raw(self, filters=None, cursor=None, page_size=500):
+        # keyset pages: no sqlite cursor is held open while the consumer is between rows
+        self.flush()
+        while True:
+            where, args = self._where(filters or {}, cursor)
+            rows = self._con().execute(f"SELECT id, payload FROM picks{where} ORDER BY id LIMIT ?",
+                                       args + [page_size]).fetchall()
+            yield from rows
+            if len(rows) < page_size: return
+            cursor = rows[-1][0]
+
+    def count(self, filters=None) -> int:
+        self.flush()
+        where, args = self._where(filters or {}, None)
+        return self._con().execute(f"SELECT COUNT(*) FROM picks{where}", args).fetchone()[0]
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._writer.join(timeout=5)
+
+def open_store() -> PickStore:
+    if PICK_STORE == "memory":
+        return MemoryPickStore()
+    return SqlitePickStore(PICK_DB)
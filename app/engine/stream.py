@@ -0,0 +1,264 @@
+# app/engine/stream.py
+"""
+Live odds for /api/matches/stream (Server-Sent Events).
+
+One Feed per (league, season, date) query and worker, shared by every client watching it.
+Its thread polls upstream once per STREAM_ODDS_S (fixtures, for status changes, once per
+STREAM_FIXTURES_S) through the response cache, so the number of viewers never changes the
+number of upstream calls and /api/matches readers get the fresher entries too. Each poll is
+diffed against the last one and only what changed goes out: moved prices, status
+transitions, fixtures added or gone. Value-mode edges are recomputed for the fixtures whose
+1X2 (best price or consensus) moved, against model probabilities worked out once per fixture. Every event is
+serialised once and the same bytes are queued to all subscribers; a subscriber whose queue
+fills up (a stalled client) is sent a fresh snapshot instead of the deltas it missed.
+A feed nobody has watched for STREAM_IDLE_S stops polling.
+
+Each open stream holds a server thread for as long as the client watches, so a worker takes
+at most STREAM_MAX_SUBSCRIBERS viewers over all its feeds and turns the next one away.
+"""
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import os, queue, threading, time
+import numpy as np
+
+from . import fastjson
+from .metrics import REGISTRY
+from .value_mode import OUTCOMES, compute_value_mode_batch
+
+STREAM_ODDS_S       = float(os.getenv("STREAM_ODDS_S", "15"))
+STREAM_FIXTURES_S   = float(os.getenv("STREAM_FIXTURES_S", "60"))
+STREAM_IDLE_S       = float(os.getenv("STREAM_IDLE_S", "60"))
+STREAM_HEARTBEAT_S  = float(os.getenv("STREAM_HEARTBEAT_S", "15"))
+STREAM_QUEUE        = int(os.getenv("STREAM_QUEUE", "64"))        # undelivered events per client before a resync
+STREAM_MAX_FEEDS    = int(os.getenv("STREAM_MAX_FEEDS", "32"))    # distinct queries streamed per worker
+STREAM_MAX_SUBSCRIBERS = int(os.getenv("STREAM_MAX_SUBSCRIBERS", "8"))   # open streams per worker (each holds a thread)
+
+Key = Tuple[Optional[int], Optional[int], Optional[str]]           # (league_id, season, date)
+Item = Dict[str, Any]                                              # an /api/matches item
+# fetch(refresh_fixtures) -> items; probs(items) -> (N, 3) model 1/X/2 probabilities
+Fetch = Callable[[bool], List[Item]]
+Probs = Callable[[List[Item]], np.ndarray]
+
+TRACKED = ("status", "bookmaker", "best_bookmakers", "consensus")   # item fields sent whole when they change
+PRICED = ("odds", "market_odds", "best_odds")                       # diffed per selection
+
+def sse(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> bytes:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: ".encode() + fastjson.dumps(data) + b"\n\n"
+
+def _price_delta(old: Optional[Dict[str, float]], new: Optional[Dict[str, float]]) -> Dict[str, Optional[float]]:
+    """Selections whose price changed; None for a selection no longer quoted."""
+    old, new = old or {}, new or {}
+    out: Dict[str, Optional[float]] = {s: p for s, p in new.items() if old.get(s) != p}
+    out.update({s: None for s in old if s not in new})
+    return out
+
+def diff(old: Dict[int, Item], new: Dict[int, Item]) -> Tuple[List[Item], List[Dict[str, Any]], List[int]]:
+    """(added items, per-fixture changes, removed fixture ids) between two polls."""
+    added = [it for fid, it in new.items() if fid not in old]
+    removed = [fid for fid in old if fid not in new]
+    changes = []
+    for fid, it in new.items():
+        prev = old.get(fid)
+        if prev is None: continue
+        ch: Dict[str, Any] = {k: it.get(k) for k in TRACKED if it.get(k) != prev.get(k)}
+        for k in PRICED:
+            d = _price_delta(prev.get(k), it.get(k))
+            if d: ch[k] = d
+        if ch: changes.append({"fixture_id": fid, **ch})
+    return added, changes, removed
+
+def _prices_1x2(it: Item) -> Optional[Dict[str, float]]:
+    return it.get("best_odds") or it.get("odds")
+
+def value_mode(items: List[Item], wm: np.ndarray) -> List[Optional[Dict[str, Any]]]:
+    """
+    compute_value_mode for each item's best 1X2 price (its bookmaker's without one; None where it
+    has neither), against the de-vigged consensus where there is one; edges in percentage points.
+    """
+    odds = np.array([[float((_prices_1x2(it) or {}).get(k) or 0.0) for k in OUTCOMES] for it in items]).reshape(-1, 3)
+    market = np.array([[float(((it.get("consensus") or {}).get("percent") or {}).get(k, np.nan)) / 100 for k in OUTCOMES]
+                       for it in items]).reshape(-1, 3)
+    vm = compute_value_mode_batch(odds, wm, market)
+    out: List[Optional[Dict[str, Any]]] = []
+    for r, it in enumerate(items):
+        if not _prices_1x2(it):
+            out.append(None); continue
+        best = int(vm["best_idx"][r])
+        row = {"edge_percent_points": {k: round(float(e)*100, 2) for k, e in zip(OUTCOMES, vm["edge"][r])},
+               "best_edge_sel": OUTCOMES[best] if best >= 0 else None,
+               "efficient": bool(vm["efficient"][r])}
+        if it.get("consensus"):
+            row["market_edge_percent_points"] = {k: round(float(e)*100, 2) for k, e in zip(OUTCOMES, vm["market_edge"][r])}
+        out.append(row)
+    return out
+
+class Subscriber:
+    def __init__(self) -> None:
+        self.queue: "queue.Queue[Tuple[int, bytes]]" = queue.Queue(STREAM_QUEUE)   # (version, event)
+        self.resync = False   # queue overflowed: next read gets a snapshot instead
+
+class Feed:
+    def __init__(self, key: Key, fetch: Fetch, probs: Probs,
+                 odds_s: float = STREAM_ODDS_S, fixtures_s: float = STREAM_FIXTURES_S):
+        self.key, self.fetch, self.probs = key, fetch, probs
+        self.odds_s, self.fixtures_s = odds_s, fixtures_s
+        self._lock = threading.Lock()
+        self.subscribers: List[Subscriber] = []
+        self.items: Dict[int, Item] = {}              # last poll, fixture id -> item (with "value_mode")
+        self._wm: Dict[int, np.ndarray] = {}          # model probabilities per fixture, computed once
+        self.version = 0
+        self.polls, self.events, self.error = 0, 0, None
+        self.last_fixtures = 0.0
+        self.idle_since: Optional[float] = time.monotonic()
+        self.ready = threading.Event()                # first poll done (or failed)
+        self.stopped = False
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"stream-{key}", daemon=True)
+
+    def start(self) -> "Feed":
+        self._thread.start()
+        return self
+
+    # --- subscribers ---
+    def subscribe(self) -> Optional[Subscriber]:
+        """None once the feed has stopped (the hub then starts a new one)."""
+        sub = Subscriber()
+        with self._lock:
+            if self.stopped: return None
+            self.subscribers.append(sub)
+            self.idle_since = None
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        with self._lock:
+            if sub in self.subscribers: self.subscribers.remove(sub)
+            if not self.subscribers: self.idle_since = time.monotonic()
+
+    def snapshot(self) -> Tuple[int, bytes]:
+        with self._lock:
+            items = list(self.items.values())
+            version, error = self.version, self.error
+        return version, sse("snapshot", {"version": version, "count": len(items), "items": items, "error": error}, version)
+
+    def _publish(self, version: int, payload: bytes) -> None:
+        with self._lock:
+            subs = list(self.subscribers)
+        for sub in subs:
+            try: sub.queue.put_nowait((version, payload))
+            except queue.Full: sub.resync = True
+        self.events += 1
+        REGISTRY.inc("betrun_stream_events_total", value=len(subs))
+
+    # --- producer ---
+    def _with_value_mode(self, items: List[Item]) -> List[Item]:
+        if not items: return items
+        missing = [it for it in items if it["fixture_id"] not in self._wm]
+        if missing:
+            for it, p in zip(missing, self.probs(missing)): self._wm[it["fixture_id"]] = p
+        wm = np.array([self._wm[it["fixture_id"]] for it in items]).reshape(-1, 3)
+        for it, vm in zip(items, value_mode(items, wm)): it["value_mode"] = vm
+        return items
+
+    def poll(self, now: Optional[float] = None) -> Optional[bytes]:
+        """One upstream round; returns the delta event it published, None when nothing changed."""
+        now = time.monotonic() if now is None else now
+        refresh = now - self.last_fixtures >= self.fixtures_s
+        try:
+            fresh = {it["fixture_id"]: it for it in self.fetch(refresh) if it.get("fixture_id") is not None}
+        except Exception as e:
+            REGISTRY.inc("betrun_stream_polls_total", outcome="error")
+            first, self.error = self.error is None, str(e)
+            if first: self._publish(self.version, sse("upstream_error", {"version": self.version, "error": self.error}))
+            return None
+        self.polls += 1
+        self.error = None
+        if refresh: self.last_fixtures = now
+        REGISTRY.inc("betrun_stream_polls_total", outcome="ok")
+        added, changes, removed = diff(self.items, fresh)
+        # value mode only where the 1X2 moved (or the fixture is new); everyone else keeps theirs
+        moved = {c["fixture_id"] for c in changes if {"odds", "best_odds", "consensus"} & c.keys()} | {it["fixture_id"] for it in added}
+        for fid, it in fresh.items():
+            if fid not in moved: it["value_mode"] = self.items[fid].get("value_mode")
+        self._with_value_mode([fresh[fid] for fid in moved])
+        for c in changes:
+            if c["fixture_id"] in moved: c["value_mode"] = fresh[c["fixture_id"]]["value_mode"]
+        for fid in removed: self._wm.pop(fid, None)
+        if not (added or changes or removed):
+            return None
+        with self._lock:
+            self.items = fresh
+            self.version += 1
+            version = self.version
+        payload = sse("delta", {"version": version, "added": added, "changes": changes, "removed": removed}, version)
+        self._publish(version, payload)
+        return payload
+
+    def _run(self) -> None:
+        while True:
+            self.poll()
+            self.ready.set()
+            self._wake.wait(self.odds_s)
+            self._wake.clear()
+            with self._lock:
+                idle = self.idle_since is not None and time.monotonic() - self.idle_since >= STREAM_IDLE_S
+                if idle: self.stopped = True
+            if idle: return
+
+    def stream(self, sub: Subscriber, heartbeat_s: float = STREAM_HEARTBEAT_S) -> Iterator[bytes]:
+        """SSE bytes for one client: a snapshot, then deltas, with keep-alive comments in between."""
+        try:
+            self.ready.wait(self.odds_s)
+            seen, payload = self.snapshot()
+            yield b"retry: 5000\n\n" + payload
+            while True:
+                try:
+                    version, payload = sub.queue.get(timeout=heartbeat_s)
+                except queue.Empty:
+                    yield b": keep-alive\n\n"
+                    continue
+                if sub.resync:   # deltas were dropped: start this client over from the current state
+                    sub.resync = False
+                    while not sub.queue.empty(): sub.queue.get_nowait()
+                    seen, payload = self.snapshot()
+                elif version <= seen and not payload.startswith(b"event: upstream_error"):
+                    continue     # already part of the snapshot this client got
+                yield payload
+        finally:
+            self.unsubscribe(sub)
+
+    def status(self) -> Dict[str, Any]:
+        league_id, season, date = self.key
+        return {"league_id": league_id, "season": season, "date": date, "subscribers": len(self.subscribers),
+                "fixtures": len(self.items), "version": self.version, "polls": self.polls,
+                "events": self.events, "error": self.error}
+
+class Hub:
+    """Feeds by query; a feed is created on the first subscription and dropped once it stops."""
+    def __init__(self, max_feeds: int = STREAM_MAX_FEEDS, max_subscribers: int = STREAM_MAX_SUBSCRIBERS):
+        self.max_feeds, self.max_subscribers = max_feeds, max_subscribers
+        self._lock = threading.Lock()
+        self.feeds: Dict[Key, Feed] = {}
+
+    def subscribe(self, key: Key, fetch: Fetch, probs: Probs) -> Tuple[Feed, Subscriber]:
+        with self._lock:
+            if sum(len(f.subscribers) for f in self.feeds.values()) >= self.max_subscribers:
+                raise RuntimeError(f"too many live viewers (STREAM_MAX_SUBSCRIBERS={self.max_subscribers})")
+            feed = self.feeds.get(key)
+            if feed is None or feed.stopped:
+                self.feeds = {k: f for k, f in self.feeds.items() if not f.stopped}
+                if len(self.feeds) >= self.max_feeds:
+                    raise RuntimeError(f"too many live queries (STREAM_MAX_FEEDS={self.max_feeds})")
+                feed = self.feeds[key] = Feed(key, fetch, probs).start()
+            sub = feed.subscribe()
+            if sub is None:   # stopped between the check and the subscription
+                feed = self.feeds[key] = Feed(key, fetch, probs).start()
+                sub = feed.subscribe()
+            return feed, sub
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            feeds = [f.status() for f in self.feeds.values() if not f.stopped]
+        return {"pid": os.getpid(), "odds_s": STREAM_ODDS_S, "fixtures_s": STREAM_FIXTURES_S,
+                "subscribers": sum(f["subscribers"] for f in feeds), "max_subscribers": self.max_subscribers, "feeds": feeds}
+
+HUB = Hub()
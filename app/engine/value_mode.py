@@ -1,4 +1,6 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+import math
+import numpy as np
 
 def compute_value_mode(odds: Dict[str,float], wm_pct: Dict[str,float]) -> Dict[str, Any]:
     # implied percentages from odds (no de-vig here)
@@ -33,3 +35,55 @@ def compute_value_mode(odds: Dict[str,float], wm_pct: Dict[str,float]) -> Dict[s
         "efficient": efficient,
         "best_edge_sel": best_sel
     }
+
+OUTCOMES = ("1", "X", "2")
+
+def compute_value_mode_batch(odds: np.ndarray, wm: np.ndarray, market: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Array form of compute_value_mode for a slate.
+    odds: (N,3) decimal prices in 1/X/2 order, 0 where missing; wm: (N,3) model probabilities.
+    best_idx is -1 where compute_value_mode would return best_edge_sel=None.
+    market: optional (N,3) margin-free market probabilities (consensus.py), NaN rows where there
+    are none; adds market_percent and market_edge (model minus market) to the result.
+    """
+    odds = np.asarray(odds, dtype=float)
+    wm = np.asarray(wm, dtype=float)
+    priced = odds > 0
+    with np.errstate(divide="ignore"):
+        vm_percent = np.where(priced, 1.0 / np.where(priced, odds, 1.0), 0.0)
+        fair_odds = np.where(priced, 1.0 / np.where(wm != 0, wm, 1e-9), np.nan)
+    edge = np.where(priced, wm - vm_percent, -1.0)
+    best_idx = np.argmax(edge, axis=1)
+    best_edge = edge[np.arange(len(edge)), best_idx]
+    # the scalar loop only moves off None when an edge beats its -1.0 starting point
+    best_idx = np.where(best_edge > -1.0, best_idx, -1)
+    best_edge = np.where(best_idx >= 0, best_edge, -1.0)
+    out = {
+        "vm_percent": vm_percent,
+        "fair_odds": fair_odds,
+        "edge": edge,
+        "efficient": best_edge < 0.03,
+        "best_idx": best_idx,
+    }
+    if market is not None:
+        market = np.asarray(market, dtype=float)
+        out["market_percent"] = market
+        out["market_edge"] = wm - market
+    return out
+
+def value_mode_row(batch: Dict[str, np.ndarray], r: int, wm_pct: Dict[str, float]) -> Dict[str, Any]:
+    """Row r of compute_value_mode_batch in the dict shape returned by compute_value_mode."""
+    fair = batch["fair_odds"][r].tolist()
+    best = int(batch["best_idx"][r])
+    out = {
+        "vm_percent": dict(zip(OUTCOMES, batch["vm_percent"][r].tolist())),
+        "true_percent": wm_pct.copy(),
+        "fair_odds": {k: (None if math.isnan(v) else v) for k, v in zip(OUTCOMES, fair)},
+        "edge": dict(zip(OUTCOMES, batch["edge"][r].tolist())),
+        "efficient": bool(batch["efficient"][r]),
+        "best_edge_sel": OUTCOMES[best] if best >= 0 else None,
+    }
+    if "market_percent" in batch and not np.isnan(batch["market_percent"][r]).any():
+        out["market_percent"] = dict(zip(OUTCOMES, batch["market_percent"][r].tolist()))
+        out["market_edge"] = dict(zip(OUTCOMES, batch["market_edge"][r].tolist()))
+    return out
@@ -44,7 +44,7 @@ async function loadEnv(){
   }
 }
 
-async function getMatches(){
+function matchesQuery(){
   const leagueId = parseInt(el('leagueId').value || '0');
   const season   = parseInt(el('season').value || '0');
   const date     = el('matchDate').value || '';
@@ -52,39 +52,112 @@ async function getMatches(){
   if (leagueId) qs.set('league_id', String(leagueId));
   if (season) qs.set('season', String(season));
   if (date) qs.set('date', date);
-  const url = '/api/matches?'+qs.toString();
+  return qs.toString();
+}
+
+function matchCard(it){
+  const o = it.odds || {};
+  const book = it.bookmaker || '-';
+  const vm = it.value_mode;
+  const edge = (vm && vm.best_edge_sel) ? ` • Best edge <code>${vm.best_edge_sel}</code> ${vm.edge_percent_points[vm.best_edge_sel]}pp` : '';
+  const b = it.best_odds, c = it.consensus;
+  const market = b ? `<div class="muted">Best: ${['1','X','2'].map(k=>`${k} <code>${b[k]}</code> (${it.best_bookmakers[k]})`).join(' • ')}
+    • Consensus (${c.method}, ${c.bookmakers} books, margin ${c.margin_percent}%): ${['1','X','2'].map(k=>`${k} ${fmtPct(c.percent[k])}`).join(' • ')}</div>` : '';
+  return `
+    <div class="card match-item" data-fixture="${it.fixture_id}">
+      <div><b>${it.league}</b> — ${it.home} vs ${it.away} <span class="muted">(${new Date(it.utc).toLocaleString()}${it.status ? ' • '+it.status : ''})</span></div>
+      <div class="row" style="margin-top:6px;">
+        <div>Odds (${book}): 1 <code>${o["1"] || '-'}</code> • X <code>${o["X"] || '-'}</code> • 2 <code>${o["2"] || '-'}</code>${edge}</div>
+        <button class="btn" onclick="useMatch(${JSON.stringify(it).replace(/"/g,'&quot;')})">Use & Analyze</button>
+      </div>
+      ${market}
+    </div>`;
+}
+
+function renderMatches(items){
+  if (!items.length){
+    el('matchesList').innerHTML = '<p class="muted">No fixtures found.</p>'; return;
+  }
+  el('matchesList').innerHTML = items.map(matchCard).join('');
+}
 
+async function getMatches(){
+  const url = '/api/matches?'+matchesQuery();
   el('matchesList').innerHTML = 'Loading...';
   try {
     const data = await getJSON(url);
-    if (!data.items || !data.items.length){
-      el('matchesList').innerHTML = '<p class="muted">No fixtures found.</p>'; return;
-    }
-    let html = '';
-    for (const it of data.items){
-      const o = it.odds || {};
-      const book = it.bookmaker || '-';
-      html += `
-        <div class="card match-item" data-fixture="${it.fixture_id}">
-          <div><b>${it.league}</b> — ${it.home} vs ${it.away} <span class="muted">(${new Date(it.utc).toLocaleString()})</span></div>
-          <div class="row" style="margin-top:6px;">
-            <div>Odds (${book}): 1 <code>${o["1"] || '-'}</code> • X <code>${o["X"] || '-'}</code> • 2 <code>${o["2"] || '-'}</code></div>
-            <button class="btn" onclick="useMatch(${JSON.stringify(it).replace(/"/g,'&quot;')})">Use & Analyze</button>
-          </div>
-        </div>`;
-    }
-    el('matchesList').innerHTML = html;
+    renderMatches(data.items || []);
   } catch (e){
     el('matchesList').innerHTML = `<div class="card">Error: ${e.message}</div>`;
   }
 }
 
+// live odds: /api/matches/stream sends a snapshot, then only what changed
+let liveSource = null;
+let liveItems = new Map();
+
+function replaceCard(it){
+  const node = document.querySelector(`.match-item[data-fixture="${it.fixture_id}"]`);
+  if (!node) return;
+  node.outerHTML = matchCard(it);
+  document.querySelector(`.match-item[data-fixture="${it.fixture_id}"]`)?.classList.add('flash');
+}
+
+function applyDelta(d){
+  for (const it of d.added || []) liveItems.set(it.fixture_id, it);
+  for (const fid of d.removed || []) liveItems.delete(fid);
+  if ((d.added || []).length || (d.removed || []).length){
+    renderMatches([...liveItems.values()]);
+  }
+  for (const c of d.changes || []){
+    const it = liveItems.get(c.fixture_id);
+    if (!it) continue;
+    for (const k of ['odds', 'market_odds', 'best_odds']){
+      if (!c[k]) continue;
+      const m = {...(it[k] || {})};
+      for (const [sel, price] of Object.entries(c[k])){ if (price == null) delete m[sel]; else m[sel] = price; }
+      it[k] = Object.keys(m).length ? m : null;
+    }
+    for (const k of ['status', 'bookmaker', 'best_bookmakers', 'consensus', 'value_mode']){ if (k in c) it[k] = c[k]; }
+    replaceCard(it);
+  }
+}
+
+function toggleLive(){
+  if (liveSource){
+    liveSource.close(); liveSource = null;
+    el('btnLive').textContent = 'Live'; return;
+  }
+  el('matchesList').innerHTML = 'Connecting...';
+  liveSource = new EventSource('/api/matches/stream?'+matchesQuery());
+  el('btnLive').textContent = 'Stop Live';
+  liveSource.addEventListener('snapshot', ev => {
+    const d = JSON.parse(ev.data);
+    liveItems = new Map(d.items.map(it => [it.fixture_id, it]));
+    renderMatches(d.items);
+  });
+  liveSource.addEventListener('delta', ev => applyDelta(JSON.parse(ev.data)));
+  liveSource.addEventListener('upstream_error', ev => {
+    el('envPanel').textContent = 'Live odds: upstream error, retrying (' + JSON.parse(ev.data).error + ')';
+  });
+}
+
+// API-Football ids of the match picked from the list (fitted ratings are keyed on them)
+let pickedIds = null;
+// bookmaker prices for the other markets of the picked match ("Over 2.5", "BTTS Yes", "CS 1-0", ...)
+let pickedMarketOdds = null;
+// de-vigged market consensus of the picked match (value mode reports the model's edge over it)
+let pickedConsensus = null;
+
 function useMatch(it){
+  pickedIds = {league_id: it.league_id, home_id: it.home_id, away_id: it.away_id, home: it.home, away: it.away};
+  pickedMarketOdds = it.market_odds || null;
+  pickedConsensus = it.consensus || null;
   el('leagueLabel').value = it.league || '';
   el('seasonForm').value  = it.season || '';
   el('home').value = it.home || '';
   el('away').value = it.away || '';
-  const o = it.odds || {};
+  const o = it.best_odds || it.odds || {};   // value is judged at the best available price
   if (o["1"]) el('odds1').value = o["1"];
   if (o["X"]) el('oddsX').value = o["X"];
   if (o["2"]) el('odds2').value = o["2"];
@@ -109,6 +182,13 @@ async function analyzeFootball(){
     team_goal_lines: {"home": (homeTG.length? homeTG:[0.5,1.5]), "away": (awayTG.length? awayTG:[0.5,1.5])},
     cs_groups: [[1,0],[2,0],[2,1]]
   };
+  if (pickedIds && pickedIds.home === payload.home && pickedIds.away === payload.away) {
+    payload.league_id = pickedIds.league_id;
+    payload.home_id = pickedIds.home_id;
+    payload.away_id = pickedIds.away_id;
+    if (pickedMarketOdds) payload.odds = {...pickedMarketOdds, ...payload.odds};
+    if (pickedConsensus) payload.consensus = pickedConsensus;
+  }
 
   const data = await postJSON('/analyze/football', payload);
   renderFootball(data);
@@ -136,6 +216,14 @@ function renderFootball(data){
     r['notes'] || ''
   ]);
 
+  // value mode over the other priced markets
+  const vmm = data.value_mode_markets;
+  const vmmHTML = vmm ? `<h3>Value Mode — Other Markets</h3>
+    ${tableFromRows(['Selection','Odds','Implied %','True %','Fair Odds','Edge (pp)'], Object.keys(vmm.odds).map(k=>[
+      k, vmm.odds[k], fmtPct(vmm.implied_percent[k]), fmtPct(vmm.true_percent[k]), vmm.fair_odds[k] ?? '-', vmm.edge_percent_points[k]
+    ]))}
+    <p class="muted">Best Edge: ${vmm.best_edge_sel || '-'}</p>` : '';
+
   // markets
   let marketsHTML = '';
   if(data.markets){
@@ -158,6 +246,8 @@ function renderFootball(data){
         ${tableFromKeyMap('True %', data.value_mode_table?.true_percent)}
         ${tableFromKeyMap('Fair Odds', data.value_mode_table?.fair_odds)}
         ${tableFromKeyMap('Edge (pp)', data.value_mode_table?.edge_percent_points)}
+        ${data.value_mode_table?.market_percent ? tableFromKeyMap('Market % (de-vigged)', data.value_mode_table.market_percent) : ''}
+        ${data.value_mode_table?.market_edge_percent_points ? tableFromKeyMap('Edge vs Market (pp)', data.value_mode_table.market_edge_percent_points) : ''}
         <p class="muted">Best Edge: ${data.value_mode_table?.best_edge_sel || '-'}</p>
       </div>
     </div>
@@ -174,6 +264,7 @@ function renderFootball(data){
         ]])}
       </div>
     </div>
+    ${vmmHTML}
     <h3>Markets</h3>
     ${marketsHTML || '<p class="muted">No markets calculated.</p>'}
     <p class="muted">Sources: ${(data.sources || []).join(' • ')}</p>
@@ -183,5 +274,6 @@ function renderFootball(data){
 
 // wire buttons
 document.getElementById('btnGetMatches').addEventListener('click', getMatches);
+document.getElementById('btnLive').addEventListener('click', toggleLive);
 document.getElementById('btnEnv').addEventListener('click', loadEnv);
 document.getElementById('btnAnalyze').addEventListener('click', analyzeFootball);
@@ -0,0 +1 @@
+"""Repeatable benchmarks for the analysis engine and the /api/matches pipeline (python -m bench)."""
@@ -0,0 +1,38 @@
+# bench/__main__.py
+"""
+python -m bench [--suite micro,macro,api,replay,stream,load] [--quick] [--out results.json]
+                [--compare baseline.json] [--threshold 0.15]
+
+Exits 1 when --compare finds a benchmark whose median is more than threshold slower.
+"""
+import argparse, sys
+
+from .harness import compare, load, report, save
+from .suites import SUITES
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m bench")
+    ap.add_argument("--suite", default="micro,macro,api", help="comma list of: " + ",".join(SUITES))
+    ap.add_argument("--quick", action="store_true", help="fewer iterations, for smoke runs")
+    ap.add_argument("--out", help="write results JSON here")
+    ap.add_argument("--compare", help="baseline results JSON to check against")
+    ap.add_argument("--threshold", type=float, default=0.15, help="allowed median slowdown (0.15 = 15%%)")
+    args = ap.parse_args(argv)
+
+    results = []
+    for name in [s.strip() for s in args.suite.split(",") if s.strip()]:
+        if name not in SUITES:
+            ap.error(f"unknown suite {name!r}")
+        results.extend(SUITES[name](quick=args.quick))
+
+    rows = compare(results, load(args.compare), args.threshold) if args.compare else None
+    print(report(results, rows))
+    if args.out:
+        save(results, args.out)
+    if rows and any(r["regressed"] for r in rows):
+        print(f"\n{sum(r['regressed'] for r in rows)} benchmark(s) regressed by more than {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
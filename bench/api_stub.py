@@ -0,0 +1,67 @@
+# bench/api_stub.py
+"""In-process stub of the API-Football endpoints /api/matches uses, with configurable latency."""
+from typing import Any, Dict, Iterable
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import json, threading, time
+
+from .fixtures import fixture_entry, odds_entry
+
+class StubAPI:
+    def __init__(self, n_fixtures: int = 40, latency_s: float = 0.0, page_size: int = 10, n_bookmakers: int = 1):
+        self.n_fixtures = n_fixtures
+        self.latency_s = latency_s
+        self.page_size = page_size
+        self.n_bookmakers = n_bookmakers
+        self.calls: Dict[str, int] = {}
+        self.moves: Dict[int, int] = {}   # fixture id -> times its odds moved (the odds seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    def body(self, path: str, q: Dict[str, str]) -> Dict[str, Any]:
+        ids = [1_000_000 + i for i in range(self.n_fixtures)]
+        if path == "/fixtures":
+            return {"paging": {"current": 1, "total": 1}, "response": [fixture_entry(fid, i) for i, fid in enumerate(ids)]}
+        if path == "/odds" and "fixture" in q:
+            fid = int(q["fixture"])
+            return {"paging": {"current": 1, "total": 1}, "response": [self.odds(fid)] if fid in ids else []}
+        if path == "/odds":
+            page = int(q.get("page", 1))
+            total = max(1, -(-len(ids) // self.page_size))
+            chunk = ids[(page-1)*self.page_size: page*self.page_size]
+            return {"paging": {"current": page, "total": total}, "response": [self.odds(fid) for fid in chunk]}
+        return {"paging": {"current": 1, "total": 1}, "response": []}
+
+    def odds(self, fid: int) -> Dict[str, Any]:
+        return odds_entry(fid, self.n_bookmakers, seed=self.moves.get(fid, 0))
+
+    def move(self, fixture_ids: Iterable[int]) -> None:
+        """Reprice these fixtures (every market of every bookmaker) from the next call on."""
+        with self._lock:
+            for fid in fixture_ids: self.moves[fid] = self.moves.get(fid, 0) + 1
+
+    def start(self) -> str:
+        stub = self
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # headers and body go out in separate writes
+            def log_message(self, *args): pass
+            def do_GET(self):
+                u = urlparse(self.path)
+                q = {k: v[0] for k, v in parse_qs(u.query).items()}
+                with stub._lock: stub.calls[u.path] = stub.calls.get(u.path, 0) + 1
+                if stub.latency_s: time.sleep(stub.latency_s)
+                data = json.dumps(stub.body(u.path, q)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown(); self._server.server_close()
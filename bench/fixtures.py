@@ -0,0 +1,65 @@
+# bench/fixtures.py
+"""Deterministic synthetic inputs shared by the suites."""
+from typing import Any, Dict, List
+import random
+
+def match_payload(rng: random.Random, **overrides: Any) -> Dict[str, Any]:
+    p = {
+        "league": "EPL", "season": 2025, "home": "Home FC", "away": "Away FC",
+        "odds": {"1": round(rng.uniform(1.4, 6.0), 2), "X": round(rng.uniform(2.8, 4.5), 2), "2": round(rng.uniform(1.4, 6.0), 2)},
+        "context": {"derby": rng.random() < 0.2},
+        "ou_lines": [1.5,2.5,3.5],
+        "team_goal_lines": {"home":[0.5,1.5], "away":[0.5,1.5]},
+        "cs_groups": [[1,0],[2,0],[2,1]],
+    }
+    p.update(overrides)
+    return p
+
+def slate(n: int, seed: int = 7, **overrides: Any) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [match_payload(rng, **overrides) for _ in range(n)]
+
+def odds_entry(fixture_id: int, n_bookmakers: int = 1, seed: int = 0, full: bool = False) -> Dict[str, Any]:
+    """
+    One /odds response entry with Match Winner, Goals Over/Under and BTTS per bookmaker; with
+    full, also Double Chance, team totals, Exact Score and an Asian line, as real feeds carry.
+    """
+    rng = random.Random(seed * 7919 + fixture_id)
+    bms = []
+    for b in range(n_bookmakers):
+        price = lambda lo, hi: f"{rng.uniform(lo, hi):.2f}"
+        bms.append({
+            "id": 8 if b == 0 else 100 + b,
+            "name": "Bet365" if b == 0 else f"Book{b}",
+            "bets": [
+                {"id": 1, "name": "Match Winner", "values": [
+                    {"value": "Home", "odd": price(1.4, 6)}, {"value": "Draw", "odd": price(2.8, 4.5)},
+                    {"value": "Away", "odd": price(1.4, 6)}]},
+                {"id": 5, "name": "Goals Over/Under", "values": [
+                    v for line in ("1.5", "2.5", "3.5")
+                    for v in ({"value": f"Over {line}", "odd": price(1.2, 3.5)}, {"value": f"Under {line}", "odd": price(1.2, 3.5)})]},
+                {"id": 8, "name": "Both Teams Score", "values": [
+                    {"value": "Yes", "odd": price(1.5, 2.4)}, {"value": "No", "odd": price(1.5, 2.4)}]},
+            ],
+        })
+        if full:
+            bms[-1]["bets"] += [
+                {"id": 12, "name": "Double Chance", "values": [
+                    {"value": v, "odd": price(1.05, 2.2)} for v in ("Home/Draw", "Home/Away", "Draw/Away")]},
+                {"id": 16, "name": "Total - Home", "values": [
+                    {"value": f"{side} {line}", "odd": price(1.2, 3.5)} for line in ("0.5", "1.5", "2.5") for side in ("Over", "Under")]},
+                {"id": 17, "name": "Total - Away", "values": [
+                    {"value": f"{side} {line}", "odd": price(1.2, 3.5)} for line in ("0.5", "1.5", "2.5") for side in ("Over", "Under")]},
+                {"id": 10, "name": "Exact Score", "values": [
+                    {"value": f"{h}:{a}", "odd": price(6, 120)} for h in range(5) for a in range(5)]},
+                {"id": 4, "name": "Asian Handicap", "values": [
+                    {"value": f"Home {hc}", "odd": price(1.6, 2.4)} for hc in ("-1", "-0.5", "+0.5")]},
+            ]
+    return {"league": {"id": 39, "season": 2025}, "fixture": {"id": fixture_id}, "bookmakers": bms}
+
+def fixture_entry(fixture_id: int, i: int) -> Dict[str, Any]:
+    return {
+        "fixture": {"id": fixture_id, "date": "2025-09-20T14:00:00+00:00", "status": {"short": "NS"}},
+        "league": {"id": 39, "name": "Premier League", "season": 2025},
+        "teams": {"home": {"id": 1000 + 2*i, "name": f"Home {i}"}, "away": {"id": 1001 + 2*i, "name": f"Away {i}"}},
+    }
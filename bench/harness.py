@@ -0,0 +1,74 @@
+# bench/harness.py
+from typing import Any, Callable, Dict, List, Optional
+import json, os, platform, statistics, sys, time
+from datetime import datetime, timezone
+
+def measure(name: str, fn: Callable[[], Any], number: int = 100, repeat: int = 7,
+            warmup: int = 1, **meta: Any) -> Dict[str, Any]:
+    """
+    Time fn `number` times per round for `repeat` rounds (after warmup calls).
+    Per-call seconds are reported; the median is what regressions are judged on.
+    """
+    for _ in range(warmup): fn()
+    per_call: List[float] = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number): fn()
+        per_call.append((time.perf_counter() - t0) / number)
+    return {
+        "name": name,
+        "number": number,
+        "repeat": repeat,
+        "min_s": min(per_call),
+        "median_s": statistics.median(per_call),
+        "mean_s": statistics.fmean(per_call),
+        "stdev_s": statistics.stdev(per_call) if len(per_call) > 1 else 0.0,
+        **meta,
+    }
+
+def environment() -> Dict[str, Any]:
+    import numpy as np
+    return {
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+def save(results: List[Dict[str, Any]], path: str) -> None:
+    with open(path, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+
+def load(path: str) -> Dict[str, Dict[str, Any]]:
+    with open(path) as f:
+        return {r["name"]: r for r in json.load(f).get("results", [])}
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float) -> List[Dict[str, Any]]:
+    """Rows for benchmarks present in both runs; regressed when median grew by more than threshold."""
+    rows = []
+    for r in results:
+        b = baseline.get(r["name"])
+        if not b or not b.get("median_s"): continue
+        ratio = r["median_s"] / b["median_s"]
+        rows.append({"name": r["name"], "baseline_s": b["median_s"], "current_s": r["median_s"],
+                     "ratio": ratio, "regressed": ratio > 1.0 + threshold})
+    return rows
+
+def fmt_time(s: float) -> str:
+    if s < 1e-3: return f"{s*1e6:9.1f} us"
+    if s < 1.0: return f"{s*1e3:9.2f} ms"
+    return f"{s:9.3f} s "
+
+def report(results: List[Dict[str, Any]], rows: Optional[List[Dict[str, Any]]] = None) -> str:
+    by_name = {r["name"]: r for r in rows or []}
+    lines = []
+    for r in results:
+        line = f"{r['name']:<44} {fmt_time(r['median_s'])}  (min {fmt_time(r['min_s']).strip()}, ±{fmt_time(r['stdev_s']).strip()})"
+        if "rps" in r:
+            line += f"  {r['rps']:.0f} req/s, p95 {fmt_time(r['p95_s']).strip()}"
+        c = by_name.get(r["name"])
+        if c:
+            line += f"  x{c['ratio']:.2f} vs baseline" + ("  REGRESSED" if c["regressed"] else "")
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,259 @@
+# bench/suites.py
+from typing import Any, Callable, Dict, List
+import random
+import numpy as np
+
+from app.engine import football as fb
+from app.engine import markets as mk
+from app.engine import odds as od
+from app.engine import consensus as cs
+from app.engine import fastjson
+from app.engine.slate import Slate
+from app.engine.value_mode import compute_value_mode
+from .fixtures import slate, match_payload, odds_entry, fixture_entry
+from .harness import measure
+
+GRID_SIZES = (6, 8, 10, 12, 15)
+
+def micro(quick: bool = False) -> List[Dict[str, Any]]:
+    n = 200 if quick else 2000
+    out = []
+    for g in GRID_SIZES:
+        out.append(measure(f"poisson_prob_matrix[g={g}]", lambda: fb.poisson_prob_matrix(1.35, 1.2, g, 0.02), number=n, max_goals=g))
+        P = fb.poisson_prob_matrix(1.35, 1.2, g, 0.02)
+        fns: Dict[str, Callable[[], Any]] = {
+            "probs_from_matrix": lambda: fb.probs_from_matrix(P),
+            "over_under_probs": lambda: fb.over_under_probs(P, 2.5),
+            "btts_probs": lambda: fb.btts_probs(P),
+            "team_goals_over": lambda: fb.team_goals_over(P, "home", 1.5),
+            "winning_margin_probs": lambda: fb.winning_margin_probs(P),
+        }
+        for name, fn in fns.items():
+            out.append(measure(f"{name}[g={g}]", fn, number=n, max_goals=g))
+    # backtest-shaped: distinct fitted lambdas, so nothing is shared through the grid cache
+    rng = np.random.default_rng(5)
+    lh, la = rng.uniform(0.5, 2.6, 2000), rng.uniform(0.4, 2.2, 2000)
+    for eps in (0.0, 1e-6, 1e-4):
+        sizes = fb.adaptive_max_goals(lh, la, eps) if eps else np.full(len(lh), fb.MAX_GOALS)
+        def sheets():
+            for g in np.unique(sizes).tolist():
+                idx = np.flatnonzero(sizes == g)
+                mk.evaluate(fb.poisson_prob_tensor(lh[idx], la[idx], g, 0.05), mk.mask_set(mk.mask_spec(g)))
+        label = f"goal_epsilon={eps:g}" if eps else f"max_goals={fb.MAX_GOALS}"
+        out.append(measure(f"grids + markets[2000 fixtures, {label}]", sheets, number=max(1, n // 200),
+                           fixtures=2000, grid_bytes=int(((sizes + 1) ** 2).sum() * 8)))
+    wm = {"1": 0.42, "X": 0.27, "2": 0.31}
+    out.append(measure("compute_value_mode", lambda: compute_value_mode({"1": 2.1, "X": 3.4, "2": 3.6}, wm), number=n))
+
+    for nb in (1, 20):
+        resp = [odds_entry(1_000_000, n_bookmakers=nb, full=True)]
+        out.append(measure(f"odds.parse_odds[{nb} bookmaker{'s' if nb > 1 else ''}, all markets]",
+                           lambda: od.parse_odds(resp), number=n))
+    for nb in (1, 20):
+        resp = [odds_entry(1_000_000 + i, n_bookmakers=nb, full=True) for i in range(40)]
+        out.append(measure(f"odds.parse_odds[slate 40 x {nb} bookmaker{'s' if nb > 1 else ''}]",
+                           lambda: od.parse_odds(resp), number=max(1, n // 100), fixtures=40))
+    books = list(od.parse_odds([odds_entry(1_000_000 + i, n_bookmakers=20) for i in range(300)]).values())
+    for method in cs.METHODS:
+        def aggregate():
+            prices = cs.slate_1x2(books)
+            return cs.best_prices(prices), cs.consensus(prices, method)
+        out.append(measure(f"consensus[300 x 20 bookmakers, {method}]", aggregate, number=max(1, n // 200), fixtures=300))
+    fx = [fixture_entry(1_000_000 + i, i) for i in range(2000)]
+    by_id = od.parse_odds([odds_entry(1_000_000 + i, n_bookmakers=5) for i in range(2000)])
+    books2k = [by_id.get(f["fixture"]["id"]) for f in fx]
+    out.append(measure("slate[2000 x 5 bookmakers] columns + items", lambda: Slate(fx).attach(books2k, 8, "Bet365", "shin").items(),
+                       number=1, repeat=3 if quick else 7, fixtures=2000))
+    body = {"count": len(fx), "items": Slate(fx).attach(books2k, 8, "Bet365", "shin").items()}
+    out.append(measure(f"fastjson.dumps[2000 items, {fastjson.ENCODER}]", lambda: fastjson.dumps(body),
+                       number=1, repeat=3 if quick else 7, fixtures=2000))
+    return out
+
+def macro(quick: bool = False) -> List[Dict[str, Any]]:
+    rng = random.Random(3)
+    one = match_payload(rng, odds={"1": 4.2, "X": 3.4, "2": 1.9})   # priced to pass the 5% edge rule
+    payloads = slate(300)
+    out = [measure("analyze_football_match", lambda: fb.analyze_football_match(one), number=50 if quick else 500)]
+    out.append(measure("slate[300] loop analyze_football_match", lambda: [fb.analyze_football_match(p) for p in payloads],
+                       number=1, repeat=3 if quick else 7, fixtures=300))
+    out.append(measure("slate[300] analyze_football_batch", lambda: fb.analyze_football_batch(payloads),
+                       number=1, repeat=3 if quick else 7, fixtures=300))
+    return out
+
+def api(quick: bool = False, n_fixtures: int = 40, latency_s: float = 0.02) -> List[Dict[str, Any]]:
+    """/api/matches end to end against the local stub; the adapter cache is off so every call goes upstream."""
+    from .api_stub import StubAPI
+    from app import app as web
+    from app.engine.adapters import live_football
+
+    stub = StubAPI(n_fixtures=n_fixtures, latency_s=latency_s)
+    base = stub.start()
+    saved = (web.APISPORTS_BASE, web.APISPORTS_KEY, live_football.BASE, live_football.CACHE)
+    web.APISPORTS_BASE, web.APISPORTS_KEY, live_football.BASE, live_football.CACHE = base, "bench", base, None
+    try:
+        client = web.app.test_client()
+        def call():
+            r = client.get("/api/matches?league_id=39&season=2025")
+            assert r.status_code == 200, r.data
+        res = measure(f"/api/matches[{n_fixtures} fixtures, {int(latency_s*1000)}ms upstream]", call,
+                      number=1, repeat=3 if quick else 7, fixtures=n_fixtures, latency_s=latency_s)
+        res["upstream_calls_per_request"] = round(sum(stub.calls.values()) / (res["repeat"] + 1), 2)
+        return [res]
+    finally:
+        web.APISPORTS_BASE, web.APISPORTS_KEY, live_football.BASE, live_football.CACHE = saved
+        stub.stop()
+
+def replay(quick: bool = False, n_fixtures: int = 40, latency_ms: float = 20.0) -> List[Dict[str, Any]]:
+    """
+    /api/matches against a replayed corpus: BENCH_CORPUS if set, else the stub recorded into a
+    temporary one. Fixed latency, no jitter or errors, so runs compare like for like offline.
+    """
+    import os, shutil, tempfile
+    from .api_stub import StubAPI
+    from app import app as web
+    from app.engine.adapters import live_football
+    from app.engine.adapters.replay import Corpus, Replayer, ReplayServer
+
+    corpus = Corpus(os.getenv("BENCH_CORPUS") or tempfile.mkdtemp(prefix="betrun_corpus_"))
+    saved = (web.APISPORTS_BASE, web.APISPORTS_KEY, live_football.BASE, live_football.CACHE)
+    def point(base):
+        web.APISPORTS_BASE, web.APISPORTS_KEY, live_football.BASE, live_football.CACHE = base, "bench", base, None
+    client = web.app.test_client()
+    try:
+        if not os.getenv("BENCH_CORPUS"):
+            stub = StubAPI(n_fixtures=n_fixtures)
+            recorder = ReplayServer(Replayer(corpus, "record"), stub.start())
+            point(recorder.start())
+            client.get("/api/matches?league_id=39&season=2025")
+            recorder.stop(); stub.stop()
+        replayer = Replayer(corpus, "replay", latency_ms=str(latency_ms))
+        server = ReplayServer(replayer)
+        point(server.start())
+        def call():
+            r = client.get("/api/matches?league_id=39&season=2025")
+            assert r.status_code == 200, r.data
+        res = measure(f"/api/matches[replay, {int(latency_ms)}ms upstream]", call,
+                      number=1, repeat=3 if quick else 7, latency_s=latency_ms / 1000)
+        res["upstream_calls_per_request"] = round(replayer.counters["hits"] / (res["repeat"] + 1), 2)
+        res["replay_misses"] = replayer.counters["misses"]
+        server.stop()
+        return [res]
+    finally:
+        web.APISPORTS_BASE, web.APISPORTS_KEY, live_football.BASE, live_football.CACHE = saved
+        if not os.getenv("BENCH_CORPUS"): shutil.rmtree(corpus.directory, ignore_errors=True)
+
+def stream(quick: bool = False, n_fixtures: int = 40, moved: int = 5) -> List[Dict[str, Any]]:
+    """
+    One live-odds poll (upstream round, diff, value mode for the moved fixtures, fan-out) with
+    `moved` fixtures repriced each time, for 1 and 100 viewers. Upstream calls per poll should not
+    depend on the viewer count.
+    """
+    from .api_stub import StubAPI
+    from app import app as web
+    from app.engine.adapters import live_football
+    from app.engine.stream import Feed
+
+    stub = StubAPI(n_fixtures=n_fixtures)
+    base = stub.start()
+    saved = (web.APISPORTS_BASE, web.APISPORTS_KEY, live_football.BASE, live_football.CACHE)
+    web.APISPORTS_BASE, web.APISPORTS_KEY, live_football.BASE, live_football.CACHE = base, "bench", base, None
+    ids = [1_000_000 + i for i in range(n_fixtures)]
+    out = []
+    try:
+        for viewers in (1, 100):
+            feed = Feed((39, 2025, None), lambda refresh: web._match_slate(39, 2025, None).items(), web._model_probs)
+            subs = [feed.subscribe() for _ in range(viewers)]
+            feed.poll()
+            before = sum(stub.calls.values())
+            def poll():
+                stub.move(ids[:moved])
+                assert feed.poll() is not None
+                for sub in subs:
+                    while not sub.queue.empty(): sub.queue.get_nowait()
+            res = measure(f"stream.poll[{n_fixtures} fixtures, {moved} moved, {viewers} viewers]", poll,
+                          number=1, repeat=5 if quick else 20, fixtures=n_fixtures, viewers=viewers)
+            res["upstream_calls_per_poll"] = round((sum(stub.calls.values()) - before) / (res["repeat"] + 1), 2)
+            out.append(res)
+        return out
+    finally:
+        web.APISPORTS_BASE, web.APISPORTS_KEY, live_football.BASE, live_football.CACHE = saved
+        stub.stop()
+
+def _server(argv: List[str], port: int, env: Dict[str, str]):
+    """Start a server process and wait until it answers on the port."""
+    import subprocess, time, httpx
+    proc = subprocess.Popen(argv, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/stream_status", timeout=1)
+            return proc
+        except httpx.TransportError:
+            if proc.poll() is not None: break
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f"server did not start: {' '.join(argv)}")
+
+def _drive(url: str, clients: int, requests: int) -> List[float]:
+    """`requests` GETs from `clients` concurrent keep-alive clients; per-request seconds."""
+    import asyncio, time, httpx
+    async def run() -> List[float]:
+        latencies: List[float] = []
+        left = iter(range(requests))
+        limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+        async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+            async def worker():
+                for _ in left:
+                    t0 = time.perf_counter()
+                    r = await client.get(url)
+                    assert r.status_code == 200, r.text
+                    latencies.append(time.perf_counter() - t0)
+            await asyncio.gather(*(worker() for _ in range(clients)))
+        return latencies
+    return asyncio.run(run())
+
+def load(quick: bool = False, n_fixtures: int = 40, latency_s: float = 0.05, clients: int = 64,
+         threads: int = 16) -> List[Dict[str, Any]]:
+    """
+    /api/matches under `clients` concurrent clients, one worker each: gunicorn gthread with
+    `threads` threads vs the ASGI app under uvicorn, against the local stub with the response
+    cache off. Per-request latency is reported like the other suites; req/s is the comparison.
+    """
+    import os, socket, statistics, sys, time
+    from .api_stub import StubAPI
+
+    stub = StubAPI(n_fixtures=n_fixtures, latency_s=latency_s)
+    base = stub.start()
+    env = {**os.environ, "APISPORTS_BASE": base, "APISPORTS_KEY": "bench", "API_CACHE": "0",
+           "PICK_STORE": "memory", "PREFETCH_LEAGUES": "", "RATINGS_ONLINE": "0"}
+    requests = 64 if quick else 320
+    out = []
+    try:
+        for name, argv in (
+            (f"gthread[{threads} threads]", [sys.executable, "-m", "gunicorn", "-w", "1", "-k", "gthread",
+                                             "--threads", str(threads), "app.app:app"]),
+            ("asgi[uvicorn]", [sys.executable, "-m", "uvicorn", "app.asgi:app", "--workers", "1", "--no-access-log"]),
+        ):
+            with socket.socket() as s:
+                s.bind(("127.0.0.1", 0)); port = s.getsockname()[1]
+            argv = argv + (["-b", f"127.0.0.1:{port}"] if "gunicorn" in argv else ["--port", str(port)])
+            proc = _server(argv, port, env)
+            try:
+                url = f"http://127.0.0.1:{port}/api/matches?league_id=39&season=2025"
+                _drive(url, clients, clients)      # warm up connections and imports
+                before = sum(stub.calls.values())
+                t0 = time.perf_counter()
+                lat = sorted(_drive(url, clients, requests))
+                wall = time.perf_counter() - t0
+            finally:
+                proc.terminate(); proc.wait(10)
+            out.append({"name": f"load /api/matches {name}[{clients} clients]", "number": 1, "repeat": len(lat),
+                        "min_s": lat[0], "median_s": statistics.median(lat), "mean_s": statistics.fmean(lat),
+                        "stdev_s": statistics.stdev(lat), "p95_s": lat[int(0.95 * (len(lat) - 1))],
+                        "rps": round(len(lat) / wall, 1), "clients": clients, "fixtures": n_fixtures,
+                        "latency_s": latency_s,
+                        "upstream_calls_per_request": round((sum(stub.calls.values()) - before) / len(lat), 2)})
+        return out
+    finally:
+        stub.stop()
+
+SUITES = {"micro": micro, "macro": macro, "api": api, "replay": replay, "stream": stream, "load": load}
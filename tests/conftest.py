@@ -0,0 +1,33 @@
+# tests/conftest.py
+"""
+Engine and route tests. The app reads its settings at import time, so the environment is
+pinned here before anything under app/ is imported: picks in memory, ratings, metrics and
+backtests in a scratch directory, the API cache in memory, no prefetching, no upstream key
+or base other than a placeholder.
+"""
+import os, sys, tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+SCRATCH = tempfile.mkdtemp(prefix="betrun_tests_")
+os.environ.update({
+    "PICK_STORE": "memory",
+    "RATINGS_DIR": os.path.join(SCRATCH, "ratings"),
+    "METRICS_DIR": os.path.join(SCRATCH, "metrics"),
+    "BACKTEST_DIR": os.path.join(SCRATCH, "backtest"),
+    "API_CACHE_DB": "",
+    "API_CORPUS": "",
+    "PREFETCH_LEAGUES": "",
+    "APISPORTS_KEY": "test",
+    "APISPORTS_BASE": "http://127.0.0.1:9",
+})
+
+import pytest
+
+@pytest.fixture
+def client():
+    from app import app as web
+    web.app.config.update(TESTING=True)
+    return web.app.test_client()
@@ -0,0 +1,56 @@
+# tests/test_adaptive_grid.py
+import json
+import numpy as np
+import pytest
+
+from app.engine import football as fb
+
+LAMBDAS = {1: (0.4, 0.3, 0.02), 2: (1.5, 1.1, 0.05), 3: (3.8, 0.6, -0.02), 4: (2.4, 2.6, 0.0)}
+lookup = lambda league, home, away: LAMBDAS.get(home)
+
+def _payload(k, **extra):
+    return {"home": f"H{k}", "away": f"A{k}", "league_id": 39, "home_id": k, "away_id": 100 + k,
+            "odds": {"1": 2.1, "X": 3.3, "2": 3.6}, **extra}
+
+def test_tail_mass_is_what_the_grid_leaves_out():
+    lh, la, g = 2.2, 1.7, 6
+    inside = np.multiply.outer(fb.poisson_pmf(lh, 60), fb.poisson_pmf(la, 60))[:g + 1, :g + 1].sum()
+    assert fb.tail_mass(lh, la, g) == pytest.approx(1 - inside, abs=1e-12)
+
+@pytest.mark.parametrize("eps", [1e-3, 1e-6, 1e-9])
+def test_adaptive_size_is_the_smallest_under_epsilon(eps):
+    lh, la = np.array([0.3, 1.2, 2.5, 4.0]), np.array([0.2, 1.0, 2.8, 0.9])
+    for k, g in enumerate(fb.adaptive_max_goals(lh, la, eps).tolist()):
+        assert fb.tail_mass(lh[k], la[k], g) < eps or g == fb.MAX_GOALS_CAP   # the cap bounds the grid
+        assert g == 1 or fb.tail_mass(lh[k], la[k], g - 1) >= eps
+
+def test_adaptive_probabilities_stay_within_epsilon():
+    eps = 1e-4
+    adaptive = [_payload(k, goal_epsilon=eps) for k in LAMBDAS]
+    params, probs, _ = fb.match_probabilities(adaptive, lookup=lookup)
+    _, full, _ = fb.match_probabilities([_payload(k, max_goals=fb.MAX_GOALS_CAP) for k in LAMBDAS], lookup=lookup)
+    sizes = fb._grid_sizes(adaptive, params)
+    assert len(set(sizes.tolist())) > 1
+    np.testing.assert_allclose(probs, full, atol=eps)
+    for r, g in zip(fb.analyze_football_batch(adaptive, lookup=lookup), sizes.tolist()):
+        if "audit" not in r: continue   # skipped: no value at these odds
+        assert r["audit"]["grid"]["max_goals"] == g and r["audit"]["grid"]["discarded_mass"] < eps
+
+def test_mixed_sizes_batch_equals_single():
+    payloads = [_payload(1, goal_epsilon=1e-6), _payload(2), _payload(3, max_goals=12), _payload(4, goal_epsilon=1e-3)]
+    batch = fb.analyze_football_batch(payloads, lookup=lookup)
+    for p, b in zip(payloads, batch):
+        assert json.dumps(fb.analyze_football_batch([p], lookup=lookup)[0], sort_keys=True) == json.dumps(b, sort_keys=True)
+
+def test_epsilon_zero_keeps_the_fixed_grid():
+    payloads = [_payload(2, goal_epsilon=0), _payload(3, goal_epsilon=None)]
+    params, _, _ = fb.match_probabilities(payloads, lookup=lookup)
+    assert fb._grid_sizes(payloads, params).tolist() == [fb.MAX_GOALS] * 2
+
+@pytest.mark.parametrize("bad", ["abc", -0.1, 1, 1.5, "nan", float("inf"), True, [0.01]])
+def test_bad_goal_epsilon_is_a_400(client, bad):
+    r = client.post("/analyze/football", json={"home": "A", "away": "B", "goal_epsilon": bad,
+                                                "odds": {"1": 4.2, "X": 3.4, "2": 1.9}})
+    assert r.status_code == 400 and "goal_epsilon" in r.get_json()["reason"]
+    with pytest.raises(fb.PayloadError):
+        fb.match_probabilities([{"home": "A", "away": "B", "goal_epsilon": bad}])
@@ -0,0 +1,95 @@
+# tests/test_asgi.py
+import asyncio, threading
+import httpx
+import pytest
+
+from app import app as web
+from app import asgi
+from app.engine.adapters import live_football as lf
+from app.engine.adapters.cache import ResponseCache
+from bench.api_stub import StubAPI
+
+@pytest.fixture
+def upstream(monkeypatch):
+    stub = StubAPI(n_fixtures=12)
+    base = stub.start()
+    monkeypatch.setattr(web, "APISPORTS_BASE", base)
+    monkeypatch.setattr(lf, "BASE", base)
+    monkeypatch.setattr(lf, "CACHE", None)
+    yield stub
+    stub.stop()
+
+def _asgi_get(url):
+    async def go():
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi.app), base_url="http://t") as c:
+                return await c.get(url)
+        finally:
+            await asgi.aio.aclose()
+    return asyncio.run(go())
+
+def test_matches_match_the_flask_route(upstream, client):
+    url = "/api/matches?league_id=39&season=2025"
+    sync = client.get(url).get_json()
+    r = _asgi_get(url)
+    assert r.status_code == 200 and r.json() == sync and sync["count"] == 12
+
+def test_blocking_helpers_run_off_the_loop(upstream, monkeypatch):
+    threads = {}
+    for name in ("_fixture_slate", "_bulk_books", "_attach_odds"):
+        real = getattr(web, name)
+        def wrapped(*a, _real=real, _name=name):
+            threads[_name] = threading.get_ident()
+            return _real(*a)
+        monkeypatch.setattr(web, name, wrapped)
+    async def go():
+        loop_thread = threading.get_ident()
+        try: slate = await asgi.match_slate(39, 2025, None)
+        finally: await asgi.aio.aclose()
+        return loop_thread, slate
+    loop_thread, slate = asyncio.run(go())
+    assert len(slate) == 12
+    assert set(threads) == {"_fixture_slate", "_bulk_books", "_attach_odds"}
+    assert loop_thread not in threads.values()
+
+def test_async_paging_matches_the_sync_pull(monkeypatch):
+    stub = StubAPI(n_fixtures=25, page_size=10)
+    base = stub.start()
+    monkeypatch.setattr(lf, "BASE", base)
+    monkeypatch.setattr(lf, "CACHE", None)
+    async def go(**kw):
+        try: return await asgi.aio.odds_bulk(39, 2025, **kw)
+        finally: await asgi.aio.aclose()
+    try:
+        assert asyncio.run(go()) == lf.odds_bulk(39, 2025)
+        assert len(asyncio.run(go(max_pages=2))) == 20
+    finally:
+        stub.stop()
+    assert stub.calls["/odds"] == 3 + 3 + 2
+
+def test_odds_fallback_and_fixtures_errors_match_the_flask_route(upstream, client, monkeypatch):
+    url = "/api/matches?league_id=39&season=2025"
+    bulk, pages = client.get(url).get_json(), upstream.calls["/odds"]
+    async def down(*a, **k): raise RuntimeError("upstream down")
+    monkeypatch.setattr(asgi.aio, "odds_bulk", down)
+    assert _asgi_get(url).json() == bulk and upstream.calls["/odds"] == pages + 12   # one call per fixture
+    def down_sync(*a, **k): raise RuntimeError("upstream down")
+    monkeypatch.setattr(asgi.aio, "fixtures", down)
+    monkeypatch.setattr(lf, "fixtures", down_sync)
+    r = _asgi_get(url)
+    assert r.status_code == 502 and r.json() == client.get(url).get_json() == {"error": "fixtures: upstream down"}
+
+def test_async_cache_reads_and_writes_sqlite_off_the_loop(tmp_path):
+    cache = ResponseCache(db_path=str(tmp_path / "cache.sqlite"))
+    seen = []
+    for name in ("get", "set"):
+        real = getattr(cache.disk, name)
+        setattr(cache.disk, name, lambda *a, _real=real, **k: seen.append(threading.get_ident()) or _real(*a, **k))
+    async def fetch(): return {"response": [1]}
+    async def go():
+        value = await cache.get_or_fetch_async("fixtures", {"date": "2025-01-01"}, fetch)
+        return threading.get_ident(), value
+    loop_thread, value = asyncio.run(go())
+    assert value == {"response": [1]}
+    assert len(seen) == 2 and loop_thread not in seen
+    assert cache.disk.get("fixtures?date=2025-01-01")[1] == {"response": [1]}
@@ -0,0 +1,95 @@
+# tests/test_backtest.py
+import gzip, json
+import numpy as np
+import pytest
+
+from app.engine import backtest as bt
+from bench.fixtures import odds_entry
+
+DAY = 86400
+T0 = 1_699_920_000   # midnight UTC
+
+def _fx(fid, league, h, a, hg, ag, day, status="FT"):
+    return {"fixture": {"id": fid, "timestamp": T0 + day*DAY + 54000, "status": {"short": status}},
+            "league": {"id": league, "season": 2024}, "teams": {"home": {"id": h}, "away": {"id": a}},
+            "goals": {"home": hg, "away": ag}}
+
+def _fixtures(league=39, days=30, seed=0):
+    rng, out = np.random.default_rng(seed), []
+    for day in range(days):
+        for h, a in ((1, 2), (3, 4)) if day % 2 else ((2, 3), (4, 1)):
+            out.append(_fx(league * 10000 + len(out), league, h, a, int(rng.poisson(1.5)), int(rng.poisson(1.1)), day))
+    return out
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    fixtures = _fixtures(39) + _fixtures(140, days=10, seed=1) + [_fx(1, 39, 1, 2, None, None, 40, status="NS")]
+    (tmp_path / "fixtures.json").write_text(json.dumps({"response": fixtures}))
+    odds = [odds_entry(fx["fixture"]["id"], n_bookmakers=2) for fx in fixtures[:50]]
+    with gzip.open(tmp_path / "odds.json.gz", "wt") as f: json.dump({"response": odds}, f)
+    return tmp_path
+
+def test_shards_are_finished_fixtures_per_league_in_kickoff_order(cache_dir):
+    shards = bt.load_shards([str(cache_dir)])
+    assert sorted(shards) == [39, 140]
+    s = shards[39]
+    assert len(s.rows) == 60 and (np.diff(s.rows[:, 1]) >= 0).all()
+    priced = (s.odds > 0).all(axis=1)
+    assert priced.sum() == 50 and priced[:50].all()
+    first = odds_entry(int(s.rows[0, 0]), n_bookmakers=2)["bookmakers"][0]["bets"][0]["values"]
+    assert s.odds[0].tolist() == [float(v["odd"]) for v in first]    # Bet365, not the other bookmaker
+    assert list(bt.load_shards([str(cache_dir)], leagues=[140])) == [140]
+
+@pytest.mark.parametrize("days", [1, 5])
+def test_walk_forward_never_sees_a_fixtures_own_result(cache_dir, days):
+    shard = bt.load_shards([str(cache_dir)])[39]
+    changed = shard._replace(rows=shard.rows.copy())
+    changed.rows[-2*days:, 5:7] = [9, 0]              # rewrite the scores from this day on
+    opts = bt.Options(warmup=8)
+    a, b = list(bt._walk_forward(shard, opts)), list(bt._walk_forward(changed, opts))
+    assert sum(len(rows) for rows, _ in a) == len(shard.rows) - 8
+    (rows, la), (_, lb) = a[-days], b[-days]
+    for k in rows.tolist():
+        ids = (39, *shard.rows[k, 3:5].tolist())
+        assert la(*ids) == lb(*ids)                   # priced from earlier days only
+    if days > 1:
+        assert a[-days + 1][1](39, 1, 2) != b[-days + 1][1](39, 1, 2)   # results do feed later days
+
+def test_reruns_skip_unchanged_shards(cache_dir, tmp_path):
+    shards, out = bt.load_shards([str(cache_dir)]), str(tmp_path / "out")
+    opts = bt.Options(warmup=8)
+    assert bt.run(shards, opts, out, workers=1) == {"ran": [39, 140], "skipped": []}
+    assert bt.run(shards, opts, out, workers=1) == {"ran": [], "skipped": [39, 140]}
+    assert bt.run(shards, opts._replace(warmup=4), out, workers=1)["ran"] == [39, 140]
+    assert bt.run(shards, opts._replace(warmup=4), out, workers=1, force=True)["ran"] == [39, 140]
+    cols = bt.load_results(out)[39]
+    assert cols["scored"].sum() == 50 - 4 and not cols["scored"][50:].any()
+    assert (cols["pnl"][~cols["picked"]] == 0).all()
+
+def test_score_flat_stakes_and_calibration():
+    cols = {"scored": np.array([True, True, True, False]), "fitted": np.array([True, False, True, True]),
+            "prob": np.array([[0.5, 0.3, 0.2], [0.2, 0.3, 0.5], [0.4, 0.4, 0.2], [1/3] * 3]),
+            "odds": np.array([[2.0, 3.5, 4.0], [4.0, 3.5, 2.0], [2.5, 3.0, 3.2], [2.0] * 3]),
+            "result": np.array([0, 1, 0, 2]), "picked": np.array([True, True, False, True]),
+            "won": np.array([True, False, False, True]), "price": np.array([2.0, 2.0, 0, 2.0]),
+            "pnl": np.array([1.0, -1.0, 0.0, 1.0])}
+    s = bt.score(cols)
+    assert (s["fixtures"], s["picks"], s["hit_rate"], s["profit"], s["roi"]) == (3, 2, 0.5, 0.0, 0.0)
+    assert s["brier"] == pytest.approx(((0.25 + .09 + .04) + (.04 + .49 + .25) + (.36 + .16 + .04)) / 3, abs=1e-4)
+    assert s["log_loss"] == pytest.approx(-np.log([0.5, 0.3, 0.4]).mean(), abs=1e-4)
+
+def test_each_block_runs_the_engine_once(cache_dir, tmp_path, monkeypatch):
+    shard = bt.load_shards([str(cache_dir)])[39]
+    calls, real = [], bt.fb.analyze_slate
+    monkeypatch.setattr(bt.fb, "analyze_slate", lambda *a, **k: calls.append(1) or real(*a, **k))
+    monkeypatch.setattr(bt.fb, "match_probabilities", None)
+    bt.run_shard(shard, bt.Options(model="priors"), str(tmp_path), "fp")
+    assert calls == [1]
+
+def test_slate_analysis_carries_the_probabilities(cache_dir):
+    shard = bt.load_shards([str(cache_dir)])[39]
+    payloads = [bt._payload(39, shard.rows[k], shard.odds[k]) for k in range(50)]
+    one = bt.fb.analyze_slate(payloads)
+    params, wm, basis = bt.fb.match_probabilities(payloads)
+    np.testing.assert_array_equal(one.params, params); np.testing.assert_array_equal(one.probabilities, wm)
+    assert one.basis == basis and one.results == bt.fb.analyze_football_batch(payloads)
@@ -0,0 +1,46 @@
+# tests/test_batch.py
+import json
+import pytest
+
+from app.engine import football as fb
+
+SLATE = [
+    {"home": "A", "away": "B", "league": "EPL", "odds": {"1": 2.9, "X": 3.3, "2": 2.4}},
+    {"home": "C", "away": "D", "league": "EPL", "odds": {"1": 1.5, "X": 4.2, "2": 6.5}, "context": {"derby": True}},
+    {"home": "E", "away": "F", "league": "EPL", "odds": {}},                                      # no prices
+    {"home": "G", "away": "H", "league": "EPL", "odds": {"1": 3.1, "X": 3.0, "2": 2.5}, "max_goals": 7},
+    {"home": "I", "away": "J", "league": "Serie A", "odds": {"1": 2.2, "X": 3.1, "2": 3.6},
+     "consensus": {"percent": {"1": 44.0, "X": 29.0, "2": 27.0}}},
+    {"home": "K", "away": "L", "league_id": 39, "home_id": 1, "away_id": 2, "odds": {"1": 1.9, "X": 3.6, "2": 4.4}},
+]
+FITTED = {(39, 1, 2): (1.8, 0.9, 0.04)}
+lookup = lambda league, home, away: FITTED.get((league, home, away))
+
+def _canon(result):
+    return json.dumps(result, sort_keys=True)
+
+def test_batch_item_equals_single_analysis():
+    batch = fb.analyze_football_batch(SLATE, lookup=lookup)
+    assert len(batch) == len(SLATE)
+    for payload, item in zip(SLATE, batch):
+        assert _canon(fb.analyze_football_batch([payload], lookup=lookup)[0]) == _canon(item)
+    assert {r["status"] for r in batch} >= {"FINAL_PICK", "SKIPPED"}
+
+def test_batch_order_does_not_matter():
+    forward = fb.analyze_football_batch(SLATE, lookup=lookup)
+    backward = fb.analyze_football_batch(SLATE[::-1], lookup=lookup)[::-1]
+    assert [_canon(r) for r in forward] == [_canon(r) for r in backward]
+
+def test_batch_route_matches_the_single_route(client):
+    payloads = SLATE[:5]
+    r = client.post("/analyze/football/batch", json={"items": payloads})
+    assert r.status_code == 200 and r.get_json()["count"] == len(payloads)
+    for payload, item in zip(payloads, r.get_json()["items"]):
+        assert client.post("/analyze/football", json=payload).get_json() == item
+
+@pytest.mark.parametrize("body", [{"items": "x"}, {"items": [1, 2]}, [{"home": "A"}, "B"]])
+def test_batch_route_rejects_malformed_items(client, body):
+    assert client.post("/analyze/football/batch", json=body).status_code == 400
+
+def test_empty_slate():
+    assert fb.analyze_football_batch([]) == []
@@ -0,0 +1,30 @@
+# tests/test_bench.py
+import json
+
+from bench import __main__ as cli
+from bench.harness import compare, measure
+from bench.suites import SUITES
+
+def test_measure_reports_per_call_times():
+    calls = []
+    r = measure("noop", lambda: calls.append(1), number=5, repeat=3, warmup=2, fixtures=1)
+    assert len(calls) == 2 + 5 * 3 and r["fixtures"] == 1
+    assert 0 <= r["min_s"] <= r["median_s"] and r["repeat"] == 3
+
+def test_compare_flags_only_slowdowns_past_the_threshold():
+    base = {"a": {"median_s": 1.0}, "b": {"median_s": 1.0}, "c": {"median_s": 0}}
+    rows = compare([{"name": "a", "median_s": 1.1}, {"name": "b", "median_s": 1.3},
+                    {"name": "c", "median_s": 1.0}, {"name": "d", "median_s": 1.0}], base, 0.15)
+    assert [(r["name"], r["regressed"]) for r in rows] == [("a", False), ("b", True)]
+
+def test_quick_suites_run_and_gate_on_a_baseline(tmp_path, capsys):
+    out = tmp_path / "results.json"
+    assert cli.main(["--suite", "micro,api", "--quick", "--out", str(out)]) == 0
+    results = json.loads(out.read_text())["results"]
+    names = {r["name"] for r in results}
+    assert len(names) == len(results) and all(r["median_s"] > 0 for r in results)
+    for r in results: r["median_s"] /= 100                 # a baseline 100x faster than this run
+    out.write_text(json.dumps({"results": results}))
+    assert cli.main(["--suite", "micro", "--quick", "--compare", str(out)]) == 1
+    assert "regressed" in capsys.readouterr().err
+    assert set(SUITES) >= {"micro", "macro", "api", "replay", "stream", "load"}
@@ -0,0 +1,91 @@
+# tests/test_cache.py
+import pytest
+
+from app.engine.adapters import cache as c
+
+class Upstream:
+    def __init__(self): self.calls = 0
+    def __call__(self):
+        self.calls += 1
+        return {"errors": [], "response": [{"n": self.calls}]}
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(c.time, "time", lambda: now[0])
+    return now
+
+def _cache(**kw):
+    return c.ResponseCache({"fixtures": (60, 120)}, refresh=lambda job: job(), **kw)
+
+def test_fresh_stale_and_expired(clock):
+    cache, up = _cache(), Upstream()
+    get = lambda: cache.get_or_fetch("fixtures", {"date": "2025-01-01"}, up)["response"][0]["n"]
+    assert get() == 1 and get() == 1 and up.calls == 1
+    clock[0] += 90                 # stale: old value served, one refresh behind it
+    assert get() == 1 and up.calls == 2
+    assert get() == 2
+    clock[0] += 60 + 120 + 1       # past ttl + stale: fetched in line
+    assert get() == 3
+    s = cache.stats()
+    assert (s["hits"], s["stale_hits"], s["misses"], s["refreshes"]) == (2, 1, 2, 1)
+
+def test_policy_is_longest_prefix():
+    cache = c.ResponseCache({"fixtures/headtohead": (5, 5)})
+    assert cache.policy("/fixtures/headtohead") == (5, 5)
+    assert cache.policy("fixtures") == c.DEFAULT_POLICIES["fixtures"]
+    assert cache.policy("standings") == (0.0, 0.0)
+
+def test_entry_ttl_overrides_policy(clock):
+    cache, up = c.ResponseCache({"fixtures": (60, 120)}, refresh=lambda job: None), Upstream()
+    cache.put("fixtures", {"date": "x"}, up(), ttl=5)
+    clock[0] += 7
+    cache.get_or_fetch("fixtures", {"date": "x"}, up)
+    assert cache.stats()["stale_hits"] == 1
+    clock[0] += 11                 # past its own ttl and as long again stale
+    cache.get_or_fetch("fixtures", {"date": "x"}, up)
+    assert cache.stats()["misses"] == 1
+
+def _fixtures(*rows):
+    return {"errors": [], "response": [{"fixture": {"id": k, "timestamp": ts, "status": {"short": s}}}
+                                       for k, (s, ts) in enumerate(rows)]}
+
+def test_live_fixtures_get_the_short_ttl(clock):
+    now = clock[0]
+    assert c.live_fixtures(_fixtures(("FT", now - 9000), ("2H", now - 3000)), now)
+    assert c.live_fixtures(_fixtures(("NS", now + 600)), now)
+    assert not c.live_fixtures(_fixtures(("FT", now - 9000), ("NS", now + 86400)), now)
+    cache = c.ResponseCache()
+    for date, body in (("live", _fixtures(("1H", now - 600))), ("done", _fixtures(("FT", now - 9000)))):
+        cache.put("fixtures", {"date": date}, body, ttl=900)
+    assert cache.memory.get("fixtures?date=live")[2] == c.API_CACHE_LIVE_TTL
+    assert cache.memory.get("fixtures?date=done")[2] == 900
+    cache.put("fixtures", {"date": "today"}, _fixtures(("NS", now + 600)))
+    clock[0] += c.API_CACHE_LIVE_TTL * 2 + 1
+    calls = []
+    cache.get_or_fetch("fixtures", {"date": "today"}, lambda: calls.append(1) or _fixtures(("1H", now)))
+    assert calls == [1]            # not served from a stale entry past the live ttl
+
+def test_error_bodies_are_not_cached(clock):
+    cache, calls = _cache(), []
+    quota = lambda: calls.append(1) or {"errors": {"requests": "limit reached"}, "response": []}
+    for _ in range(3): cache.get_or_fetch("fixtures", {"date": "y"}, quota)
+    assert len(calls) == 3 and cache.peek("fixtures", {"date": "y"}) is None
+    assert not c.cacheable({"errors": ["x"]}) and c.cacheable({"errors": [], "response": []})
+
+def test_hits_are_private_copies(clock, tmp_path):
+    cache, up = _cache(), Upstream()
+    first = cache.get_or_fetch("fixtures", {"date": "z"}, up)
+    first["response"].clear()
+    hit = cache.get_or_fetch("fixtures", {"date": "z"}, up)
+    hit["response"][0]["n"] = "changed"
+    assert cache.get_or_fetch("fixtures", {"date": "z"}, up) == {"errors": [], "response": [{"n": 1}]}
+    assert up.calls == 1
+
+def test_disk_tier_is_shared(clock, tmp_path):
+    db = str(tmp_path / "cache.sqlite")
+    a, b, up = _cache(db_path=db), _cache(db_path=db), Upstream()
+    a.get_or_fetch("fixtures", {"date": "d"}, up)
+    assert b.get_or_fetch("fixtures", {"date": "d"}, up)["response"] == [{"n": 1}]
+    assert up.calls == 1 and b.stats()["disk_hits"] == 1
+    assert [p for p, _ in b.responses("fixtures")] == [{"date": "d"}]
@@ -0,0 +1,96 @@
+# tests/test_consensus.py
+import numpy as np
+import pytest
+
+from app import app as web
+from app.engine import consensus as cs
+from app.engine.adapters import live_football as lf
+from app.engine.odds import parse_odds
+from app.engine.value_mode import compute_value_mode_batch
+from bench.api_stub import StubAPI
+from bench.fixtures import odds_entry
+
+def _bisect(f, lo, hi):
+    for _ in range(200):
+        mid = (lo + hi) / 2
+        if f(lo) * f(mid) <= 0: hi = mid
+        else: lo = mid
+    return (lo + hi) / 2
+
+def _shin_ref(prices):
+    q = 1 / np.asarray(prices)
+    p = lambda z: (np.sqrt(z*z + 4*(1 - z) * q*q / q.sum()) - z) / (2*(1 - z))
+    return p(_bisect(lambda z: p(z).sum() - 1, 0.0, 0.5))
+
+def _power_ref(prices):
+    q = 1 / np.asarray(prices)
+    return q ** _bisect(lambda k: (q ** k).sum() - 1, 1.0, 3.0)
+
+BOOKS = np.array([[1.50, 4.20, 7.00], [2.10, 3.30, 3.60], [1.12, 9.50, 21.0], [2.90, 3.10, 2.60]])
+
+@pytest.mark.parametrize("method,ref", [("shin", _shin_ref), ("power", _power_ref),
+                                        ("proportional", lambda p: (1/p) / (1/p).sum())])
+def test_devig_matches_a_bisection_reference(method, ref):
+    p = cs.devig(BOOKS, method)
+    np.testing.assert_allclose(p.sum(axis=1), 1, atol=1e-12)
+    np.testing.assert_allclose(p, np.array([ref(b) for b in BOOKS]), atol=1e-10)
+
+def test_shin_and_power_take_more_margin_off_longshots():
+    prop = cs.devig(BOOKS, "proportional")
+    for method in ("shin", "power"):
+        p = cs.devig(BOOKS, method)
+        assert (p[:, 0] > prop[:, 0])[:3].all() and (p[:, 2] < prop[:, 2])[:3].all()
+
+def test_devig_edge_rows():
+    prices = np.array([[2.1, 3.4, np.nan], [2.2, 3.6, 4.0]])   # the second is priced under 100%
+    for method in cs.METHODS:
+        p = cs.devig(prices, method)
+        assert np.isnan(p[0]).all() and p[1].sum() == pytest.approx(1)
+    np.testing.assert_allclose(cs.devig(prices, "shin")[1], cs.devig(prices, "proportional")[1])
+    with pytest.raises(ValueError, match="unknown de-vig method"):
+        cs.devig(prices, "median")
+
+def _slate():
+    entries = [odds_entry(fid, n_bookmakers=4, seed=fid) for fid in (1, 2)]
+    entries[1]["bookmakers"][2]["bets"][0]["values"].pop()          # one bookmaker without a full 1X2
+    books = parse_odds(entries)
+    return entries, cs.slate_1x2([books[1], None, books[2]])
+
+def test_best_price_and_consensus_over_the_slate():
+    entries, prices = _slate()
+    assert prices.shape == (3, 4, 3) and np.isnan(prices[1]).all() and np.isnan(prices[2, 2]).all()
+    raw = np.array([[float(v["odd"]) for v in bm["bets"][0]["values"]] for bm in entries[0]["bookmakers"]])
+    np.testing.assert_array_equal(prices[0], raw)
+    best = cs.best_prices(prices)
+    np.testing.assert_array_equal(best["price"][0], raw.max(axis=0))
+    np.testing.assert_array_equal(best["row"][0], raw.argmax(axis=0))
+    assert best["price"][1].tolist() == [0, 0, 0] and best["row"][1].tolist() == [-1, -1, -1]
+    c = cs.consensus(prices, "shin")
+    assert c["bookmakers"].tolist() == [4, 0, 3]
+    np.testing.assert_allclose(c["prob"][0], cs.devig(raw, "shin").mean(axis=0))
+    assert c["margin"][0] == pytest.approx((1 / raw).sum(axis=1).mean() - 1)
+    assert np.isnan(c["prob"][1]).all() and np.isnan(c["margin"][1])
+
+def test_value_mode_reports_the_edge_over_consensus():
+    wm = np.array([[0.5, 0.3, 0.2], [0.4, 0.3, 0.3]])
+    market = np.array([[0.45, 0.3, 0.25], [np.nan] * 3])
+    out = compute_value_mode_batch(np.array([[2.0, 3.4, 4.1], [2.5, 3.2, 3.0]]), wm, market)
+    np.testing.assert_allclose(out["market_edge"][0], [0.05, 0, -0.05], atol=1e-12)
+    assert "market_edge" not in compute_value_mode_batch(np.ones((2, 3)) * 2, wm)
+
+def test_matches_carry_best_price_and_consensus(monkeypatch, client):
+    stub = StubAPI(n_fixtures=6, n_bookmakers=3)
+    base = stub.start()
+    monkeypatch.setattr(web, "APISPORTS_BASE", base)
+    monkeypatch.setattr(lf, "BASE", base)
+    monkeypatch.setattr(lf, "CACHE", None)
+    try:
+        items = client.get("/api/matches?league_id=39&season=2025").get_json()["items"]
+    finally:
+        stub.stop()
+    for it in items:
+        raw = [[float(v["odd"]) for v in bm["bets"][0]["values"]] for bm in stub.odds(it["fixture_id"])["bookmakers"]]
+        assert it["best_odds"] == dict(zip("1X2", np.max(raw, axis=0).tolist()))
+        assert it["odds"] == dict(zip("1X2", raw[0]))                    # Bet365 still fills odds
+        assert it["consensus"]["bookmakers"] == 3 and it["consensus"]["method"] == cs.DEVIG_METHOD
+        assert sum(it["consensus"]["percent"].values()) == pytest.approx(100, abs=0.02)
@@ -0,0 +1,43 @@
+# tests/test_fastjson.py
+import json
+import numpy as np
+import pytest
+from flask import jsonify
+
+from app import app as web
+from app.engine import fastjson
+from app.engine.slate import Slate
+
+OBJ = {"b": [1, 2.5, None, True], "a": {"z": "é", "y": []}, "n": 0}
+
+def test_dumps_matches_the_stdlib():
+    assert json.loads(fastjson.dumps(OBJ)) == OBJ
+    assert fastjson.dumps(OBJ).startswith(b'{"a":{"y":[],"z":')   # compact, keys sorted
+    assert fastjson.loads(fastjson.dumps(OBJ)) == OBJ
+
+@pytest.mark.skipif(fastjson.orjson is None, reason="orjson not installed")
+def test_numpy_values_serialise():
+    assert json.loads(fastjson.dumps({"p": np.array([0.5, 0.25]), "k": np.int64(3)})) == {"p": [0.5, 0.25], "k": 3}
+
+@pytest.mark.parametrize("args,kwargs,expected", [
+    ((OBJ,), {}, OBJ), ((1, 2), {}, [1, 2]), ((), {"x": 1}, {"x": 1}), ((), {}, None)])
+def test_jsonify_through_the_provider(args, kwargs, expected):
+    with web.app.app_context():
+        r = jsonify(*args, **kwargs)
+    assert r.mimetype == "application/json" and r.get_data().endswith(b"\n")
+    assert json.loads(r.get_data()) == expected
+
+def test_jsonify_rejects_args_and_kwargs():
+    with web.app.app_context(), pytest.raises(TypeError):
+        jsonify(1, x=2)
+
+def test_slate_items_keep_the_fixture_fields():
+    raw = [{"fixture": {"id": 7, "date": "2025-01-01T15:00:00+00:00", "status": {"short": "NS"}},
+            "league": {"id": 39, "name": "Premier League", "season": 2024},
+            "teams": {"home": {"id": 1, "name": "A"}, "away": {"id": 2, "name": "B"}}},
+           {"fixture": {}, "league": {}, "teams": {}}]
+    items = Slate(raw).items()
+    assert items[0] == {"fixture_id": 7, "utc": "2025-01-01T15:00:00+00:00", "status": "NS", "league_id": 39,
+                        "league": "Premier League", "season": 2024, "home_id": 1, "home": "A", "away_id": 2,
+                        "away": "B", "odds": None, "market_odds": None, "bookmaker": None}
+    assert items[1]["fixture_id"] is None and items[1]["home"] is None
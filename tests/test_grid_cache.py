@@ -0,0 +1,77 @@
+# tests/test_grid_cache.py
+import json
+import numpy as np
+import pytest
+
+from app.engine import football as fb
+from app.engine.grid_cache import LRU, GridCache, quantize
+
+@pytest.fixture
+def gc(monkeypatch):
+    cache = GridCache(grid_entries=64, market_entries=64, quantum=0)
+    monkeypatch.setattr(fb, "GRID_CACHE", cache)
+    return cache
+
+def test_lru_evicts_the_least_recently_used():
+    lru = LRU(2)
+    lru.put("a", 1); lru.put("b", 2)
+    assert lru.get("a") == 1
+    lru.put("c", 3)
+    assert (lru.get("a"), lru.get("b"), lru.get("c"), len(lru)) == (1, None, 3, 2)
+    off = LRU(0); off.put("a", 1)
+    assert off.get("a") is None
+
+def test_quantized_keys():
+    assert quantize(1.237, 0.05) == 1.25 and quantize(1.237, 0) == 1.237
+    assert GridCache(quantum=0.1).key(1.26, 0.94, 0.02, 10) == (1.3, 0.9, 0.02, 10)
+
+def test_second_lookup_is_a_hit_on_the_same_grid(gc):
+    P1, m1 = fb.score_grid(1.4, 1.1, 0.05)
+    P2, m2 = fb.score_grid(1.4, 1.1, 0.05)
+    assert P1 is P2 and not P1.flags.writeable and m1 == m2
+    np.testing.assert_allclose(P1, fb.poisson_prob_matrix(1.4, 1.1, rho=0.05), atol=1e-15)
+    s = gc.stats()
+    assert (s["grid_hits"], s["grid_misses"], s["market_hits"], s["market_misses"]) == (1, 1, 1, 1)
+
+def test_callers_get_their_own_sheet(gc):
+    _, m = fb.score_grid(1.4, 1.1)
+    m["1X2"]["1"] = -1; m["Over/Under"].clear()
+    _, again = fb.score_grid(1.4, 1.1)
+    assert again["1X2"]["1"] > 0 and again["Over/Under"]
+
+def test_lines_are_part_of_the_sheet_key(gc):
+    _, a = fb.score_grid(1.4, 1.1, ou_lines=[2.5])
+    _, b = fb.score_grid(1.4, 1.1, ou_lines=[1.5, 3.5])
+    assert a != b and gc.stats()["grid_hits"] == 1 and len(gc.markets) == 2
+
+def test_quantum_snaps_nearby_lambdas_to_one_entry(gc):
+    P1, _ = fb.score_grid(1.23, 0.98, quantum=0.05)
+    P2, _ = fb.score_grid(1.26, 1.01, quantum=0.05)
+    assert P1 is P2
+    np.testing.assert_allclose(P1, fb.poisson_prob_matrix(1.25, 1.0), atol=1e-15)
+
+def _slate():
+    return [{"home": f"H{k % 4}", "away": f"A{k % 3}", "league": "EPL", "odds": {"1": 2.0 + k / 10, "X": 3.4, "2": 3.9}}
+            for k in range(12)]
+
+def test_warm_cold_and_disabled_caches_agree(monkeypatch):
+    runs = []
+    for cache in (GridCache(0, 0), GridCache(64, 64)):
+        monkeypatch.setattr(fb, "GRID_CACHE", cache)
+        runs += [json.dumps(fb.analyze_football_batch(_slate()), sort_keys=True) for _ in range(2)]
+    assert len(set(runs)) == 1
+    assert cache.stats()["grid_hits"] > 0 and cache.stats()["market_hits"] > 0
+
+@pytest.mark.parametrize("bad", ["abc", -1, -0.01, "nan", float("inf"), True, [0.05]])
+def test_bad_lambda_quantum_is_a_400(client, bad):
+    item = {"home": "A", "away": "B", "lambda_quantum": bad, "odds": {"1": 4.2, "X": 3.4, "2": 1.9}}
+    r = client.post("/analyze/football", json=item)
+    assert r.status_code == 400 and "lambda_quantum" in r.get_json()["reason"]
+    assert client.post("/analyze/football/batch", json={"items": [item]}).status_code == 400
+    assert client.post("/simulate/bankroll", json={"items": [item], "paths": 10}).status_code == 400
+    with pytest.raises(fb.PayloadError):
+        fb.match_probabilities([item])
+
+def test_lambda_quantum_as_a_string_is_read(client):
+    item = {"home": "A", "away": "B", "lambda_quantum": "0.05", "odds": {"1": 4.2, "X": 3.4, "2": 1.9}}
+    assert client.post("/analyze/football", json=item).status_code == 200
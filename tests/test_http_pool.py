@@ -0,0 +1,39 @@
+# tests/test_http_pool.py
+import threading, time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+from app.engine.adapters import http_pool
+
+@pytest.fixture
+def pool(monkeypatch):
+    ex = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(http_pool, "_executor", ex)
+    yield ex
+    ex.shutdown(wait=True)
+
+def test_results_in_item_order_with_failures_as_none(pool):
+    def fn(x):
+        if x == 3: raise RuntimeError("upstream")
+        time.sleep(0.01 * (5 - x))
+        return x * 10
+    assert http_pool.fan_out(fn, range(5), concurrency=3, deadline_s=5) == [0, 10, 20, None, 40]
+
+def test_queued_work_is_cancelled_at_the_deadline(pool):
+    release = threading.Event()
+    for _ in range(2): pool.submit(release.wait)        # another request holds every pool thread
+    started = []
+    t0 = time.monotonic()
+    out = http_pool.fan_out(started.append, range(4), concurrency=4, deadline_s=0.05)
+    assert out == [None] * 4 and time.monotonic() - t0 < 1
+    release.set()
+    pool.shutdown(wait=True)
+    assert started == []                                 # none of it ran after the caller gave up
+
+def test_slow_items_past_the_deadline_give_none(pool):
+    gate = threading.Event()
+    def fn(x):
+        if x: gate.wait(2)
+        return x
+    assert http_pool.fan_out(fn, [0, 1], concurrency=2, deadline_s=0.1) == [0, None]
+    gate.set()
@@ -0,0 +1,61 @@
+# tests/test_markets.py
+import numpy as np
+import pytest
+
+from app.engine import markets as mk
+from app.engine import football as fb
+
+G = 8
+P = fb.poisson_prob_matrix(1.6, 1.2, G, 0.04)
+
+def brute(pred):
+    """Mass of the scores satisfying pred(home, away), by looping over the grid."""
+    return sum(P[h, a] for h in range(G + 1) for a in range(G + 1) if pred(h, a))
+
+SHEET = {
+    ("Over/Under", None, "O2.5"): lambda h, a: h + a > 2.5,
+    ("Over/Under", None, "U1.5"): lambda h, a: h + a <= 1.5,
+    ("BTTS", None, "Yes"): lambda h, a: h > 0 and a > 0,
+    ("Team Goals", "away", "> 0.5"): lambda h, a: a > 0.5,
+    ("1X2 + O/U", None, "X & U2.5"): lambda h, a: h == a and h + a <= 2.5,
+    ("DC + BTTS", None, "X2 & GG"): lambda h, a: a >= h and h > 0 and a > 0,
+    ("Correct Score", None, "2:1"): lambda h, a: (h, a) == (2, 1),
+    ("Win to Nil", None, "Away"): lambda h, a: h == 0 and a > 0,
+    ("Winning Margin", None, "+3+"): lambda h, a: h - a >= 3,
+    ("Winning Margin", None, "-2"): lambda h, a: a - h == 2,
+}
+
+def test_market_sheet_matches_a_loop_over_the_grid():
+    ms = mk.mask_set(mk.mask_spec(G))
+    values = dict(zip(((m, s, k) for m, s, k, _ in ms.layout), mk.evaluate(P, ms)))
+    for key, pred in SHEET.items():
+        assert values[key] == pytest.approx(brute(pred), abs=1e-12), key
+
+def test_stacked_grids_price_like_single_ones():
+    T = fb.poisson_prob_tensor(np.array([0.8, 1.6, 2.9]), np.array([1.1, 1.2, 0.5]), G, np.array([0.0, 0.04, -0.02]))
+    ms = mk.mask_set(mk.mask_spec(G))
+    stacked = mk.evaluate(T, ms)
+    for k in range(3):
+        np.testing.assert_allclose(stacked[k], mk.evaluate(T[k], ms), rtol=1e-12)
+
+@pytest.mark.parametrize("selection,pred", [
+    ("1", lambda h, a: h > a), ("x", lambda h, a: h == a), ("X2", lambda h, a: a >= h),
+    ("Over 2.5", lambda h, a: h + a > 2.5), ("BTTS No", lambda h, a: not (h and a)),
+    ("Home Under 1.5", lambda h, a: h <= 1.5), ("CS 0-0", lambda h, a: h == a == 0)])
+def test_selection_masks(selection, pred):
+    assert mk.mass(P, mk.selection_mask(G, selection)) == pytest.approx(brute(pred), abs=1e-12)
+
+def test_out_of_grid_score_and_bad_selection():
+    assert mk.mass(P, mk.selection_mask(G, "CS 12-0")) == 0
+    with pytest.raises(ValueError):
+        mk.selection_mask(G, "Asian -0.25")
+
+def test_masks_are_cached_and_read_only():
+    ms = mk.mask_set(mk.mask_spec(G))
+    assert mk.mask_set(mk.mask_spec(G)) is ms
+    with pytest.raises(ValueError):
+        ms.masks[0, 0, 0] = 1.0
+
+def test_line_labels_are_kept():
+    layout = mk.mask_set(mk.mask_spec(G, ou_lines=[2, 2.0])).layout
+    assert [k for m, _, k, _ in layout if m == "Over/Under"] == ["O2", "U2", "O2.0", "U2.0"]
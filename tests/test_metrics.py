@@ -0,0 +1,62 @@
+# tests/test_metrics.py
+import json, os
+from types import SimpleNamespace
+
+from app.engine import metrics as m
+
+def _line(text, prefix):
+    return next(l for l in text.splitlines() if l.startswith(prefix)).rsplit(" ", 1)[1]
+
+def test_histogram_buckets_are_cumulative():
+    reg = m.Registry(directory=None)
+    for s in (0.0003, 0.004, 0.004, 30.0):
+        reg.observe("betrun_stage_seconds", s, stage="x")
+    text = reg.render()
+    assert "# TYPE betrun_stage_seconds histogram" in text
+    assert _line(text, 'betrun_stage_seconds_bucket{stage="x",le="0.0005"}') == "1"
+    assert _line(text, 'betrun_stage_seconds_bucket{stage="x",le="0.005"}') == "3"
+    assert _line(text, 'betrun_stage_seconds_bucket{stage="x",le="25.0"}') == "3"
+    assert _line(text, 'betrun_stage_seconds_bucket{stage="x",le="+Inf"}') == "4"
+    assert _line(text, 'betrun_stage_seconds_count{stage="x"}') == "4"
+
+def test_span_times_the_block_even_when_it_raises():
+    reg = m.Registry(directory=None)
+    try:
+        with reg.span("boom"): raise KeyError
+    except KeyError:
+        pass
+    assert reg.hists[("betrun_stage_seconds", (("stage", "boom"),))][2] == 1
+
+def test_render_merges_live_workers(tmp_path):
+    reg = m.Registry(directory=str(tmp_path), flush_s=3600)
+    reg.inc("betrun_cache_events_total", 2, event="hit")
+    reg.set("betrun_api_quota_remaining", 90, window="day")
+    def other(pid, hits, quota, ts):
+        snap = {"pid": pid, "counters": [["betrun_cache_events_total", [["event", "hit"]], hits]],
+                "gauges": [["betrun_api_quota_remaining", [["window", "day"]], quota, ts]], "hists": []}
+        (tmp_path / f"metrics_{pid}.json").write_text(json.dumps(snap))
+    other(os.getppid(), 3, 70, 2e10)      # a live worker, newer quota reading
+    other(2**22 + 12345, 100, 1, 3e10)     # a worker that has exited
+    text = reg.render()
+    assert _line(text, 'betrun_cache_events_total{event="hit"}') == "5"
+    assert _line(text, 'betrun_api_quota_remaining{window="day"}') == "70"
+    assert (tmp_path / f"metrics_{os.getpid()}.json").exists()
+
+def test_record_upstream_counts_outcomes_and_quota(monkeypatch):
+    reg = m.Registry(directory=None)
+    monkeypatch.setattr(m, "REGISTRY", reg)
+    ok = SimpleNamespace(status_code=200, headers={"x-ratelimit-requests-remaining": "7400", "x-ratelimit-limit": "bad"})
+    m.record_upstream("/odds", 0.02, ok)
+    m.record_upstream("odds", 0.01, error=TimeoutError())
+    assert reg.counters[("betrun_upstream_requests_total", (("endpoint", "odds"), ("status", "200")))] == 1
+    assert reg.counters[("betrun_upstream_requests_total", (("endpoint", "odds"), ("status", "TimeoutError")))] == 1
+    assert reg.gauges[("betrun_api_quota_remaining", (("window", "day"),))][0] == 7400
+    assert ("betrun_api_quota_limit", (("window", "minute"),)) not in reg.gauges
+
+def test_metrics_route_reports_engine_stages(client):
+    client.post("/analyze/football", json={"home": "A", "away": "B", "odds": {"1": 2.1, "X": 3.3, "2": 3.6}})
+    r = client.get("/metrics")
+    assert r.status_code == 200 and r.mimetype == "text/plain"
+    text = r.get_data(as_text=True)
+    assert 'betrun_stage_seconds_count{stage="analyze.total"}' in text
+    assert 'betrun_stage_seconds_count{stage="engine.score_matrix"}' in text
@@ -0,0 +1,57 @@
+# tests/test_ndjson_import.py
+import io, json
+import pytest
+
+from app.engine import audit
+from app.engine.ndjson import gzip_chunks, maybe_gunzip, split_lines
+
+def _body(n, bad=None):
+    lines = [json.dumps({"home": f"H{k}", "away": f"A{k}", "league": "EPL", "status": "FINAL_PICK"}) for k in range(n)]
+    if bad is not None: lines[bad] = "{not json"
+    return ("\n".join(lines) + "\n").encode()
+
+def _gz(body):
+    return b"".join(gzip_chunks([body]))
+
+def _post(client, body, **query):
+    qs = "&".join(f"{k}={v}" for k, v in query.items())
+    return client.post(f"/import/stream?{qs}", data=body)
+
+def test_bad_line_is_partial_and_resumes_without_duplicates(client):
+    r = _post(client, _body(1200, bad=700), replace=1)
+    got = r.get_json()
+    assert r.status_code == 422 and got["status"] == "partial"
+    assert got["cursor"] == 500 and got["imported"] == 500 and "line 701" in got["error"]
+    r = _post(client, _body(1200), cursor=got["cursor"])
+    assert r.status_code == 200 and r.get_json()["imported"] == 700
+    assert audit.picks_count() == 1200
+
+def test_gzip_body_is_detected(client):
+    r = _post(client, _gz(_body(30)), replace=1)
+    assert r.status_code == 200 and r.get_json()["count"] == 30
+
+@pytest.mark.parametrize("mangle", [lambda gz: gz[:-12], lambda gz: gz[:10] + b"\xff" * 40 + gz[50:]],
+                         ids=["truncated", "corrupt"])
+def test_damaged_gzip_is_partial_not_500(client, mangle):
+    r = _post(client, mangle(_gz(_body(2000))), replace=1)
+    got = r.get_json()
+    assert r.status_code == 422 and got["status"] == "partial" and "gzip" in got["error"]
+
+def test_truncated_gzip_at_a_line_boundary_is_not_complete():
+    gz = _gz(_body(5))
+    with pytest.raises(ValueError, match="truncated"):
+        list(split_lines(maybe_gunzip([gz[:-8]])))   # every line inflates, the trailer is missing
+
+def test_dropped_upload_is_partial(client):
+    body = _body(50)   # the connection goes away before Content-Length bytes arrive
+    r = client.post("/import/stream?replace=1", input_stream=io.BytesIO(body),
+                    environ_overrides={"CONTENT_LENGTH": str(len(body) * 2)})
+    got = r.get_json()
+    assert r.status_code == 422 and got["status"] == "partial" and "interrupted" in got["error"]
+
+def test_engine_import_reports_read_errors():
+    def lines():
+        yield from _body(10).split(b"\n")[:10]
+        raise OSError("reset by peer")
+    got = audit.import_picks_ndjson(lines(), replace=True, chunk_size=4)
+    assert got["status"] == "partial" and got["cursor"] == 8 and got["imported"] == 8
@@ -0,0 +1,69 @@
+# tests/test_odds.py
+import numpy as np
+import pytest
+
+from app.engine import odds as od
+from bench.fixtures import odds_entry
+
+def _bm(bid, name, *bets):
+    return {"id": bid, "name": name, "bets": [{"name": n, "values": [{"value": v, "odd": o} for v, o in vals]}
+                                             for n, vals in bets]}
+
+def _entry(fid, *bookmakers):
+    return {"fixture": {"id": fid}, "bookmakers": list(bookmakers)}
+
+def test_every_priced_market_is_read():
+    e = odds_entry(7, n_bookmakers=2, full=True)
+    book = od.parse_fixture_odds([e])
+    assert book.fixture_id == 7 and book.bookmaker_ids == (8, 101) and book.bookmaker_names == ("Bet365", "Book1")
+    names = {"Match Winner": "", "Double Chance": "", "Goals Over/Under": "", "Both Teams Score": "BTTS ",
+             "Total - Home": "Home ", "Total - Away": "Away ", "Exact Score": ""}
+    fixed = {"Home": "1", "Draw": "X", "Away": "2", "Home/Draw": "1X", "Home/Away": "12", "Draw/Away": "X2"}
+    for r, bm in enumerate(e["bookmakers"]):
+        expected = {}
+        for bet in bm["bets"]:
+            if bet["name"] not in names: continue                  # Asian Handicap is not priced
+            for v in bet["values"]:
+                label = fixed.get(v["value"], v["value"])
+                if bet["name"] == "Exact Score": label = "CS " + label.replace(":", "-")
+                expected[names[bet["name"]] + label] = float(v["odd"])
+        assert od.quote(book, bm["id"]) == expected
+        assert set(book.selections) == set(expected)
+
+def test_one_pass_over_many_fixtures_equals_per_fixture_parsing():
+    entries = [odds_entry(fid, n_bookmakers=3, full=fid % 2 == 0) for fid in range(10)]
+    books = od.parse_odds(entries)
+    assert sorted(books) == list(range(10))
+    for e in entries:
+        one = od.parse_fixture_odds([e])
+        b = books[e["fixture"]["id"]]
+        assert (b.selections, b.bookmaker_ids) == (one.selections, one.bookmaker_ids)
+        np.testing.assert_array_equal(b.prices, one.prices)
+
+@pytest.mark.parametrize("kind,value,expected", [
+    ("1x2", " 1 (Home) ", "1"), ("1x2", "1  (home)", "1"), ("1x2", "DRAW", "X"), ("dc", "x2", "X2"),
+    ("ou", "Over 2.5", "Over 2.5"), ("ou", "under 0.50", "Under 0.5"), ("ou", "Over 2.25", None),
+    ("ou", "Over 3", None), ("ou", "Over", None), ("home", "Under 1.5", "Home Under 1.5"),
+    ("away", "Over x", None), ("cs", "2:1", "CS 2-1"), ("cs", "Other", None), ("btts", "Yes", "BTTS Yes")])
+def test_selection_names(kind, value, expected):
+    assert od.selection_for(kind, value) == expected
+
+def test_missing_and_bad_prices_are_nan_and_empty_bookmakers_dropped():
+    book = od.parse_fixture_odds([_entry(1,
+        _bm(8, "Bet365", ("Match Winner", [("Home", "2.10"), ("Draw", None), ("Away", "abc")]),
+            ("Goals Over/Under", [("Over 2.5", "1.90"), ("Under 2.5", "1.00")])),
+        _bm(11, "1xBet", ("Match Winner", [("Home", "0"), ("Draw", "")]), ("Asian Handicap", [("Home -1", "2")])),
+        _bm(16, "Unibet", ("1X2", [("Home", "2.2"), ("Draw", "3.3"), ("Away", "3.4")])))])
+    assert book.bookmaker_ids == (8, 16)
+    row = book.prices[0]
+    assert row[book.column("1")] == 2.1 and np.isnan(row[book.column("X")]) and np.isnan(row[book.column("2")])
+    assert row[book.column("Over 2.5")] == 1.9 and np.isnan(row[book.column("Under 2.5")])
+    assert od.quote(book, 8) == {"Over 2.5": 1.9}                     # a partial 1X2 is dropped
+    assert od.quote(book, name="Unibet") == {"1": 2.2, "X": 3.3, "2": 3.4}
+    assert od.quote(book, 99) is None
+    assert od.quote(book, 99, fallback=True) == {"1": 2.2, "X": 3.3, "2": 3.4}   # first full 1X2
+
+def test_split_1x2():
+    assert od.split_1x2({"1": 2.0, "X": 3.0, "2": 4.0, "BTTS Yes": 1.8}) == ({"1": 2.0, "X": 3.0, "2": 4.0}, {"BTTS Yes": 1.8})
+    assert od.split_1x2({"Over 2.5": 1.9}) == (None, {"Over 2.5": 1.9})
+    assert od.split_1x2(None) == (None, None) and od.parse_fixture_odds([]) is None
@@ -0,0 +1,59 @@
+# tests/test_odds_bulk.py
+import pytest
+
+from app import app as web
+from app.engine.adapters import live_football as lf
+from bench.api_stub import StubAPI
+
+@pytest.fixture
+def upstream(monkeypatch):
+    stub = StubAPI(n_fixtures=25, page_size=10)
+    base = stub.start()
+    monkeypatch.setattr(web, "APISPORTS_BASE", base)
+    monkeypatch.setattr(lf, "BASE", base)
+    monkeypatch.setattr(lf, "CACHE", None)
+    yield stub
+    stub.stop()
+
+def test_every_page_is_read_once(upstream):
+    entries = lf.odds_bulk(39, 2025)
+    assert upstream.calls["/odds"] == 3
+    idx = lf.index_by_fixture(entries)
+    assert sorted(idx) == [1_000_000 + i for i in range(25)]
+    assert all(len(v) == 1 and v[0]["fixture"]["id"] == fid for fid, v in idx.items())
+
+def test_failed_page_leaves_a_partial_result(upstream, monkeypatch):
+    real = lf._get
+    def flaky(path, params, refresh_ttl=None):
+        if params.get("page") == 2: raise RuntimeError("upstream")
+        return real(path, params, refresh_ttl)
+    monkeypatch.setattr(lf, "_get", flaky)
+    assert len(lf.odds_bulk(39, 2025)) == 15
+
+def test_needs_a_league_season_or_a_date():
+    with pytest.raises(ValueError):
+        lf.odds_bulk(39, None)
+    assert lf.index_by_fixture([{"fixture": {}}, {"fixture": {"id": 3}}]) == {3: [{"fixture": {"id": 3}}]}
+
+def test_page_helpers():
+    first = {"response": [1, 2], "paging": {"current": 1, "total": 4}}
+    assert list(lf.more_pages(first)) == [2, 3, 4] and list(lf.more_pages(first, max_pages=2)) == [2]
+    assert list(lf.more_pages({})) == [] and list(lf.more_pages(first, max_pages=1)) == []
+    assert lf.merge_pages(first, [{"response": [3]}, None, {"response": None}]) == [1, 2, 3]
+    assert lf.odds_bulk_params(None, None, "2025-08-16", 8) == {"date": "2025-08-16", "bookmaker": 8}
+
+def test_max_pages_stops_paging(upstream):
+    assert len(lf.odds_bulk(39, 2025, max_pages=2)) == 20 and upstream.calls["/odds"] == 2
+
+def test_matches_joins_bulk_odds_by_fixture(upstream, client):
+    got = client.get("/api/matches?league_id=39&season=2025").get_json()
+    assert got["count"] == 25 and all(it["odds"] for it in got["items"])
+    assert upstream.calls == {"/fixtures": 1, "/odds": 3}   # O(pages), not one call per fixture
+
+def test_matches_falls_back_to_per_fixture_calls(upstream, client, monkeypatch):
+    url = "/api/matches?league_id=39&season=2025"
+    bulk = client.get(url).get_json()
+    def down(*a, **k): raise RuntimeError("bulk odds down")
+    monkeypatch.setattr(lf, "odds_bulk", down)
+    assert client.get(url).get_json() == bulk          # same items, one call per fixture
+    assert upstream.calls["/odds"] == 3 + 25
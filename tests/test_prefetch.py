@@ -0,0 +1,96 @@
+# tests/test_prefetch.py
+import time
+import pytest
+
+from app.engine.adapters import live_football as lf
+from app.engine.adapters import prefetch as pf
+from app.engine.adapters.cache import ResponseCache
+from app import app as web
+from bench.api_stub import StubAPI
+
+def test_config_parsing():
+    assert pf.parse_leagues("39:2025, 140:2024,bad,61") == [(39, 2025), (140, 2024)]
+    assert pf.parse_bookmakers("8, all,x") == [8, None]
+
+@pytest.mark.parametrize("ahead,expected", [
+    (5*86400, (6*3600, 12*3600)), (2*86400, (3*3600, 3*3600)), (7*3600, (3600, 3600)),
+    (2*3600, (1800, 900)), (600, (900, 300)), (-60, (900, 300)), (None, (12*3600, 0))])
+def test_cadence_tightens_towards_kickoff(ahead, expected):
+    assert pf.cadence(ahead) == expected
+
+def test_next_kickoff_is_the_nearest_one_ahead():
+    fxs = [{"fixture": {"timestamp": t}} for t in (50, 300, 200, None)] + [{}]
+    assert pf.next_kickoff(fxs, now=100) == 200
+    assert pf.next_kickoff(fxs, now=400) is None
+
+def test_budget_refills_continuously(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(pf.time, "monotonic", lambda: clock[0])
+    b = pf.Budget(per_day=2400)
+    assert b.available() == 100
+    b.spend(100)
+    clock[0] += 36
+    assert b.available() == pytest.approx(1)
+    clock[0] += 86400
+    assert b.available() == 100 and b.spent == 100
+
+class KickoffStub(StubAPI):
+    def __init__(self, kickoff, **kw):
+        super().__init__(**kw)
+        self.kickoff = kickoff
+    def body(self, path, q):
+        data = super().body(path, q)
+        if path == "/fixtures":
+            for fx in data["response"]: fx["fixture"]["timestamp"] = self.kickoff
+        return data
+
+@pytest.fixture
+def upstream(monkeypatch):
+    now = time.time()
+    stub = KickoffStub(now + 2*3600, n_fixtures=12, page_size=5)
+    base = stub.start()
+    monkeypatch.setattr(web, "APISPORTS_BASE", base)
+    monkeypatch.setattr(lf, "BASE", base)
+    monkeypatch.setattr(lf, "CACHE", ResponseCache(refresh=lambda job: None))
+    yield stub, now
+    stub.stop()
+
+def test_one_tick_warms_what_matches_reads(upstream, client):
+    stub, now = upstream
+    p = pf.Prefetcher([(39, 2025)], budget_per_day=1500, bookmakers=[None])
+    assert p.tick(now) == 1 + 3
+    job = p.jobs[0]
+    assert job.kickoff == stub.kickoff and job.due["odds"] == now + 900
+    assert p.tick(now + 60) == 0                        # nothing due yet
+    calls = dict(stub.calls)
+    assert client.get("/api/matches?league_id=39&season=2025").get_json()["count"] == 12
+    assert stub.calls == calls                          # served from the prefetched entries
+
+def test_budget_and_quota_reserve_pause_the_scheduler(upstream, monkeypatch):
+    stub, now = upstream
+    p = pf.Prefetcher([(39, 2025)], budget_per_day=24, bookmakers=[None])
+    assert p.tick(now) == 1 and p.paused == "budget"    # an hour's worth of 24/day is one call
+    monkeypatch.setattr(pf.Prefetcher, "_quota_left", lambda self: pf.PREFETCH_RESERVE - 1)
+    fresh = pf.Prefetcher([(39, 2025)], bookmakers=[None])
+    assert fresh.tick(now) == 0 and fresh.paused.startswith("daily quota left")
+
+def test_a_refresh_never_outspends_the_budget(upstream):
+    stub, now = upstream
+    p = pf.Prefetcher([(39, 2025)], budget_per_day=48, bookmakers=[None])   # two calls an hour
+    assert p.tick(now) == 2 and p.paused == "budget"    # fixtures, then page 1 of 3 odds pages
+    assert stub.calls == {"/fixtures": 1, "/odds": 1} and p.budget.tokens >= 0
+    job = p.jobs[0]
+    assert job.due["odds"] <= now and job.last["odds"] == 0    # still due, resumed on refill
+    p.budget.capacity = p.budget.tokens = 3
+    assert p.tick(now) == 3 and p.paused is None and job.last["odds"] == now
+    assert p.budget.tokens >= 0 and stub.calls["/odds"] == 1 + 3
+
+def test_failed_refresh_backs_off(upstream, monkeypatch):
+    stub, now = upstream
+    def down(*a, **k): raise RuntimeError("upstream 500")
+    monkeypatch.setattr(lf, "fixtures", down)
+    p = pf.Prefetcher([(39, 2025)], bookmakers=[None])
+    assert p.tick(now) == 1
+    job = p.jobs[0]
+    assert job.error == "fixtures: upstream 500" and job.due["fixtures"] == now + 300
+    assert p.status(now)["leagues"][0]["error"] == job.error
@@ -0,0 +1,171 @@
+# tests/test_ratings.py
+import json, os
+import numpy as np
+import pytest
+
+from app.engine import ratings
+
+LEAGUE = 39
+DAY = 86400
+
+def _fx(fid, h, a, hg, ag, ts, league=LEAGUE, status="FT"):
+    return {"fixture": {"id": fid, "timestamp": ts, "status": {"short": status}}, "league": {"id": league},
+            "teams": {"home": {"id": h}, "away": {"id": a}}, "goals": {"home": hg, "away": ag}}
+
+def _season(n_rounds=12, t0=1_700_000_000):
+    """Round robin of four teams; team 1 scores most, team 4 least."""
+    rng = np.random.default_rng(0)
+    strength = {1: 0.5, 2: 0.2, 3: -0.2, 4: -0.5}
+    out, fid = [], 1000
+    for r in range(n_rounds):
+        for h in strength:
+            for a in strength:
+                if h == a: continue
+                fid += 1
+                out.append(_fx(fid, h, a, int(rng.poisson(np.exp(0.3 + strength[h] - strength[a]))),
+                               int(rng.poisson(np.exp(strength[a] - strength[h]))), t0 + (r*12 + fid % 12) * DAY))
+    return out
+
+@pytest.fixture
+def rdir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ratings, "RATINGS_DIR", str(tmp_path))
+    monkeypatch.setattr(ratings, "RATINGS_SEED", False)
+    ratings._loaded.clear(); ratings._logs.clear()
+    yield tmp_path
+    ratings._loaded.clear(); ratings._logs.clear()
+
+def _fit(fixtures):
+    r = ratings.fit_ratings(ratings.matches_from_fixtures(fixtures), LEAGUE, now=max(f["fixture"]["timestamp"] for f in fixtures))
+    ratings.save_ratings(r)
+    return r
+
+def test_fit_orders_teams_by_strength(rdir):
+    r = _fit(_season())
+    net = dict(zip(r.team_ids.tolist(), (r.attack + r.defence).tolist()))
+    assert net[1] > net[2] > net[3] > net[4]
+    assert abs(r.attack.mean()) < 1e-9 and abs(r.defence.mean()) < 1e-9
+
+def test_record_appends_to_the_log_in_place(rdir):
+    old = _fit(_season())
+    log = ratings.log_path(ratings.ratings_path(LEAGUE))
+    size = os.path.getsize(log)
+    fresh = _fx(9001, 4, 1, 5, 0, int(old.log[:, 4].max()) + DAY)
+    assert ratings.new_results([fresh]) == [fresh]
+    assert ratings.record_results([fresh]) == {LEAGUE: 1}
+    assert os.path.getsize(log) == size + 48
+    r = ratings.load_ratings(ratings.ratings_path(LEAGUE))
+    assert r.online_updates == 1 and r.log[-1, 5] == 9001
+    assert r.attack[r.index()[4]] > old.attack[old.index()[4]]
+    # applied once: the in-memory seen set answers without reading the log back
+    assert ratings.new_results([fresh]) == []
+    assert ratings.record_results([fresh]) == {LEAGUE: 0}
+    assert os.path.getsize(log) == size + 48
+
+def test_new_results_stats_once_per_ttl(rdir, monkeypatch):
+    _fit(_season())
+    fx = _fx(1001, 1, 2, 1, 0, 0)
+    ratings.new_results([fx])
+    calls = []
+    real = os.stat
+    monkeypatch.setattr(ratings.os, "stat", lambda *a, **k: calls.append(a) or real(*a, **k))
+    for _ in range(50): assert ratings.new_results([fx]) == []
+    assert calls == []
+    monkeypatch.setattr(ratings, "STAT_TTL", 0.0)
+    ratings.new_results([fx])
+    assert calls
+
+def test_other_workers_appends_are_picked_up(rdir, monkeypatch):
+    r = _fit(_season())
+    monkeypatch.setattr(ratings, "STAT_TTL", 0.0)
+    ratings.new_results([])
+    assert 9002 not in ratings._seen(LEAGUE)
+    row = np.array([[1, 2, 0, 0, int(r.log[:, 4].max()) + DAY, 9002]], dtype=np.int64)
+    ratings.append_log(ratings.ratings_path(LEAGUE), row)
+    assert 9002 in ratings._seen(LEAGUE)
+
+def test_leagues_never_fitted_are_left_alone_unless_seeding(rdir, monkeypatch):
+    fx = _fx(5001, 10, 11, 2, 1, 1_700_000_000, league=140)
+    assert ratings.new_results([fx]) == []
+    assert ratings.record_results([fx]) == {}
+    assert not os.path.exists(ratings.ratings_path(140))
+    monkeypatch.setattr(ratings, "RATINGS_SEED", True)
+    ratings._logs.clear()
+    assert ratings.new_results([fx]) == [fx]
+    assert ratings.record_results([fx]) == {140: 1}
+    assert ratings.load_ratings(ratings.ratings_path(140)).online_updates == 1
+    assert ratings.new_results([fx]) == []
+
+def test_single_file_ratings_are_migrated(rdir):
+    r = _fit(_season())
+    path = ratings.ratings_path(LEAGUE)
+    os.remove(ratings.log_path(path))
+    np.savez_compressed(path, team_ids=r.team_ids, attack=r.attack, defence=r.defence,
+                        scalars=np.array([r.mu, r.home_adv, r.rho]), log=r.log,
+                        meta=np.array([r.league_id, r.n_matches, r.fitted_at, 0], dtype=np.int64))
+    ratings._logs.clear(); ratings._loaded.clear()
+    assert ratings.new_results([_fx(1001, 1, 2, 1, 0, 0)]) == []
+    fresh = _fx(9003, 2, 3, 1, 1, int(r.log[:, 4].max()) + DAY)
+    assert ratings.record_results([fresh]) == {LEAGUE: 1}
+    assert len(ratings.read_log(path)[0]) == len(r.log) + 1
+    with np.load(path) as z: assert "log" not in z.files
+
+def test_reconcile_refits_rho_and_resets_drift(rdir, monkeypatch):
+    r = _fit(_season())
+    drifted = r._replace(rho=0.15, attack=r.attack + 0.3, online_updates=150)
+    back = ratings.reconcile(drifted, now=r.fitted_at)
+    assert back.online_updates == 0
+    assert back.rho == pytest.approx(r.rho)
+    np.testing.assert_allclose(back.attack, r.attack)
+
+def test_record_reconciles_from_the_full_log(rdir, monkeypatch):
+    r = _fit(_season())
+    monkeypatch.setattr(ratings, "RECONCILE_EVERY", 1)
+    fresh = _fx(9004, 3, 4, 2, 0, int(r.log[:, 4].max()) + DAY)
+    assert ratings.record_results([fresh]) == {LEAGUE: 1}
+    after = ratings.load_ratings(ratings.ratings_path(LEAGUE))
+    assert after.online_updates == 0 and after.n_matches == len(r.log) + 1 == len(after.log)
+
+def test_fit_recovers_known_strengths():
+    rng = np.random.default_rng(1)
+    att, dfn = np.array([0.3, 0.1, -0.1, -0.3]), np.array([0.2, -0.2, 0.1, -0.1])
+    hi, ai = rng.integers(0, 4, 20000), rng.integers(0, 4, 20000)
+    hi, ai = hi[hi != ai], ai[hi != ai]
+    hg = rng.poisson(np.exp(0.1 + 0.25 + att[hi] - dfn[ai])); ag = rng.poisson(np.exp(0.1 + att[ai] - dfn[hi]))
+    mu, home, a, d = ratings.fit_poisson(hi, ai, hg, ag, 4)
+    assert mu == pytest.approx(0.1, abs=0.03) and home == pytest.approx(0.25, abs=0.03)
+    np.testing.assert_allclose(a, att, atol=0.03); np.testing.assert_allclose(d, dfn, atol=0.03)
+
+def test_matches_from_fixtures_reads_regulation_results():
+    aet = _fx(2, 1, 2, 3, 2, 0, status="AET")
+    aet["score"] = {"fulltime": {"home": 2, "away": 2}}
+    aet["fixture"].update(timestamp=None, date="2025-01-01T15:00:00Z")
+    m = ratings.matches_from_fixtures([_fx(1, 1, 2, 1, 0, 100), aet, _fx(3, 1, 2, None, None, 0),
+                                       _fx(4, 1, 2, 0, 0, 0, status="1H")])
+    assert m.as_log().tolist() == [[1, 2, 1, 0, 100, 1], [1, 2, 2, 2, 1735743600, 2]]
+
+def test_lookup_is_the_log_linear_model(rdir):
+    r = _fit(_season())
+    idx = r.index()
+    lh, la, rho = ratings.lambdas(LEAGUE, 1, "4")
+    assert lh == pytest.approx(np.exp(r.mu + r.home_adv + r.attack[idx[1]] - r.defence[idx[4]]))
+    assert la == pytest.approx(np.exp(r.mu + r.attack[idx[4]] - r.defence[idx[1]]))
+    assert rho == r.rho and lh > la
+    assert ratings.lambdas(LEAGUE, 1, 99) is None and ratings.lambdas(140, 1, 4) is None
+    assert ratings.lambdas(None, 1, 4) is None and ratings.lambdas("x", 1, 4) is None
+
+def test_engine_prices_rated_teams_from_their_ratings(rdir):
+    _fit(_season())
+    from app.engine import football as fb
+    params, _, basis = fb.match_probabilities([{"league_id": LEAGUE, "home_id": 1, "away_id": 4},
+                                               {"league_id": LEAGUE, "home_id": 1, "away_id": 99}])
+    assert list(basis) == ["fitted ratings", "priors"]
+    assert params[0].tolist() == pytest.approx(list(ratings.lambdas(LEAGUE, 1, 4)))
+
+def test_cli_fits_from_saved_responses(rdir, tmp_path, capsys):
+    src = tmp_path / "fixtures_2024.json"
+    src.write_text(json.dumps({"response": _season()}))
+    assert ratings.main(["fit", "--league", str(LEAGUE), "--from-json", str(src)]) == 0
+    assert ratings.get_ratings(LEAGUE)[0].n_matches == len(_season())
+    assert ratings.main(["show", "--league", str(LEAGUE)]) == 0
+    assert "league 39" in capsys.readouterr().out
+    assert ratings.main(["show", "--league", "140"]) == 1
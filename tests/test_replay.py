@@ -0,0 +1,101 @@
+# tests/test_replay.py
+import json
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.engine import backtest as bt
+from app.engine.adapters import live_football as lf
+from app.engine.adapters.replay import Corpus, Replayer, ReplayAdapter, ReplayServer
+from bench.api_stub import StubAPI
+
+@pytest.fixture
+def stub():
+    s = StubAPI(n_fixtures=12, page_size=5)
+    base = s.start()
+    yield s, base
+    s.stop()
+
+def _serve(monkeypatch, replayer, upstream="http://127.0.0.1:9"):
+    server = ReplayServer(replayer, upstream)
+    monkeypatch.setattr(lf, "BASE", server.start())
+    monkeypatch.setattr(lf, "CACHE", None)
+    return server
+
+def _pull():
+    return lf.fixtures(39, 2025), lf.odds_bulk(39, 2025)
+
+def test_recorded_run_replays_offline(stub, tmp_path, monkeypatch):
+    s, base = stub
+    corpus = str(tmp_path / "corpus")
+    rec = Replayer(Corpus(corpus), "record")
+    server = _serve(monkeypatch, rec, base)
+    live = _pull()
+    server.stop(); s.stop()
+    assert rec.stats()["recorded"] == 1 + 3 and len(live[1]) == 12
+
+    replay = Replayer(Corpus(corpus), "replay")
+    server = _serve(monkeypatch, replay)
+    try:
+        assert _pull() == live
+        with pytest.raises(requests.HTTPError):
+            lf.fixtures(140, 2025)                      # never recorded: 404, not a live call
+    finally:
+        server.stop()
+    assert (replay.counters["hits"], replay.counters["misses"], replay.counters["upstream"]) == (4, 1, 0)
+    assert sorted(r.path for r in Corpus(corpus)) == ["fixtures", "odds", "odds", "odds"]
+    assert len([i for i in bt.iter_response_items([corpus]) if "teams" in i]) == 12   # the backtest reads it too
+
+def _upstream(body, status=200):
+    calls = []
+    def call():
+        calls.append(1)
+        return status, {"content-type": "application/json", "x-ratelimit-remaining": "9", "set-cookie": "x"}, \
+            json.dumps(body).encode(), 0.25
+    return calls, call
+
+def test_only_clean_responses_are_recorded(tmp_path):
+    r = Replayer(Corpus(str(tmp_path)), "record")
+    for body, status in (({"errors": {"requests": "limit"}, "response": []}, 200),
+                         ({"errors": [], "response": [1]}, 500)):
+        r.respond("fixtures", {"date": "x"}, _upstream(body, status)[1])
+    assert list(Corpus(str(tmp_path))) == []
+    r.respond("fixtures", {"date": "x"}, _upstream({"errors": [], "response": [1]})[1])
+    (saved,) = Corpus(str(tmp_path))
+    assert saved.headers == {"content-type": "application/json", "x-ratelimit-remaining": "9"}
+    assert saved.elapsed_ms == 250.0 and saved.params == {"date": "x"}
+
+def test_hybrid_records_misses_once(tmp_path):
+    r = Replayer(Corpus(str(tmp_path)), "hybrid")
+    calls, up = _upstream({"errors": [], "response": [{"id": 1}]})
+    bodies = [r.respond("odds", {"fixture": 1}, up)[2] for _ in range(3)]
+    assert len(calls) == 1 and json.loads(bodies[0]) == json.loads(bodies[2])
+    assert (r.counters["recorded"], r.counters["hits"]) == (1, 2)
+
+def _faults(tmp_path, seed, **kw):
+    corpus = Corpus(str(tmp_path))
+    if not list(corpus):
+        corpus.put("fixtures", {"date": "x"}, 200, {}, b'{"errors":[],"response":[]}', 0.08)
+    slept = []
+    r = Replayer(corpus, "replay", seed=seed, sleep=slept.append, **kw)
+    statuses = [r.respond("fixtures", {"date": "x"})[0] for _ in range(40)]
+    return statuses, slept
+
+def test_faults_are_reproducible_per_seed(tmp_path):
+    a = _faults(tmp_path, 1, latency_ms="20", jitter_ms=10, error_rate=0.3, error_status=503)
+    assert a == _faults(tmp_path, 1, latency_ms="20", jitter_ms=10, error_rate=0.3, error_status=503)
+    assert a != _faults(tmp_path, 2, latency_ms="20", jitter_ms=10, error_rate=0.3, error_status=503)
+    statuses, slept = a
+    assert set(statuses) == {200, 503} and all(0.02 <= s < 0.03 for s in slept)
+    _, slept = _faults(tmp_path, 1, latency_ms="recorded")
+    assert slept == [0.08] * 40
+
+def test_adapter_serves_a_session_in_process(stub, tmp_path):
+    s, base = stub
+    session = requests.Session()
+    replayer = Replayer(Corpus(str(tmp_path)), "hybrid")
+    session.mount(base + "/", ReplayAdapter(replayer, HTTPAdapter(), base))
+    first = session.get(f"{base}/odds", params={"fixture": 1_000_003}).json()
+    s.stop()
+    again = session.get(f"{base}/odds", params={"fixture": 1_000_003})
+    assert again.status_code == 200 and again.json() == first and s.calls == {"/odds": 1}
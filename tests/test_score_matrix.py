@@ -0,0 +1,67 @@
+# tests/test_score_matrix.py
+import math
+import numpy as np
+import pytest
+
+from app.engine import football as fb
+
+def test_matrix_is_normalised_outer_product_with_dc_corner():
+    lh, la, rho, g = 1.4, 1.1, 0.05, 10
+    P = fb.poisson_prob_matrix(lh, la, g, rho)
+    ref = np.multiply.outer(fb.poisson_pmf(lh, g), fb.poisson_pmf(la, g))
+    ref[:2, :2] *= [[1 - lh*la*rho, 1 + lh*rho], [1 + la*rho, 1 - rho]]
+    assert P.shape == (g + 1, g + 1)
+    assert P.sum() == pytest.approx(1.0)
+    np.testing.assert_allclose(P, ref / ref.sum(), rtol=1e-12)
+
+def _baseline_matrix(lh, la, g, rho):
+    """The original per-cell double loop, kept verbatim as the reference."""
+    P = np.zeros((g+1, g+1))
+    for i in range(g+1):
+        for j in range(g+1):
+            p_ind = (math.exp(-lh) * (lh**i) / math.factorial(i)) * \
+                    (math.exp(-la) * (la**j) / math.factorial(j))
+            adj = 1.0
+            if i <= 1 and j <= 1:
+                if i == 0 and j == 0: adj = 1 - (lh*la*rho)
+                elif i == 0 and j == 1: adj = 1 + (lh*rho)
+                elif i == 1 and j == 0: adj = 1 + (la*rho)
+                elif i == 1 and j == 1: adj = 1 - rho
+            P[i,j] = p_ind * adj
+    S = P.sum()
+    if S>0: P /= S
+    return P
+
+@pytest.mark.parametrize("g", [3, 6, 10, 15])
+@pytest.mark.parametrize("rho", [-0.1, 0, 0.02, 0.1])
+def test_matrix_matches_the_baseline_loop(g, rho):
+    for lh in np.linspace(0.05, 5, 12):
+        for la in np.linspace(0.05, 5, 12):
+            np.testing.assert_allclose(fb.poisson_prob_matrix(lh, la, g, rho), _baseline_matrix(lh, la, g, rho),
+                                       rtol=0, atol=1e-15)
+
+def test_tensor_matches_matrix_per_row():
+    lh, la, rho = np.array([0.6, 1.3, 2.4]), np.array([1.9, 1.0, 0.4]), np.array([0.02, 0.05, -0.03])
+    T = fb.poisson_prob_tensor(lh, la, 8, rho)
+    for k in range(3):
+        np.testing.assert_allclose(T[k], fb.poisson_prob_matrix(lh[k], la[k], 8, rho[k]), rtol=1e-12)
+
+@pytest.mark.parametrize("bad", [0, -1, 200, 2.5, "abc", True, float("inf")])
+def test_out_of_range_max_goals_is_rejected(client, bad):
+    r = client.post("/analyze/football", json={"home": "A", "away": "B", "max_goals": bad,
+                                                "odds": {"1": 4.2, "X": 3.4, "2": 1.9}})
+    assert r.status_code == 400
+    assert "max_goals" in r.get_json()["reason"]
+
+def test_max_goals_checked_on_every_entry_point(client):
+    item = {"home": "A", "away": "B", "max_goals": 0, "odds": {"1": 4.2, "X": 3.4, "2": 1.9}}
+    assert client.post("/analyze/football/batch", json={"items": [item]}).status_code == 400
+    assert client.post("/simulate/bankroll", json={"items": [item], "paths": 10}).status_code == 400
+    with pytest.raises(fb.PayloadError):
+        fb.match_probabilities([item])
+
+def test_valid_max_goals_sizes_the_grid(client):
+    r = client.post("/analyze/football", json={"home": "A", "away": "B", "max_goals": "6",
+                                                "odds": {"1": 4.2, "X": 3.4, "2": 1.9}})
+    assert r.status_code == 200
+    assert r.get_json()["audit"]["grid"]["max_goals"] == 6
@@ -0,0 +1,57 @@
+# tests/test_simulation.py
+import numpy as np
+import pytest
+
+from app.engine import football as fb
+from app.engine import simulation as sim
+
+ITEM = {"home": "A", "away": "B", "odds": {"1": 4.2, "X": 3.4, "2": 1.9}}
+
+def _grids():
+    return [fb.poisson_prob_matrix(1.5, 1.1, 10, 0.05), fb.poisson_prob_matrix(0.9, 1.6, 10, 0.02)]
+
+def test_same_seed_same_numbers_and_chunking_bounds_memory():
+    picks = [sim.Pick(0, "1", 2.4), sim.Pick(0, "Over 2.5", 1.9), sim.Pick(1, "2", 2.1)]
+    a = sim.simulate(_grids(), picks, paths=3000, rounds=5, seed=11, chunk=1000)
+    b = sim.simulate(_grids(), picks, paths=3000, rounds=5, seed=11, chunk=1000)
+    assert a == b
+    assert [p["prob"] for p in a["picks"]] == [round(float(v), 4) for v in (
+        fb.probs_from_matrix(_grids()[0])["1"], fb.over_under_probs(_grids()[0], 2.5)[0], fb.probs_from_matrix(_grids()[1])["2"])]
+
+@pytest.mark.parametrize("opts", [
+    {"rounds": sim.SIM_MAX_ROUNDS + 1},
+    {"kelly": [0.5] * (sim.SIM_MAX_KELLY + 1)},
+    {"kelly": [-3]}, {"kelly": [0]}, {"kelly": []},
+    {"max_exposure": 1.5}, {"max_exposure": 0}, {"ruin": 0},
+    {"paths": sim.SIM_MAX_DRAWS // 6 + 1, "rounds": 1, "kelly": [0.5, 1, 2]},   # 2 fixtures x 3 multipliers
+])
+def test_requests_outside_the_budget_are_refused(opts):
+    with pytest.raises(ValueError):
+        sim.simulate(_grids(), [sim.Pick(0, "1", 2.4), sim.Pick(1, "2", 2.1)], **opts)
+
+def test_route_answers_400(client):
+    assert client.post("/simulate/bankroll", json={"items": [ITEM], "kelly": [-3]}).status_code == 400
+    assert client.post("/simulate/bankroll", json={"items": [ITEM], "paths": 1, "rounds": 200_000_000}).status_code == 400
+    r = client.post("/simulate/bankroll", json={"items": [ITEM], "paths": 500, "rounds": 3, "seed": 1})
+    assert r.status_code == 200 and all(k["exposure"] > 0 for k in r.get_json()["kelly"])
+
+def test_pick_mc_is_independent_of_the_grid_and_agrees_with_it():
+    params = np.array([[1.5, 1.1, 0.05], [0.9, 1.6, 0.02]])
+    sels, odds = ["1", "X"], np.array([2.4, 3.3])
+    grids = [fb.poisson_prob_matrix(*p[:2], 10, p[2]) for p in params]
+    model = np.array([fb.probs_from_matrix(P)[s] for P, s in zip(grids, sels)])
+    out = sim.pick_mc(params, sels, odds, model, seeds=[1, 2], paths=200_000)
+    assert all(r["agrees"] for r in out)
+    assert [r["ev_model"] for r in out] == [round(float(q*o - 1), 4) for q, o in zip(model, odds)]
+    # a wrong model probability is caught
+    assert not any(r["agrees"] for r in sim.pick_mc(params, sels, odds, model + 0.05, seeds=[1, 2], paths=200_000))
+
+def test_ev_mc_is_off_by_default_and_batch_equals_single(monkeypatch):
+    assert sim.SIM_AUDIT_PATHS == 0
+    assert "ev_mc" not in fb.analyze_football_match(ITEM)["audit"]
+    monkeypatch.setattr(sim, "SIM_AUDIT_PATHS", 500)
+    monkeypatch.setattr(sim.pick_mc, "__defaults__", (500,))
+    items = [dict(ITEM, home=f"H{k}", odds={"1": 4.2 + k/10, "X": 3.4, "2": 1.9}) for k in range(4)]
+    batch = fb.analyze_football_batch(items)
+    assert batch == [fb.analyze_football_match(p) for p in items]
+    assert batch[0]["audit"]["ev_mc"]["paths"] == 500
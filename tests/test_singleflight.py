@@ -0,0 +1,82 @@
+# tests/test_singleflight.py
+import asyncio, threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+from app.engine.adapters import live_football as lf
+from app.engine.adapters.singleflight import AsyncSingleFlight, SingleFlight
+from bench.api_stub import StubAPI
+
+def _concurrently(n, fn):
+    with ThreadPoolExecutor(max_workers=n) as ex:
+        futures = [ex.submit(fn) for _ in range(n)]
+        return [f.exception() or f.result() for f in futures]
+
+def _gated(sf, key, result, n=6):
+    """n callers of one key; the leader is held until every follower is waiting on it."""
+    runs, gate = [], threading.Event()
+    def fn():
+        runs.append(1)
+        gate.wait(2)
+        if isinstance(result, BaseException): raise result
+        return result
+    def waiters():
+        while sf.stats()["deduplicated"] < n - 1 and not gate.wait(0.001): pass
+        gate.set()
+    threading.Thread(target=waiters, daemon=True).start()
+    return runs, _concurrently(n, lambda: sf.do(key, fn))
+
+def test_concurrent_callers_share_one_call():
+    sf = SingleFlight()
+    value = {"response": [1]}
+    runs, out = _gated(sf, "odds?fixture=1", value)
+    assert len(runs) == 1 and all(v is value for v in out)
+    assert sf.stats() == {"calls": 6, "executed": 1, "deduplicated": 5, "errors": 0, "in_flight": 0}
+
+def test_followers_get_the_leaders_exception():
+    sf = SingleFlight()
+    runs, out = _gated(sf, "fixtures?date=x", RuntimeError("upstream 500"))
+    assert len(runs) == 1 and all(isinstance(e, RuntimeError) for e in out)
+    assert sf.stats()["errors"] == 1
+
+def test_nothing_is_remembered_after_the_call():
+    sf, runs = SingleFlight(), []
+    for _ in range(3): sf.do("k", lambda: runs.append(1))
+    with pytest.raises(KeyError): sf.do("k", lambda: {}["x"])
+    assert sf.do("k", lambda: 5) == 5 and len(runs) == 3 and sf.stats()["in_flight"] == 0
+
+def test_async_callers_share_one_call():
+    async def go():
+        sf, runs = AsyncSingleFlight(), []
+        async def fn():
+            runs.append(1)
+            await asyncio.sleep(0.01)
+            return len(runs)
+        out = await asyncio.gather(*(sf.do("k", fn) for _ in range(5)))
+        return runs, out, sf.stats()
+    runs, out, stats = asyncio.run(go())
+    assert runs == [1] and out == [1] * 5 and stats["deduplicated"] == 4 and stats["in_flight"] == 0
+
+def test_cancelled_async_leader_does_not_cancel_followers():
+    async def go():
+        sf = AsyncSingleFlight()
+        leader = asyncio.ensure_future(sf.do("k", lambda: asyncio.sleep(5)))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(sf.do("k", lambda: asyncio.sleep(5)))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(RuntimeError, match="cancelled"):
+            await follower
+        assert leader.cancelled()
+    asyncio.run(go())
+
+def test_identical_upstream_calls_are_coalesced(monkeypatch):
+    stub = StubAPI(n_fixtures=3, latency_s=0.2)
+    monkeypatch.setattr(lf, "BASE", stub.start())
+    monkeypatch.setattr(lf, "CACHE", None)
+    monkeypatch.setattr(lf, "FLIGHTS", SingleFlight())
+    try:
+        out = _concurrently(8, lambda: lf.fixtures(39, 2025))
+    finally:
+        stub.stop()
+    assert all(len(r) == 3 for r in out) and stub.calls == {"/fixtures": 1}
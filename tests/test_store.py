@@ -0,0 +1,77 @@
+# tests/test_store.py
+import os, sqlite3, subprocess, sys, time
+import pytest
+
+from app.engine import store as st
+from app.engine.metrics import REGISTRY
+from tests.conftest import ROOT
+
+def _pick(k, league="EPL", status="FINAL_PICK", date="2025-01-01"):
+    return {"home": f"H{k}", "away": f"A{k}", "league": league, "status": status, "date": date,
+            "alignment": {"vm_best": "1"}}
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    s = st.MemoryPickStore() if request.param == "memory" else st.SqlitePickStore(str(tmp_path / "picks.sqlite"))
+    yield s
+    s.close()
+
+def test_importing_the_engine_opens_no_store(tmp_path):
+    env = {k: v for k, v in os.environ.items() if k not in ("PICK_STORE", "PICK_DB")}
+    env["PYTHONPATH"] = ROOT
+    subprocess.run([sys.executable, "-c", "import app.asgi, app.engine.backtest"], cwd=tmp_path, env=env, check=True)
+    assert not list(tmp_path.glob("*.sqlite*"))
+
+def test_pick_store_is_abstract():
+    class Partial(st.PickStore):
+        def add(self, pick): pass
+    with pytest.raises(TypeError):
+        Partial()
+
+def test_add_query_filters_and_pages(store):
+    for k in range(5):
+        store.add(_pick(k, league="EPL" if k % 2 == 0 else "LaLiga", date=f"2025-01-0{k+1}"))
+    store.flush()   # add() is queued; add_many() writes at once
+    store.add_many([_pick(9, status="SKIPPED")])
+    assert store.count() == 6
+    assert store.count({"league": "EPL"}) == 4
+    assert store.count({"date_from": "2025-01-02", "date_to": "2025-01-03"}) == 2
+    page, cursor = store.query({"league": "EPL"}, limit=2)
+    assert [p["home"] for p in page] == ["H0", "H2"] and cursor is not None
+    rest, end = store.query({"league": "EPL"}, limit=10, cursor=cursor)
+    assert [p["home"] for p in rest] == ["H4", "H9"] and end is None
+    assert [rid for rid, _ in store.iter_raw({"status": "SKIPPED"})] == [6]
+    assert store.replace_all([_pick(1)]) == 1 and store.count() == 1
+
+def test_failed_batch_is_retried_not_dropped(tmp_path, monkeypatch):
+    monkeypatch.setattr(st, "_RETRY_S", 0.05)
+    s = st.SqlitePickStore(str(tmp_path / "picks.sqlite"), flush_s=0.01)
+    real, failures = s._insert, [1]
+    def flaky(con, picks):
+        if failures:
+            failures.pop(); raise sqlite3.OperationalError("database is locked")
+        return real(con, picks)
+    monkeypatch.setattr(s, "_insert", flaky)
+    before = REGISTRY.counters.get(("betrun_pick_store_total", (("event", "failed_batches"),)), 0)
+    s.add(_pick(1))
+    deadline = time.time() + 5
+    while s.count() < 1 and time.time() < deadline: time.sleep(0.02)
+    assert s.count() == 1
+    assert REGISTRY.counters[("betrun_pick_store_total", (("event", "failed_batches"),))] == before + 1
+    s.close()
+
+@pytest.mark.parametrize("query", ["limit=-4", "limit=0", "limit=abc", "cursor=x", "cursor=-1", "cursor=1.5"])
+@pytest.mark.parametrize("route", ["/export", "/export/stream"])
+def test_export_rejects_bad_paging_args(client, route, query):
+    r = client.get(f"{route}?{query}")
+    assert r.status_code == 400 and query.split("=")[0] in r.get_json()["reason"]
+
+def test_export_pages_to_the_end(client):
+    client.post("/import", json={"items": [_pick(k) for k in range(5)]})
+    seen, cursor = [], ""
+    while cursor is not None:
+        page = client.get(f"/export?limit=2&cursor={cursor}").get_json()
+        seen += [p["home"] for p in page["items"]]
+        cursor = page["next_cursor"]
+    assert seen == [f"H{k}" for k in range(5)]
+    assert client.get("/export/stream?limit=3").get_data().count(b"\n") == 3
@@ -0,0 +1,71 @@
+# tests/test_stream.py
+import numpy as np
+import pytest
+
+from app import app as web
+from app.engine import stream as st
+
+def _item(fid, home=2.0, draw=3.4, away=3.8, status="NS"):
+    return {"fixture_id": fid, "status": status, "odds": {"1": home, "X": draw, "2": away},
+            "market_odds": None, "bookmaker": "Bet365"}
+
+def _feed(polls):
+    it = iter(polls)
+    return st.Feed((39, 2025, None), lambda refresh: next(it), lambda items: np.full((len(items), 3), 1/3))
+
+def test_diff_reports_moves_status_and_membership():
+    old = {1: _item(1), 2: _item(2)}
+    new = {1: _item(1, home=2.1, status="1H"), 3: _item(3)}
+    added, changes, removed = st.diff(old, new)
+    assert [it["fixture_id"] for it in added] == [3] and removed == [2]
+    assert changes == [{"fixture_id": 1, "status": "1H", "odds": {"1": 2.1}}]
+
+def test_poll_publishes_only_changes_with_fresh_edges():
+    feed = _feed([[_item(1), _item(2)], [_item(1), _item(2)], [_item(1, home=2.6), _item(2)]])
+    sub = feed.subscribe()
+    assert feed.poll(now=0) is not None          # first poll: everything is "added"
+    before = feed.items[1]["value_mode"]
+    assert feed.poll(now=1) is None              # nothing moved
+    payload = feed.poll(now=2)
+    assert b'"changes":[{"fixture_id":1' in payload and b'"value_mode"' in payload
+    assert sub.queue.qsize() == 2 and feed.version == 2
+    expected = st.value_mode([_item(1, home=2.6)], np.full((1, 3), 1/3))[0]
+    assert feed.items[1]["value_mode"] == expected != before
+
+def test_slow_subscriber_is_resynced(monkeypatch):
+    monkeypatch.setattr(st, "STREAM_QUEUE", 1)
+    feed = _feed([[_item(1, home=2 + k/10)] for k in range(3)])
+    sub = feed.subscribe()
+    for k in range(3): feed.poll(now=k)
+    assert sub.resync
+    gen = feed.stream(sub, heartbeat_s=0.01)
+    feed.ready.set()
+    assert b"event: snapshot" in next(gen)
+    assert b"event: snapshot" in next(gen)      # the overflowed queue is replaced by a fresh snapshot
+    gen.close()
+    assert feed.subscribers == []
+
+def test_hub_caps_viewers_per_worker():
+    hub = st.Hub(max_feeds=4, max_subscribers=2)
+    fetch, probs = (lambda refresh: []), (lambda items: np.zeros((0, 3)))
+    hub.subscribe((1, 2025, None), fetch, probs)
+    feed, sub = hub.subscribe((2, 2025, None), fetch, probs)
+    with pytest.raises(RuntimeError, match="STREAM_MAX_SUBSCRIBERS"):
+        hub.subscribe((1, 2025, None), fetch, probs)
+    feed.unsubscribe(sub)
+    hub.subscribe((1, 2025, None), fetch, probs)
+    assert hub.status()["subscribers"] == 2
+
+def test_stream_route_answers_503_when_full(client, monkeypatch):
+    monkeypatch.setattr(web.STREAM_HUB, "max_subscribers", 0)
+    r = client.get("/api/matches/stream?league_id=39&season=2025")
+    assert r.status_code == 503 and "STREAM_MAX_SUBSCRIBERS" in r.get_json()["error"]
+
+def test_only_upstream_failures_are_502(client, monkeypatch):
+    r = client.get("/api/matches?date=2025-01-01")    # APISPORTS_BASE points at a closed port
+    assert r.status_code == 502 and r.get_json()["error"].startswith("fixtures: ")
+    monkeypatch.setattr(web.api, "fixtures", lambda *a, **k: [{"fixture": {"id": 1}}])
+    def broken(fixtures_raw): raise KeyError("team index")
+    monkeypatch.setattr(web, "_fixture_slate", broken)
+    with pytest.raises(KeyError):                     # a bug of ours, not reported as an upstream outage
+        client.get("/api/matches?date=2025-01-01")
@@ -0,0 +1,51 @@
+# tests/test_team_index.py
+import pytest
+
+from app.engine.adapters.sources import _ALIAS, _norm
+from app.engine.adapters.team_index import TeamIndex
+
+TEAMS = [(33, "Manchester United"), (50, "Manchester City"), (541, "Real Madrid"), (548, "Real Sociedad"),
+         (543, "Real Betis"), (47, "Tottenham Hotspur"), (42, "Arsenal"), (157, "Bayern Munich")]
+
+@pytest.fixture
+def index():
+    idx = TeamIndex(_norm, _ALIAS)
+    for tid, name in TEAMS:
+        idx.add({"team": {"id": tid, "name": name}}, 39)
+    return idx
+
+@pytest.mark.parametrize("name,how,team_id", [
+    ("Arsenal FC", "exact", 42),
+    ("Man City", "alias", 50),
+    ("Tottenham", "fuzzy", 47),
+    ("Bayern Munchen", "fuzzy", 157),
+    ("Manchester", "ambiguous", None),   # United and City tie
+    ("Real", "miss", None),              # too short to match inside "real madrid"
+    ("Man", "miss", None),
+])
+def test_lookup(index, name, how, team_id):
+    m = index.lookup(name)
+    assert m.how == how
+    assert ((m.team or {}).get("team") or {}).get("id") == team_id
+
+def test_lookup_many_agrees_with_lookup(index):
+    names = ["Arsenal FC", "Man City", "Tottenham", "Manchester", "Real", "Man", "Bayern Munchen", ""]
+    fresh = TeamIndex(_norm, _ALIAS)
+    for tid, name in TEAMS:
+        fresh.add({"team": {"id": tid, "name": name}}, 39)
+    assert [(m.how, m.team) for m in index.lookup_many(names)] == [(m.how, m.team) for m in map(fresh.lookup, names)]
+
+def test_runner_up_of_the_same_team_is_not_a_rival():
+    idx = TeamIndex(_norm, {})
+    idx.add({"team": {"id": 47, "name": "Tottenham Hotspur"}})
+    idx.add({"team": {"id": 47, "name": "Tottenham Hotspurs"}})
+    assert idx.lookup("Tottenham").how == "fuzzy"
+
+def test_strict_matching_never_fuzzes(index):
+    index.strict = True
+    assert index.lookup("Tottenham").team is None
+
+@pytest.mark.parametrize("league_id", ["abc", 39.5, True, [39]])
+def test_resolve_rejects_a_bad_league_id(client, league_id):
+    r = client.post("/api/teams/resolve", json={"names": ["Arsenal"], "league_id": league_id})
+    assert r.status_code == 400 and "league_id" in r.get_json()["error"]